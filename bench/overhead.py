@@ -0,0 +1,378 @@
+"""Benchmark of the per-case overhead of the adapter.
+
+usage: python bench/overhead.py [--cases N] [--jobs 1,8,32] [--json FILE]
+                                [--baseline FILE] [--tolerance RATIO]
+
+Trivial solvers in C++ and Python, which read the input and write a zero score,
+are run through run_case, as `run` does, and through a raw subprocess.run with the
+same stdin and stdout as the baseline. The difference between the two is what the
+adapter adds per case: the temporary files, the opens, the logging, the decoding
+of the output and the parsing of the score.
+
+For each solver and number of workers, the throughput, the median and 95th
+percentile latency per case and the peak memory traced in the adapter are
+reported. With --baseline, the overhead is compared with a previous --json result
+and the benchmark exits with 1 if it regressed by more than the tolerance.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tracemalloc
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from cp_heuristics_adapter.executor import Case, Verdict, run_case
+from cp_heuristics_adapter.runner import ProgramRunner
+from cp_heuristics_adapter.setup_logger import add_log_file, setup_logging
+
+PYTHON_SOLVER = """\
+import sys
+sys.stdin.read()
+with open(sys.argv[1], "w") as f:
+    f.write("0")
+"""
+
+CPP_SOLVER = """\
+#include <fstream>
+#include <iostream>
+#include <iterator>
+#include <string>
+int main(int argc, char *argv[]) {
+    std::string input{std::istreambuf_iterator<char>(std::cin), {}};
+    std::ofstream(argv[1]) << 0;
+}
+"""
+
+# Overheads below this [ms] are within the noise and never reported as regressions
+NOISE_FLOOR_MS = 1.0
+
+
+@dataclass(frozen=True)
+class Measurement:
+    """Measurement of a scenario.
+
+    Attributes:
+        solver (str): Name of the solver.
+        jobs (int): Number of workers.
+        mode (str): 'raw' for the baseline, 'adapter' for run_case.
+        throughput (float): Cases per second.
+        p50_ms (float): Median latency [ms] per case.
+        p95_ms (float): 95th percentile latency [ms] per case.
+        peak_kib (float | None): Peak memory [KiB] traced in the adapter. None for the baseline.
+    """
+
+    solver: str
+    jobs: int
+    mode: str
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    peak_kib: float | None
+
+
+def build_solvers(work_dir: Path) -> dict[str, list[str]]:
+    """Write the trivial solvers and build the C++ one if a compiler is available.
+
+    Args:
+        work_dir (Path): Directory to write the solvers to.
+
+    Returns:
+        dict[str, list[str]]: Command to run each solver.
+    """
+    python_source = work_dir / "noop.py"
+    python_source.write_text(PYTHON_SOLVER)
+    solvers = {"python": [sys.executable, str(python_source)]}
+    cxx = shutil.which("g++") or shutil.which("clang++")
+    if cxx is None:
+        print("C++ compiler not found, skipping the C++ solver", file=sys.stderr)
+        return solvers
+    cpp_source = work_dir / "noop.cpp"
+    cpp_source.write_text(CPP_SOLVER)
+    executable = work_dir / "noop_cpp"
+    subprocess.run([cxx, "-O2", str(cpp_source), "-o", str(executable)], check=True)
+    solvers["cpp"] = [str(executable)]
+    return solvers
+
+
+def make_cases(work_dir: Path, number: int) -> list[Case]:
+    """Write the inputs of the cases.
+
+    Args:
+        work_dir (Path): Directory to write the inputs to.
+        number (int): Number of cases.
+
+    Returns:
+        list[Case]: Cases.
+    """
+    (work_dir / "in").mkdir(exist_ok=True)
+    (work_dir / "out").mkdir(exist_ok=True)
+    cases = []
+    for case_id in range(number):
+        input_file = work_dir / "in" / f"{case_id:04}.txt"
+        input_file.write_text(f"{case_id} {case_id + 1}\n")
+        cases.append(Case(case_id, input_file, work_dir / "out" / f"{case_id:04}.txt"))
+    return cases
+
+
+def raw_exec(cmd: list[str], case: Case) -> None:
+    """Run a case with subprocess.run only.
+
+    Args:
+        cmd (list[str]): Command to run the solver.
+        case (Case): Case.
+    """
+    score_file = case.output_file.with_suffix(".score")
+    with case.input_file.open() as inf, case.output_file.open("w") as ouf:
+        subprocess.run(cmd + [str(score_file)], stdin=inf, stdout=ouf, check=True)
+
+
+def adapter_exec(runner: ProgramRunner, case: Case) -> None:
+    """Run a case with run_case.
+
+    Args:
+        runner (ProgramRunner): Runner of the solver.
+        case (Case): Case.
+
+    Raises:
+        RuntimeError: If the case fails.
+    """
+    result = run_case(runner, case, timelimit=60.0)
+    if result.verdict != Verdict.AC:
+        raise RuntimeError(f"{result.verdict.description()} in {case.input_file}")
+
+
+def measure(
+    run: Callable[[Case], None], cases: list[Case], jobs: int
+) -> tuple[float, list[float]]:
+    """Run the cases with a pool of workers.
+
+    Args:
+        run (Callable[[Case], None]): Function running a case.
+        cases (list[Case]): Cases.
+        jobs (int): Number of workers.
+
+    Returns:
+        tuple[float, list[float]]: Throughput [cases/s] and latency [ms] of each case.
+    """
+
+    def timed(case: Case) -> float:
+        start = perf_counter()
+        run(case)
+        return (perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        # Warm up the workers and the page cache
+        list(pool.map(run, cases[:jobs]))
+        start = perf_counter()
+        latencies = list(pool.map(timed, cases))
+        elapsed = perf_counter() - start
+    return len(cases) / elapsed, latencies
+
+
+def peak_kib(run: Callable[[Case], None], cases: list[Case], jobs: int) -> float:
+    """Measure the peak memory traced while running the cases.
+
+    It is measured in a separate pass since tracing slows down the allocations.
+
+    Args:
+        run (Callable[[Case], None]): Function running a case.
+        cases (list[Case]): Cases.
+        jobs (int): Number of workers.
+
+    Returns:
+        float: Peak memory [KiB].
+    """
+    tracemalloc.start()
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            list(pool.map(run, cases))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def percentile(values: list[float], q: int) -> float:
+    """Get a percentile of the values.
+
+    Args:
+        values (list[float]): Values.
+        q (int): Percentile between 1 and 99.
+
+    Returns:
+        float: Percentile.
+    """
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+def benchmark(
+    solvers: dict[str, list[str]], cases: list[Case], jobs_list: list[int]
+) -> list[Measurement]:
+    """Measure all scenarios.
+
+    Args:
+        solvers (dict[str, list[str]]): Command to run each solver.
+        cases (list[Case]): Cases.
+        jobs_list (list[int]): Numbers of workers.
+
+    Returns:
+        list[Measurement]: Measurements.
+    """
+    measurements = []
+    for solver, cmd in solvers.items():
+        runner = ProgramRunner(cmd)
+        modes: dict[str, Callable[[Case], None]] = {
+            "raw": lambda case: raw_exec(cmd, case),
+            "adapter": lambda case: adapter_exec(runner, case),
+        }
+        for jobs in jobs_list:
+            for mode, run in modes.items():
+                throughput, latencies = measure(run, cases, jobs)
+                measurement = Measurement(
+                    solver=solver,
+                    jobs=jobs,
+                    mode=mode,
+                    throughput=throughput,
+                    p50_ms=statistics.median(latencies),
+                    p95_ms=percentile(latencies, 95),
+                    peak_kib=peak_kib(run, cases, jobs) if mode == "adapter" else None,
+                )
+                print(pretty_row(measurement), flush=True)
+                measurements.append(measurement)
+    return measurements
+
+
+def overheads(measurements: list[Measurement]) -> dict[tuple[str, int], float]:
+    """Get the median overhead of the adapter over the baseline per scenario.
+
+    Args:
+        measurements (list[Measurement]): Measurements.
+
+    Returns:
+        dict[tuple[str, int], float]: Overhead [ms] per solver and number of workers.
+    """
+    p50 = {(m.solver, m.jobs, m.mode): m.p50_ms for m in measurements}
+    return {
+        (solver, jobs): p50[(solver, jobs, "adapter")] - p50[(solver, jobs, "raw")]
+        for solver, jobs, mode in p50
+        if mode == "adapter" and (solver, jobs, "raw") in p50
+    }
+
+
+def pretty_row(m: Measurement) -> str:
+    """Format a measurement as a row of the table.
+
+    Args:
+        m (Measurement): Measurement.
+
+    Returns:
+        str: Row.
+    """
+    peak = "-" if m.peak_kib is None else f"{m.peak_kib:.0f}"
+    return (
+        f"{m.solver:<8} {m.jobs:5} {m.mode:<8} {m.throughput:10.1f} "
+        f"{m.p50_ms:9.2f} {m.p95_ms:9.2f} {peak:>10}"
+    )
+
+
+def regressions(
+    current: dict[tuple[str, int], float],
+    baseline: dict[tuple[str, int], float],
+    tolerance: float,
+) -> list[str]:
+    """Compare the overheads with the baseline.
+
+    Args:
+        current (dict[tuple[str, int], float]): Current overheads [ms].
+        baseline (dict[tuple[str, int], float]): Overheads [ms] of the baseline.
+        tolerance (float): Allowed relative increase.
+
+    Returns:
+        list[str]: Descriptions of the regressions.
+    """
+    found = []
+    for key, overhead in current.items():
+        if key not in baseline:
+            continue
+        allowed = max(baseline[key], NOISE_FLOOR_MS) * (1 + tolerance)
+        if overhead > allowed:
+            solver, jobs = key
+            found.append(
+                f"{solver} with {jobs} jobs: {baseline[key]:.2f} ms -> {overhead:.2f} ms"
+            )
+    return found
+
+
+def load_overheads(json_file: Path) -> dict[tuple[str, int], float]:
+    """Load the overheads from a --json result.
+
+    Args:
+        json_file (Path): Path to the result.
+
+    Returns:
+        dict[tuple[str, int], float]: Overhead [ms] per solver and number of workers.
+    """
+    return overheads([Measurement(**m) for m in json.loads(json_file.read_text())])
+
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Benchmark the per-case overhead.")
+    parser.add_argument("--cases", type=int, default=200, help="Cases per scenario.")
+    parser.add_argument(
+        "--jobs",
+        type=str,
+        default=f"1,{cpus},{cpus * 4}",
+        help="Comma-separated numbers of workers. Default is 1, the CPUs and 4x the CPUs.",
+    )
+    parser.add_argument("--json", type=Path, help="Write the measurements to a file.")
+    parser.add_argument(
+        "--baseline", type=Path, help="Compare the overheads with a --json result."
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed relative increase of the overhead. Default is 0.2.",
+    )
+    args = parser.parse_args()
+    jobs_list = sorted({int(jobs) for jobs in args.jobs.split(",")})
+
+    with TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir)
+        # Log as `run` does: records are queued and written to a JSON-lines file
+        setup_logging(console_level=logging.WARNING)
+        add_log_file(work_dir / "log.jsonl")
+        solvers = build_solvers(work_dir)
+        cases = make_cases(work_dir, args.cases)
+        print("solver    jobs mode        cases/s  p50 [ms]  p95 [ms] peak [KiB]")
+        measurements = benchmark(solvers, cases, jobs_list)
+
+    print()
+    current = overheads(measurements)
+    for (solver, jobs), overhead in current.items():
+        print(f"overhead of {solver} with {jobs} jobs: {overhead:+.2f} ms per case")
+    if args.json is not None:
+        args.json.write_text(json.dumps([asdict(m) for m in measurements], indent=2))
+    if args.baseline is not None:
+        found = regressions(current, load_overheads(args.baseline), args.tolerance)
+        for description in found:
+            print(f"regression: {description}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
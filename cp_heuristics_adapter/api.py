@@ -0,0 +1,202 @@
+"""Library API to run the cases of a project from Python, e.g. in a notebook.
+
+The results are yielded as the cases finish, so they can be consumed before the
+whole run does:
+
+    from cp_heuristics_adapter.api import run_cases
+
+    for result in run_cases("main.cpp", 100, jobs=8, build_mode="release"):
+        print(result.case.case_id, result.verdict.value, result.score)
+
+run_cases_async is the same as an async generator, for asyncio code:
+
+    async for result in run_cases_async("main.cpp", "0-99", jobs=8):
+        ...
+
+Unlike `run`, nothing is written to the scores directory. The outputs are written
+to the outputs directory as usual, unless `write_outputs` is False.
+"""
+
+import asyncio
+import os
+import threading
+from collections.abc import AsyncIterator, Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+from cp_heuristics_adapter import executor
+from cp_heuristics_adapter.executor import Case, CaseResult
+from cp_heuristics_adapter.languages import BuildMode, detect_language
+from cp_heuristics_adapter.project import Project
+from cp_heuristics_adapter.selection import select_cases
+
+__all__ = ["Case", "CaseResult", "run_cases", "run_cases_async"]
+
+# Default time limit [s] of a case
+DEFAULT_TIME_LIMIT = 2.0
+
+
+def _case_ids(cases: str | int | Iterable[int], project: Project) -> list[int]:
+    """Get the IDs of the cases to run.
+
+    Args:
+        cases (str | int | Iterable[int]): Number N of the cases 0 to N-1, selector (see select_cases) or IDs.
+        project (Project): Project.
+
+    Raises:
+        ValueError: If the selector is invalid or no cases are selected.
+
+    Returns:
+        list[int]: IDs of the cases.
+    """
+    if isinstance(cases, str):
+        return select_cases(cases, project)
+    case_ids = list(range(cases)) if isinstance(cases, int) else list(cases)
+    if not case_ids:
+        raise ValueError("No cases are selected")
+    return case_ids
+
+
+def run_cases(
+    source: str | Path,
+    cases: str | int | Iterable[int],
+    *,
+    jobs: int = 1,
+    timelimit: float = DEFAULT_TIME_LIMIT,
+    memory_limit: int | None = None,
+    build_mode: BuildMode | str = BuildMode.DEBUG,
+    seeds: int = 1,
+    args: list[str] | None = None,
+    env: dict[str, str] | None = None,
+    stderr_limit: int | None = None,
+    write_outputs: bool = True,
+    cancel: threading.Event | None = None,
+) -> Iterator[CaseResult]:
+    """Build a source file of a project and run cases, yielding their results.
+
+    The source is built when the iteration starts, with the language config of the
+    project. Results are yielded in the order of completion. Cases that have not
+    started yet are cancelled when the iteration is stopped.
+
+    Args:
+        source (str | Path): Path to the source file, in a project.
+        cases (str | int | Iterable[int]): Cases to run. A number N runs the cases 0 to N-1, a
+            string is a selector as in `run` (e.g. '3,10-20' or 'failed'), and otherwise the case IDs.
+        jobs (int, optional): Number of cases to run at the same time. Defaults to 1.
+        timelimit (float, optional): Time limit [s] per case. Defaults to 2.0.
+        memory_limit (int | None, optional): Memory limit [MB], 0 for unlimited. Defaults to None
+            (the 'memory_limit' in the language config).
+        build_mode (BuildMode | str, optional): Build mode, 'debug' or 'release'. Defaults to 'debug'.
+        seeds (int, optional): Number of runs with distinct seeds per case. Defaults to 1.
+        args (list[str] | None, optional): Extra arguments for the solver. Defaults to None.
+        env (dict[str, str] | None, optional): Extra environment variables for the solver. Defaults to None.
+        stderr_limit (int | None, optional): Size [bytes] of the tail of stderr kept per case.
+            Defaults to None (stderr is not captured).
+        write_outputs (bool, optional): Whether to write the outputs to the outputs directory.
+            Defaults to True.
+        cancel (threading.Event | None, optional): Event to cancel the remaining cases. Defaults to None.
+
+    Raises:
+        FileNotFoundError: If the source file is not in a project.
+        ValueError: If the arguments are invalid.
+        CancelledError: If `cancel` is set.
+
+    Yields:
+        CaseResult: Result of each case.
+    """
+    source = Path(source).expanduser().resolve()
+    build_mode = (
+        BuildMode.from_str(build_mode) if isinstance(build_mode, str) else build_mode
+    )
+    if build_mode == BuildMode.PGO:
+        raise ValueError("PGO builds are trained by the 'run' subcommand only")
+    if jobs < 1:
+        raise ValueError(f"Invalid number of jobs: {jobs}")
+    if seeds < 1:
+        raise ValueError(f"Invalid number of seeds: {seeds}")
+    project = Project(Project.search_project_root(source))
+    case_ids = _case_ids(cases, project)
+
+    Lang = detect_language(source)
+    language = Lang(build_mode=build_mode, config_file=project.config_file(Lang))
+    runner = language.compile(source)
+    if memory_limit is None:
+        memory_limit = language.memory_limit
+
+    seed_list: list[int | None] = [None] if seeds == 1 else list(range(seeds))
+    case_list = [
+        Case(
+            case_id=case_id,
+            input_file=project.input_file(case_id),
+            output_file=(
+                project.output_file(case_id, seed)
+                if write_outputs
+                else Path(os.devnull)
+            ),
+            seed=seed,
+        )
+        for case_id in case_ids
+        for seed in seed_list
+    ]
+    if write_outputs:
+        for output_dir in {case.output_file.parent for case in case_list}:
+            output_dir.mkdir(parents=True, exist_ok=True)
+    yield from executor.run_cases(
+        runner,
+        case_list,
+        jobs=jobs,
+        timelimit=timelimit,
+        memory_limit=memory_limit if memory_limit > 0 else None,
+        args=args,
+        env=env,
+        cancel=cancel,
+        stderr_limit=stderr_limit,
+    )
+
+
+async def run_cases_async(
+    source: str | Path,
+    cases: str | int | Iterable[int],
+    **kwargs: Any,
+) -> AsyncIterator[CaseResult]:
+    """Build a source file of a project and run cases, as an async generator.
+
+    The build and the cases run in a thread, like run_cases, so that the event loop
+    is not blocked. When the iteration is stopped, e.g. by
+    `break` or a cancelled task, the cases that have not started yet are cancelled,
+    and the running ones finish first.
+
+    Args:
+        source (str | Path): Path to the source file, in a project.
+        cases (str | int | Iterable[int]): Cases to run (see run_cases).
+        **kwargs (Any): Keyword arguments of run_cases, except `cancel`.
+
+    Raises:
+        FileNotFoundError: If the source file is not in a project.
+        ValueError: If the arguments are invalid.
+
+    Yields:
+        CaseResult: Result of each case.
+    """
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue[CaseResult | BaseException | None] = asyncio.Queue()
+    cancel = threading.Event()
+
+    def produce() -> None:
+        try:
+            for result in run_cases(source, cases, cancel=cancel, **kwargs):
+                loop.call_soon_threadsafe(results.put_nowait, result)
+        except BaseException as e:
+            loop.call_soon_threadsafe(results.put_nowait, e)
+        else:
+            loop.call_soon_threadsafe(results.put_nowait, None)
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while (item := await results.get()) is not None:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        cancel.set()
+        await producer
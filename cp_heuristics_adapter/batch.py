@@ -0,0 +1,347 @@
+"""Batch protocol to run many cases in one solver process.
+
+The solver is started once with the environment variable CP_BATCH=1. For each
+case, the adapter writes a request line to its stdin with five tab-separated
+fields:
+
+    INPUT_FILE  OUTPUT_FILE  SCORE_FILE  METRICS_FILE  SEED
+
+The seed is empty unless `--seeds` is given. The solver reads the input file,
+writes the output file and the score file (and optionally the metrics file), and
+then writes a reply line to its stdout: `ok`, or `error` followed by a reason.
+The time of a case is measured from the request to the reply.
+
+If a case exceeds the time limit, or the solver exits or replies with an error,
+the process is killed and a fresh one serves the remaining cases. Python solvers
+need not implement the protocol: they are run by batch_harness.py.
+
+When stderr is captured, a case gets what the process wrote to it from the
+request to the reply. As stderr is not synchronized with the replies, the solver
+should write STDERR_DELIMITER to stderr before each reply, as batch_harness.py
+does, and a case gets what was written before it. Without the delimiter, the
+last writes of a case may be attributed to the next one instead.
+"""
+
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, as_completed
+from dataclasses import replace
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from time import perf_counter_ns
+
+from cp_heuristics_adapter.batch_harness import STDERR_DELIMITER
+from cp_heuristics_adapter.capture import StderrTail
+from cp_heuristics_adapter.cores import lease_core
+from cp_heuristics_adapter.executor import Case, CaseResult, Verdict, parse_metrics
+from cp_heuristics_adapter.runner import memory_limited
+
+logger = logging.getLogger(__name__)
+
+# Name of the environment variable telling the solver to speak the batch protocol
+BATCH_ENV_VAR = "CP_BATCH"
+
+HARNESS_SCRIPT = Path(__file__).with_name("batch_harness.py")
+
+# Time [s] to wait for STDERR_DELIMITER after a reply. A process that does not write
+# it within this time after its first case is not waited for again.
+STDERR_DELIMITER_TIMEOUT = 0.5
+
+
+class BatchProcess:
+    """A solver process serving cases over the batch protocol."""
+
+    def __init__(
+        self,
+        cmd: list[str],
+        memory_limit_mb: int | None,
+        stderr_limit: int | None = None,
+    ) -> None:
+        """Start the solver process.
+
+        Args:
+            cmd (list[str]): Command to start the solver.
+            memory_limit_mb (int | None): Memory limit [MB] of the process. None means unlimited.
+            stderr_limit (int | None, optional): Size [bytes] of the tail of stderr kept.
+                Defaults to None (stderr is not captured).
+        """
+        logger.info(f"starting batch process {cmd}")
+        if memory_limit_mb is not None and sys.platform != "win32":
+            cmd = memory_limited(cmd, memory_limit_mb)
+        self.stderr = None if stderr_limit is None else StderrTail(stderr_limit)
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=None if self.stderr is None else self.stderr.writer,
+            text=True,
+            env={**os.environ, BATCH_ENV_VAR: "1"},
+        )
+        if self.stderr is not None:
+            # Only the process holds the write end from now on
+            self.stderr.close(timeout=0)
+        self.served = 0
+        # Whether the process writes STDERR_DELIMITER. None until a case tells.
+        self.__delimited: bool | None = None
+        # Replies are read by a thread so that waiting for them can time out
+        self.__replies: queue.Queue[str | None] = queue.Queue()
+        threading.Thread(target=self.__read_replies, daemon=True).start()
+
+    def __read_replies(self) -> None:
+        """Queue the reply lines until the process closes its stdout."""
+        assert self.process.stdout is not None
+        for line in self.process.stdout:
+            self.__replies.put(line.rstrip("\n"))
+        self.__replies.put(None)
+
+    def request(self, fields: list[str], timeout: float) -> str | None:
+        """Send a request and wait for the reply.
+
+        Args:
+            fields (list[str]): Fields of the request.
+            timeout (float): Timeout in seconds.
+
+        Raises:
+            TimeoutExpired: If the timeout expires.
+
+        Returns:
+            str | None: Reply. None if the process has exited.
+        """
+        assert self.process.stdin is not None
+        self.served += 1
+        try:
+            self.process.stdin.write("\t".join(fields) + "\n")
+            self.process.stdin.flush()
+        except OSError:
+            return None
+        try:
+            return self.__replies.get(timeout=timeout)
+        except queue.Empty:
+            raise subprocess.TimeoutExpired(self.process.args, timeout)
+
+    def alive(self) -> bool:
+        """Check if the process is running.
+
+        Returns:
+            bool: Whether the process is running.
+        """
+        return self.process.poll() is None
+
+    def kill(self) -> None:
+        """Kill the process."""
+        self.process.kill()
+        self.process.wait()
+        if self.stderr is not None:
+            self.stderr.close()
+
+    def take_stderr(self) -> str | None:
+        """Get the tail of stderr of the last case, and clear it.
+
+        The tail ends at STDERR_DELIMITER if the process writes it, and otherwise
+        holds what was captured since the last call.
+
+        Returns:
+            str | None: Tail of stderr. None if stderr is not captured.
+        """
+        if self.stderr is None:
+            return None
+        if self.__delimited is not False:
+            delimiter = STDERR_DELIMITER.encode()
+            text = self.stderr.take_until(delimiter, STDERR_DELIMITER_TIMEOUT)
+            if text is not None:
+                self.__delimited = True
+                return text
+            if self.__delimited is None and self.alive():
+                logger.debug("The batch process does not delimit its stderr")
+                self.__delimited = False
+        return self.stderr.take()
+
+    def clear_stderr(self) -> None:
+        """Drop what was captured from stderr after the last case."""
+        if self.stderr is not None:
+            self.stderr.take()
+
+    def close(self) -> None:
+        """Stop the process by closing its stdin, or kill it if it does not exit."""
+        assert self.process.stdin is not None
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.kill()
+        if self.stderr is not None:
+            self.stderr.close()
+
+
+class BatchSolver:
+    """For running cases over the batch protocol, with a solver process per worker."""
+
+    def __init__(self, cmd: list[str], cases_per_process: int = 0) -> None:
+        """Initialize the BatchSolver.
+
+        Args:
+            cmd (list[str]): Command to start the solver.
+            cases_per_process (int, optional): Number of cases after which a process is replaced by a fresh one. Defaults to 0 (never).
+        """
+        self.cmd = cmd
+        self.cases_per_process = cases_per_process
+        self.__processes: list[BatchProcess] = []
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def for_python(exec_cmd: list[str]) -> "BatchSolver":
+        """Create a BatchSolver running a Python solver with the batch harness.
+
+        Args:
+            exec_cmd (list[str]): Command to run the solver, an interpreter and a source file.
+
+        Returns:
+            BatchSolver: BatchSolver.
+        """
+        python, source = exec_cmd
+        return BatchSolver([python, str(HARNESS_SCRIPT), source])
+
+    def kill_running(self) -> None:
+        """Kill the processes serving cases in any thread.
+
+        The cases they are running fail with a runtime error.
+        """
+        with self.__lock:
+            for process in self.__processes:
+                if process.alive():
+                    process.kill()
+
+    def run_cases(
+        self,
+        cases: Iterable[Case],
+        *,
+        jobs: int,
+        timelimit: float,
+        memory_limit: int | None = None,
+        cancel: threading.Event | None = None,
+        stderr_limit: int | None = None,
+    ) -> Iterator[CaseResult]:
+        """Run cases in parallel, like executor.run_cases.
+
+        Args:
+            cases (Iterable[Case]): Cases to run.
+            jobs (int): Number of solver processes.
+            timelimit (float): Time limit per case.
+            memory_limit (int | None, optional): Memory limit [MB] per process. Defaults to None (unlimited).
+            cancel (threading.Event | None, optional): Event to cancel the remaining cases. Defaults to None.
+            stderr_limit (int | None, optional): Size [bytes] of the tail of stderr kept per case.
+                Defaults to None (stderr is not captured).
+
+        Raises:
+            CancelledError: If `cancel` is set.
+
+        Yields:
+            CaseResult: Result of each case.
+        """
+        assert jobs >= 1
+        local = threading.local()
+
+        def worker_process() -> BatchProcess:
+            process: BatchProcess | None = getattr(local, "process", None)
+            recycle = (
+                self.cases_per_process > 0
+                and process is not None
+                and process.served >= self.cases_per_process
+            )
+            if process is not None and (recycle or not process.alive()):
+                process.close()
+                process = None
+            if process is None:
+                process = BatchProcess(self.cmd, memory_limit, stderr_limit)
+                with self.__lock:
+                    self.__processes.append(process)
+                local.process = process
+            return process
+
+        def run_unless_cancelled(case: Case) -> CaseResult:
+            if cancel is not None and cancel.is_set():
+                raise CancelledError()
+            process = worker_process()
+            # What was written after the reply of the previous case is dropped
+            process.clear_stderr()
+            with lease_core():
+                result = self.__run_case(process, case, timelimit)
+            stderr = process.take_stderr()
+            return result if stderr is None else replace(result, stderr=stderr)
+
+        pool = ThreadPoolExecutor(max_workers=jobs)
+        try:
+            futures: list[Future[CaseResult]] = [
+                pool.submit(run_unless_cancelled, case) for case in cases
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            with self.__lock:
+                processes, self.__processes = self.__processes, []
+            for process in processes:
+                process.close()
+
+    def __run_case(
+        self, process: BatchProcess, case: Case, timelimit: float
+    ) -> CaseResult:
+        """Run a case in a solver process.
+
+        Args:
+            process (BatchProcess): Solver process.
+            case (Case): Case.
+            timelimit (float): Time limit.
+
+        Returns:
+            CaseResult: Result of the case.
+        """
+        if case.seed is None:
+            logger.info(f"Running {case.input_file.name} in batch")
+        else:
+            logger.info(
+                f"Running {case.input_file.name} with seed {case.seed} in batch"
+            )
+        with (
+            NamedTemporaryFile(mode="w") as tmpf,
+            NamedTemporaryFile(mode="w") as metrics_tmpf,
+        ):
+            fields = [
+                str(case.input_file),
+                str(case.output_file),
+                tmpf.name,
+                metrics_tmpf.name,
+                "" if case.seed is None else str(case.seed),
+            ]
+            start_time = perf_counter_ns()
+            try:
+                reply = process.request(fields, timelimit)
+            except subprocess.TimeoutExpired:
+                logger.error(f"Time limit exceeded in {case.input_file.name}")
+                process.kill()
+                return CaseResult(case, Verdict.TLE, None)
+            time_ms = (perf_counter_ns() - start_time) / 1_000_000
+            if reply != "ok":
+                reason = "the solver exited" if reply is None else reply
+                logger.error(
+                    f"Runtime error occured in {case.input_file.name} ({reason})"
+                )
+                process.kill()
+                return CaseResult(case, Verdict.RE, None)
+            with open(tmpf.name, "r") as in_tmpf:
+                try:
+                    score = int(in_tmpf.read())
+                except ValueError:
+                    logger.error(f"Failed to read the score of {case.input_file.name}")
+                    return CaseResult(case, Verdict.RE, None, time_ms)
+            with open(metrics_tmpf.name, "r") as in_metrics_tmpf:
+                metrics = parse_metrics(in_metrics_tmpf.read(), case.input_file.name)
+        return CaseResult(case, Verdict.AC, score, time_ms, None, metrics)
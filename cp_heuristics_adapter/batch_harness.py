@@ -0,0 +1,95 @@
+"""Batch harness for Python solvers.
+
+This script is run by the Python interpreter configured for the solver, so it
+must only depend on the standard library.
+
+usage: python batch_harness.py SOURCE
+
+The harness speaks the batch protocol (see cp_heuristics_adapter.batch) for an
+unmodified solver. For each request line, it redirects the file descriptors 0
+and 1 to the input and the output files, and runs the solver as __main__ with
+the score file as its argument. The interpreter startup and the imports are paid
+once per process instead of once per case.
+
+Before each reply, the harness writes STDERR_DELIMITER to stderr, so that the
+adapter attributes what the solver wrote there to the right case.
+
+Each case runs with fresh __main__ globals, but the modules imported by the
+solver are shared by the cases of a process, together with any state they keep.
+"""
+
+import os
+import random
+import runpy
+import sys
+import traceback
+
+# Line written to stderr at the end of each case, before the reply
+STDERR_DELIMITER = "\x1e--- end of case ---\n"
+
+
+def run_case(source: str, fields: list[str]) -> str:
+    """Run the solver on a case.
+
+    Args:
+        source (str): Path to the solver.
+        fields (list[str]): Input, output, score and metrics files, and the seed.
+
+    Returns:
+        str: Reply, 'ok' or 'error' followed by the reason.
+    """
+    input_file, output_file, score_file, metrics_file, seed = fields
+    input_fd = os.open(input_file, os.O_RDONLY)
+    os.dup2(input_fd, 0)
+    os.close(input_fd)
+    output_fd = os.open(output_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.dup2(output_fd, 1)
+    os.close(output_fd)
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.argv = [source, score_file]
+    os.environ["METRICS_FILE"] = metrics_file
+    if seed:
+        os.environ["SEED"] = seed
+    else:
+        os.environ.pop("SEED", None)
+    # Cases must not share the random state of the previous case
+    random.seed()
+
+    reply = "ok"
+    try:
+        runpy.run_path(source, run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            reply = f"error exit {e.code}"
+    except Exception as e:
+        traceback.print_exc()
+        reply = f"error {type(e).__name__}"
+    finally:
+        try:
+            sys.stdout.flush()
+        except Exception:
+            reply = "error flush"
+    return reply
+
+
+def main() -> None:
+    source = sys.argv[1]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(source)))
+    # The requests and the replies keep the original stdin and stdout
+    requests = os.fdopen(os.dup(0), "r")
+    replies = os.fdopen(os.dup(1), "w")
+    for line in requests:
+        fields = line.rstrip("\n").split("\t")
+        reply = run_case(source, fields)
+        try:
+            sys.stderr.write(STDERR_DELIMITER)
+            sys.stderr.flush()
+        except Exception:
+            pass
+        replies.write(reply + "\n")
+        replies.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import logging
+import os
+import threading
+import time
+from typing import TextIO
+
+logger = logging.getLogger(__name__)
+
+# Default size [KB] of the tail of stderr kept per case
+DEFAULT_STDERR_LIMIT_KB = 64
+
+# Size [bytes] of the chunks read from the pipe
+CHUNK_SIZE = 65536
+
+
+class StderrTail:
+    """Capture what a program writes to stderr, keeping only the last bytes of it.
+
+    The program gets the write end of a pipe as stderr (see `writer`), and a thread
+    drains the pipe into a buffer that is trimmed to the limit. The program is
+    therefore never blocked on a full pipe, and the memory used does not depend on
+    how much it writes. With `forward`, what is read is also written to another file,
+    so the tail is kept while the stream still goes where it would have gone.
+    """
+
+    def __init__(self, limit: int, forward: TextIO | None = None) -> None:
+        """Open the pipe and start draining it.
+
+        Args:
+            limit (int): Number of bytes to keep from the end of the stream.
+            forward (TextIO | None, optional): File to write the stream to as well.
+                Defaults to None.
+        """
+        assert limit > 0
+        self.limit = limit
+        self.total = 0
+        self.__forward_fd: int | None = None
+        if forward is not None:
+            forward.flush()
+            self.__forward_fd = forward.fileno()
+        self.__buffer = bytearray()
+        self.__lock = threading.Lock()
+        # Notified when a chunk is captured or the pipe is drained
+        self.__captured = threading.Condition(self.__lock)
+        self.__drained = False
+        read_fd, write_fd = os.pipe()
+        self.writer: TextIO = os.fdopen(write_fd, "w")
+        self.__thread = threading.Thread(
+            target=self.__drain, args=(read_fd,), daemon=True
+        )
+        self.__thread.start()
+
+    def __enter__(self) -> "StderrTail":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def __drain(self, read_fd: int) -> None:
+        """Read the pipe until all its write ends are closed.
+
+        Args:
+            read_fd (int): Read end of the pipe.
+        """
+        with os.fdopen(read_fd, "rb", buffering=0) as reader:
+            while chunk := reader.read(CHUNK_SIZE):
+                self.__forward(chunk)
+                with self.__captured:
+                    self.total += len(chunk)
+                    self.__buffer += chunk
+                    if len(self.__buffer) > self.limit:
+                        del self.__buffer[: len(self.__buffer) - self.limit]
+                    self.__captured.notify_all()
+        with self.__captured:
+            self.__drained = True
+            self.__captured.notify_all()
+
+    def __forward(self, chunk: bytes) -> None:
+        """Write a chunk to the forwarded file, if any.
+
+        Args:
+            chunk (bytes): Chunk read from the pipe.
+        """
+        if self.__forward_fd is None:
+            return
+        view = memoryview(chunk)
+        try:
+            while view:
+                view = view[os.write(self.__forward_fd, view) :]
+        except OSError as e:
+            logger.warning(f"Stopped forwarding stderr: {e}")
+            self.__forward_fd = None
+
+    def close(self, timeout: float = 1.0) -> None:
+        """Close the write end of this process and wait for the pipe to be drained.
+
+        The write ends held by the program are closed when it exits. A process it
+        left behind may keep the pipe open, so this does not wait for more than the
+        timeout.
+
+        Args:
+            timeout (float, optional): Timeout in seconds. Defaults to 1.0.
+        """
+        if not self.writer.closed:
+            self.writer.close()
+        self.__thread.join(timeout=timeout)
+
+    def take(self) -> str:
+        """Get the captured tail and clear it.
+
+        Returns:
+            str: Tail of the stream, preceded by a note if the beginning was dropped.
+        """
+        with self.__lock:
+            data = bytes(self.__buffer)
+            dropped = self.total - len(data)
+            self.__buffer.clear()
+            self.total = 0
+        return _with_note(data, dropped)
+
+    def take_until(self, delimiter: bytes, timeout: float) -> str | None:
+        """Get the captured tail up to a delimiter, waiting for it, and clear it.
+
+        What was captured after the delimiter is kept for the next call.
+
+        Args:
+            delimiter (bytes): Delimiter written by the program.
+            timeout (float): Timeout in seconds.
+
+        Returns:
+            str | None: Tail of the stream before the delimiter, preceded by a note if
+                the beginning was dropped. None if the delimiter was not captured before
+                the timeout or the end of the stream, in which case nothing is cleared.
+        """
+        deadline = time.monotonic() + timeout
+        with self.__captured:
+            while (index := self.__buffer.find(delimiter)) < 0:
+                remaining = deadline - time.monotonic()
+                if self.__drained or remaining <= 0:
+                    return None
+                self.__captured.wait(remaining)
+            data = bytes(self.__buffer[:index])
+            dropped = self.total - len(self.__buffer)
+            del self.__buffer[: index + len(delimiter)]
+            self.total = len(self.__buffer)
+        return _with_note(data, dropped)
+
+
+def _with_note(data: bytes, dropped: int) -> str:
+    """Decode a captured tail, noting the bytes dropped before it.
+
+    Args:
+        data (bytes): Captured tail.
+        dropped (int): Number of bytes dropped before it.
+
+    Returns:
+        str: Tail, preceded by a note if the beginning was dropped.
+    """
+    text = data.decode(errors="replace")
+    if dropped > 0:
+        return f"[... {dropped} bytes dropped]\n{text}"
+    return text
+
+
+def last_lines(text: str, count: int) -> str:
+    """Get the last lines of a text.
+
+    Args:
+        text (str): Text.
+        count (int): Number of lines.
+
+    Returns:
+        str: Last lines.
+    """
+    return "\n".join(text.rstrip("\n").splitlines()[-count:])
@@ -0,0 +1,225 @@
+import fnmatch
+import logging
+import re
+from collections import Counter
+from pathlib import Path, PurePosixPath
+
+from cp_heuristics_adapter.util import pathlib_util
+
+logger = logging.getLogger(__name__)
+
+# Name of the manifest file in the inputs directory
+MANIFEST_NAME = "manifest.txt"
+
+
+def _natural_key(name: str) -> list[tuple[int, str]]:
+    """Get the key to sort names by, comparing numbers in them by value.
+
+    Args:
+        name (str): Name.
+
+    Returns:
+        list[tuple[int, str]]: Key.
+    """
+    return [
+        (int(part), "") if part.isdigit() else (-1, part)
+        for part in re.split(r"(\d+)", name)
+    ]
+
+
+def _shard(inputs_dir: Path, names: list[str], shard_size: int) -> list[str]:
+    """Move the inputs into subdirectories of `shard_size` inputs each, by case ID.
+
+    All the moves are checked before any file is moved. Missing inputs stay as they are.
+
+    Args:
+        inputs_dir (Path): Inputs directory.
+        names (list[str]): Name of each case.
+        shard_size (int): Number of files per subdirectory.
+
+    Raises:
+        FileExistsError: If a file would be moved onto another.
+
+    Returns:
+        list[str]: Name of each case after the moves.
+    """
+    width = max(3, len(str((len(names) - 1) // shard_size)))
+    moves: dict[str, str] = {}
+    sharded = []
+    for case_id, name in enumerate(names):
+        sharded_name = f"{case_id // shard_size:0{width}}/{PurePosixPath(name).name}"
+        if sharded_name == name or not (inputs_dir / name).is_file():
+            sharded_name = name
+        else:
+            moves[name] = sharded_name
+        sharded.append(sharded_name)
+    targets = Counter(moves.values())
+    for name, target in moves.items():
+        if targets[target] > 1:
+            raise FileExistsError(
+                f"Cannot move {name} to {target}, where another input goes too"
+            )
+        if (inputs_dir / target).exists():
+            raise FileExistsError(f"Cannot move {name} to {target}")
+    for name, target in moves.items():
+        (inputs_dir / target).parent.mkdir(exist_ok=True)
+        (inputs_dir / name).rename(inputs_dir / target)
+    return sharded
+
+
+class CaseIndex:
+    """Names of the input files of the cases, relative to the inputs directory.
+
+    A case ID is the line of the case in a manifest file, and the name on the line
+    may be any relative path, e.g. `seed_42.txt` or `017/017123.txt` for inputs
+    sharded into subdirectories. The output of a case has the same name relative to
+    the outputs directory. The cases are listed from the manifest alone, so no
+    directory is scanned however many cases there are.
+
+    Without a manifest, the input of the case N is `{N:04}.txt`.
+    """
+
+    def __init__(self, names: list[str] | None = None) -> None:
+        """Initialize the CaseIndex.
+
+        Args:
+            names (list[str] | None, optional): Name of each case. Defaults to None (no manifest).
+        """
+        self.names = names
+
+    @staticmethod
+    def load(manifest_file: Path) -> "CaseIndex":
+        """Load the index from a manifest file, with a name per line.
+
+        Args:
+            manifest_file (Path): Path to the manifest file.
+
+        Returns:
+            CaseIndex: Index. Without names if the file does not exist.
+        """
+        if not manifest_file.is_file():
+            return CaseIndex()
+        names = [line for line in manifest_file.read_text().splitlines() if line]
+        logger.debug(f"loaded {len(names)} cases from {manifest_file}")
+        return CaseIndex(names)
+
+    @staticmethod
+    def build(
+        inputs_dir: Path,
+        shard_size: int | None = None,
+        previous: "CaseIndex | None" = None,
+    ) -> "CaseIndex":
+        """Index the input files in a directory and its subdirectories.
+
+        The files are sorted by name, comparing numbers in the names by value, so that
+        the inputs `0000.txt`, `0001.txt`, ... keep their case IDs. Hidden files and
+        the manifest are skipped. With a previous index, its cases keep their IDs and
+        only the new files are appended, so that the IDs recorded with past scores
+        stay valid. With a shard size, the files are moved into subdirectories `000`,
+        `001`, ... of at most `shard_size` files each.
+
+        Args:
+            inputs_dir (Path): Inputs directory.
+            shard_size (int | None, optional): Number of files per subdirectory. Defaults to None (files are not moved).
+            previous (CaseIndex | None, optional): Previous index to extend. Defaults to None (the cases are numbered anew).
+
+        Raises:
+            FileExistsError: If a file would be moved onto another. No file is moved then.
+
+        Returns:
+            CaseIndex: Index.
+        """
+        found = sorted(
+            (
+                path.relative_to(inputs_dir).as_posix()
+                for path in inputs_dir.rglob("*")
+                if path.is_file()
+                and not path.name.startswith(".")
+                and path != inputs_dir / MANIFEST_NAME
+            ),
+            key=_natural_key,
+        )
+        names = [] if previous is None or previous.names is None else previous.names
+        missing = [name for name in names if not (inputs_dir / name).is_file()]
+        if missing:
+            logger.warning(
+                f"{len(missing)} indexed inputs are missing (e.g. {missing[0]}). "
+                "They keep their case IDs"
+            )
+        indexed = set(names)
+        names = names + [name for name in found if name not in indexed]
+        if shard_size is None:
+            return CaseIndex(names)
+        return CaseIndex(_shard(inputs_dir, names, shard_size))
+
+    def save(self, manifest_file: Path) -> None:
+        """Write the index to a manifest file.
+
+        Args:
+            manifest_file (Path): Path to the manifest file.
+        """
+        assert self.names is not None
+        pathlib_util.write_atomically(
+            manifest_file, "".join(f"{name}\n" for name in self.names)
+        )
+
+    def __len__(self) -> int:
+        """Get the number of indexed cases.
+
+        Returns:
+            int: Number of cases. 0 without a manifest.
+        """
+        return 0 if self.names is None else len(self.names)
+
+    def name(self, case_id: int) -> str:
+        """Get the name of the input of a case.
+
+        Args:
+            case_id (int): Case ID.
+
+        Raises:
+            IndexError: If the case is not in the manifest.
+
+        Returns:
+            str: Name relative to the inputs directory.
+        """
+        if self.names is None:
+            return f"{case_id:04}.txt"
+        if not 0 <= case_id < len(self.names):
+            raise IndexError(
+                f"Case {case_id} is not in the manifest of {len(self.names)} cases"
+            )
+        return self.names[case_id]
+
+    def output_name(self, case_id: int, seed: int | None = None) -> str:
+        """Get the name of the output of a case.
+
+        Args:
+            case_id (int): Case ID.
+            seed (int | None, optional): Seed of the run. Defaults to None.
+
+        Returns:
+            str: Name relative to the outputs directory, with `_seed{seed}` before the suffix for a seed.
+        """
+        name = PurePosixPath(self.name(case_id))
+        if seed is None:
+            return name.as_posix()
+        return name.with_name(f"{name.stem}_seed{seed}{name.suffix}").as_posix()
+
+    def match(self, pattern: str) -> list[int]:
+        """Get the cases whose names match a glob pattern.
+
+        Unlike a glob on the files, `*` matches `/` too.
+
+        Args:
+            pattern (str): Glob pattern, e.g. '017/*'.
+
+        Returns:
+            list[int]: Case IDs.
+        """
+        assert self.names is not None
+        return [
+            case_id
+            for case_id, name in enumerate(self.names)
+            if fnmatch.fnmatchcase(name, pattern)
+        ]
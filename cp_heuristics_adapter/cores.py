@@ -0,0 +1,126 @@
+import functools
+import logging
+import os
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from cp_heuristics_adapter.util import pathlib_util
+
+if sys.platform != "win32":
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+# Environment variable with the number of solvers the invocations of the user may run
+# at the same time on the machine
+CORES_ENV_VAR = "CP_HEURISTICS_ADAPTER_CORES"
+
+# Interval [s] to retry when all the cores are leased
+POLL_INTERVAL = 0.05
+
+
+class CorePool:
+    """Cores leased by the solvers of all the invocations of the user on the machine.
+
+    A core is a file `{i}.lock` in the pool directory for i below the budget, and
+    it is leased by an exclusive flock on the file. A lease is released by the kernel
+    when its process exits, so a killed invocation never keeps its cores. Locks of
+    different open files conflict in the same process too, so the threads of a run
+    lease their cores like other processes do.
+    """
+
+    def __init__(self, budget: int, directory: Path) -> None:
+        """Initialize the CorePool.
+
+        Args:
+            budget (int): Number of cores.
+            directory (Path): Directory of the lock files, shared by the invocations.
+
+        Raises:
+            ValueError: If the budget is invalid.
+        """
+        if budget < 1:
+            raise ValueError(f"Invalid core budget: {budget}")
+        self.budget = budget
+        self.directory = directory
+
+    def try_acquire(self) -> tuple[int, int] | None:
+        """Lease a core if one is free.
+
+        Returns:
+            tuple[int, int] | None: Index of the core and file descriptor of the lock. None if all the cores are leased.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for core in range(self.budget):
+            fd = os.open(self.directory / f"{core}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            return core, fd
+        return None
+
+    @contextmanager
+    def lease(self) -> Iterator[int]:
+        """Lease a core for the block, waiting until one is free.
+
+        Yields:
+            int: Index of the core.
+        """
+        acquired = self.try_acquire()
+        if acquired is None:
+            logger.debug(f"Waiting for one of the {self.budget} cores of the budget")
+            started = time.monotonic()
+            while acquired is None:
+                time.sleep(POLL_INTERVAL)
+                acquired = self.try_acquire()
+            logger.debug(f"Waited {time.monotonic() - started:.2f} s for a core")
+        core, fd = acquired
+        try:
+            yield core
+        finally:
+            # Closing the only descriptor of the open file releases its lock
+            os.close(fd)
+
+
+@functools.cache
+def core_pool() -> CorePool | None:
+    """Get the pool of the budget set by CP_HEURISTICS_ADAPTER_CORES.
+
+    Raises:
+        ValueError: If the budget is invalid.
+
+    Returns:
+        CorePool | None: Pool in the runtime directory of the user. None if no budget is
+            set, or on Windows, where files are not locked by flock.
+    """
+    budget = os.environ.get(CORES_ENV_VAR)
+    if not budget:
+        return None
+    if sys.platform == "win32":
+        logger.warning(f"{CORES_ENV_VAR} is ignored on Windows")
+        return None
+    try:
+        count = int(budget)
+    except ValueError:
+        raise ValueError(f"Invalid {CORES_ENV_VAR}: {budget}")
+    return CorePool(count, pathlib_util.runtime_dir() / "cores")
+
+
+@contextmanager
+def lease_core() -> Iterator[None]:
+    """Lease a core of the budget for the block, if a budget is set.
+
+    Yields:
+        None: Nothing.
+    """
+    pool = core_pool()
+    if pool is None:
+        yield
+        return
+    with pool.lease():
+        yield
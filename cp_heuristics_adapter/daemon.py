@@ -0,0 +1,626 @@
+import contextlib
+import hashlib
+import itertools
+import json
+import logging
+import os
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from cp_heuristics_adapter.util import pathlib_util
+
+if TYPE_CHECKING:
+    from cp_heuristics_adapter.executor import CaseResult
+
+logger = logging.getLogger(__name__)
+
+# Name of the settings directory marking a project root
+SETTINGS_DIR_NAME = ".cp-heuristics-adapter"
+
+# Environment variable with the priority of the requests. Lower values are served first
+PRIORITY_ENV_VAR = "CP_HEURISTICS_ADAPTER_PRIORITY"
+DEFAULT_PRIORITY = 0
+
+# Interval [s] to check whether the daemon is stopped
+POLL_INTERVAL = 0.5
+
+Message = dict[str, Any]
+
+
+def socket_path(project_root: Path) -> Path:
+    """Get the path to the socket of the daemon of a project.
+
+    A socket path is limited to about 100 bytes, so the socket is in the runtime
+    directory of the user, named by the digest of the project root.
+
+    Args:
+        project_root (Path): Project root directory.
+
+    Returns:
+        Path: Path to the socket.
+    """
+    digest = hashlib.sha256(str(project_root.resolve()).encode()).hexdigest()[:16]
+    return pathlib_util.runtime_dir() / f"{digest}.sock"
+
+
+def find_project_root(path: Path) -> Path | None:
+    """Search for the project root containing a path.
+
+    Unlike Project.search_project_root, it neither raises nor imports the project,
+    so that a command not served by a daemon starts as fast as before.
+
+    Args:
+        path (Path): Path in the project.
+
+    Returns:
+        Path | None: Project root directory. None if the path is not in a project.
+    """
+    for directory in [path, *path.parents]:
+        if (directory / SETTINGS_DIR_NAME).is_dir():
+            return directory
+    return None
+
+
+def send(conn: socket.socket, message: Message) -> None:
+    """Send a message as a line of JSON.
+
+    Args:
+        conn (socket.socket): Connection.
+        message (Message): Message.
+    """
+    conn.sendall((json.dumps(message) + "\n").encode())
+
+
+def peer_uid(conn: socket.socket) -> int | None:
+    """Get the user ID of the process on the other end of a Unix socket.
+
+    Args:
+        conn (socket.socket): Connection.
+
+    Returns:
+        int | None: User ID. None if the platform does not tell it (SO_PEERCRED is
+            Linux only).
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = conn.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _, uid, _ = struct.unpack("3i", creds)
+    return int(uid)
+
+
+def connect(project_root: Path) -> socket.socket | None:
+    """Connect to the daemon of a project.
+
+    The socket is trusted only if it is owned by the user, as the commands sent to
+    it are run as the owner of the daemon.
+
+    Args:
+        project_root (Path): Project root directory.
+
+    Returns:
+        socket.socket | None: Connection. None if no daemon of the user is running.
+    """
+    path = socket_path(project_root)
+    try:
+        owner = path.stat().st_uid
+    except FileNotFoundError:
+        return None
+    if owner != os.getuid():
+        logger.warning(f"Ignoring the socket {path} of another user (uid {owner})")
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(str(path))
+    except OSError:
+        conn.close()
+        return None
+    return conn
+
+
+def request(project_root: Path, message: Message) -> Iterator[Message]:
+    """Send a request to the daemon of a project and receive its replies.
+
+    Args:
+        project_root (Path): Project root directory.
+        message (Message): Request.
+
+    Raises:
+        ConnectionError: If no daemon is running.
+
+    Yields:
+        Message: Replies, until the daemon closes the connection.
+    """
+    conn = connect(project_root)
+    if conn is None:
+        raise ConnectionError(f"No daemon is running for {project_root}")
+    with conn, conn.makefile("r") as replies:
+        send(conn, message)
+        for line in replies:
+            yield json.loads(line)
+
+
+def _show(message: Message) -> int | None:
+    """Show a reply to a forwarded command.
+
+    The results of the cases are logged by the command itself, so "case" replies,
+    meant for other clients, are skipped.
+
+    Args:
+        message (Message): Reply.
+
+    Returns:
+        int | None: Exit code if the command finished. None otherwise.
+    """
+    kind = message["type"]
+    if kind == "log":
+        logging.getLogger(message["logger"]).log(
+            message["level"], message["message"], extra={"forwarded": True}
+        )
+    elif kind in ("stdout", "stderr"):
+        stream = sys.stdout if kind == "stdout" else sys.stderr
+        stream.write(message["text"])
+        stream.flush()
+    elif kind == "queued" and message["position"] > 0:
+        logger.info(f"Queued by the daemon behind {message['position']} requests")
+    elif kind == "exit":
+        return int(message["code"])
+    return None
+
+
+def forward(argv: list[str], cwd: Path) -> int | None:
+    """Send a command to the daemon of the project in a directory, if it is running.
+
+    The logs and outputs of the command are shown as if it ran here.
+
+    Args:
+        argv (list[str]): Command line arguments without the program name.
+        cwd (Path): Current directory, in which relative paths in the arguments are resolved.
+
+    Returns:
+        int | None: Exit code of the command. None if it is to be run here, because no
+            daemon is running, the platform has no Unix sockets, or the daemon does not
+            serve it (e.g. run --watch).
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        # No daemon can run, e.g. on Windows
+        return None
+    project_root = find_project_root(cwd.resolve())
+    if project_root is None or not socket_path(project_root).exists():
+        return None
+    priority = int(os.environ.get(PRIORITY_ENV_VAR, DEFAULT_PRIORITY))
+    message = {"command": "run", "argv": argv, "cwd": str(cwd), "priority": priority}
+    try:
+        replies = request(project_root, message)
+        first = next(replies)
+        if first["type"] == "rejected":
+            return None
+        from cp_heuristics_adapter.setup_logger import setup_logging
+
+        setup_logging()
+        for reply in itertools.chain([first], replies):
+            if reply["type"] == "rejected":
+                logger.warning(f"The daemon dropped the command: {reply['reason']}")
+                return None
+            code = _show(reply)
+            if code is not None:
+                return code
+    except (ConnectionError, StopIteration):
+        return None
+    logger.error("The daemon closed the connection before the command finished")
+    return 1
+
+
+class _Channel:
+    """Connection to a client, shared by the threads sending to it.
+
+    The client may disconnect at any time, e.g. on Ctrl-C, after which the messages
+    are dropped.
+    """
+
+    def __init__(self, conn: socket.socket) -> None:
+        """Initialize the _Channel.
+
+        Args:
+            conn (socket.socket): Connection.
+        """
+        self.conn = conn
+        self.__lock = threading.Lock()
+        self.__closed = False
+
+    def send(self, message: Message) -> None:
+        """Send a message unless the client disconnected.
+
+        Args:
+            message (Message): Message.
+        """
+        with self.__lock:
+            if self.__closed:
+                return
+            try:
+                send(self.conn, message)
+            except OSError:
+                self.__closed = True
+
+    def close(self) -> None:
+        """Close the connection."""
+        with self.__lock:
+            self.__closed = True
+            self.conn.close()
+
+
+class _LogForwarder(logging.Handler):
+    """Handler sending the records to a client."""
+
+    def __init__(self, channel: _Channel) -> None:
+        """Initialize the _LogForwarder.
+
+        Args:
+            channel (_Channel): Channel to the client.
+        """
+        super().__init__()
+        self.channel = channel
+        self.setFormatter(logging.Formatter("%(message)s"))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # A record received from a daemon is not sent back, e.g. by a client
+        # running in the process of the daemon
+        if getattr(record, "forwarded", False):
+            return
+        self.channel.send(
+            {
+                "type": "log",
+                "logger": record.name,
+                "level": record.levelno,
+                "message": self.format(record),
+            }
+        )
+
+
+class _StreamForwarder:
+    """File-like object sending what is written to a client."""
+
+    def __init__(self, channel: _Channel, kind: str) -> None:
+        """Initialize the _StreamForwarder.
+
+        Args:
+            channel (_Channel): Channel to the client.
+            kind (str): Stream of the client, 'stdout' or 'stderr'.
+        """
+        self.channel = channel
+        self.kind = kind
+
+    def write(self, text: str) -> int:
+        if text:
+            self.channel.send({"type": self.kind, "text": text})
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+@dataclass(order=True)
+class _Request:
+    """Command waiting to be run by the daemon, ordered by priority, then by arrival.
+
+    Attributes:
+        priority (int): Priority. Lower values are served first.
+        seq (int): Arrival order.
+        argv (list[str]): Command line arguments without the program name.
+        cwd (Path): Current directory of the client.
+        channel (_Channel): Channel to the client.
+    """
+
+    priority: int
+    seq: int
+    argv: list[str] = field(compare=False)
+    cwd: Path = field(compare=False)
+    channel: _Channel = field(compare=False)
+
+
+def _case_message(result: "CaseResult") -> Message:
+    """Get the message of the result of a case.
+
+    Args:
+        result (CaseResult): Result.
+
+    Returns:
+        Message: Message.
+    """
+    return {
+        "type": "case",
+        "case": result.case.case_id,
+        "seed": result.case.seed,
+        "verdict": result.verdict.value,
+        "score": result.score,
+        "time_ms": result.time_ms,
+    }
+
+
+def _exit_code(e: SystemExit) -> int:
+    """Get the exit code of a SystemExit.
+
+    Args:
+        e (SystemExit): Exception.
+
+    Returns:
+        int: Exit code.
+    """
+    if e.code is None or isinstance(e.code, int):
+        return e.code or 0
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+class Daemon:
+    """Daemon running the commands of clients, keeping builds and stages warm.
+
+    The daemon listens on the socket of its project (see socket_path). A client
+    sends a request as a line of JSON and receives the replies as lines of JSON:
+
+    - {"command": "run", "argv": [...], "cwd": "...", "priority": 0} runs a command.
+      The replies are "queued", then "log", "case", "stdout" and "stderr" while it
+      runs, and "exit" with its exit code. "rejected" means it is to be run by the
+      client, e.g. run --watch.
+    - {"command": "status"} replies "status" with the queue and the warm state.
+    - {"command": "stop"} replies "stopped" and stops the daemon.
+
+    The requests run code as the user of the daemon, so on Linux the clients of
+    other users are refused by their SO_PEERCRED credentials.
+
+    The commands run in this process, so they pay neither for the startup of Python
+    nor for the imports, and a run reuses the builds, the prefork servers and the
+    stages kept by WarmState. They run one at a time, since a run already uses all
+    the cores and the current directory is shared, in the order of their priorities
+    and then of their arrival.
+    """
+
+    def __init__(self, project_root: Path) -> None:
+        """Initialize the Daemon.
+
+        Args:
+            project_root (Path): Project root directory.
+
+        Raises:
+            RuntimeError: If the platform has no Unix sockets, e.g. Windows.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("The daemon needs Unix sockets, which are not available")
+        from cp_heuristics_adapter.warm import WarmState
+
+        self.project_root = project_root.resolve()
+        self.socket_path = socket_path(self.project_root)
+        self.warm = WarmState()
+        self.__queue: "queue.PriorityQueue[_Request]" = queue.PriorityQueue()
+        self.__seq = itertools.count()
+        self.__lock = threading.Lock()
+        self.__queued: list[_Request] = []
+        self.__running: _Request | None = None
+        self.__started = time.monotonic()
+        self.__stopped = threading.Event()
+        self.ready = threading.Event()
+
+    def __bind(self) -> socket.socket:
+        """Bind the socket, removing the socket of a daemon that is gone.
+
+        Raises:
+            RuntimeError: If a daemon is already running for the project.
+
+        Returns:
+            socket.socket: Listening socket.
+        """
+        if self.socket_path.exists():
+            conn = connect(self.project_root)
+            if conn is not None:
+                conn.close()
+                raise RuntimeError(
+                    f"A daemon is already running for {self.project_root}"
+                )
+            self.socket_path.unlink()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.socket_path))
+        server.listen()
+        server.settimeout(POLL_INTERVAL)
+        return server
+
+    def serve_forever(self) -> None:
+        """Serve the clients until the daemon is stopped.
+
+        Raises:
+            RuntimeError: If a daemon is already running for the project.
+        """
+        server = self.__bind()
+        worker = threading.Thread(target=self.__work, name="daemon-worker")
+        worker.start()
+        logger.info(f"Serving {self.project_root} on {self.socket_path}")
+        self.ready.set()
+        try:
+            while not self.__stopped.is_set():
+                try:
+                    conn, _ = server.accept()
+                except TimeoutError:
+                    continue
+                uid = peer_uid(conn)
+                if uid is not None and uid != os.getuid():
+                    # The requests run code as the user of the daemon
+                    logger.warning(f"Refused a client of another user (uid {uid})")
+                    conn.close()
+                    continue
+                threading.Thread(
+                    target=self.__accept, args=(conn,), daemon=True
+                ).start()
+        finally:
+            self.__stopped.set()
+            server.close()
+            self.socket_path.unlink(missing_ok=True)
+            worker.join()
+            self.warm.close()
+            logger.info("The daemon stopped")
+
+    def stop(self) -> None:
+        """Stop the daemon after the running command. Queued commands are rejected."""
+        self.__stopped.set()
+
+    def status(self) -> Message:
+        """Get the status of the daemon.
+
+        Returns:
+            Message: Status.
+        """
+        with self.__lock:
+            running = None if self.__running is None else self.__running.argv
+            queued = [
+                {"argv": item.argv, "priority": item.priority}
+                for item in sorted(self.__queued)
+            ]
+        return {
+            "type": "status",
+            "pid": os.getpid(),
+            "project": str(self.project_root),
+            "uptime_s": round(time.monotonic() - self.__started, 1),
+            "running": running,
+            "queued": queued,
+            **self.warm.status(),
+        }
+
+    def __accept(self, conn: socket.socket) -> None:
+        """Receive the request of a client.
+
+        Args:
+            conn (socket.socket): Connection.
+        """
+        channel = _Channel(conn)
+        try:
+            with conn.makefile("r") as lines:
+                line = lines.readline()
+            message = json.loads(line)
+            if message["command"] == "run":
+                self.__enqueue(message, channel)
+                return
+            if message["command"] == "status":
+                channel.send(self.status())
+            elif message["command"] == "stop":
+                channel.send({"type": "stopped"})
+                self.stop()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Invalid request: {e}")
+        channel.close()
+
+    def __enqueue(self, message: Message, channel: _Channel) -> None:
+        """Queue a command, or reject it if it is to be run by the client.
+
+        Args:
+            message (Message): Request.
+            channel (_Channel): Channel to the client.
+        """
+        from cp_heuristics_adapter.main import DAEMON_SUBCOMMANDS, requested_subcommand
+
+        argv: list[str] = message["argv"]
+        name = requested_subcommand(argv)
+        reason = None
+        if name not in DAEMON_SUBCOMMANDS:
+            reason = f"'{name}' is not served by the daemon"
+        elif "--watch" in argv:
+            reason = "a watch runs until it is interrupted"
+        if reason is not None:
+            channel.send({"type": "rejected", "reason": reason})
+            channel.close()
+            return
+        item = _Request(
+            priority=int(message.get("priority", DEFAULT_PRIORITY)),
+            seq=next(self.__seq),
+            argv=argv,
+            cwd=Path(message["cwd"]),
+            channel=channel,
+        )
+        with self.__lock:
+            position = sum(other < item for other in self.__queued)
+            position += self.__running is not None
+            self.__queued.append(item)
+            self.__queue.put(item)
+        channel.send({"type": "queued", "position": position})
+
+    def __work(self) -> None:
+        """Run the queued commands until the daemon is stopped."""
+        while not self.__stopped.is_set():
+            try:
+                item = self.__queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            with self.__lock:
+                self.__queued.remove(item)
+                self.__running = item
+            code = 1
+            try:
+                code = self.__execute(item)
+            finally:
+                with self.__lock:
+                    self.__running = None
+                # The command is done by the time its client learns its exit code
+                item.channel.send({"type": "exit", "code": code})
+                item.channel.close()
+        # The clients of the commands still queued run them by themselves
+        with self.__lock:
+            for item in self.__queued:
+                item.channel.send({"type": "rejected", "reason": "the daemon stopped"})
+                item.channel.close()
+            self.__queued.clear()
+
+    def __execute(self, item: _Request) -> int:
+        """Run a command, forwarding its logs and outputs to its client.
+
+        The arguments are parsed here, so that invalid ones are reported to the
+        client as without the daemon.
+
+        Args:
+            item (_Request): Command.
+
+        Returns:
+            int: Exit code.
+        """
+        from cp_heuristics_adapter.main import build_parser, requested_subcommand
+        from cp_heuristics_adapter.setup_logger import scoped_log_files
+        from cp_heuristics_adapter.subcommands.run import Run
+
+        logger.info(f"Running {' '.join(item.argv)}")
+        root_logger = logging.getLogger()
+        handler = _LogForwarder(item.channel)
+        home = Path.cwd()
+        code = 0
+        try:
+            os.chdir(item.cwd)
+            with (
+                scoped_log_files(),
+                contextlib.redirect_stdout(_StreamForwarder(item.channel, "stdout")),
+                contextlib.redirect_stderr(_StreamForwarder(item.channel, "stderr")),
+            ):
+                parser, subcommand = build_parser(item.argv)
+                args = parser.parse_args(item.argv)
+                assert subcommand is not None
+                if isinstance(subcommand, Run):
+                    subcommand.warm = self.warm
+                    subcommand.on_result = lambda result: item.channel.send(
+                        _case_message(result)
+                    )
+                handler.setLevel(args.log_level.upper())
+                root_logger.addHandler(handler)
+                subcommand.run(args)
+        except SystemExit as e:
+            code = _exit_code(e)
+        except Exception:
+            # Reported as without the daemon
+            name = requested_subcommand(item.argv)
+            logger.exception(f"An error occurred while running the '{name}' subcommand")
+        finally:
+            os.chdir(home)
+            root_logger.removeHandler(handler)
+        return code
@@ -0,0 +1,295 @@
+import logging
+import subprocess
+from collections.abc import Iterable, Iterator
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
+from enum import Enum
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import TextIO
+
+from cp_heuristics_adapter.capture import StderrTail
+from cp_heuristics_adapter.cores import lease_core
+from cp_heuristics_adapter.runner import MemoryLimitExceeded, ProgramRunner
+
+logger = logging.getLogger(__name__)
+
+# Name of the environment variable to pass the seed of a case to the solver
+SEED_ENV_VAR = "SEED"
+# Name of the environment variable to pass the path of the metrics file to the solver
+METRICS_ENV_VAR = "METRICS_FILE"
+
+
+class Verdict(Enum):
+    """Verdict of a case.
+
+    AC: The solver finished successfully and reported a score.
+    RE: Runtime error.
+    TLE: Time limit exceeded.
+    MLE: Memory limit exceeded.
+    """
+
+    AC = "AC"
+    RE = "RE"
+    TLE = "TLE"
+    MLE = "MLE"
+
+    def description(self) -> str:
+        """Get the human readable description of the verdict.
+
+        Returns:
+            str: Description.
+        """
+        descriptions = {
+            Verdict.AC: "Accepted",
+            Verdict.RE: "Runtime error",
+            Verdict.TLE: "Time limit exceeded",
+            Verdict.MLE: "Memory limit exceeded",
+        }
+        return descriptions[self]
+
+
+@dataclass(frozen=True)
+class Case:
+    """A case to run.
+
+    Attributes:
+        case_id (int): Case ID.
+        input_file (Path): Path to the input file.
+        output_file (Path): Path to the output file.
+        seed (int | None): Seed passed to the solver. None means no seed is passed.
+        args (tuple[str, ...]): Extra arguments of this case, after those of the run.
+        env (dict[str, str]): Extra environment variables of this case, over those of the run.
+    """
+
+    case_id: int
+    input_file: Path
+    output_file: Path
+    seed: int | None = None
+    args: tuple[str, ...] = ()
+    env: dict[str, str] = field(default_factory=dict, hash=False)
+
+
+@dataclass(frozen=True)
+class CaseResult:
+    """Result of a case.
+
+    Attributes:
+        case (Case): Case.
+        verdict (Verdict): Verdict.
+        score (int | None): Score. None unless the verdict is AC.
+        time_ms (float | None): Time [ms] taken by the solver. None if it was not measured.
+        max_rss_mb (float | None): Peak memory usage [MB]. None if it was not measured.
+        metrics (dict[str, float]): Metrics reported by the solver. Empty unless the verdict is AC.
+        stderr (str | None): Tail of what the solver wrote to stderr. None if it was not captured.
+    """
+
+    case: Case
+    verdict: Verdict
+    score: int | None
+    time_ms: float | None = None
+    max_rss_mb: float | None = None
+    metrics: dict[str, float] = field(default_factory=dict)
+    stderr: str | None = None
+
+
+def parse_metrics(text: str, name: str) -> dict[str, float]:
+    """Parse the metrics written by the solver.
+
+    Each line is a name and a number separated by whitespace, e.g. `iterations 123456`.
+    If a name appears more than once, the last value wins, so the solver may rewrite
+    its counters as it goes. Malformed lines are skipped with a warning.
+
+    Args:
+        text (str): Content of the metrics file.
+        name (str): Name of the case, for the warnings.
+
+    Returns:
+        dict[str, float]: Metrics by name.
+    """
+    metrics: dict[str, float] = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        try:
+            if len(fields) != 2:
+                raise ValueError(line)
+            metrics[fields[0]] = float(fields[1])
+        except ValueError:
+            logger.warning(f"Skipped a malformed metrics line in {name}: {line!r}")
+    return metrics
+
+
+def run_case(
+    runner: ProgramRunner,
+    case: Case,
+    *,
+    timelimit: float,
+    memory_limit: int | None = None,
+    args: list[str] | None = None,
+    env: dict[str, str] | None = None,
+    stderr_limit: int | None = None,
+) -> CaseResult:
+    """Run a single case.
+
+    The path of the score file is passed to the solver as the first argument,
+    followed by `args`. The seed of the case, if any, is passed as the environment
+    variable SEED. The path of a file the solver may write metrics to is passed as
+    the environment variable METRICS_FILE (see parse_metrics for the format). If a
+    core budget is set, the case waits for a core of it first (see cores.py).
+
+    Args:
+        runner (ProgramRunner): Program runner.
+        case (Case): Case to run.
+        timelimit (float): Time limit.
+        memory_limit (int | None, optional): Memory limit [MB]. Defaults to None (unlimited).
+        args (list[str] | None, optional): Extra arguments for the solver. Defaults to None.
+        env (dict[str, str] | None, optional): Extra environment variables for the solver. Defaults to None.
+        stderr_limit (int | None, optional): Size [bytes] of the tail of stderr kept in the result.
+            Defaults to None (stderr is not captured).
+
+    Returns:
+        CaseResult: Result of the case.
+    """
+    with lease_core():
+        if stderr_limit is None:
+            return _run_case(runner, case, timelimit, memory_limit, args, env, None)
+        with StderrTail(stderr_limit) as tail:
+            result = _run_case(
+                runner, case, timelimit, memory_limit, args, env, tail.writer
+            )
+            tail.close()
+            return replace(result, stderr=tail.take())
+
+
+def _run_case(
+    runner: ProgramRunner,
+    case: Case,
+    timelimit: float,
+    memory_limit: int | None,
+    args: list[str] | None,
+    env: dict[str, str] | None,
+    stderr: TextIO | None,
+) -> CaseResult:
+    """Run a single case with the given stderr (see run_case).
+
+    Args:
+        runner (ProgramRunner): Program runner.
+        case (Case): Case to run.
+        timelimit (float): Time limit.
+        memory_limit (int | None): Memory limit [MB]. None means unlimited.
+        args (list[str] | None): Extra arguments for the solver.
+        env (dict[str, str] | None): Extra environment variables for the solver.
+        stderr (TextIO | None): stderr of the solver. None means sys.stderr.
+
+    Returns:
+        CaseResult: Result of the case.
+    """
+    if case.seed is None:
+        logger.info(f"Running {case.input_file.name}")
+    else:
+        logger.info(f"Running {case.input_file.name} with seed {case.seed}")
+        env = {**(env or {}), SEED_ENV_VAR: str(case.seed)}
+    with (
+        NamedTemporaryFile(mode="w") as tmpf,
+        NamedTemporaryFile(mode="w") as metrics_tmpf,
+        case.input_file.open("r") as inf,
+        case.output_file.open("w") as ouf,
+    ):
+        solver_args = [tmpf.name] + (args or []) + list(case.args)
+        env = {**(env or {}), **case.env, METRICS_ENV_VAR: metrics_tmpf.name}
+        try:
+            result = runner.run(
+                args=solver_args,
+                timeout=timelimit,
+                stdin=inf,
+                stdout=ouf,
+                stderr=stderr,
+                memory_limit_mb=memory_limit,
+                env=env,
+            )
+        except MemoryLimitExceeded as e:
+            logger.error(f"Memory limit exceeded in {case.input_file.name}")
+            return CaseResult(case, Verdict.MLE, None, max_rss_mb=e.max_rss_mb)
+        except subprocess.CalledProcessError:
+            logger.error(f"Runtime error occured in {case.input_file.name}")
+            return CaseResult(case, Verdict.RE, None)
+        except subprocess.TimeoutExpired:
+            logger.error(f"Time limit exceeded in {case.input_file.name}")
+            return CaseResult(case, Verdict.TLE, None)
+        with open(tmpf.name, "r") as in_tmpf:
+            try:
+                score = int(in_tmpf.read())
+            except ValueError:
+                logger.error(f"Failed to read the score of {case.input_file.name}")
+                return CaseResult(case, Verdict.RE, None, result.time_ms)
+        with open(metrics_tmpf.name, "r") as in_metrics_tmpf:
+            metrics = parse_metrics(in_metrics_tmpf.read(), case.input_file.name)
+    return CaseResult(
+        case, Verdict.AC, score, result.time_ms, result.max_rss_mb, metrics
+    )
+
+
+def run_cases(
+    runner: ProgramRunner,
+    cases: Iterable[Case],
+    *,
+    jobs: int,
+    timelimit: float,
+    memory_limit: int | None = None,
+    args: list[str] | None = None,
+    env: dict[str, str] | None = None,
+    cancel: threading.Event | None = None,
+    stderr_limit: int | None = None,
+) -> Iterator[CaseResult]:
+    """Run cases in parallel.
+
+    Results are yielded in the order of completion. Cases that have not started yet
+    are cancelled when the iteration is stopped. Once `cancel` is set, cases do not
+    start any more and the iteration raises CancelledError. Cases already running
+    are not stopped by it; see ProgramRunner.kill_running.
+
+    Args:
+        runner (ProgramRunner): Program runner.
+        cases (Iterable[Case]): Cases to run.
+        jobs (int): Number of cases to run at the same time.
+        timelimit (float): Time limit.
+        memory_limit (int | None, optional): Memory limit [MB]. Defaults to None (unlimited).
+        args (list[str] | None, optional): Extra arguments for the solver. Defaults to None.
+        env (dict[str, str] | None, optional): Extra environment variables for the solver. Defaults to None.
+        cancel (threading.Event | None, optional): Event to cancel the remaining cases. Defaults to None.
+        stderr_limit (int | None, optional): Size [bytes] of the tail of stderr kept per case.
+            Defaults to None (stderr is not captured).
+
+    Raises:
+        CancelledError: If `cancel` is set.
+
+    Yields:
+        CaseResult: Result of each case.
+    """
+    assert jobs >= 1
+
+    def run_unless_cancelled(case: Case) -> CaseResult:
+        if cancel is not None and cancel.is_set():
+            raise CancelledError()
+        return run_case(
+            runner,
+            case,
+            timelimit=timelimit,
+            memory_limit=memory_limit,
+            args=args,
+            env=env,
+            stderr_limit=stderr_limit,
+        )
+
+    pool = ThreadPoolExecutor(max_workers=jobs)
+    try:
+        futures: list[Future[CaseResult]] = [
+            pool.submit(run_unless_cancelled, case) for case in cases
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,302 @@
+import bisect
+import hashlib
+import json
+import logging
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import toml
+
+from cp_heuristics_adapter.executor import parse_metrics
+from cp_heuristics_adapter.util import pathlib_util
+
+logger = logging.getLogger(__name__)
+
+# Time limit [s] of the extraction of the features of an input
+EXTRACT_TIME_LIMIT = 10.0
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """Extractor of the features of the inputs.
+
+    Attributes:
+        command (list[str]): Command reading an input from stdin and printing its features.
+        buckets (int): Number of buckets per feature.
+    """
+
+    command: list[str]
+    buckets: int
+
+    @staticmethod
+    def load(spec_file: Path) -> "FeatureSpec":
+        """Load the extractor from a TOML file.
+
+        Args:
+            spec_file (Path): Path to the specification file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the specification is invalid.
+
+        Returns:
+            FeatureSpec: Extractor.
+        """
+        logger.info(f"loading feature extractor from {spec_file}")
+        pathlib_util.assert_file_existence(spec_file)
+        spec = toml.load(spec_file)
+        command: list[str] = spec.get("command", [])
+        if not command:
+            raise ValueError(f"No command is defined in {spec_file}")
+        buckets: int = spec.get("buckets", 4)
+        if buckets < 1:
+            raise ValueError(f"Invalid number of buckets in {spec_file}: {buckets}")
+        return FeatureSpec(command=command, buckets=buckets)
+
+
+class FeatureIndex:
+    """Cache of the features of the inputs, keyed by the SHA-256 digest of each input.
+
+    The digest of an input file is cached with its size and modification time, so an
+    unchanged input is read neither by the extractor nor to be hashed again. The
+    features are dropped when the command of the extractor changes.
+    """
+
+    def __init__(
+        self, index_file: Path, command: list[str], cwd: Path | None = None
+    ) -> None:
+        """Initialize the FeatureIndex, loading the index file if it exists.
+
+        Args:
+            index_file (Path): Path to the index file.
+            command (list[str]): Command of the extractor.
+            cwd (Path | None, optional): Directory to run the extractor in. Defaults to None (the current one).
+        """
+        self.index_file = index_file
+        self.command = command
+        self.cwd = cwd
+        # Size, modification time and digest by path of the input file
+        self.__digests: dict[str, tuple[int, int, str]] = {}
+        # Features by digest of the input
+        self.__features: dict[str, dict[str, float]] = {}
+        # Whether the index changed since it was loaded
+        self.__changed = False
+        if index_file.is_file():
+            index = json.loads(index_file.read_text())
+            self.__digests = {
+                path: (size, mtime_ns, digest)
+                for path, (size, mtime_ns, digest) in index["digests"].items()
+            }
+            if index["command"] == command:
+                self.__features = index["features"]
+            else:
+                logger.info("The feature extractor changed, so the features are reset")
+
+    def __digest(self, input_file: Path) -> str:
+        """Get the digest of an input file, hashing it only if it changed.
+
+        Args:
+            input_file (Path): Path to the input file.
+
+        Returns:
+            str: SHA-256 digest of the content.
+        """
+        stat = input_file.stat()
+        key = input_file.as_posix()
+        cached = self.__digests.get(key)
+        if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+        digest = hashlib.sha256(input_file.read_bytes()).hexdigest()
+        self.__digests[key] = (stat.st_size, stat.st_mtime_ns, digest)
+        self.__changed = True
+        return digest
+
+    def __extract(self, input_file: Path) -> dict[str, float]:
+        """Run the extractor on an input.
+
+        Args:
+            input_file (Path): Path to the input file.
+
+        Raises:
+            RuntimeError: If the extractor fails.
+
+        Returns:
+            dict[str, float]: Features by name.
+        """
+        with open(input_file, "r") as inf:
+            try:
+                result = subprocess.run(
+                    self.command,
+                    stdin=inf,
+                    cwd=self.cwd,
+                    capture_output=True,
+                    text=True,
+                    timeout=EXTRACT_TIME_LIMIT,
+                )
+            except (OSError, subprocess.TimeoutExpired) as e:
+                raise RuntimeError(f"Failed to extract features of {input_file}: {e}")
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"Failed to extract features of {input_file} "
+                f"(exit code {result.returncode}): {result.stderr.strip()}"
+            )
+        return parse_metrics(result.stdout, input_file.name)
+
+    def features(
+        self, input_files: list[Path], jobs: int = 1
+    ) -> list[dict[str, float]]:
+        """Get the features of inputs, extracting those not in the index.
+
+        The index file is updated if anything was hashed or extracted.
+
+        Args:
+            input_files (list[Path]): Paths to the input files.
+            jobs (int, optional): Number of extractions at the same time. Defaults to 1.
+
+        Raises:
+            RuntimeError: If the extractor fails.
+
+        Returns:
+            list[dict[str, float]]: Features of each input.
+        """
+        digests = [self.__digest(input_file) for input_file in input_files]
+        missing = {
+            digest: input_file
+            for digest, input_file in zip(digests, input_files)
+            if digest not in self.__features
+        }
+        if missing:
+            logger.info(f"Extracting the features of {len(missing)} inputs")
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                extracted = pool.map(self.__extract, missing.values())
+                self.__features.update(zip(missing, extracted))
+            self.__changed = True
+        if self.__changed:
+            self.save()
+        return [self.__features[digest] for digest in digests]
+
+    def save(self) -> None:
+        """Write the index to its file."""
+        index = {
+            "command": self.command,
+            "digests": self.__digests,
+            "features": self.__features,
+        }
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        pathlib_util.write_atomically(self.index_file, json.dumps(index))
+        self.__changed = False
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """Cases with close values of a feature.
+
+    Attributes:
+        label (str): Value, or range of the values, of the feature.
+        case_ids (list[int]): IDs of the cases.
+    """
+
+    label: str
+    case_ids: list[int]
+
+
+def bucketize(values: dict[int, float], count: int) -> list[Bucket]:
+    """Split cases into buckets by the value of a feature.
+
+    A feature with at most `count` distinct values gets a bucket per value. Otherwise
+    the values are split at their quantiles into at most `count` buckets of about the
+    same number of cases.
+
+    Args:
+        values (dict[int, float]): Value of the feature by case ID.
+        count (int): Number of buckets.
+
+    Returns:
+        list[Bucket]: Buckets, in ascending order of the values.
+    """
+    distinct = sorted(set(values.values()))
+    if len(distinct) <= count:
+        index_of = {value: index for index, value in enumerate(distinct)}
+    else:
+        # Ties at an edge stay in the same bucket, so some buckets may merge
+        edges = sorted(set(statistics.quantiles(values.values(), n=count)))
+        index_of = {value: bisect.bisect_right(edges, value) for value in distinct}
+    members: dict[int, list[int]] = {}
+    for case_id, value in sorted(values.items()):
+        members.setdefault(index_of[value], []).append(case_id)
+    buckets = []
+    for index in sorted(members):
+        low = min(values[case_id] for case_id in members[index])
+        high = max(values[case_id] for case_id in members[index])
+        label = f"{low:g}" if low == high else f"{low:g}..{high:g}"
+        buckets.append(Bucket(label, members[index]))
+    return buckets
+
+
+class SliceSummary:
+    """Mean scores of runs per bucket of a feature.
+
+    The bucket of each case is looked up once, so a run costs a single pass over
+    its scores however many buckets there are.
+    """
+
+    def __init__(
+        self, feature: str, buckets: list[Bucket], runs: dict[str, dict[int, float]]
+    ) -> None:
+        """Initialize the SliceSummary.
+
+        Args:
+            feature (str): Name of the feature.
+            buckets (list[Bucket]): Buckets of the feature.
+            runs (dict[str, dict[int, float]]): Scores by case ID of each run, by name of the run.
+        """
+        self.feature = feature
+        self.labels = [bucket.label for bucket in buckets]
+        self.cases = [len(bucket.case_ids) for bucket in buckets]
+        bucket_of = {
+            case_id: index
+            for index, bucket in enumerate(buckets)
+            for case_id in bucket.case_ids
+        }
+        # Mean score per bucket of each run. None if the run has no case in a bucket
+        self.means: dict[str, list[float | None]] = {}
+        for name, scores in runs.items():
+            sums = [0.0] * len(buckets)
+            counts = [0] * len(buckets)
+            for case_id, score in scores.items():
+                index = bucket_of.get(case_id)
+                if index is not None:
+                    sums[index] += score
+                    counts[index] += 1
+            self.means[name] = [
+                total / count if count > 0 else None
+                for total, count in zip(sums, counts)
+            ]
+
+    def pretty(self) -> str:
+        """Return the summary in a pretty format.
+
+        Returns:
+            str: Summary in a pretty format.
+        """
+        name_width = max([len("cases"), *(len(name) for name in self.means)])
+        widths = [max(12, len(label) + 2) for label in self.labels]
+
+        def row(head: str, cells: list[str]) -> str:
+            return f"{head:<{name_width}}" + "".join(
+                f"{cell:>{width}}" for cell, width in zip(cells, widths)
+            )
+
+        lines = [
+            f"feature: {self.feature}",
+            row("", self.labels),
+            row("cases", [str(count) for count in self.cases]),
+        ]
+        for name, means in self.means.items():
+            lines.append(
+                row(name, ["-" if mean is None else f"{mean:.2f}" for mean in means])
+            )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,249 @@
+import itertools
+import json
+import logging
+import re
+import shlex
+import statistics
+from dataclasses import dataclass
+from pathlib import Path
+
+import toml
+
+from cp_heuristics_adapter.executor import CaseResult, Verdict
+from cp_heuristics_adapter.languages import BuildMode
+from cp_heuristics_adapter.tuning import Direction
+from cp_heuristics_adapter.util import pathlib_util
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Variant:
+    """A compiler and flags to build the solver with.
+
+    Attributes:
+        compiler (str): Compiler.
+        flags (list[str]): Compilation flags.
+    """
+
+    compiler: str
+    flags: list[str]
+
+    @property
+    def name(self) -> str:
+        """Get the name of the variant, the command line without the files.
+
+        Returns:
+            str: Name.
+        """
+        return shlex.join([self.compiler, *self.flags])
+
+
+@dataclass(frozen=True)
+class Matrix:
+    """Matrix of compiler and flag variants.
+
+    Attributes:
+        variants (list[Variant]): Variants.
+        direction (Direction): Direction of the scores.
+        metric (str | None): Metric of the solver measuring its throughput. None means the time is used.
+    """
+
+    variants: list[Variant]
+    direction: Direction
+    metric: str | None
+
+    @staticmethod
+    def load(spec_file: Path) -> "Matrix":
+        """Load the matrix from a TOML file.
+
+        The variants are all combinations of a compiler and an alternative of each
+        axis, e.g. `compilers = ["g++", "clang++"]` and
+        `axes = [["-O2", "-O3"], ["", "-march=native"]]` give eight variants. An
+        alternative may have several flags separated by spaces, and the empty one
+        adds none. The common `flags` come first.
+
+        Args:
+            spec_file (Path): Path to the specification file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the specification is invalid.
+
+        Returns:
+            Matrix: Matrix.
+        """
+        logger.info(f"loading flag matrix from {spec_file}")
+        pathlib_util.assert_file_existence(spec_file)
+        spec = toml.load(spec_file)
+        compilers: list[str] = spec.get("compilers", [])
+        if not compilers:
+            raise ValueError(f"No compilers are defined in {spec_file}")
+        common: list[str] = spec.get("flags", [])
+        axes: list[list[str]] = spec.get("axes", [])
+        if any(not alternatives for alternatives in axes):
+            raise ValueError(f"An axis has no alternatives in {spec_file}")
+        variants = [
+            Variant(
+                compiler,
+                [
+                    *common,
+                    *(flag for choice in choices for flag in shlex.split(choice)),
+                ],
+            )
+            for compiler in compilers
+            for choices in itertools.product(*axes)
+        ]
+        return Matrix(
+            variants=variants,
+            direction=Direction.from_str(spec.get("direction", "maximize")),
+            metric=spec.get("metric"),
+        )
+
+
+@dataclass(frozen=True)
+class VariantSummary:
+    """Summary of the runs of a variant.
+
+    Attributes:
+        variant (Variant): Variant.
+        score (float | None): Mean score of the successful cases. None if no case succeeded.
+        throughput (float | None): Metric per second, or cases per second without a metric.
+            None if it was not measured.
+        failed (int): Number of failed cases.
+    """
+
+    variant: Variant
+    score: float | None
+    throughput: float | None
+    failed: int
+
+    @staticmethod
+    def of(
+        variant: Variant,
+        results: list[CaseResult],
+        scores: list[float],
+        metric: str | None,
+    ) -> "VariantSummary":
+        """Summarize the results of a variant.
+
+        Args:
+            variant (Variant): Variant.
+            results (list[CaseResult]): Results of the cases.
+            scores (list[float]): Scores of the successful cases, transformed by the score type.
+            metric (str | None): Metric measuring the throughput. None means the time is used.
+
+        Returns:
+            VariantSummary: Summary.
+        """
+        succeeded = [
+            result
+            for result in results
+            if result.verdict == Verdict.AC and result.time_ms is not None
+        ]
+        seconds = sum(result.time_ms or 0.0 for result in succeeded) / 1000
+        throughput = None
+        if succeeded and seconds > 0:
+            if metric is None:
+                throughput = len(succeeded) / seconds
+            elif all(metric in result.metrics for result in succeeded):
+                throughput = (
+                    sum(result.metrics[metric] for result in succeeded) / seconds
+                )
+        return VariantSummary(
+            variant=variant,
+            score=statistics.mean(scores) if scores else None,
+            throughput=throughput,
+            failed=len(results) - len(succeeded),
+        )
+
+
+def rank(
+    summaries: list[VariantSummary], by: str, direction: Direction
+) -> list[VariantSummary]:
+    """Rank the variants, the best first.
+
+    Variants with failed cases come after all the others.
+
+    Args:
+        summaries (list[VariantSummary]): Summaries of the variants.
+        by (str): 'score' or 'throughput'.
+        direction (Direction): Direction of the scores.
+
+    Returns:
+        list[VariantSummary]: Summaries from the best to the worst.
+    """
+    sign = 1.0 if direction == Direction.MAXIMIZE else -1.0
+
+    def key(summary: VariantSummary) -> tuple[bool, float]:
+        if by == "score":
+            value = None if summary.score is None else sign * summary.score
+        else:
+            value = summary.throughput
+        return summary.failed > 0 or value is None, -(value or 0.0)
+
+    return sorted(summaries, key=key)
+
+
+def pretty(summaries: list[VariantSummary], metric: str | None) -> str:
+    """Format the ranked variants as a table.
+
+    Args:
+        summaries (list[VariantSummary]): Ranked summaries.
+        metric (str | None): Metric measuring the throughput. None means the time is used.
+
+    Returns:
+        str: Table.
+    """
+    unit = "cases/s" if metric is None else f"{metric}/s"
+    lines = [f"{'rank':>4}  {'score':>14}  {unit:>16}  {'failed':>6}  variant"]
+    for index, summary in enumerate(summaries, 1):
+        score = "-" if summary.score is None else f"{summary.score:.2f}"
+        throughput = "-" if summary.throughput is None else f"{summary.throughput:.4g}"
+        lines.append(
+            f"{index:>4}  {score:>14}  {throughput:>16}  {summary.failed:>6}  "
+            f"{summary.variant.name}"
+        )
+    return "\n".join(lines)
+
+
+def write_release_config(config_file: Path, variant: Variant) -> None:
+    """Write the compiler and the flags of a variant to the release section of the C++ config.
+
+    The rest of the file, including the comments, is kept as is.
+
+    Args:
+        config_file (Path): Path to cpp_config.toml.
+        variant (Variant): Variant.
+
+    Raises:
+        ValueError: If the config file has no release section.
+    """
+    text = config_file.read_text()
+    header = re.search(
+        rf"^\[{BuildMode.RELEASE.value}\][ \t]*$", text, flags=re.MULTILINE
+    )
+    if header is None:
+        raise ValueError(f"No [{BuildMode.RELEASE.value}] section in {config_file}")
+    next_header = re.compile(r"^\[", flags=re.MULTILINE).search(text, header.end())
+    end = len(text) if next_header is None else next_header.start()
+    section = text[header.end() : end]
+
+    # JSON strings are valid TOML basic strings. The flags are written one per
+    # line, like in the template
+    values = {
+        "compiler": f"compiler = {json.dumps(variant.compiler)}",
+        "flags": "flags = [\n"
+        + "".join(f"    {json.dumps(flag)},\n" for flag in variant.flags)
+        + "]",
+    }
+    for key, line in values.items():
+        # A value may span several lines, e.g. an array with a flag per line
+        pattern = re.compile(
+            rf"^{key}\s*=\s*(\[[^\]]*\]|[^\n]*)[ \t]*$", flags=re.MULTILINE
+        )
+        if pattern.search(section) is not None:
+            section = pattern.sub(lambda _: line, section, count=1)
+        else:
+            section = f"\n{line}{section}"
+    config_file.write_text(text[: header.end()] + section + text[end:])
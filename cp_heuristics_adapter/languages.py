@@ -1,19 +1,25 @@
+import hashlib
+import json
 import logging
+import os
+import shutil
 import subprocess
+import sys
 from abc import ABCMeta, abstractmethod
 from enum import Enum
 from functools import lru_cache
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from typing import Any
 
 import toml
 
+from cp_heuristics_adapter.pgo import PgoTraining, train
 from cp_heuristics_adapter.runner import ProgramRunner
-from cp_heuristics_adapter.setup_logger import setup_logging
 from cp_heuristics_adapter.util import pathlib_util
 from cp_heuristics_adapter.util.config_util import ConfigKey
+from cp_heuristics_adapter.watch import local_dependencies
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -22,10 +28,12 @@ class BuildMode(Enum):
 
     DEBUG: Debug mode.
     RELEASE: Release mode.
+    PGO: Release mode with profile-guided optimization (C++ only).
     """
 
     DEBUG = "debug"
     RELEASE = "release"
+    PGO = "pgo"
 
     @staticmethod
     def from_str(value: str) -> "BuildMode":
@@ -46,6 +54,20 @@ class BuildMode(Enum):
         raise ValueError(f"Invalid mode: {value}")
 
 
+def build_cache_dir() -> Path:
+    """Get the directory to cache builds in.
+
+    It is $XDG_CACHE_HOME/cp-heuristics-adapter, or ~/.cache/cp-heuristics-adapter if
+    XDG_CACHE_HOME is not set.
+
+    Returns:
+        Path: Path to the directory.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    root = Path(cache_home) if cache_home else Path.home() / ".cache"
+    return root / "cp-heuristics-adapter"
+
+
 class Language(metaclass=ABCMeta):
     @abstractmethod
     def __init__(
@@ -72,6 +94,16 @@ class Language(metaclass=ABCMeta):
         """
         pass
 
+    @property
+    @abstractmethod
+    def memory_limit(self) -> int:
+        """Get the memory limit [MB] per case. 0 means unlimited.
+
+        Returns:
+            int: Memory limit [MB].
+        """
+        pass
+
     @classmethod
     @abstractmethod
     def suffixes(self) -> list[str]:
@@ -92,6 +124,8 @@ class Cpp(Language):
         Attributes:
             COMPILER (ConfigKey[str]): Compiler. Defaults to "g++".
             FLAGS (ConfigKey[list[str]]): Compilation flags. Defaults to ["-O2", "-Wall", "-Wextra"].
+            MEMORY_LIMIT (ConfigKey[int]): Memory limit [MB] per case. Defaults to 0 (unlimited).
+            LLVM_PROFDATA (ConfigKey[str]): Command to merge the profiles of clang in PGO mode. Defaults to "llvm-profdata".
         """
 
         COMPILER = ConfigKey[str](
@@ -106,12 +140,23 @@ class Cpp(Language):
                 "-Wextra",
             ],
         )
+        MEMORY_LIMIT = ConfigKey[int](
+            key="memory_limit",
+            default=0,
+        )
+        LLVM_PROFDATA = ConfigKey[str](
+            key="llvm_profdata",
+            default="llvm-profdata",
+        )
 
         def __init__(
             self, *, build_mode: BuildMode, config_file: Path | None = None
         ) -> None:
             """Initialize the Cpp config.
 
+            In PGO mode, the release config is used if the config file has no section
+            for PGO.
+
             Args:
                 build_mode (BuildMode): Build mode.
                 config_file (Path | None, optional): Path to the config file. Defaults to None.
@@ -120,17 +165,30 @@ class Cpp(Language):
             if config_file is not None:
                 logger.info(f"loading cpp config from {config_file}")
                 pathlib_util.assert_file_existence(config_file)
-                config = toml.load(config_file)[build_mode.value]
+                sections = toml.load(config_file)
+                if build_mode == BuildMode.PGO and build_mode.value not in sections:
+                    logger.info("using the release config for pgo")
+                    config = sections[BuildMode.RELEASE.value]
+                else:
+                    config = sections[build_mode.value]
             else:
                 logger.info("using default cpp config")
             self.compiler = Cpp.Config.COMPILER.load_from(config)
             self.flags = Cpp.Config.FLAGS.load_from(config)
+            self.memory_limit = Cpp.Config.MEMORY_LIMIT.load_from(config)
+            self.llvm_profdata = Cpp.Config.LLVM_PROFDATA.load_from(config)
 
             logger.debug(f"compiler: {self.compiler}")
             logger.debug(f"flags: {self.flags}")
+            logger.debug(f"memory limit: {self.memory_limit}")
 
     def __init__(
-        self, *, build_mode: BuildMode, config_file: Path | None = None
+        self,
+        *,
+        build_mode: BuildMode,
+        config_file: Path | None = None,
+        extra_flags: list[str] | None = None,
+        training: PgoTraining | None = None,
     ) -> None:
         """Initialize the Cpp object.
 
@@ -139,35 +197,199 @@ class Cpp(Language):
         Args:
             build_mode (BuildMode): Build mode.
             config_file (Path | None, optional): Path to the config file. Defaults to None.
+            extra_flags (list[str] | None, optional): Flags added to the config (e.g. for profiling). Defaults to None.
+            training (PgoTraining | None, optional): Training runs in PGO mode. Defaults to None.
         """
+        self.build_mode = build_mode
         self.config = Cpp.Config(build_mode=build_mode, config_file=config_file)
+        if extra_flags:
+            self.config.flags = self.config.flags + extra_flags
+        self.training = training
 
     @lru_cache
     def compile(self, source_file: Path) -> ProgramRunner:
         """Compile the source file.
 
+        In PGO mode, the build is cached (see __build_pgo).
+
         Args:
             source_file (Path): Path to the source file.
 
+        Raises:
+            ValueError: If no training runs are given in PGO mode.
+
         Returns:
             ProgramRunner: ProgramRunner object.
         """
+        if self.build_mode == BuildMode.PGO:
+            if self.training is None:
+                raise ValueError("PGO build mode needs training runs")
+            return ProgramRunner([str(self.__build_pgo(source_file, self.training))])
+
         exec_file = source_file.with_suffix("")
+        self.__compile(source_file, self.config.flags, exec_file)
+        return ProgramRunner([f"{exec_file.resolve()}"])
+
+    def compile_to(self, source_file: Path, exec_file: Path) -> ProgramRunner:
+        """Compile the source file to the given executable, ignoring the build mode.
+
+        Args:
+            source_file (Path): Path to the source file.
+            exec_file (Path): Path to the executable.
 
+        Returns:
+            ProgramRunner: ProgramRunner object.
+        """
+        self.__compile(source_file, self.config.flags, exec_file)
+        return ProgramRunner([str(exec_file.resolve())])
+
+    def __compile(self, source_file: Path, flags: list[str], exec_file: Path) -> None:
+        """Run the compiler.
+
+        Args:
+            source_file (Path): Path to the source file.
+            flags (list[str]): Compilation flags.
+            exec_file (Path): Path to the executable.
+        """
         compile_cmd = [self.config.compiler]
-        compile_cmd.extend(self.config.flags)
+        compile_cmd.extend(flags)
         compile_cmd.extend([str(source_file), "-o", str(exec_file)])
 
         logger.info(f"compiling {source_file} with {compile_cmd}")
         subprocess.check_call(compile_cmd)
 
-        return ProgramRunner([f"{exec_file.resolve()}"])
+    def __build_pgo(self, source_file: Path, training: PgoTraining) -> Path:
+        """Build with profile-guided optimization, reusing a cached build.
+
+        The source file is compiled with instrumentation, which is run on the
+        training inputs, and then compiled again with the collected profile. The
+        build is cached by the hash of the source file, its local headers, the
+        compilation settings and the training inputs.
+
+        Args:
+            source_file (Path): Path to the source file.
+            training (PgoTraining): Training runs.
+
+        Returns:
+            Path: Path to the executable.
+        """
+        digest = hashlib.sha256()
+        for dependency in local_dependencies(source_file):
+            digest.update(dependency.read_bytes())
+        digest.update(json.dumps([self.config.compiler, *self.config.flags]).encode())
+        for input_file in training.inputs:
+            digest.update(hashlib.sha256(input_file.read_bytes()).digest())
+        cache_dir = (
+            build_cache_dir()
+            / "cpp"
+            / f"{source_file.stem}-pgo-{digest.hexdigest()[:16]}"
+        )
+        exec_file = cache_dir / source_file.stem
+        if exec_file.is_file():
+            logger.info(f"using the cached pgo build {exec_file}")
+            return exec_file
+
+        cache_dir.parent.mkdir(parents=True, exist_ok=True)
+        with TemporaryDirectory(dir=cache_dir.parent) as temp_dir:
+            build_dir = Path(temp_dir)
+            profile_dir = build_dir / "profile"
+            # Both builds have the same output path, by which gcc names the profile
+            build_file = build_dir / source_file.stem
+            self.__compile(
+                source_file,
+                [*self.config.flags, f"-fprofile-generate={profile_dir}"],
+                build_file,
+            )
+            train(ProgramRunner([str(build_file)]), training)
+            self.__compile(
+                source_file,
+                [*self.config.flags, self.__profile_use_flag(profile_dir)],
+                build_file,
+            )
+            shutil.rmtree(profile_dir)
+            # Another process may have finished the same build in the meantime
+            try:
+                build_dir.rename(cache_dir)
+            except OSError:
+                if not exec_file.is_file():
+                    raise
+        return exec_file
+
+    def __profile_use_flag(self, profile_dir: Path) -> str:
+        """Get the flag to compile with the collected profile.
+
+        gcc reads the profile directory as is, while the raw profiles of clang are
+        merged with llvm-profdata first.
+
+        Args:
+            profile_dir (Path): Directory the instrumented program wrote the profiles to.
+
+        Returns:
+            str: Compilation flag.
+        """
+        if "clang" not in Path(self.config.compiler).name:
+            return f"-fprofile-use={profile_dir}"
+        profdata = profile_dir / "merged.profdata"
+        merge_cmd = [self.config.llvm_profdata, "merge", f"--output={profdata}"]
+        merge_cmd.extend(str(raw) for raw in sorted(profile_dir.glob("*.profraw")))
+        logger.info(f"merging the profiles with {merge_cmd}")
+        subprocess.check_call(merge_cmd)
+        return f"-fprofile-use={profdata}"
+
+    @property
+    def memory_limit(self) -> int:
+        return self.config.memory_limit
 
     @classmethod
     def suffixes(self) -> list[str]:
         return [".cpp", ".cc", ".cxx"]
 
 
+class PythonBackend(Enum):
+    """Backend to run Python solvers.
+
+    CPYTHON: Run with the CPython interpreter.
+    PYPY: Run with the PyPy interpreter.
+    CYTHON: Compile to a native executable with Cython.
+    NUITKA: Compile to a native executable with Nuitka.
+    """
+
+    CPYTHON = "cpython"
+    PYPY = "pypy"
+    CYTHON = "cython"
+    NUITKA = "nuitka"
+
+    @staticmethod
+    def from_str(value: str) -> "PythonBackend":
+        """Get the PythonBackend from the value.
+
+        Args:
+            value (str): Value.
+
+        Raises:
+            ValueError: If the value is invalid.
+
+        Returns:
+            PythonBackend: PythonBackend.
+        """
+        for backend in PythonBackend:
+            if backend.value == value:
+                return backend
+        raise ValueError(f"Invalid python backend: {value}")
+
+
+# Prints the compiler and linker settings of a Python installation for embedding
+_EMBED_INFO_SCRIPT = """
+import json, sysconfig
+print(json.dumps({
+    "include": sysconfig.get_paths()["include"],
+    "libdir": sysconfig.get_config_var("LIBDIR"),
+    "ldversion": sysconfig.get_config_var("LDVERSION"),
+    "libs": " ".join(filter(None, [sysconfig.get_config_var("LIBS"), sysconfig.get_config_var("SYSLIBS")])),
+}))
+"""
+
+
 class Python(Language):
     """Python language class."""
 
@@ -176,12 +398,57 @@ class Python(Language):
 
         Attributes:
             PYTHON (ConfigKey[str]): Python command. Defaults to "python".
+            MEMORY_LIMIT (ConfigKey[int]): Memory limit [MB] per case. Defaults to 0 (unlimited).
+            PREFORK (ConfigKey[bool]): Whether to fork each run from a warm server. Defaults to False.
+            PRELOAD (ConfigKey[list[str]]): Modules imported by the prefork server. Defaults to [].
+            BACKEND (ConfigKey[str]): Backend to run the solver. Defaults to "cpython".
+            PYPY (ConfigKey[str]): PyPy command. Defaults to "pypy3".
+            PYPY_JIT (ConfigKey[list[str]]): Options for the PyPy JIT (e.g. "threshold=200"). Defaults to [].
+            CC (ConfigKey[str]): C compiler for the Cython backend. Defaults to "cc".
+            CC_FLAGS (ConfigKey[list[str]]): Flags for the C compiler. Defaults to ["-O2"].
+            NUITKA_FLAGS (ConfigKey[list[str]]): Extra flags for Nuitka. Defaults to [].
         """
 
         PYTHON = ConfigKey[str](
             key="python",
             default="python",
         )
+        MEMORY_LIMIT = ConfigKey[int](
+            key="memory_limit",
+            default=0,
+        )
+        PREFORK = ConfigKey[bool](
+            key="prefork",
+            default=False,
+        )
+        PRELOAD = ConfigKey[list[str]](
+            key="preload",
+            default=[],
+        )
+        BACKEND = ConfigKey[str](
+            key="backend",
+            default=PythonBackend.CPYTHON.value,
+        )
+        PYPY = ConfigKey[str](
+            key="pypy",
+            default="pypy3",
+        )
+        PYPY_JIT = ConfigKey[list[str]](
+            key="pypy_jit",
+            default=[],
+        )
+        CC = ConfigKey[str](
+            key="cc",
+            default="cc",
+        )
+        CC_FLAGS = ConfigKey[list[str]](
+            key="cc_flags",
+            default=["-O2"],
+        )
+        NUITKA_FLAGS = ConfigKey[list[str]](
+            key="nuitka_flags",
+            default=[],
+        )
 
         def __init__(
             self, *, build_mode: BuildMode, config_file: Path | None = None
@@ -200,23 +467,48 @@ class Python(Language):
             else:
                 logger.info("using default python config")
             self.python = Python.Config.PYTHON.load_from(config)
+            self.memory_limit = Python.Config.MEMORY_LIMIT.load_from(config)
+            self.prefork = Python.Config.PREFORK.load_from(config)
+            self.preload = Python.Config.PRELOAD.load_from(config)
+            self.backend = PythonBackend.from_str(
+                Python.Config.BACKEND.load_from(config)
+            )
+            self.pypy = Python.Config.PYPY.load_from(config)
+            self.pypy_jit = Python.Config.PYPY_JIT.load_from(config)
+            self.cc = Python.Config.CC.load_from(config)
+            self.cc_flags = Python.Config.CC_FLAGS.load_from(config)
+            self.nuitka_flags = Python.Config.NUITKA_FLAGS.load_from(config)
+
+            logger.debug(f"backend: {self.backend.value}")
 
     def __init__(
-        self, *, build_mode: BuildMode, config_file: Path | None = None
+        self,
+        *,
+        build_mode: BuildMode,
+        config_file: Path | None = None,
+        backend: PythonBackend | None = None,
     ) -> None:
         """Initialize the Python object.
 
-        You can customize the python command by providing a config file.
+        You can customize the python command and the backend by providing a config file.
 
         Args:
             build_mode (BuildMode): Build mode.
             config_file (Path | None, optional): Path to the config file. Defaults to None.
+            backend (PythonBackend | None, optional): Backend overriding the config. Defaults to None.
         """
         self.config = Python.Config(build_mode=build_mode, config_file=config_file)
+        if backend is not None:
+            self.config.backend = backend
 
     @lru_cache
     def compile(self, source_file: Path) -> ProgramRunner:
-        """Python does not need compilation, so this method just returns a ProgramRunner object.
+        """Prepare the runner for the backend.
+
+        The interpreters (CPython and PyPy) need no compilation. In prefork mode, the
+        CPython runner forks each run from a server that has imported the preloaded
+        modules. Cython and Nuitka builds are cached by the hash of the source and the
+        build settings.
 
         Args:
             source_file (Path): Path to the source file.
@@ -224,14 +516,333 @@ class Python(Language):
         Returns:
             ProgramRunner: ProgramRunner object.
         """
+        source = str(source_file.resolve())
+        backend = self.config.backend
+        if backend == PythonBackend.PYPY:
+            logger.info("compilation is not needed for pypy")
+            # The JIT starts compiling a loop after `threshold` iterations, which
+            # matters for short-running cases
+            jit_args = ["--jit", ",".join(self.config.pypy_jit)]
+            return ProgramRunner(
+                [self.config.pypy, *(jit_args if self.config.pypy_jit else []), source]
+            )
+        if backend in (PythonBackend.CYTHON, PythonBackend.NUITKA):
+            return ProgramRunner([str(self.__build(source_file))])
+
         logger.info("compilation is not needed for python")
-        return ProgramRunner([self.config.python, str(source_file.resolve())])
+        if self.config.prefork:
+            if sys.platform == "win32":
+                logger.warning("prefork mode is not supported on Windows, ignoring it")
+            else:
+                # Imported here because the prefork server depends on Unix-only modules
+                from cp_heuristics_adapter.prefork import PreforkRunner
+
+                return PreforkRunner(
+                    self.config.python, source_file.resolve(), self.config.preload
+                )
+        return ProgramRunner([self.config.python, source])
+
+    def __build(self, source_file: Path) -> Path:
+        """Build a native executable with Cython or Nuitka, reusing a cached build.
+
+        Args:
+            source_file (Path): Path to the source file.
+
+        Returns:
+            Path: Path to the executable.
+        """
+        backend = self.config.backend
+        settings = [backend.value, self.config.python]
+        if backend == PythonBackend.CYTHON:
+            settings += [self.config.cc, *self.config.cc_flags]
+        else:
+            settings += self.config.nuitka_flags
+        digest = hashlib.sha256(source_file.read_bytes())
+        digest.update(json.dumps(settings).encode())
+        cache_dir = (
+            build_cache_dir()
+            / "python"
+            / f"{source_file.stem}-{backend.value}-{digest.hexdigest()[:16]}"
+        )
+        exec_file = cache_dir / source_file.stem
+        if exec_file.is_file():
+            logger.info(f"using the cached {backend.value} build {exec_file}")
+            return exec_file
+
+        cache_dir.parent.mkdir(parents=True, exist_ok=True)
+        with TemporaryDirectory(dir=cache_dir.parent) as temp_dir:
+            build_dir = Path(temp_dir)
+            if backend == PythonBackend.CYTHON:
+                self.__build_cython(source_file, build_dir)
+            else:
+                self.__build_nuitka(source_file, build_dir)
+            # Another process may have finished the same build in the meantime
+            try:
+                build_dir.rename(cache_dir)
+            except OSError:
+                if not exec_file.is_file():
+                    raise
+        return exec_file
+
+    def __build_cython(self, source_file: Path, build_dir: Path) -> None:
+        """Compile the source file to an executable embedding the interpreter.
+
+        Args:
+            source_file (Path): Path to the source file.
+            build_dir (Path): Directory to put the executable in.
+        """
+        c_file = build_dir / f"{source_file.stem}.c"
+        cython_cmd = [self.config.python, "-m", "cython", "--embed", "-3"]
+        cython_cmd.extend([str(source_file), "-o", str(c_file)])
+        logger.info(f"translating {source_file} with {cython_cmd}")
+        subprocess.check_call(cython_cmd)
+
+        info = json.loads(
+            subprocess.check_output(
+                [self.config.python, "-c", _EMBED_INFO_SCRIPT], text=True
+            )
+        )
+        compile_cmd = [self.config.cc]
+        compile_cmd.extend(self.config.cc_flags)
+        compile_cmd.extend([str(c_file), "-o", str(build_dir / source_file.stem)])
+        compile_cmd.extend([f"-I{info['include']}", f"-L{info['libdir']}"])
+        compile_cmd.extend([f"-Wl,-rpath,{info['libdir']}"])
+        compile_cmd.extend([f"-lpython{info['ldversion']}", *info["libs"].split()])
+        logger.info(f"compiling {c_file} with {compile_cmd}")
+        subprocess.check_call(compile_cmd)
+
+    def __build_nuitka(self, source_file: Path, build_dir: Path) -> None:
+        """Compile the source file to an executable with Nuitka.
+
+        Args:
+            source_file (Path): Path to the source file.
+            build_dir (Path): Directory to put the executable in.
+        """
+        compile_cmd = [self.config.python, "-m", "nuitka", "--remove-output"]
+        compile_cmd.extend([f"--output-dir={build_dir}"])
+        compile_cmd.extend([f"--output-filename={source_file.stem}"])
+        compile_cmd.extend(self.config.nuitka_flags)
+        compile_cmd.append(str(source_file))
+        logger.info(f"compiling {source_file} with {compile_cmd}")
+        subprocess.check_call(compile_cmd)
+
+    @property
+    def memory_limit(self) -> int:
+        return self.config.memory_limit
 
     @classmethod
     def suffixes(self) -> list[str]:
         return [".py"]
 
 
+class Rust(Language):
+    """Rust language class."""
+
+    class Config:
+        """Rust configuration class.
+
+        Attributes:
+            CARGO (ConfigKey[str]): Cargo command. Defaults to "cargo".
+            PROFILE (ConfigKey[str]): Cargo profile. Defaults to "" (dev in debug mode and release in release mode).
+            EDITION (ConfigKey[str]): Edition of a single-file solver. Defaults to "2021".
+            DEPENDENCIES (ConfigKey[dict[str, Any]]): Dependencies of a single-file solver. Defaults to {}.
+            RUSTFLAGS (ConfigKey[list[str]]): Flags to pass to rustc, appended to $RUSTFLAGS. Defaults to [].
+            TARGET_DIR (ConfigKey[str]): Target directory shared by all builds. Defaults to "" (in the build cache).
+            MEMORY_LIMIT (ConfigKey[int]): Memory limit [MB] per case. Defaults to 0 (unlimited).
+        """
+
+        CARGO = ConfigKey[str](
+            key="cargo",
+            default="cargo",
+        )
+        PROFILE = ConfigKey[str](
+            key="profile",
+            default="",
+        )
+        EDITION = ConfigKey[str](
+            key="edition",
+            default="2021",
+        )
+        DEPENDENCIES = ConfigKey[dict[str, Any]](
+            key="dependencies",
+            default={},
+        )
+        RUSTFLAGS = ConfigKey[list[str]](
+            key="rustflags",
+            default=[],
+        )
+        TARGET_DIR = ConfigKey[str](
+            key="target_dir",
+            default="",
+        )
+        MEMORY_LIMIT = ConfigKey[int](
+            key="memory_limit",
+            default=0,
+        )
+
+        def __init__(
+            self, *, build_mode: BuildMode, config_file: Path | None = None
+        ) -> None:
+            """Initialize the Rust config.
+
+            Args:
+                build_mode (BuildMode): Build mode.
+                config_file (Path | None, optional): Path to the config file. Defaults to None.
+            """
+            config: dict[str, Any] = {}
+            if config_file is not None:
+                logger.info(f"loading rust config from {config_file}")
+                pathlib_util.assert_file_existence(config_file)
+                config = toml.load(config_file)[build_mode.value]
+            else:
+                logger.info("using default rust config")
+            self.cargo = os.path.expanduser(Rust.Config.CARGO.load_from(config))
+            self.profile = Rust.Config.PROFILE.load_from(config) or (
+                "release" if build_mode == BuildMode.RELEASE else "dev"
+            )
+            self.edition = Rust.Config.EDITION.load_from(config)
+            self.dependencies = Rust.Config.DEPENDENCIES.load_from(config)
+            self.rustflags = Rust.Config.RUSTFLAGS.load_from(config)
+            target_dir = Rust.Config.TARGET_DIR.load_from(config)
+            self.target_dir = (
+                Path(target_dir).expanduser()
+                if target_dir
+                else build_cache_dir() / "rust" / "target"
+            )
+            self.memory_limit = Rust.Config.MEMORY_LIMIT.load_from(config)
+
+            logger.debug(f"profile: {self.profile}")
+            logger.debug(f"target dir: {self.target_dir}")
+
+    def __init__(
+        self, *, build_mode: BuildMode, config_file: Path | None = None
+    ) -> None:
+        """Initialize the Rust object.
+
+        You can customize the profile, dependencies and flags by providing a config file.
+
+        Args:
+            build_mode (BuildMode): Build mode.
+            config_file (Path | None, optional): Path to the config file. Defaults to None.
+        """
+        self.config = Rust.Config(build_mode=build_mode, config_file=config_file)
+
+    @lru_cache
+    def compile(self, source_file: Path) -> ProgramRunner:
+        """Build the source file with cargo.
+
+        If the source file is a binary target of a cargo project, the project is built.
+        Otherwise, a cargo project for the single file is generated in the build cache.
+        All builds share the persistent target directory, so they are incremental.
+
+        Args:
+            source_file (Path): Path to the source file.
+
+        Raises:
+            RuntimeError: If cargo does not report the executable.
+
+        Returns:
+            ProgramRunner: ProgramRunner object.
+        """
+        source_file = source_file.resolve()
+        target = self.__find_cargo_target(source_file)
+        if target is None:
+            target = self.__generate_manifest(source_file)
+        manifest, bin_name = target
+
+        build_cmd = [self.config.cargo, "build", "--manifest-path", str(manifest)]
+        build_cmd.extend(["--bin", bin_name, "--profile", self.config.profile])
+        build_cmd.extend(["--target-dir", str(self.config.target_dir)])
+        build_cmd.append("--message-format=json-render-diagnostics")
+        env = dict(os.environ)
+        if self.config.rustflags:
+            # RUSTFLAGS overrides build.rustflags of .cargo/config.toml, so it is set
+            # only for configured flags, after the flags of the user
+            rustflags = " ".join(self.config.rustflags)
+            user_rustflags = os.environ.get("RUSTFLAGS")
+            env["RUSTFLAGS"] = (
+                f"{user_rustflags} {rustflags}" if user_rustflags else rustflags
+            )
+        logger.info(f"compiling {source_file} with {build_cmd}")
+        messages = subprocess.check_output(build_cmd, text=True, env=env)
+
+        for line in messages.splitlines():
+            message = json.loads(line)
+            if (
+                message.get("reason") == "compiler-artifact"
+                and message.get("target", {}).get("name") == bin_name
+                and message.get("executable")
+            ):
+                return ProgramRunner([message["executable"]])
+        raise RuntimeError(f"cargo did not build an executable for {source_file}")
+
+    def __find_cargo_target(self, source_file: Path) -> tuple[Path, str] | None:
+        """Find the cargo project having the source file as a binary target.
+
+        Args:
+            source_file (Path): Resolved path to the source file.
+
+        Returns:
+            tuple[Path, str] | None: Path to Cargo.toml and the name of the binary, or None if not found.
+        """
+        for directory in source_file.parents:
+            manifest = directory / "Cargo.toml"
+            if not manifest.is_file():
+                continue
+            metadata_cmd = [self.config.cargo, "metadata", "--no-deps"]
+            metadata_cmd.extend(["--format-version", "1"])
+            metadata_cmd.extend(["--manifest-path", str(manifest)])
+            metadata = json.loads(subprocess.check_output(metadata_cmd, text=True))
+            for package in metadata["packages"]:
+                for target in package["targets"]:
+                    if (
+                        "bin" in target["kind"]
+                        and Path(target["src_path"]).resolve() == source_file
+                    ):
+                        logger.info(f"found cargo project {manifest}")
+                        return manifest, target["name"]
+            return None
+        return None
+
+    def __generate_manifest(self, source_file: Path) -> tuple[Path, str]:
+        """Generate a cargo project for a single source file in the build cache.
+
+        Args:
+            source_file (Path): Resolved path to the source file.
+
+        Returns:
+            tuple[Path, str]: Path to the generated Cargo.toml and the name of the binary.
+        """
+        digest = hashlib.sha256(str(source_file).encode()).hexdigest()[:16]
+        # The binary name is unique because all builds share the target directory
+        bin_name = f"{source_file.stem}-{digest}"
+        manifest = {
+            "package": {
+                "name": "solver",
+                "version": "0.1.0",
+                "edition": self.config.edition,
+                "autobins": False,
+            },
+            "bin": [{"name": bin_name, "path": str(source_file)}],
+            "dependencies": self.config.dependencies,
+        }
+        content = toml.dumps(manifest)
+        manifest_file = build_cache_dir() / "rust" / bin_name / "Cargo.toml"
+        # Rewriting an unchanged manifest would make cargo check it again
+        if not manifest_file.is_file() or manifest_file.read_text() != content:
+            manifest_file.parent.mkdir(parents=True, exist_ok=True)
+            manifest_file.write_text(content)
+        return manifest_file, bin_name
+
+    @property
+    def memory_limit(self) -> int:
+        return self.config.memory_limit
+
+    @classmethod
+    def suffixes(self) -> list[str]:
+        return [".rs"]
+
+
 def detect_language(source_file: Path) -> type[Language]:
     """Detect the language of the source file.
 
@@ -241,7 +852,7 @@ def detect_language(source_file: Path) -> type[Language]:
     Returns:
         type[Language]: Language class.
     """
-    langs: list[type[Language]] = [Cpp, Python]
+    langs: list[type[Language]] = [Cpp, Python, Rust]
     for lang in langs:
         if source_file.suffix in lang.suffixes():
             return lang
@@ -1,71 +1,187 @@
 import argparse
+import importlib
 import logging
+import os
 import sys
+from pathlib import Path
 
 from cp_heuristics_adapter.setup_logger import setup_logging
-from cp_heuristics_adapter.subcommands.clean import Clean
-from cp_heuristics_adapter.subcommands.init import Init
-from cp_heuristics_adapter.subcommands.run import Run
+from cp_heuristics_adapter.subcommands.subcommand import Subcommand
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
-if logger.level != logging.DEBUG:
-    # Disable traceback in case of error
-    sys.tracebacklimit = 0
-
-# Mapping of subcommand classes to their names
-subcommand_names: dict[type, str] = {
-    Init: "init",
-    Run: "run",
-    Clean: "clean",
+# Mapping of subcommand names to their modules, classes and descriptions.
+# Modules are imported only when their subcommand is invoked, to keep the startup fast.
+subcommands: dict[str, tuple[str, str, str]] = {
+    "init": (
+        "cp_heuristics_adapter.subcommands.init",
+        "Init",
+        "Initialize a new project",
+    ),
+    "run": (
+        "cp_heuristics_adapter.subcommands.run",
+        "Run",
+        "Run the program",
+    ),
+    "clean": (
+        "cp_heuristics_adapter.subcommands.clean",
+        "Clean",
+        "Clean the project",
+    ),
+    "index": (
+        "cp_heuristics_adapter.subcommands.index",
+        "Index",
+        "Write the manifest of the inputs",
+    ),
+    "tune": (
+        "cp_heuristics_adapter.subcommands.tune",
+        "Tune",
+        "Tune the parameters of the program",
+    ),
+    "flags": (
+        "cp_heuristics_adapter.subcommands.flags",
+        "Flags",
+        "Rank compiler and flag variants of the program",
+    ),
+    "compare": (
+        "cp_heuristics_adapter.subcommands.compare",
+        "Compare",
+        "Compare the scores of a run with a baseline",
+    ),
+    "slice": (
+        "cp_heuristics_adapter.subcommands.slice",
+        "Slice",
+        "Slice the scores of runs by the features of the inputs",
+    ),
+    "merge": (
+        "cp_heuristics_adapter.subcommands.merge",
+        "Merge",
+        "Merge the scores of runs on disjoint cases",
+    ),
+    "serve": (
+        "cp_heuristics_adapter.subcommands.serve",
+        "Serve",
+        "Serve run and compare from a daemon keeping builds warm",
+    ),
+    "restore": (
+        "cp_heuristics_adapter.subcommands.restore",
+        "Restore",
+        "Restore the outputs of a past run",
+    ),
 }
 
 
-def main() -> None:
-    """Entry point of the program."""
+# Levels of the console and the log files
+LOG_LEVELS = ["debug", "info", "warning", "error"]
+
+# Options of the program (not of subcommands) taking a value
+options_with_value = {"--log-level", "--log-file-level"}
+
+# Subcommands sent to the daemon if it is running
+DAEMON_SUBCOMMANDS = {"run", "compare"}
+
+# Environment variable to run the subcommands without the daemon
+NO_DAEMON_ENV_VAR = "CP_HEURISTICS_ADAPTER_NO_DAEMON"
+
+
+def requested_subcommand(argv: list[str]) -> str | None:
+    """Get the name of the subcommand in the command line.
+
+    Args:
+        argv (list[str]): Command line arguments without the program name.
+
+    Returns:
+        str | None: Name of the subcommand. None if no subcommand is given.
+    """
+    args = iter(argv)
+    for arg in args:
+        if arg in options_with_value:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg if arg in subcommands else None
+    return None
+
+
+def build_parser(argv: list[str]) -> tuple[argparse.ArgumentParser, Subcommand | None]:
+    """Build the parser of the program, with the arguments of the requested subcommand.
+
+    Only the module of the requested subcommand is imported.
+
+    Args:
+        argv (list[str]): Command line arguments without the program name.
+
+    Returns:
+        tuple[argparse.ArgumentParser, Subcommand | None]: Parser and the requested
+            subcommand. None if no subcommand is requested.
+    """
     parser = argparse.ArgumentParser(prog="cp-heuristics-adapter")
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        choices=LOG_LEVELS,
+        default="debug",
+        help="Level of the log messages shown in the console. Default is 'debug'.",
+    )
+    parser.add_argument(
+        "--log-file-level",
+        type=str,
+        choices=LOG_LEVELS,
+        default="debug",
+        help=(
+            "Level of the log messages written to the JSON-lines log file of "
+            "'run' and 'tune'. Default is 'debug'."
+        ),
+    )
     subparsers = parser.add_subparsers(dest="subcommand")
 
-    subcommand_init = Init(
-        subparsers,
-        name=subcommand_names[Init],
-        description="Initialize a new project",
-    )
-    subcommand_init.add_arguments()
+    name = requested_subcommand(argv)
+    subcommand: Subcommand | None = None
+    for subcommand_name, (module, class_name, description) in subcommands.items():
+        if subcommand_name == name:
+            Cls = getattr(importlib.import_module(module), class_name)
+            subcommand = Cls(subparsers, name=subcommand_name, description=description)
+            subcommand.add_arguments()
+        else:
+            subparsers.add_parser(name=subcommand_name, description=description)
+    return parser, subcommand
 
-    subcommand_run = Run(
-        subparsers,
-        name=subcommand_names[Run],
-        description="Run the program",
-    )
-    subcommand_run.add_arguments()
 
-    subcommand_clean = Clean(
-        subparsers,
-        name=subcommand_names[Clean],
-        description="Clean the project",
+def main(argv: list[str] | None = None) -> None:
+    """Entry point of the program.
+
+    The subcommands served by a daemon (see serve) are sent to it if it is running
+    for the project in the current directory, unless CP_HEURISTICS_ADAPTER_NO_DAEMON
+    is set.
+
+    Args:
+        argv (list[str] | None, optional): Command line arguments without the program name. Defaults to None (sys.argv[1:]).
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    name = requested_subcommand(argv)
+    if name in DAEMON_SUBCOMMANDS and not os.environ.get(NO_DAEMON_ENV_VAR):
+        # Imported here so that commands not served by a daemon do not pay for it
+        from cp_heuristics_adapter.daemon import forward
+
+        code = forward(argv, Path.cwd())
+        if code is not None:
+            sys.exit(code)
+
+    parser, subcommand = build_parser(argv)
+    args = parser.parse_args(argv)
+
+    setup_logging(
+        console_level=args.log_level.upper(), file_level=args.log_file_level.upper()
     )
-    subcommand_clean.add_arguments()
-
-    args = parser.parse_args()
-    subcommand: str = args.subcommand
-    logger.debug(f"Running subcommand: {subcommand}")
-
-    if subcommand == subcommand_names[Init]:
-        try:
-            subcommand_init.run(args)
-        except Exception:
-            logger.exception("An error occurred while running the 'init' subcommand")
-    elif subcommand == subcommand_names[Run]:
-        try:
-            subcommand_run.run(args)
-        except Exception:
-            logger.exception("An error occurred while running the 'run' subcommand")
-    elif subcommand == subcommand_names[Clean]:
-        try:
-            subcommand_clean.run(args)
-        except Exception:
-            logger.exception("An error occurred while running the 'clean' subcommand")
-    else:
+    if logger.level != logging.DEBUG:
+        # Disable traceback in case of error
+        sys.tracebacklimit = 0
+    logger.debug(f"Running subcommand: {args.subcommand}")
+
+    if subcommand is None:
         parser.print_help()
+        return
+    try:
+        subcommand.run(args)
+    except Exception:
+        logger.exception(f"An error occurred while running the '{name}' subcommand")
@@ -0,0 +1,65 @@
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from cp_heuristics_adapter.executor import Case, Verdict, run_cases
+from cp_heuristics_adapter.runner import ProgramRunner
+
+logger = logging.getLogger(__name__)
+
+# Instrumented programs are slower, and a program killed by the time limit writes
+# no profile, so the training runs get a longer time limit
+TIME_LIMIT_FACTOR = 2.0
+
+
+@dataclass(frozen=True)
+class PgoTraining:
+    """Training runs of a profile-guided optimization build.
+
+    Attributes:
+        inputs (list[Path]): Input files to train on.
+        jobs (int): Number of training runs at the same time.
+        timelimit (float): Time limit of the cases. The training runs get TIME_LIMIT_FACTOR times it.
+    """
+
+    inputs: list[Path]
+    jobs: int
+    timelimit: float
+
+
+def train(runner: ProgramRunner, training: PgoTraining) -> None:
+    """Run an instrumented program on the training inputs to collect its profile.
+
+    The runs in parallel merge their profile data in the profile directory given
+    to the compiler. Their outputs and scores are discarded.
+
+    Args:
+        runner (ProgramRunner): Runner of the instrumented program.
+        training (PgoTraining): Training runs.
+
+    Raises:
+        RuntimeError: If no training run finishes successfully.
+    """
+    logger.info(f"Training the PGO build on {len(training.inputs)} cases")
+    with TemporaryDirectory() as output_dir:
+        cases = [
+            Case(case_id, input_file, Path(output_dir) / f"{case_id:04}.txt")
+            for case_id, input_file in enumerate(training.inputs)
+        ]
+        results = list(
+            run_cases(
+                runner,
+                cases,
+                jobs=training.jobs,
+                timelimit=training.timelimit * TIME_LIMIT_FACTOR,
+            )
+        )
+    succeeded = sum(result.verdict == Verdict.AC for result in results)
+    if succeeded == 0:
+        raise RuntimeError("No training run of the PGO build finished successfully")
+    if succeeded < len(results):
+        logger.warning(
+            f"{len(results) - succeeded} training runs of the PGO build failed, "
+            "so their profiles may be missing"
+        )
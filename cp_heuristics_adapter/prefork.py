@@ -0,0 +1,309 @@
+import json
+import logging
+import os
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import weakref
+from pathlib import Path
+from tempfile import mkdtemp
+from time import perf_counter, perf_counter_ns
+from typing import Any, BinaryIO, TextIO
+
+from cp_heuristics_adapter.capture import StderrTail
+from cp_heuristics_adapter.prefork_server import HEADER
+from cp_heuristics_adapter.runner import (
+    ALLOCATION_FAILURE_TAIL,
+    ProgramRunner,
+    RunResult,
+    check_returncode,
+    ru_maxrss_to_mb,
+    allocation_failed,
+)
+
+logger = logging.getLogger(__name__)
+
+SERVER_SCRIPT = Path(__file__).with_name("prefork_server.py")
+
+
+def _stop_server(server: subprocess.Popen[str], socket_dir: str) -> None:
+    """Stop the prefork server and remove its socket.
+
+    Args:
+        server (subprocess.Popen[str]): Server process.
+        socket_dir (str): Directory containing the socket.
+    """
+    # The server exits when its stdin is closed
+    if server.stdin is not None:
+        server.stdin.close()
+    try:
+        server.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+    if server.stdout is not None:
+        server.stdout.close()
+    shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+def _kill(pid: int) -> None:
+    """Kill a child of the prefork server.
+
+    Args:
+        pid (int): Process ID.
+    """
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class PreforkRunner(ProgramRunner):
+    """For running a Python solver in children forked from a warm server.
+
+    The server imports the preloaded modules once and forks a fresh child per run,
+    so each run still starts from a clean state but does not pay the interpreter
+    startup and the imports. The server is started on the first run and stopped
+    when the runner is garbage collected or the adapter exits. Not available on
+    Windows.
+    """
+
+    def __init__(
+        self, python: str, source_file: Path, preload: list[str] | None = None
+    ) -> None:
+        """Initialize the PreforkRunner.
+
+        Args:
+            python (str): Python command.
+            source_file (Path): Path to the solver.
+            preload (list[str] | None, optional): Modules imported by the server. Defaults to None.
+        """
+        super().__init__([python, str(source_file)])
+        self.preload = preload or []
+        self.__lock = threading.Lock()
+        self.__socket_path: str | None = None
+        self.__children: set[int] = set()
+
+    def kill_running(self) -> None:
+        """Kill the children running the solver for this runner in any thread."""
+        with self.__lock:
+            for pid in self.__children:
+                _kill(pid)
+
+    def __start_server(self) -> str:
+        """Start the server unless it is running.
+
+        Raises:
+            RuntimeError: If the server fails to start.
+
+        Returns:
+            str: Path to the socket of the server.
+        """
+        with self.__lock:
+            if self.__socket_path is not None:
+                return self.__socket_path
+            socket_dir = mkdtemp(prefix="cp-heuristics-adapter-")
+            socket_path = os.path.join(socket_dir, "prefork.sock")
+            python, source = self.exec_cmd
+            cmd = [python, str(SERVER_SCRIPT), socket_path, source, *self.preload]
+            logger.info(f"starting prefork server {cmd}")
+            server = subprocess.Popen(
+                cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+            )
+            weakref.finalize(self, _stop_server, server, socket_dir)
+            assert server.stdout is not None
+            if server.stdout.readline().strip() != "ready":
+                raise RuntimeError(f"failed to start the prefork server for {source}")
+            self.__socket_path = socket_path
+            return socket_path
+
+    def run(
+        self,
+        args: list[str],
+        timeout: float | None = None,
+        stdin: TextIO | None = None,
+        stdout: TextIO | None = None,
+        stderr: TextIO | None = None,
+        memory_limit_mb: int | None = None,
+        env: dict[str, str] | None = None,
+    ) -> RunResult:
+        """Run the solver in a child forked from the server.
+
+        Args:
+            args (list[str]): Arguments to pass to the program.
+            timeout (float | None, optional): Timeout in seconds. Defaults to None.
+            stdin (TextIO, optional): stdin (TextIO, optional). Defaults to None (sys.stdin).
+            stdout (TextIO, optional): stdout (TextIO, optional). Defaults to None (sys.stdout).
+            stderr (TextIO, optional): stderr (TextIO, optional). Defaults to None (sys.stderr).
+            memory_limit_mb (int | None, optional): Memory limit [MB]. Defaults to None (unlimited).
+            env (dict[str, str] | None, optional): Environment variables added to the current ones. Defaults to None.
+
+        Raises:
+            CalledProcessError: If the program exits with a non-zero code.
+            MemoryLimitExceeded: If the program exceeds the memory limit.
+            TimeoutExpired: If the timeout expires.
+        """
+        if stdin is None:
+            stdin = sys.stdin
+        if stdout is None:
+            stdout = sys.stdout
+        if stderr is None:
+            stderr = sys.stderr
+        socket_path = self.__start_server()
+
+        cmd = self.exec_cmd + args
+        logger.info(f"running {cmd} in prefork mode")
+        # The environment of the server is inherited by the children
+        request = {"args": args, "env": env or {}, "memory_limit_mb": memory_limit_mb}
+        body = json.dumps(request).encode()
+        start_time = perf_counter_ns()
+        # Under a memory limit, stderr goes through a tail searched for a failed allocation
+        tail = None
+        if memory_limit_mb is not None:
+            tail = StderrTail(ALLOCATION_FAILURE_TAIL, forward=stderr)
+        try:
+            output, status = self.__request(
+                socket_path,
+                body,
+                stdin,
+                stderr if tail is None else tail.writer,
+                cmd,
+                timeout,
+            )
+            end_time = perf_counter_ns()
+        finally:
+            # Also on a timeout, the drain thread ends once the killed child is gone
+            if tail is not None:
+                tail.close()
+
+        allocation_failure = tail is not None and allocation_failed(tail.take())
+        max_rss_mb = ru_maxrss_to_mb(status["ru_maxrss"])
+        logger.debug(f"peak memory usage: {max_rss_mb:.1f} MB")
+        check_returncode(
+            cmd,
+            status["returncode"],
+            output,
+            memory_limit_mb,
+            max_rss_mb,
+            allocation_failure,
+        )
+        stdout.write(output)
+        return RunResult(
+            output=output,
+            time_ms=(end_time - start_time) / 1_000_000,
+            max_rss_mb=max_rss_mb,
+        )
+
+    def __request(
+        self,
+        socket_path: str,
+        body: bytes,
+        stdin: TextIO,
+        stderr: TextIO,
+        cmd: list[str],
+        timeout: float | None,
+    ) -> tuple[str, dict[str, Any]]:
+        """Send a request to the server and wait for the child to exit.
+
+        Args:
+            socket_path (str): Path to the socket of the server.
+            body (bytes): Request.
+            stdin (TextIO): stdin of the child.
+            stderr (TextIO): stderr of the child.
+            cmd (list[str]): Command of the run, for the errors.
+            timeout (float | None): Timeout in seconds. None means no timeout.
+
+        Raises:
+            CalledProcessError: If the server gave no valid reply.
+            OSError: If the server is not reachable.
+            TimeoutExpired: If the timeout expires.
+
+        Returns:
+            tuple[str, dict[str, Any]]: Output of the child and its exit status.
+        """
+        deadline = None if timeout is None else perf_counter() + timeout
+        read_fd, write_fd = os.pipe()
+        with (
+            os.fdopen(read_fd, "rb") as pipe,
+            socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn,
+        ):
+            try:
+                conn.connect(socket_path)
+                socket.send_fds(
+                    conn,
+                    [HEADER.pack(len(body))],
+                    [stdin.fileno(), write_fd, stderr.fileno()],
+                )
+                conn.sendall(body)
+            finally:
+                # The child has its own copy of the write end
+                os.close(write_fd)
+            with conn.makefile("rb") as reply:
+                pid: int = self.__read_reply(reply, cmd)["pid"]
+                with self.__lock:
+                    self.__children.add(pid)
+                try:
+                    output = self.__read_output(pipe, deadline)
+                    if deadline is not None:
+                        conn.settimeout(max(deadline - perf_counter(), 0.0))
+                    status = self.__read_reply(reply, cmd)
+                except (subprocess.TimeoutExpired, TimeoutError):
+                    _kill(pid)
+                    raise subprocess.TimeoutExpired(cmd, timeout or 0.0)
+                finally:
+                    with self.__lock:
+                        self.__children.discard(pid)
+        return output, status
+
+    @staticmethod
+    def __read_reply(reply: BinaryIO, cmd: list[str]) -> dict[str, Any]:
+        """Read a reply of the server.
+
+        Args:
+            reply (BinaryIO): Connection to the server.
+            cmd (list[str]): Command of the run, for the error.
+
+        Raises:
+            CalledProcessError: If the server closed the connection without a reply,
+                e.g. because it died. The return code is -1.
+
+        Returns:
+            dict[str, Any]: Reply.
+        """
+        line = reply.readline()
+        try:
+            reply_dict: dict[str, Any] = json.loads(line)
+        except json.JSONDecodeError:
+            logger.error(f"The prefork server gave no valid reply: {line!r}")
+            raise subprocess.CalledProcessError(-1, cmd)
+        return reply_dict
+
+    @staticmethod
+    def __read_output(pipe: BinaryIO, deadline: float | None) -> str:
+        """Read the stdout of the child until it is closed.
+
+        Args:
+            pipe (BinaryIO): Read end of the stdout pipe.
+            deadline (float | None): Deadline in perf_counter seconds. None means no deadline.
+
+        Raises:
+            TimeoutExpired: If the deadline passes.
+
+        Returns:
+            str: Output of the child.
+        """
+        chunks: list[bytes] = []
+        while True:
+            if deadline is not None:
+                remaining = deadline - perf_counter()
+                readable, _, _ = select.select([pipe], [], [], max(remaining, 0.0))
+                if not readable:
+                    raise subprocess.TimeoutExpired([], 0.0)
+            chunk = os.read(pipe.fileno(), 65536)
+            if not chunk:
+                return b"".join(chunks).decode()
+            chunks.append(chunk)
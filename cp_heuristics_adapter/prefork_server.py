@@ -0,0 +1,229 @@
+"""Prefork server for Python solvers.
+
+This script is run by the Python interpreter configured for the solver, so it
+must only depend on the standard library.
+
+usage: python prefork_server.py SOCKET_PATH SOURCE [MODULE ...]
+
+The server imports the modules once, listens on the Unix socket and forks a
+fresh child per request. A request consists of an 8-byte big-endian length
+sent together with the file descriptors for stdin, stdout and stderr, followed
+by a JSON object {"args": [...], "env": {...}, "memory_limit_mb": int | null}.
+The server replies with a line {"pid": int} once the child has started and a
+line {"returncode": int, "ru_maxrss": int} once it has exited.
+"""
+
+import importlib
+import json
+import os
+import random
+import resource
+import runpy
+import select
+import signal
+import socket
+import struct
+import sys
+import traceback
+from typing import Any
+
+HEADER = struct.Struct(">Q")
+
+
+def receive_request(conn: socket.socket) -> tuple[dict[str, Any], list[int]]:
+    """Receive a request and the file descriptors of the child.
+
+    Args:
+        conn (socket.socket): Connection to the client.
+
+    Raises:
+        ConnectionError: If the connection is closed in the middle of the request.
+
+    Returns:
+        tuple[dict[str, Any], list[int]]: Request and file descriptors.
+    """
+    header, fds, _, _ = socket.recv_fds(conn, HEADER.size, 3)
+    while len(header) < HEADER.size:
+        chunk = conn.recv(HEADER.size - len(header))
+        if not chunk:
+            raise ConnectionError("connection closed while receiving a request")
+        header += chunk
+    (length,) = HEADER.unpack(header)
+    body = b""
+    while len(body) < length:
+        chunk = conn.recv(length - len(body))
+        if not chunk:
+            raise ConnectionError("connection closed while receiving a request")
+        body += chunk
+    return json.loads(body), fds
+
+
+def run_child(source: str, request: dict[str, Any], fds: list[int]) -> None:
+    """Run the solver as __main__ in the forked child. Never returns.
+
+    Args:
+        source (str): Path to the solver.
+        request (dict[str, Any]): Request.
+        fds (list[int]): File descriptors for stdin, stdout and stderr.
+    """
+    code = 1
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", closefd=False)
+        sys.stderr = open(2, "w", closefd=False)
+
+        memory_limit_mb = request.get("memory_limit_mb")
+        if memory_limit_mb is not None:
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        os.environ.update(request["env"])
+        sys.argv = [source] + request["args"]
+
+        # Children must not share the random state inherited from the server
+        random.seed()
+        numpy = sys.modules.get("numpy")
+        if numpy is not None:
+            numpy.random.seed()
+
+        code = 0
+        runpy.run_path(source, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            code = code or 1
+        os._exit(code)
+
+
+def reap_children(children: dict[int, socket.socket]) -> None:
+    """Report the exit status of finished children to their clients.
+
+    Args:
+        children (dict[int, socket.socket]): Connections of running children by pid.
+    """
+    while children:
+        try:
+            pid, status, rusage = os.wait4(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+        reply = {
+            "returncode": os.waitstatus_to_exitcode(status),
+            "ru_maxrss": rusage.ru_maxrss,
+        }
+        try:
+            conn.sendall((json.dumps(reply) + "\n").encode())
+        except OSError:
+            # The client has given up on the child (e.g. time limit exceeded)
+            pass
+        conn.close()
+
+
+def drain(fd: int) -> None:
+    """Read everything available from a non-blocking file descriptor.
+
+    Args:
+        fd (int): File descriptor.
+    """
+    while True:
+        try:
+            if not os.read(fd, 4096):
+                return
+        except BlockingIOError:
+            return
+
+
+def start_child(
+    listener: socket.socket,
+    source: str,
+    children: dict[int, socket.socket],
+    wakeup_fds: tuple[int, int],
+) -> None:
+    """Accept a request and fork a child for it.
+
+    Args:
+        listener (socket.socket): Listening socket.
+        source (str): Path to the solver.
+        children (dict[int, socket.socket]): Connections of running children by pid.
+        wakeup_fds (tuple[int, int]): Pipe used to wake up on SIGCHLD.
+    """
+    conn, _ = listener.accept()
+    try:
+        request, fds = receive_request(conn)
+    except (ConnectionError, ValueError):
+        conn.close()
+        return
+    pid = os.fork()
+    if pid == 0:
+        signal.set_wakeup_fd(-1)
+        for fd in wakeup_fds:
+            os.close(fd)
+        for sock in (listener, conn, *children.values()):
+            sock.close()
+        run_child(source, request, fds)
+    for fd in fds:
+        os.close(fd)
+    conn.sendall((json.dumps({"pid": pid}) + "\n").encode())
+    children[pid] = conn
+
+
+def serve(socket_path: str, source: str, modules: list[str]) -> None:
+    """Preload the modules and serve requests until stdin is closed.
+
+    Args:
+        socket_path (str): Path to the Unix socket.
+        source (str): Path to the solver.
+        modules (list[str]): Modules to import in advance.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.abspath(source)))
+    for module in modules:
+        importlib.import_module(module)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(128)
+
+    # SIGCHLD wakes up select through the pipe
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.set_wakeup_fd(wakeup_w)
+
+    print("ready", flush=True)
+    children: dict[int, socket.socket] = {}
+    stdin_fd = sys.stdin.fileno()
+    while True:
+        readable, _, _ = select.select([listener, wakeup_r, stdin_fd], [], [])
+        if wakeup_r in readable:
+            drain(wakeup_r)
+        if stdin_fd in readable:
+            # The client closes stdin to stop the server
+            return
+        if listener in readable:
+            start_child(listener, source, children, (wakeup_r, wakeup_w))
+        reap_children(children)
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1], sys.argv[2], sys.argv[3:])
@@ -0,0 +1,346 @@
+import io
+import itertools
+import logging
+import pstats
+import re
+import shutil
+import subprocess
+import threading
+from abc import ABCMeta, abstractmethod
+from collections import Counter
+from pathlib import Path
+from typing import TextIO
+
+from cp_heuristics_adapter.languages import Cpp, Language, Python, Rust
+from cp_heuristics_adapter.runner import ProgramRunner, RunResult
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler(metaclass=ABCMeta):
+    """Profiler wrapping each run of the solver.
+
+    Attributes:
+        NAME (str): Name of the profiler.
+        REPORT_SUFFIX (str): Suffix of the merged report.
+        COMPILE_FLAGS (list[str]): Extra compilation flags needed by the profiler.
+        CAPTURES_STDERR (bool): Whether the profile is written to stderr.
+    """
+
+    NAME = ""
+    REPORT_SUFFIX = ".txt"
+    COMPILE_FLAGS: list[str] = []
+    CAPTURES_STDERR = False
+
+    @abstractmethod
+    def command(
+        self, exec_cmd: list[str], profile_file: Path
+    ) -> tuple[list[str], dict[str, str]]:
+        """Get the command to run the solver under the profiler.
+
+        Args:
+            exec_cmd (list[str]): Command to run the solver.
+            profile_file (Path): Path to write the profile of the run to.
+
+        Returns:
+            tuple[list[str], dict[str, str]]: Command and extra environment variables.
+        """
+        pass
+
+    @abstractmethod
+    def report(
+        self, exec_cmd: list[str], profile_files: list[Path], profile_dir: Path
+    ) -> str:
+        """Merge the profiles of all runs into a report.
+
+        Args:
+            exec_cmd (list[str]): Command to run the solver.
+            profile_files (list[Path]): Profiles of the runs.
+            profile_dir (Path): Directory containing the profiles.
+
+        Returns:
+            str: Report.
+        """
+        pass
+
+
+class CProfileProfiler(Profiler):
+    """cProfile for Python. The report lists the functions by cumulative time.
+
+    Attributes:
+        TOP (int): Number of functions in the report.
+    """
+
+    NAME = "cprofile"
+    TOP = 50
+
+    def command(
+        self, exec_cmd: list[str], profile_file: Path
+    ) -> tuple[list[str], dict[str, str]]:
+        python, *rest = exec_cmd
+        return [python, "-m", "cProfile", "-o", str(profile_file), *rest], {}
+
+    def report(
+        self, exec_cmd: list[str], profile_files: list[Path], profile_dir: Path
+    ) -> str:
+        stream = io.StringIO()
+        files = [str(file) for file in profile_files if file.is_file()]
+        if not files:
+            return "no profile\n"
+        stats = pstats.Stats(*files, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(CProfileProfiler.TOP)
+        return stream.getvalue()
+
+
+class ImportTimeProfiler(Profiler):
+    """-X importtime for Python. The report lists the modules by total import time.
+
+    Attributes:
+        TOP (int): Number of modules in the report.
+    """
+
+    NAME = "importtime"
+    TOP = 50
+    CAPTURES_STDERR = True
+
+    # import time: self [us] | cumulative | imported package
+    LINE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(.+)$")
+
+    def command(
+        self, exec_cmd: list[str], profile_file: Path
+    ) -> tuple[list[str], dict[str, str]]:
+        python, *rest = exec_cmd
+        return [python, "-X", "importtime", *rest], {}
+
+    def report(
+        self, exec_cmd: list[str], profile_files: list[Path], profile_dir: Path
+    ) -> str:
+        self_us: Counter[str] = Counter()
+        cumulative_us: Counter[str] = Counter()
+        for profile_file in profile_files:
+            if not profile_file.is_file():
+                continue
+            for line in profile_file.read_text().splitlines():
+                match = ImportTimeProfiler.LINE.match(line)
+                if match is None:
+                    continue
+                module = match.group(3).strip()
+                self_us[module] += int(match.group(1))
+                cumulative_us[module] += int(match.group(2))
+        runs = max(len(profile_files), 1)
+        lines = [f"mean over {runs} runs", "cumulative [ms]    self [ms]  module"]
+        for module, total in cumulative_us.most_common(ImportTimeProfiler.TOP):
+            lines.append(
+                f"{total / runs / 1000:15.2f} {self_us[module] / runs / 1000:12.2f}  "
+                f"{module}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+class PerfProfiler(Profiler):
+    """perf record for native executables.
+
+    The report is in the collapsed-stack format, which flamegraph tools
+    (e.g. flamegraph.pl, speedscope, inferno) take as input.
+    """
+
+    NAME = "perf"
+    REPORT_SUFFIX = ".folded"
+
+    def command(
+        self, exec_cmd: list[str], profile_file: Path
+    ) -> tuple[list[str], dict[str, str]]:
+        perf_cmd = ["perf", "record", "-g", "-q", "-o", str(profile_file), "--"]
+        return perf_cmd + exec_cmd, {}
+
+    def report(
+        self, exec_cmd: list[str], profile_files: list[Path], profile_dir: Path
+    ) -> str:
+        stacks: Counter[str] = Counter()
+        for profile_file in profile_files:
+            if not profile_file.is_file():
+                continue
+            script = subprocess.check_output(
+                ["perf", "script", "-i", str(profile_file)],
+                text=True,
+                stderr=subprocess.DEVNULL,
+            )
+            stacks.update(collapse_perf_script(script))
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class GprofProfiler(Profiler):
+    """gprof for C++. The solver is compiled with -pg, and the report is the flat profile."""
+
+    NAME = "gprof"
+    COMPILE_FLAGS = ["-pg"]
+
+    def command(
+        self, exec_cmd: list[str], profile_file: Path
+    ) -> tuple[list[str], dict[str, str]]:
+        # glibc writes gmon.out to <prefix>.<pid> so that runs do not overwrite it
+        return exec_cmd, {"GMON_OUT_PREFIX": str(profile_file.parent / "gmon")}
+
+    def report(
+        self, exec_cmd: list[str], profile_files: list[Path], profile_dir: Path
+    ) -> str:
+        gmon_files = [str(file) for file in sorted(profile_dir.glob("gmon.*"))]
+        if not gmon_files:
+            return "no profile\n"
+        executable = exec_cmd[0]
+        # Sum up the profiles into gmon.sum, then print its flat profile
+        subprocess.check_call(["gprof", "-s", executable, *gmon_files], cwd=profile_dir)
+        return subprocess.check_output(
+            ["gprof", "-b", "-p", executable, str(profile_dir / "gmon.sum")],
+            text=True,
+        )
+
+
+PROFILERS: dict[str, type[Profiler]] = {
+    CProfileProfiler.NAME: CProfileProfiler,
+    ImportTimeProfiler.NAME: ImportTimeProfiler,
+    PerfProfiler.NAME: PerfProfiler,
+    GprofProfiler.NAME: GprofProfiler,
+}
+
+
+def collapse_perf_script(script: str) -> Counter[str]:
+    """Collapse the output of perf script into stacks.
+
+    Each sample of perf script is a header line followed by frames, innermost first,
+    and ends with an empty line. A stack is the frames from the outermost joined by ';'.
+
+    Args:
+        script (str): Output of perf script.
+
+    Returns:
+        Counter[str]: Number of samples per stack.
+    """
+    stacks: Counter[str] = Counter()
+    frames: list[str] = []
+    for line in itertools.chain(script.splitlines(), [""]):
+        if not line.strip():
+            if frames:
+                stacks[";".join(reversed(frames))] += 1
+            frames = []
+            continue
+        if not line[0].isspace():
+            # Header line of a sample (command, pid, time, event)
+            frames = []
+            continue
+        # Frame line: address symbol+offset (dso)
+        parts = line.split(maxsplit=1)
+        symbol = parts[1] if len(parts) > 1 else parts[0]
+        symbol = re.sub(r"\+0x[0-9a-f]+", "", symbol.rsplit(" (", 1)[0])
+        frames.append(symbol.replace(";", ":"))
+    return stacks
+
+
+def default_profiler(lang: type[Language]) -> type[Profiler]:
+    """Get the default profiler for the language.
+
+    Args:
+        lang (type[Language]): Language.
+
+    Raises:
+        ValueError: If no profiler is available.
+
+    Returns:
+        type[Profiler]: Profiler.
+    """
+    if lang is Python:
+        return CProfileProfiler
+    if shutil.which("perf") is not None:
+        return PerfProfiler
+    if lang is Cpp and shutil.which("gprof") is not None:
+        return GprofProfiler
+    raise ValueError(f"No profiler is available for {lang.__name__}")
+
+
+def assert_supported(profiler: type[Profiler], lang: type[Language]) -> None:
+    """Assert the profiler supports the language.
+
+    Args:
+        profiler (type[Profiler]): Profiler.
+        lang (type[Language]): Language.
+
+    Raises:
+        ValueError: If the profiler does not support the language.
+    """
+    supported: dict[type[Profiler], list[type[Language]]] = {
+        CProfileProfiler: [Python],
+        ImportTimeProfiler: [Python],
+        PerfProfiler: [Cpp, Rust],
+        GprofProfiler: [Cpp],
+    }
+    if lang not in supported[profiler]:
+        raise ValueError(f"{profiler.NAME} does not support {lang.__name__}")
+
+
+class ProfilingRunner(ProgramRunner):
+    """For running a program under a profiler, keeping the profile of each run."""
+
+    def __init__(
+        self, runner: ProgramRunner, profiler: Profiler, profile_dir: Path
+    ) -> None:
+        """Initialize the ProfilingRunner.
+
+        Args:
+            runner (ProgramRunner): Runner of the program to profile.
+            profiler (Profiler): Profiler.
+            profile_dir (Path): Directory to write the profiles to.
+        """
+        super().__init__(list(runner.exec_cmd))
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.profile_files: list[Path] = []
+        self.__lock = threading.Lock()
+
+    def run(
+        self,
+        args: list[str],
+        timeout: float | None = None,
+        stdin: TextIO | None = None,
+        stdout: TextIO | None = None,
+        stderr: TextIO | None = None,
+        memory_limit_mb: int | None = None,
+        env: dict[str, str] | None = None,
+    ) -> RunResult:
+        """Run the program under the profiler.
+
+        Args:
+            args (list[str]): Arguments to pass to the program.
+            timeout (float | None, optional): Timeout in seconds. Defaults to None.
+            stdin (TextIO, optional): stdin (TextIO, optional). Defaults to None (sys.stdin).
+            stdout (TextIO, optional): stdout (TextIO, optional). Defaults to None (sys.stdout).
+            stderr (TextIO, optional): stderr (TextIO, optional). Defaults to None (sys.stderr).
+            memory_limit_mb (int | None, optional): Memory limit [MB]. Defaults to None (unlimited).
+            env (dict[str, str] | None, optional): Environment variables added to the current ones. Defaults to None.
+
+        Raises:
+            CalledProcessError: If the program exits with a non-zero code.
+            MemoryLimitExceeded: If the program exceeds the memory limit.
+            TimeoutExpired: If the timeout expires.
+        """
+        with self.__lock:
+            profile_file = self.profile_dir / f"{len(self.profile_files):04}.prof"
+            self.profile_files.append(profile_file)
+        cmd, profiler_env = self.profiler.command(self.exec_cmd, profile_file)
+        runner = ProgramRunner(cmd)
+        full_env = {**(env or {}), **profiler_env}
+        if not self.profiler.CAPTURES_STDERR:
+            return runner.run(
+                args, timeout, stdin, stdout, stderr, memory_limit_mb, full_env
+            )
+        with profile_file.open("w") as profile_stderr:
+            return runner.run(
+                args, timeout, stdin, stdout, profile_stderr, memory_limit_mb, full_env
+            )
+
+    def report(self) -> str:
+        """Merge the profiles of all runs so far into a report.
+
+        Returns:
+            str: Report.
+        """
+        return self.profiler.report(self.exec_cmd, self.profile_files, self.profile_dir)
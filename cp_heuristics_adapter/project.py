@@ -1,12 +1,12 @@
 import logging
+import re
 from pathlib import Path
 
-from cp_heuristics_adapter.languages import Cpp, Language, Python
-from cp_heuristics_adapter.setup_logger import setup_logging
+from cp_heuristics_adapter.case_index import MANIFEST_NAME, CaseIndex
+from cp_heuristics_adapter.languages import Cpp, Language, Python, Rust
 from cp_heuristics_adapter.util.pathlib_util import assert_not_exists
 
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -23,9 +23,28 @@ class Project:
         self.settings_dir = root / ".cp-heuristics-adapter"
         self.cpp_config_file = self.settings_dir / "cpp_config.toml"
         self.python_config_file = self.settings_dir / "py_config.toml"
+        self.rust_config_file = self.settings_dir / "rust_config.toml"
+        self.tune_config_file = self.settings_dir / "tune.toml"
+        self.flags_config_file = self.settings_dir / "flags.toml"
+        self.features_config_file = self.settings_dir / "features.toml"
         self.inputs_dir = self.root / "in"
         self.outputs_dir = self.root / "out"
+        self.case_manifest_file = self.inputs_dir / MANIFEST_NAME
         self.scores_dir = self.root / "scores"
+        self.store_dir = self.scores_dir / "store"
+        self.features_index_file = self.scores_dir / "features.json"
+        self.__cases: CaseIndex | None = None
+
+    @property
+    def cases(self) -> CaseIndex:
+        """Get the index of the cases, loading the manifest on the first call.
+
+        Returns:
+            CaseIndex: Index of the cases.
+        """
+        if self.__cases is None:
+            self.__cases = CaseIndex.load(self.case_manifest_file)
+        return self.__cases
 
     def input_file(self, case_id: int) -> Path:
         """Get the input file for the case.
@@ -33,21 +52,105 @@ class Project:
         Args:
             case_id (int): Case ID.
 
+        Raises:
+            IndexError: If the case is not in the manifest.
+
         Returns:
             Path: Path to the input file.
         """
-        return self.inputs_dir / f"{case_id:04}.txt"
+        return self.inputs_dir / self.cases.name(case_id)
 
-    def output_file(self, case_id: int) -> Path:
+    def output_file(self, case_id: int, seed: int | None = None) -> Path:
         """Get the output file for the case.
 
         Args:
             case_id (int): Case ID.
+            seed (int | None, optional): Seed of the run. Defaults to None.
+
+        Raises:
+            IndexError: If the case is not in the manifest.
 
         Returns:
             Path: Path to the output file.
         """
-        return self.outputs_dir / f"{case_id:04}.txt"
+        return self.outputs_dir / self.cases.output_name(case_id, seed)
+
+    def scores_file(self, timestamp: str) -> Path:
+        """Get the scores file of a run.
+
+        Args:
+            timestamp (str): Timestamp of the run.
+
+        Returns:
+            Path: Path to the scores file.
+        """
+        return self.scores_dir / f"scores_{timestamp}.txt"
+
+    def baseline_file(self, name: str) -> Path:
+        """Get the scores file saved as a named baseline.
+
+        Args:
+            name (str): Name of the baseline.
+
+        Returns:
+            Path: Path to the baseline file.
+        """
+        return self.scores_dir / f"baseline_{name}.txt"
+
+    def scores_files(self) -> list[Path]:
+        """Get the scores files of all runs, from the oldest to the latest.
+
+        Returns:
+            list[Path]: Paths to the scores files.
+        """
+        if not self.scores_dir.is_dir():
+            return []
+        return sorted(
+            path
+            for path in self.scores_dir.glob("scores_*.txt")
+            if re.fullmatch(r"scores_\d{8}-\d{6}\.txt", path.name)
+        )
+
+    def log_file(self, timestamp: str) -> Path:
+        """Get the JSON-lines log file of a run.
+
+        Args:
+            timestamp (str): Timestamp of the run.
+
+        Returns:
+            Path: Path to the log file.
+        """
+        return self.scores_dir / f"log_{timestamp}.jsonl"
+
+    def stderr_file(
+        self, timestamp: str, case_id: int, seed: int | None = None
+    ) -> Path:
+        """Get the file to keep the captured stderr of a case in a run.
+
+        Args:
+            timestamp (str): Timestamp of the run.
+            case_id (int): Case ID.
+            seed (int | None, optional): Seed of the run. Defaults to None.
+
+        Returns:
+            Path: Path to the stderr file, named like the output file.
+        """
+        return (
+            self.scores_dir
+            / f"stderr_{timestamp}"
+            / self.cases.output_name(case_id, seed)
+        )
+
+    def study_file(self, name: str) -> Path:
+        """Get the file to record the trials of a tuning study in.
+
+        Args:
+            name (str): Name of the study.
+
+        Returns:
+            Path: Path to the study file.
+        """
+        return self.scores_dir / f"study_{name}.jsonl"
 
     @staticmethod
     def search_project_root(path: Path) -> Path:
@@ -88,5 +191,6 @@ class Project:
         config_file_map = {
             Cpp: self.cpp_config_file,
             Python: self.python_config_file,
+            Rust: self.rust_config_file,
         }
         return config_file_map[lang]
@@ -1,16 +1,68 @@
 import logging
+import os
 import subprocess
 import sys
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 from time import perf_counter_ns
 from typing import TextIO
 
-from cp_heuristics_adapter.setup_logger import setup_logging
+from cp_heuristics_adapter.capture import StderrTail
+
+if sys.platform != "win32":
+    import resource
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
+# Messages by which programs report a failed allocation on stderr: C++ (std::bad_alloc),
+# Python (MemoryError), Rust (memory allocation of N bytes failed) and C (ENOMEM)
+ALLOCATION_FAILURE_MESSAGES = (
+    "std::bad_alloc",
+    "MemoryError",
+    "memory allocation of",
+    "Cannot allocate memory",
+    "out of memory",
+)
+# Size [bytes] of the tail of stderr searched for the messages
+ALLOCATION_FAILURE_TAIL = 4096
+
+
+class MemoryLimitExceeded(subprocess.CalledProcessError):
+    """Raised when a program exceeds the memory limit.
+
+    Attributes:
+        memory_limit_mb (int): Memory limit [MB].
+        max_rss_mb (float): Peak resident set size [MB] of the program.
+    """
+
+    def __init__(
+        self,
+        returncode: int,
+        cmd: list[str],
+        memory_limit_mb: int,
+        max_rss_mb: float,
+        output: str | None = None,
+    ) -> None:
+        """Initialize the MemoryLimitExceeded.
+
+        Args:
+            returncode (int): Return code of the program.
+            cmd (list[str]): Executed command.
+            memory_limit_mb (int): Memory limit [MB].
+            max_rss_mb (float): Peak resident set size [MB] of the program.
+            output (str | None, optional): Output of the program. Defaults to None.
+        """
+        super().__init__(returncode, cmd, output)
+        self.memory_limit_mb = memory_limit_mb
+        self.max_rss_mb = max_rss_mb
+
+    def __str__(self) -> str:
+        return (
+            f"Command '{self.cmd}' exceeded the memory limit "
+            f"({self.max_rss_mb:.0f} MB used, limit {self.memory_limit_mb} MB)."
+        )
+
 
 @dataclass
 class RunResult:
@@ -18,12 +70,14 @@ class RunResult:
 
     Attributes:
         output (str): Output of the program.
-        returncode (int): Return code of the program.
         time_ms (float): Time [ms] taken by the program.
+        max_rss_mb (float | None): Peak resident set size [MB] of the program.
+            None if it was not measured.
     """
 
     output: str
     time_ms: float
+    max_rss_mb: float | None = None
 
     def time_with_unit(self) -> str:
         """Return the time with the unit.
@@ -34,8 +88,107 @@ class RunResult:
         return f"{self.time_ms:.0f} ms"
 
 
+def ru_maxrss_to_mb(ru_maxrss: int) -> float:
+    """Convert ru_maxrss of a child process to megabytes.
+
+    Args:
+        ru_maxrss (int): ru_maxrss field of the resource usage.
+
+    Returns:
+        float: Peak resident set size [MB].
+    """
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return ru_maxrss / (1024 * 1024)
+    return ru_maxrss / 1024
+
+
+def allocation_failed(stderr_tail: str) -> bool:
+    """Check whether a program reported a failed allocation on stderr.
+
+    Args:
+        stderr_tail (str): Tail of what the program wrote to stderr.
+
+    Returns:
+        bool: Whether one of ALLOCATION_FAILURE_MESSAGES is in it.
+    """
+    return any(message in stderr_tail for message in ALLOCATION_FAILURE_MESSAGES)
+
+
+def check_returncode(
+    cmd: list[str],
+    returncode: int,
+    output: str,
+    memory_limit_mb: int | None,
+    max_rss_mb: float,
+    allocation_failure: bool = False,
+) -> None:
+    """Check the exit status and the peak memory usage of a finished program.
+
+    Args:
+        cmd (list[str]): Executed command.
+        returncode (int): Return code of the program.
+        output (str): Output of the program.
+        memory_limit_mb (int | None): Memory limit [MB]. None means unlimited.
+        max_rss_mb (float): Peak resident set size [MB] of the program.
+        allocation_failure (bool, optional): Whether the program reported a failed
+            allocation (see allocation_failed). Defaults to False.
+
+    Raises:
+        CalledProcessError: If the program exited with a non-zero code.
+        MemoryLimitExceeded: If the program exceeded the memory limit.
+    """
+    # An allocation beyond RLIMIT_AS makes the program fail, typically before its
+    # resident set size reaches the limit, so failures close to it count as MLE.
+    # A single large allocation fails with the resident set size still small, so
+    # failures reporting a failed allocation count as MLE as well. The limit is not
+    # enforced on some platforms (e.g. macOS), so a program that finished
+    # successfully but used too much memory is also regarded as MLE.
+    if memory_limit_mb is not None and (
+        max_rss_mb > memory_limit_mb
+        or (
+            returncode != 0
+            and (
+                allocation_failure
+                or max_rss_mb >= memory_limit_mb * ProgramRunner.MLE_RSS_RATIO
+            )
+        )
+    ):
+        raise MemoryLimitExceeded(
+            returncode, cmd, memory_limit_mb, max_rss_mb, output=output
+        )
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, output)
+
+
+def memory_limited(cmd: list[str], memory_limit_mb: int) -> list[str]:
+    """Wrap a command so that it runs with its address space limited.
+
+    The limit is set by `ulimit -v` of a shell that then execs the command, so the
+    program keeps the PID of the started process. Unlike a preexec_fn, this does not
+    run Python code between fork and exec, which is unsafe in a process with threads.
+    Where the shell fails to set the limit (e.g. on macOS), the command runs without it.
+
+    Args:
+        cmd (list[str]): Command.
+        memory_limit_mb (int): Memory limit [MB].
+
+    Returns:
+        list[str]: Wrapped command.
+    """
+    limit_kb = memory_limit_mb * 1024
+    return ["/bin/sh", "-c", f'ulimit -v {limit_kb} 2>/dev/null; exec "$@"', "sh"] + cmd
+
+
 class ProgramRunner:
-    """For running a program."""
+    """For running a program.
+
+    Attributes:
+        MLE_RSS_RATIO (float): A failed run whose peak resident set size reached this
+            ratio of the memory limit is regarded as memory limit exceeded.
+    """
+
+    MLE_RSS_RATIO = 0.9
 
     def __init__(self, exec_cmd: list[str]) -> None:
         """Initialize the ProgramRunner.
@@ -48,6 +201,94 @@ class ProgramRunner:
         # Replace ~ with the home directory
         if self.exec_cmd[0].startswith("~/"):
             self.exec_cmd[0] = str(Path.home() / self.exec_cmd[0][2:])
+        self.__running: set[subprocess.Popen[str]] = set()
+        self.__running_lock = threading.Lock()
+
+    def kill_running(self) -> None:
+        """Kill the programs being run by this runner in any thread.
+
+        Their runs raise CalledProcessError. Runs started afterwards are not affected.
+        """
+        with self.__running_lock:
+            for process in self.__running:
+                process.kill()
+
+    def _communicate(
+        self, process: subprocess.Popen[str], timeout: float | None
+    ) -> str:
+        """Wait for a started program, which kill_running can kill meanwhile.
+
+        Args:
+            process (subprocess.Popen[str]): Started program with stdout piped.
+            timeout (float | None): Timeout in seconds.
+
+        Raises:
+            TimeoutExpired: If the timeout expires. The program is killed.
+
+        Returns:
+            str: Output of the program.
+        """
+        with self.__running_lock:
+            self.__running.add(process)
+        try:
+            output, _ = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            with self.__running_lock:
+                self.__running.discard(process)
+        return output
+
+    def __wait4(
+        self, process: subprocess.Popen[str], timeout: float | None
+    ) -> tuple[str, "resource.struct_rusage | None"]:
+        """Wait for a started program and reap it with os.wait4 to get its resource usage.
+
+        The output is read to the end, then the program is reaped by its pid. A timer
+        kills it if the timeout expires first. kill_running can kill it meanwhile.
+
+        Args:
+            process (subprocess.Popen[str]): Started program with stdout piped.
+            timeout (float | None): Timeout in seconds.
+
+        Raises:
+            TimeoutExpired: If the timeout expires. The program is killed.
+
+        Returns:
+            tuple[str, resource.struct_rusage | None]: Output and resource usage of the
+                program. The usage is None if the program was reaped elsewhere, i.e. by
+                Popen when it was killed right as it exited.
+        """
+        expired = threading.Event()
+
+        def expire() -> None:
+            expired.set()
+            process.kill()
+
+        timer = None if timeout is None else threading.Timer(timeout, expire)
+        with self.__running_lock:
+            self.__running.add(process)
+        try:
+            if timer is not None:
+                timer.start()
+            assert process.stdout is not None
+            output = process.stdout.read()
+            rusage = None
+            try:
+                _, status, rusage = os.wait4(process.pid, 0)
+                process.returncode = os.waitstatus_to_exitcode(status)
+            except ChildProcessError:
+                process.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            with self.__running_lock:
+                self.__running.discard(process)
+        if expired.is_set():
+            raise subprocess.TimeoutExpired(process.args, timeout or 0.0, output)
+        return output, rusage
 
     def run(
         self,
@@ -56,15 +297,28 @@ class ProgramRunner:
         stdin: TextIO | None = None,
         stdout: TextIO | None = None,
         stderr: TextIO | None = None,
+        memory_limit_mb: int | None = None,
+        env: dict[str, str] | None = None,
     ) -> RunResult:
         """Run the program.
 
+        The memory limit is enforced with RLIMIT_AS (see memory_limited), so it is not
+        available on Windows. Note that sanitizers (e.g. -fsanitize=address) reserve a
+        huge address space and therefore do not work with a memory limit.
+
         Args:
             args (list[str]): Arguments to pass to the program.
             timeout (float | None, optional): Timeout in seconds. Defaults to None.
             stdin (TextIO, optional): stdin (TextIO, optional). Defaults to None (sys.stdin).
             stdout (TextIO, optional): stdout (TextIO, optional). Defaults to None (sys.stdout).
             stderr (TextIO, optional): stderr (TextIO, optional). Defaults to None (sys.stderr).
+            memory_limit_mb (int | None, optional): Memory limit [MB]. Defaults to None (unlimited).
+            env (dict[str, str] | None, optional): Environment variables added to the current ones. Defaults to None.
+
+        Raises:
+            CalledProcessError: If the program exits with a non-zero code.
+            MemoryLimitExceeded: If the program exceeds the memory limit.
+            TimeoutExpired: If the timeout expires.
         """
         if stdin is None:
             stdin = sys.stdin
@@ -73,21 +327,99 @@ class ProgramRunner:
         if stderr is None:
             stderr = sys.stderr
 
+        if memory_limit_mb is not None and sys.platform == "win32":
+            logger.warning("memory limit is not supported on Windows, ignoring it")
+            memory_limit_mb = None
+        full_env = None if env is None else {**os.environ, **env}
+
         logger.info(f"running {self.exec_cmd + args}")
         start_time = perf_counter_ns()
-        output = subprocess.check_output(
-            args=self.exec_cmd + args,
-            timeout=timeout,
-            stdin=stdin,
-            stderr=stderr,
-            text=True,
-        )
+        max_rss_mb: float | None = None
+        if memory_limit_mb is None:
+            cmd = self.exec_cmd + args
+            with subprocess.Popen(
+                args=cmd,
+                stdin=stdin,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                text=True,
+                env=full_env,
+            ) as process:
+                output = self._communicate(process, timeout)
+            if process.returncode != 0:
+                raise subprocess.CalledProcessError(process.returncode, cmd, output)
+        else:
+            output, max_rss_mb = self.__run_with_memory_limit(
+                args=args,
+                timeout=timeout,
+                stdin=stdin,
+                stderr=stderr,
+                memory_limit_mb=memory_limit_mb,
+                env=full_env,
+            )
         end_time = perf_counter_ns()
         stdout.write(output)
         return RunResult(
             output=output,
             time_ms=(end_time - start_time) / 1_000_000,
+            max_rss_mb=max_rss_mb,
+        )
+
+    def __run_with_memory_limit(
+        self,
+        *,
+        args: list[str],
+        timeout: float | None,
+        stdin: TextIO,
+        stderr: TextIO,
+        memory_limit_mb: int,
+        env: dict[str, str] | None,
+    ) -> tuple[str, float]:
+        """Run the program under the memory limit and measure its peak memory usage.
+
+        Args:
+            args (list[str]): Arguments to pass to the program.
+            timeout (float | None): Timeout in seconds.
+            stdin (TextIO): stdin.
+            stderr (TextIO): stderr.
+            memory_limit_mb (int): Memory limit [MB].
+            env (dict[str, str] | None): Environment variables. None means the current ones.
+
+        Raises:
+            CalledProcessError: If the program exits with a non-zero code.
+            MemoryLimitExceeded: If the program exceeds the memory limit.
+            TimeoutExpired: If the timeout expires.
+
+        Returns:
+            tuple[str, float]: Output and peak resident set size [MB] of the program.
+        """
+        cmd = self.exec_cmd + args
+        # stderr goes through a tail searched for a failed allocation afterwards
+        with StderrTail(ALLOCATION_FAILURE_TAIL, forward=stderr) as tail:
+            with subprocess.Popen(
+                args=memory_limited(cmd, memory_limit_mb),
+                stdin=stdin,
+                stdout=subprocess.PIPE,
+                stderr=tail.writer,
+                text=True,
+                env=env,
+            ) as process:
+                # Only the program holds the write end from now on
+                tail.close(timeout=0)
+                output, rusage = self.__wait4(process, timeout)
+            tail.close()
+            allocation_failure = allocation_failed(tail.take())
+        max_rss_mb = 0.0 if rusage is None else ru_maxrss_to_mb(rusage.ru_maxrss)
+        logger.debug(f"peak memory usage: {max_rss_mb:.1f} MB")
+        check_returncode(
+            cmd,
+            process.returncode,
+            output,
+            memory_limit_mb,
+            max_rss_mb,
+            allocation_failure,
         )
+        return output, max_rss_mb
 
 
 class Solver:
@@ -0,0 +1,314 @@
+import logging
+import re
+import statistics
+from collections.abc import Iterable
+from pathlib import Path
+
+from cp_heuristics_adapter.project import Project
+
+logger = logging.getLogger(__name__)
+
+# a-b: inclusive range of case IDs
+RANGE = re.compile(r"(\d+)-(\d+)")
+
+
+def case_ids_file(scores_file: Path) -> Path:
+    """Get the file listing the case IDs of the lines of a scores file.
+
+    It is written only when the cases are not 0, 1, ..., in this order.
+
+    Args:
+        scores_file (Path): Path to the scores file.
+
+    Returns:
+        Path: Path to the case IDs file, e.g. scores_YYYYmmdd-HHMMSS.cases.txt.
+    """
+    return scores_file.with_suffix(".cases.txt")
+
+
+def failed_file(scores_file: Path) -> Path:
+    """Get the file listing the cases that failed in a run.
+
+    Args:
+        scores_file (Path): Path to the scores file of the run.
+
+    Returns:
+        Path: Path to the failed cases file, e.g. scores_YYYYmmdd-HHMMSS.failed.txt.
+    """
+    return scores_file.with_suffix(".failed.txt")
+
+
+def read_ids(ids_file: Path) -> list[int]:
+    """Read case IDs separated by whitespace or commas. '#' starts a comment.
+
+    Args:
+        ids_file (Path): Path to the file.
+
+    Raises:
+        ValueError: If the file has something other than case IDs.
+
+    Returns:
+        list[int]: Case IDs.
+    """
+    ids = []
+    for line in ids_file.read_text().splitlines():
+        for token in line.split("#", 1)[0].replace(",", " ").split():
+            if not token.isdigit():
+                raise ValueError(f"Invalid case ID in {ids_file}: {token}")
+            ids.append(int(token))
+    return ids
+
+
+def write_ids(ids_file: Path, case_ids: list[int]) -> None:
+    """Write case IDs, one per line.
+
+    Args:
+        ids_file (Path): Path to the file.
+        case_ids (list[int]): Case IDs.
+    """
+    ids_file.write_text("".join(f"{case_id}\n" for case_id in case_ids))
+
+
+def read_case_ids(scores_file: Path, number: int) -> list[int]:
+    """Read the case IDs of the lines of a scores file.
+
+    Args:
+        scores_file (Path): Path to the scores file.
+        number (int): Number of lines of the scores file.
+
+    Raises:
+        ValueError: If the number of case IDs does not match.
+
+    Returns:
+        list[int]: Case ID of each line.
+    """
+    ids_file = case_ids_file(scores_file)
+    if not ids_file.is_file():
+        return list(range(number))
+    case_ids = read_ids(ids_file)
+    if len(case_ids) != number:
+        raise ValueError(
+            f"{ids_file.name} has {len(case_ids)} case IDs for {number} lines"
+        )
+    return case_ids
+
+
+def read_scores(scores_file: Path) -> list[float]:
+    """Read a scores file written by 'run'.
+
+    A line of the file has the scores of a case, one per seed. They are averaged.
+
+    Args:
+        scores_file (Path): Path to the scores file.
+
+    Returns:
+        list[float]: Mean score of each case.
+    """
+    scores = []
+    for line in scores_file.read_text().splitlines():
+        if line.strip():
+            scores.append(statistics.mean(float(score) for score in line.split()))
+    return scores
+
+
+def scores_by_case(scores_file: Path) -> dict[int, float]:
+    """Read the mean score of each case of a run.
+
+    Args:
+        scores_file (Path): Path to the scores file.
+
+    Returns:
+        dict[int, float]: Mean score by case ID.
+    """
+    scores = read_scores(scores_file)
+    return dict(zip(read_case_ids(scores_file, len(scores)), scores))
+
+
+def resolve_run(project: Project, run: str) -> Path:
+    """Get the scores file of a run.
+
+    Args:
+        project (Project): Project.
+        run (str): Path to a scores file, baseline name or timestamp.
+
+    Raises:
+        FileNotFoundError: If no such run is found.
+
+    Returns:
+        Path: Path to the scores file.
+    """
+    candidates = [
+        Path(run).expanduser(),
+        project.baseline_file(run),
+        project.scores_file(run),
+    ]
+    for candidate in candidates:
+        if candidate.is_file():
+            return candidate
+    raise FileNotFoundError(f"No run or baseline found for '{run}'")
+
+
+def _failed_ids(project: Project, run: str) -> list[int]:
+    """Get the cases that failed in a run.
+
+    Args:
+        project (Project): Project.
+        run (str): Timestamp of the run. Empty means the latest run with failed cases.
+
+    Raises:
+        FileNotFoundError: If no run is found.
+
+    Returns:
+        list[int]: Case IDs.
+    """
+    if not run:
+        failed_files = sorted(project.scores_dir.glob("scores_*.failed.txt"))
+        if not failed_files:
+            raise FileNotFoundError("No run with failed cases found")
+        return read_ids(failed_files[-1])
+    scores_file = project.scores_file(run)
+    if failed_file(scores_file).is_file():
+        return read_ids(failed_file(scores_file))
+    if scores_file.is_file():
+        return []
+    raise FileNotFoundError(f"Run not found: {run}")
+
+
+def _glob_ids(project: Project, pattern: str) -> list[int]:
+    """Get the cases whose input file names match a glob pattern.
+
+    With a manifest, the names in it are matched instead of the files.
+
+    Args:
+        project (Project): Project.
+        pattern (str): Glob pattern, e.g. '00*.txt'.
+
+    Returns:
+        list[int]: Case IDs.
+    """
+    if project.cases.names is not None:
+        return project.cases.match(pattern)
+    ids = []
+    for input_file in sorted(project.inputs_dir.glob(pattern)):
+        if input_file.stem.isdigit():
+            ids.append(int(input_file.stem))
+        else:
+            logger.warning(f"Skipped {input_file.name}, which is not a case")
+    return ids
+
+
+def _all_ids(project: Project) -> list[int]:
+    """Get all cases in the manifest.
+
+    Args:
+        project (Project): Project.
+
+    Raises:
+        ValueError: If the project has no manifest.
+
+    Returns:
+        list[int]: Case IDs.
+    """
+    if project.cases.names is None:
+        raise ValueError(f"'all' needs the manifest {project.case_manifest_file}")
+    return list(range(len(project.cases)))
+
+
+def _item_ids(item: str, project: Project) -> Iterable[int]:
+    """Get the cases selected by an item of a selector.
+
+    Args:
+        item (str): Item, e.g. '10-20' (see select_cases).
+        project (Project): Project.
+
+    Raises:
+        ValueError: If the item is invalid.
+
+    Returns:
+        Iterable[int]: Case IDs.
+    """
+    if item.isdigit():
+        return [int(item)]
+    if (match := RANGE.fullmatch(item)) is not None:
+        return range(int(match.group(1)), int(match.group(2)) + 1)
+    if item == "all":
+        return _all_ids(project)
+    if item.startswith("@"):
+        return read_ids(Path(item[1:]).expanduser())
+    if item.startswith("glob:"):
+        return _glob_ids(project, item.removeprefix("glob:"))
+    if item == "failed" or item.startswith("failed:"):
+        return _failed_ids(project, item.removeprefix("failed").lstrip(":"))
+    raise ValueError(f"Invalid case selector: {item}")
+
+
+def select_cases(selector: str, project: Project) -> list[int]:
+    """Select cases by a selector.
+
+    A selector is a plain number N for the cases 0 to N-1, or comma-separated
+    items of the following forms:
+
+    - `a` or `a-b`: the case `a`, or the cases from `a` to `b` inclusive.
+    - `all`: all cases in the manifest (see CaseIndex).
+    - `@FILE`: the cases listed in a file (see read_ids).
+    - `glob:PATTERN`: the cases whose input files in `in/` (or names in the
+      manifest) match the pattern.
+    - `failed:YYYYmmdd-HHMMSS`: the cases that failed in the run, or in the latest
+      run with failures for `failed`.
+
+    Args:
+        selector (str): Selector.
+        project (Project): Project.
+
+    Raises:
+        ValueError: If the selector is invalid or selects no cases.
+
+    Returns:
+        list[int]: Selected case IDs, sorted without duplicates.
+    """
+    selector = selector.strip()
+    if selector.isdigit():
+        return list(range(int(selector)))
+    ids: set[int] = set()
+    for item in selector.split(","):
+        item = item.strip()
+        if item:
+            ids.update(_item_ids(item, project))
+    if not ids:
+        raise ValueError(f"No cases selected by '{selector}'")
+    return sorted(ids)
+
+
+def parse_shard(shard: str) -> tuple[int, int]:
+    """Parse a shard in the form 'i/n'.
+
+    Args:
+        shard (str): Shard, e.g. '2/4' for the second of four shards.
+
+    Raises:
+        ValueError: If the shard is invalid.
+
+    Returns:
+        tuple[int, int]: 1-based index and number of shards.
+    """
+    match = re.fullmatch(r"(\d+)/(\d+)", shard.strip())
+    if match is None or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise ValueError(f"Invalid shard: {shard}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def shard_cases(case_ids: list[int], index: int, count: int) -> list[int]:
+    """Take a shard of cases.
+
+    Cases are dealt out to the shards in turn, so that the shards are deterministic
+    for the same selection and differ by at most one case in size.
+
+    Args:
+        case_ids (list[int]): Sorted case IDs.
+        index (int): 1-based index of the shard.
+        count (int): Number of shards.
+
+    Returns:
+        list[int]: Case IDs of the shard.
+    """
+    return case_ids[index - 1 :: count]
@@ -1,13 +1,141 @@
-import logging.config as logger_config
+import atexit
+import datetime
+import json
+import logging
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
+from queue import SimpleQueue
+from typing import TYPE_CHECKING
 
-import yaml
+if TYPE_CHECKING:
+    from logging.handlers import QueueListener
 
 LOGGER_CONFIG_PATH = Path(__file__).parent / "logger_config.yaml"
 
+_configured = False
+_lock = threading.Lock()
+_queue: "SimpleQueue[logging.LogRecord]" = SimpleQueue()
+_listener: "QueueListener | None" = None
+_file_level: int | str = logging.DEBUG
 
-def setup_logging() -> None:
-    """Setup logging configuration"""
-    with LOGGER_CONFIG_PATH.open() as f:
-        config = yaml.safe_load(f.read())
-    logger_config.dictConfig(config)
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formatter writing a record as a line of JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _restart_listener(handlers: tuple[logging.Handler, ...]) -> None:
+    """Restart the background thread writing the queued records to the handlers.
+
+    Records queued while the listener is restarted are kept in the queue.
+
+    Args:
+        handlers (tuple[logging.Handler, ...]): Handlers to write the records to.
+    """
+    from logging.handlers import QueueListener
+
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    _listener = QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    """Write the remaining records and stop the background thread."""
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+
+
+def setup_logging(
+    console_level: int | str | None = None, file_level: int | str = logging.DEBUG
+) -> None:
+    """Setup logging configuration.
+
+    The handlers in logger_config.yaml are moved behind a queue, so that logging
+    calls only enqueue records and a background thread writes them. It is called
+    once at the entry point. Later calls do nothing.
+
+    Args:
+        console_level (int | str | None, optional): Level of the handlers in logger_config.yaml. Defaults to None (as configured).
+        file_level (int | str, optional): Level of the log files added by add_log_file. Defaults to DEBUG.
+    """
+    global _configured, _file_level
+    with _lock:
+        if _configured:
+            return
+        # Imported here so that commands exiting before logging (e.g. --help) do not pay for it
+        import logging.config as logger_config
+        from logging.handlers import QueueHandler
+
+        import yaml
+
+        with LOGGER_CONFIG_PATH.open() as f:
+            config = yaml.safe_load(f.read())
+        logger_config.dictConfig(config)
+
+        root = logging.getLogger()
+        handlers = tuple(root.handlers)
+        for handler in handlers:
+            if console_level is not None:
+                handler.setLevel(console_level)
+            root.removeHandler(handler)
+        root.addHandler(QueueHandler(_queue))
+        _restart_listener(handlers)
+        atexit.register(_stop_listener)
+        _file_level = file_level
+        _configured = True
+
+
+def add_log_file(log_file: Path) -> None:
+    """Write the log records to a JSON-lines file as well.
+
+    Args:
+        log_file (Path): Path to the log file.
+    """
+    handler = logging.FileHandler(log_file, encoding="utf-8")
+    handler.setLevel(_file_level)
+    handler.setFormatter(JsonLinesFormatter())
+    with _lock:
+        handlers = () if _listener is None else _listener.handlers
+        _restart_listener((*handlers, handler))
+
+
+@contextmanager
+def scoped_log_files() -> Iterator[None]:
+    """Remove the log files added in the block when it exits.
+
+    A process running many subcommands, e.g. a daemon, would otherwise keep writing
+    to the log files of all past runs.
+
+    Yields:
+        None: Nothing.
+    """
+    with _lock:
+        before = () if _listener is None else _listener.handlers
+    try:
+        yield
+    finally:
+        with _lock:
+            if _listener is not None:
+                added = [h for h in _listener.handlers if h not in before]
+                if added:
+                    _restart_listener(before)
+                for handler in added:
+                    handler.close()
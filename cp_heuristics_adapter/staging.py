@@ -0,0 +1,254 @@
+import itertools
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+from dataclasses import replace
+from pathlib import Path
+from tempfile import mkdtemp
+from types import TracebackType
+
+from cp_heuristics_adapter.executor import Case, CaseResult
+from cp_heuristics_adapter.runner import ProgramRunner
+
+logger = logging.getLogger(__name__)
+
+# RAM-backed directory to stage the files in by default
+DEFAULT_STAGE_ROOT = Path("/dev/shm")
+
+
+def _preload(file: Path) -> None:
+    """Ask the kernel to load a file into the page cache.
+
+    Args:
+        file (Path): File.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(file, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+def _is_noexec(directory: Path) -> bool:
+    """Check if a directory is on a file system mounted with noexec.
+
+    Args:
+        directory (Path): Directory.
+
+    Returns:
+        bool: Whether programs cannot be executed from the directory.
+    """
+    if not hasattr(os, "statvfs"):
+        return False
+    return bool(os.statvfs(directory).f_flag & getattr(os, "ST_NOEXEC", 0))
+
+
+class Stage:
+    """Copies of the inputs and the executable in a RAM-backed directory.
+
+    Cases run from the stage read their inputs and exec the solver from memory, so
+    the latency and the jitter of the project directory (e.g. on a network file
+    system) are not charged to the solver. Outputs are written to the stage too, and
+    copied back to the project in batches by a background thread.
+
+    It is used as a context manager, which waits for the outputs to be copied back
+    and removes the stage on exit.
+
+    Attributes:
+        BATCH_SIZE (int): Maximum number of outputs copied back at once.
+    """
+
+    BATCH_SIZE = 64
+
+    def __init__(self, root: Path = DEFAULT_STAGE_ROOT) -> None:
+        """Initialize the Stage in a new directory under the root.
+
+        Args:
+            root (Path, optional): RAM-backed directory, e.g. a tmpfs. Defaults to /dev/shm.
+
+        Raises:
+            FileNotFoundError: If the root does not exist.
+        """
+        if not root.is_dir():
+            raise FileNotFoundError(
+                f"Directory to stage the files in not found: {root}"
+            )
+        self.dir = Path(mkdtemp(prefix="cp-heuristics-adapter-", dir=root))
+        # Original case by staged output, until the output is written back
+        self.__originals: dict[Path, Case] = {}
+        # Size, modification time and staged copy by original input
+        self.__staged_inputs: dict[Path, tuple[int, int, Path]] = {}
+        self.__input_count = itertools.count()
+        self.__output_count = itertools.count()
+        self.__executable_count = itertools.count()
+        self.__executable: Path | None = None
+        # Staged and original cases of the outputs to write back
+        self.__pending: queue.Queue[tuple[Case, Case] | None] = queue.Queue()
+        self.__error: Exception | None = None
+        self.__writer = threading.Thread(target=self.__write_back_loop, daemon=True)
+        self.__writer.start()
+
+    def __enter__(self) -> "Stage":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def cases(self, cases: list[Case]) -> list[Case]:
+        """Stage the inputs of cases.
+
+        Inputs staged before, e.g. by a previous run in watch mode, are not copied again
+        unless their size or modification time changed since.
+
+        Args:
+            cases (list[Case]): Cases.
+
+        Returns:
+            list[Case]: Cases reading their inputs from the stage and writing their outputs to it.
+        """
+        (self.dir / "in").mkdir(exist_ok=True)
+        (self.dir / "out").mkdir(exist_ok=True)
+        staged_cases = []
+        for case in cases:
+            staged_input = self.__stage_input(case.input_file)
+            staged_output = self.dir / "out" / f"{next(self.__output_count):06}"
+            staged_case = replace(
+                case, input_file=staged_input, output_file=staged_output
+            )
+            self.__originals[staged_output] = case
+            staged_cases.append(staged_case)
+        return staged_cases
+
+    def __stage_input(self, input_file: Path) -> Path:
+        """Stage an input unless its staged copy is up to date.
+
+        A changed input is copied to a new path, so that a case still reading the old
+        copy is not affected, and the old copy is removed.
+
+        Args:
+            input_file (Path): Input file.
+
+        Returns:
+            Path: Staged copy.
+        """
+        stat = input_file.stat()
+        staged = self.__staged_inputs.get(input_file)
+        if staged is not None and staged[:2] == (stat.st_size, stat.st_mtime_ns):
+            return staged[2]
+        # Keeps the name of the input, which the logs refer to the case by
+        staged_input = (
+            self.dir / "in" / f"{next(self.__input_count):06}"
+        ) / input_file.name
+        staged_input.parent.mkdir()
+        shutil.copyfile(input_file, staged_input)
+        _preload(staged_input)
+        if staged is not None:
+            shutil.rmtree(staged[2].parent, ignore_errors=True)
+        self.__staged_inputs[input_file] = (
+            stat.st_size,
+            stat.st_mtime_ns,
+            staged_input,
+        )
+        return staged_input
+
+    def runner(self, runner: ProgramRunner) -> ProgramRunner:
+        """Stage the executable of a runner.
+
+        Only a standalone executable (e.g. a C++ or Rust build) is staged. Interpreted
+        solvers import files next to them, so they are run as is.
+
+        Args:
+            runner (ProgramRunner): Runner.
+
+        Returns:
+            ProgramRunner: Runner of the staged executable, or the runner as is.
+        """
+        if type(runner) is not ProgramRunner or len(runner.exec_cmd) != 1:
+            logger.info("The solver is not a standalone executable, not staging it")
+            return runner
+        if sys.platform == "win32" or _is_noexec(self.dir):
+            logger.warning(f"Programs cannot be executed from {self.dir}")
+            return runner
+        executable = Path(runner.exec_cmd[0])
+        (self.dir / "bin").mkdir(exist_ok=True)
+        # Each build gets its own name so that a rebuild never replaces a running one.
+        # The previous build is removed, which does not affect its running processes
+        staged = self.dir / "bin" / f"{next(self.__executable_count)}_{executable.name}"
+        if self.__executable is not None:
+            self.__executable.unlink(missing_ok=True)
+        self.__executable = staged
+        shutil.copy2(executable, staged)
+        _preload(staged)
+        logger.info(f"Staged the executable to {staged}")
+        return ProgramRunner([str(staged)])
+
+    def write_back(self, result: CaseResult) -> CaseResult:
+        """Queue the output of a staged case to be copied back to the project.
+
+        Args:
+            result (CaseResult): Result of a staged case.
+
+        Returns:
+            CaseResult: Result with the original case.
+        """
+        original = self.__originals.pop(result.case.output_file)
+        self.__pending.put((result.case, original))
+        return replace(result, case=original)
+
+    def flush(self) -> None:
+        """Wait until all queued outputs are copied back.
+
+        The cases staged before and not written back, e.g. those cancelled, are
+        forgotten, so it is called once no staged case is running.
+
+        Raises:
+            OSError: If an output failed to be copied back.
+        """
+        self.__pending.join()
+        self.__originals.clear()
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
+
+    def close(self) -> None:
+        """Copy back the queued outputs and remove the stage."""
+        try:
+            self.flush()
+        finally:
+            self.__pending.put(None)
+            self.__writer.join()
+            shutil.rmtree(self.dir, ignore_errors=True)
+
+    def __write_back_loop(self) -> None:
+        """Copy back the queued outputs in batches until None is queued."""
+        while True:
+            batch = [self.__pending.get()]
+            while len(batch) < Stage.BATCH_SIZE:
+                try:
+                    batch.append(self.__pending.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if item is None:
+                    continue
+                staged_case, original = item
+                try:
+                    shutil.copyfile(staged_case.output_file, original.output_file)
+                    staged_case.output_file.unlink()
+                except OSError as e:
+                    logger.error(f"Failed to write back {staged_case.output_file}: {e}")
+                    self.__error = e
+            for _ in batch:
+                self.__pending.task_done()
+            if None in batch:
+                return
@@ -0,0 +1,314 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from cp_heuristics_adapter.tuning import Direction
+from cp_heuristics_adapter.util import pathlib_util
+
+if sys.platform != "win32":
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class StoredRun:
+    """Outputs of a run kept in the store.
+
+    Attributes:
+        timestamp (str): Timestamp of the run.
+        mean_score (float): Mean score of the run, transformed by its score type.
+        outputs (dict[str, str]): Digest of each output by its name in the outputs directory.
+        case_ids (tuple[int, ...] | None): IDs of the cases of the run. None for runs
+            stored before they were recorded.
+        score_type (str | None): Score type of the mean score (e.g. 'plain' or 'log').
+            None for runs stored before it was recorded.
+    """
+
+    timestamp: str
+    mean_score: float
+    outputs: dict[str, str]
+    case_ids: tuple[int, ...] | None = None
+    score_type: str | None = None
+
+    def comparable_with(self, other: "StoredRun") -> bool:
+        """Check whether the mean scores of this run and another one are comparable.
+
+        They are if the runs are over the same cases and have the same score type.
+
+        Args:
+            other (StoredRun): Other run.
+
+        Returns:
+            bool: Whether the mean scores are comparable.
+        """
+        return self.case_ids == other.case_ids and self.score_type == other.score_type
+
+
+class OutputStore:
+    """Content-addressed store of the outputs of runs.
+
+    Each distinct output is stored once, compressed with gzip, under the SHA-256
+    digest of its content. A run is a manifest mapping the names of its outputs to
+    their digests, so outputs repeated across runs take no extra space.
+
+    Attributes:
+        COMPRESS_LEVEL (int): gzip compression level.
+    """
+
+    COMPRESS_LEVEL = 6
+
+    def __init__(self, root: Path) -> None:
+        """Initialize the OutputStore.
+
+        Args:
+            root (Path): Directory of the store.
+        """
+        self.root = root
+        self.objects_dir = root / "objects"
+        self.runs_dir = root / "runs"
+
+    def object_file(self, digest: str) -> Path:
+        """Get the file of an object.
+
+        Args:
+            digest (str): SHA-256 digest of the content.
+
+        Returns:
+            Path: Path to the compressed object.
+        """
+        return self.objects_dir / digest[:2] / f"{digest[2:]}.gz"
+
+    @contextmanager
+    def __locked(self, exclusive: bool) -> Iterator[None]:
+        """Hold the lock of the store for the block.
+
+        Args:
+            exclusive (bool): Whether to take it exclusively, or else shared.
+
+        Yields:
+            None: Nothing.
+        """
+        if sys.platform == "win32":
+            yield
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.root / "lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            # Closing the only descriptor of the open file releases its lock
+            os.close(fd)
+
+    def __put(self, data: bytes) -> str:
+        """Store a content unless it is stored already.
+
+        Args:
+            data (bytes): Content.
+
+        Returns:
+            str: SHA-256 digest of the content.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        object_file = self.object_file(digest)
+        if object_file.exists():
+            return digest
+        object_file.parent.mkdir(parents=True, exist_ok=True)
+        pathlib_util.write_atomically(
+            object_file, gzip.compress(data, compresslevel=OutputStore.COMPRESS_LEVEL)
+        )
+        return digest
+
+    def save_run(
+        self,
+        timestamp: str,
+        output_files: list[Path],
+        outputs_dir: Path,
+        mean_score: float,
+        case_ids: list[int],
+        score_type: str,
+    ) -> StoredRun:
+        """Store the outputs of a run.
+
+        Args:
+            timestamp (str): Timestamp of the run.
+            output_files (list[Path]): Output files.
+            outputs_dir (Path): Directory of the output files. Names are relative to it.
+            mean_score (float): Mean score of the run, transformed by the score type.
+            case_ids (list[int]): IDs of the cases of the run.
+            score_type (str): Score type of the mean score.
+
+        Returns:
+            StoredRun: Stored run.
+        """
+        with self.__locked(exclusive=False):
+            outputs = {
+                str(output_file.relative_to(outputs_dir)): self.__put(
+                    output_file.read_bytes()
+                )
+                for output_file in output_files
+            }
+            run = StoredRun(timestamp, mean_score, outputs, tuple(case_ids), score_type)
+            self.runs_dir.mkdir(parents=True, exist_ok=True)
+            manifest = {
+                "timestamp": timestamp,
+                "mean_score": mean_score,
+                "outputs": outputs,
+                "case_ids": case_ids,
+                "score_type": score_type,
+            }
+            pathlib_util.write_atomically(
+                self.runs_dir / f"{timestamp}.json", json.dumps(manifest, indent=1)
+            )
+        return run
+
+    def runs(self) -> list[StoredRun]:
+        """Get the stored runs, from the oldest to the latest.
+
+        Returns:
+            list[StoredRun]: Stored runs.
+        """
+        if not self.runs_dir.is_dir():
+            return []
+        runs = []
+        for manifest_file in sorted(self.runs_dir.glob("*.json")):
+            manifest = json.loads(manifest_file.read_text())
+            case_ids = manifest.get("case_ids")
+            runs.append(
+                StoredRun(
+                    manifest["timestamp"],
+                    manifest["mean_score"],
+                    manifest["outputs"],
+                    None if case_ids is None else tuple(case_ids),
+                    manifest.get("score_type"),
+                )
+            )
+        return runs
+
+    def run(self, timestamp: str) -> StoredRun:
+        """Get a stored run.
+
+        Args:
+            timestamp (str): Timestamp of the run.
+
+        Raises:
+            FileNotFoundError: If the run is not stored.
+
+        Returns:
+            StoredRun: Stored run.
+        """
+        for run in self.runs():
+            if run.timestamp == timestamp:
+                return run
+        raise FileNotFoundError(f"Outputs of the run {timestamp} are not stored")
+
+    def best_run(self, direction: Direction) -> StoredRun:
+        """Get the stored run with the best mean score.
+
+        Only the runs comparable with the latest run over the most cases are ranked,
+        so that e.g. a rerun of a few failed cases is not compared with full runs.
+
+        Args:
+            direction (Direction): Direction of the scores.
+
+        Raises:
+            FileNotFoundError: If no run is stored.
+
+        Returns:
+            StoredRun: Best run. The latest one among ties.
+        """
+        runs = self.runs()
+        if not runs:
+            raise FileNotFoundError(f"No runs are stored in {self.root}")
+        reference = max(reversed(runs), key=lambda run: len(run.case_ids or ()))
+        sign = 1 if direction == Direction.MAXIMIZE else -1
+        return max(
+            (run for run in reversed(runs) if run.comparable_with(reference)),
+            key=lambda run: sign * run.mean_score,
+        )
+
+    def restore(self, run: StoredRun, outputs_dir: Path) -> None:
+        """Write the outputs of a stored run to a directory.
+
+        Args:
+            run (StoredRun): Stored run.
+            outputs_dir (Path): Directory to write the outputs to.
+        """
+        for name, digest in run.outputs.items():
+            output_file = outputs_dir / name
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            output_file.write_bytes(
+                gzip.decompress(self.object_file(digest).read_bytes())
+            )
+
+    def prune(
+        self,
+        keep_last: int | None,
+        keep_best: int | None,
+        direction: Direction = Direction.MAXIMIZE,
+    ) -> list[StoredRun]:
+        """Remove the runs not kept by the retention policy and their unused objects.
+
+        A run is kept if it is one of the `keep_last` latest runs or one of the
+        `keep_best` runs with the best mean scores among the runs comparable with it
+        (see StoredRun.comparable_with).
+
+        Args:
+            keep_last (int | None): Number of the latest runs to keep. None means none by this rule.
+            keep_best (int | None): Number of the best runs to keep. None means none by this rule.
+            direction (Direction, optional): Direction of the scores. Defaults to MAXIMIZE.
+
+        Returns:
+            list[StoredRun]: Removed runs.
+        """
+        runs = self.runs()
+        kept: set[str] = set()
+        if keep_last:
+            kept |= {run.timestamp for run in runs[-keep_last:]}
+        if keep_best:
+            sign = 1 if direction == Direction.MAXIMIZE else -1
+            groups: dict[tuple[object, object], list[StoredRun]] = {}
+            for run in runs:
+                groups.setdefault((run.case_ids, run.score_type), []).append(run)
+            for group in groups.values():
+                # The latest runs first among ties
+                best = sorted(
+                    group,
+                    key=lambda run: (sign * run.mean_score, run.timestamp),
+                    reverse=True,
+                )
+                kept |= {run.timestamp for run in best[:keep_best]}
+        removed = [run for run in runs if run.timestamp not in kept]
+        for run in removed:
+            (self.runs_dir / f"{run.timestamp}.json").unlink()
+        self.collect_garbage()
+        return removed
+
+    def collect_garbage(self) -> int:
+        """Remove the objects no stored run refers to.
+
+        Waits for the runs being saved, whose objects are not referred to yet.
+
+        Returns:
+            int: Number of removed objects.
+        """
+        removed = 0
+        if not self.objects_dir.is_dir():
+            return removed
+        with self.__locked(exclusive=True):
+            used = {digest for run in self.runs() for digest in run.outputs.values()}
+            for object_file in self.objects_dir.glob("*/*.gz"):
+                digest = object_file.parent.name + object_file.name[: -len(".gz")]
+                if digest not in used:
+                    object_file.unlink()
+                    removed += 1
+        logger.debug(f"removed {removed} unused objects")
+        return removed
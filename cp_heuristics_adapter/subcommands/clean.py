@@ -4,16 +4,21 @@ from dataclasses import dataclass
 from pathlib import Path
 
 from cp_heuristics_adapter.project import Project
-from cp_heuristics_adapter.setup_logger import setup_logging
+from cp_heuristics_adapter.store import OutputStore
 from cp_heuristics_adapter.subcommands.subcommand import Subcommand
+from cp_heuristics_adapter.tuning import Direction
 from cp_heuristics_adapter.util.file_deletion_interactor import delete_if_allowed
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
 class Clean(Subcommand):
-    """Clean the project."""
+    """Clean the project.
+
+    With a retention policy, only the stored outputs of the runs not kept by it are
+    removed, without asking. With `outputs`, only the outputs directory is emptied,
+    keeping the inputs and their manifest.
+    """
 
     @dataclass(frozen=True)
     class Args:
@@ -21,15 +26,54 @@ class Clean(Subcommand):
 
         Attributes:
             path (Path): Path to the project directory.
+            keep_last (int | None): Number of the latest stored runs to keep.
+            keep_best (int | None): Number of the best stored runs to keep.
+            direction (Direction): Direction of the scores.
+            outputs (bool): Whether to empty only the outputs directory.
         """
 
         path: Path
+        keep_last: int | None
+        keep_best: int | None
+        direction: Direction
+        outputs: bool
 
     def add_arguments(self) -> None:
         """Add arguments to the parser."""
         self.parser.add_argument(
             "-p", "--path", type=str, default=".", help="Path to project directory"
         )
+        self.parser.add_argument(
+            "--keep-last",
+            type=int,
+            default=None,
+            help="Remove the stored outputs of all runs but the latest ones.",
+        )
+        self.parser.add_argument(
+            "--keep-best",
+            type=int,
+            default=None,
+            help=(
+                "Remove the stored outputs of all runs but those with the best mean "
+                "scores. Combined with --keep-last, runs kept by either are kept."
+            ),
+        )
+        self.parser.add_argument(
+            "-d",
+            "--direction",
+            type=str,
+            choices=[direction.value for direction in Direction],
+            default=Direction.MAXIMIZE.value,
+            help="Direction of the scores for --keep-best. Default is 'maximize'.",
+        )
+        self.parser.add_argument(
+            "--outputs",
+            action="store_true",
+            help=(
+                "Empty only the outputs directory, including its subdirectories, and "
+                "keep the inputs, their manifest and the scores."
+            ),
+        )
 
     def parse_args(self, args: argparse.Namespace) -> "Clean.Args":
         """Parse the arguments.
@@ -37,11 +81,23 @@ class Clean(Subcommand):
         Args:
             args (argparse.Namespace): Arguments.
 
+        Raises:
+            ValueError: If a number of runs to keep is negative.
+
         Returns:
             Clean.Args: Parsed arguments.
         """
         path = Path(args.path).expanduser()
-        return Clean.Args(path=path)
+        for keep in (args.keep_last, args.keep_best):
+            if keep is not None and keep < 0:
+                raise ValueError(f"Invalid number of runs to keep: {keep}")
+        return Clean.Args(
+            path=path,
+            keep_last=args.keep_last,
+            keep_best=args.keep_best,
+            direction=Direction.from_str(args.direction),
+            outputs=args.outputs,
+        )
 
     def run(self, raw_args: argparse.Namespace) -> None:
         """Run the subcommand.
@@ -55,6 +111,20 @@ class Clean(Subcommand):
 
         project = Project(project_root)
 
+        if args.keep_last is not None or args.keep_best is not None:
+            logger.info(f"Pruning the stored outputs in {project.store_dir}")
+            removed = OutputStore(project.store_dir).prune(
+                args.keep_last, args.keep_best, args.direction
+            )
+            logger.info(f"Removed the outputs of {len(removed)} runs")
+            return
+
+        if args.outputs:
+            logger.info(f"Cleaning the outputs at {project.outputs_dir.resolve()}")
+            if delete_if_allowed(project.outputs_dir):
+                project.outputs_dir.mkdir()
+            return
+
         logger.info(f"Cleaning project at {project_root.resolve()}")
         delete_if_allowed(project.settings_dir)
         delete_if_allowed(project.inputs_dir)
@@ -0,0 +1,379 @@
+import argparse
+import datetime
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from cp_heuristics_adapter.executor import Case, CaseResult, Verdict, run_case
+from cp_heuristics_adapter.flag_matrix import (
+    Matrix,
+    Variant,
+    VariantSummary,
+    pretty,
+    rank,
+    write_release_config,
+)
+from cp_heuristics_adapter.languages import BuildMode, Cpp, detect_language
+from cp_heuristics_adapter.project import Project
+from cp_heuristics_adapter.runner import ProgramRunner
+from cp_heuristics_adapter.selection import select_cases
+from cp_heuristics_adapter.setup_logger import add_log_file
+from cp_heuristics_adapter.subcommands.run import Run, ScoreType
+from cp_heuristics_adapter.subcommands.subcommand import Subcommand
+
+logger = logging.getLogger(__name__)
+
+
+class Flags(Subcommand):
+    """Subcommand 'flags'.
+
+    Build the solver with each compiler and flag variant of a matrix, run the variants
+    on sample cases and rank them.
+
+    Attributes:
+        DEFAULT_RANK_BY (str): Default criterion to rank the variants by.
+        RANK_BY (list[str]): Criteria to rank the variants by.
+    """
+
+    DEFAULT_RANK_BY = "score"
+    RANK_BY = ["score", "throughput"]
+
+    @dataclass(frozen=True)
+    class Args:
+        """Arguments for the 'flags' subcommand.
+
+        Attributes:
+            source (Path): Path to source file.
+            cases (str): Cases to run each variant on, as a selector (see select_cases).
+            config (Path | None): Path to the flag matrix. None means the project's flags.toml.
+            timelimit (float): Time limit for execution.
+            memory_limit (int | None): Memory limit [MB]. None means the release config.
+            score_type (ScoreType): Type of score.
+            jobs (int): Number of builds and cases to run in parallel.
+            rank_by (str): Criterion to rank the variants by, 'score' or 'throughput'.
+            write_best (bool): Whether to write the best variant to the release config.
+        """
+
+        source: Path
+        cases: str
+        config: Path | None
+        timelimit: float
+        memory_limit: int | None
+        score_type: ScoreType
+        jobs: int
+        rank_by: str
+        write_best: bool
+
+    def add_arguments(self) -> None:
+        """Add arguments.
+
+        source: Path to source file.
+        cases: Cases to run each variant on.
+        config: Path to the flag matrix.
+        time-limit: Time limit for execution.
+        memory-limit: Memory limit for execution.
+        score-type: Type of score.
+        jobs: Number of builds and cases to run in parallel.
+        rank-by: Criterion to rank the variants by.
+        write-best: Write the best variant to the release config.
+        """
+        self.parser.add_argument("source", type=str, help="Path to source file.")
+        self.parser.add_argument(
+            "cases",
+            type=str,
+            help="Cases to run each variant on, in the same form as for 'run'.",
+        )
+        self.parser.add_argument(
+            "-c",
+            "--config",
+            type=str,
+            default=None,
+            help="Path to the flag matrix. Default is '.cp-heuristics-adapter/flags.toml'.",
+        )
+        self.parser.add_argument(
+            "-t",
+            "--time-limit",
+            type=float,
+            default=Run.DEFAULT_TIME_LIMIT,
+            help=f"Time limit for execution. Default is {Run.DEFAULT_TIME_LIMIT:.1f} seconds.",
+        )
+        self.parser.add_argument(
+            "-m",
+            "--memory-limit",
+            type=int,
+            default=None,
+            help=(
+                "Memory limit [MB] for execution. 0 means unlimited. "
+                "Default is the 'memory_limit' in the release config."
+            ),
+        )
+        self.parser.add_argument(
+            "-s",
+            "--score-type",
+            type=str,
+            choices=[score_type.value for score_type in ScoreType],
+            default=Run.DEFAULT_SCORE_TYPE.value,
+            help=(
+                "Type of score to average over cases. "
+                f"Default is '{Run.DEFAULT_SCORE_TYPE.value}'."
+            ),
+        )
+        self.parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=Run.DEFAULT_JOBS,
+            help=(
+                "Number of builds and cases to run in parallel. Each case runs pinned "
+                f"to a core of its own. Default is {Run.DEFAULT_JOBS}."
+            ),
+        )
+        self.parser.add_argument(
+            "--rank-by",
+            type=str,
+            choices=Flags.RANK_BY,
+            default=Flags.DEFAULT_RANK_BY,
+            help=(
+                "Rank the variants by the mean score, or by the throughput (the 'metric' "
+                "of the matrix per second, or cases per second without it). "
+                f"Default is '{Flags.DEFAULT_RANK_BY}'."
+            ),
+        )
+        self.parser.add_argument(
+            "--write-best",
+            action="store_true",
+            help="Write the compiler and the flags of the best variant to the release section of cpp_config.toml.",
+        )
+
+    def parse_args(self, args: argparse.Namespace) -> "Flags.Args":
+        """Parse the arguments.
+
+        Args:
+            args (argparse.Namespace): Arguments.
+
+        Raises:
+            ValueError: If the number of jobs is invalid.
+
+        Returns:
+            Flags.Args: Parsed arguments.
+        """
+        if args.jobs < 1:
+            raise ValueError(f"Invalid number of jobs: {args.jobs}")
+        return Flags.Args(
+            source=Path(args.source).expanduser(),
+            cases=args.cases,
+            config=None if args.config is None else Path(args.config).expanduser(),
+            timelimit=args.time_limit,
+            memory_limit=args.memory_limit,
+            score_type=ScoreType.from_str(args.score_type),
+            jobs=args.jobs,
+            rank_by=args.rank_by,
+            write_best=args.write_best,
+        )
+
+    def __build(
+        self,
+        source_file: Path,
+        variants: list[Variant],
+        config_file: Path,
+        build_root: Path,
+        jobs: int,
+    ) -> dict[int, ProgramRunner]:
+        """Build the variants in parallel.
+
+        Args:
+            source_file (Path): Path to the source file.
+            variants (list[Variant]): Variants.
+            config_file (Path): Path to cpp_config.toml.
+            build_root (Path): Directory to put the builds in.
+            jobs (int): Number of builds at the same time.
+
+        Returns:
+            dict[int, ProgramRunner]: Runner by index of the variant. Variants that
+                failed to build are missing.
+        """
+
+        def build(index: int) -> ProgramRunner:
+            language = Cpp(build_mode=BuildMode.RELEASE, config_file=config_file)
+            language.config.compiler = variants[index].compiler
+            language.config.flags = variants[index].flags
+            build_dir = build_root / f"{index:03}"
+            build_dir.mkdir()
+            return language.compile_to(source_file, build_dir / source_file.stem)
+
+        runners: dict[int, ProgramRunner] = {}
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(build, index): index for index in range(len(variants))
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    runners[index] = future.result()
+                except (OSError, subprocess.CalledProcessError) as e:
+                    logger.error(f"Failed to build {variants[index].name}: {e}")
+        return dict(sorted(runners.items()))
+
+    def __cores(self, jobs: int) -> list[int | None]:
+        """Get the cores to pin the cases to.
+
+        Args:
+            jobs (int): Number of cases to run in parallel.
+
+        Returns:
+            list[int | None]: A core per job. None means the cases are not pinned.
+        """
+        if sys.platform != "linux" or shutil.which("taskset") is None:
+            logger.warning(
+                "Cases are not pinned to cores, which needs taskset on Linux"
+            )
+            return [None] * jobs
+        cores = sorted(os.sched_getaffinity(0))
+        if len(cores) < jobs:
+            logger.warning(
+                f"Cases are not pinned to cores, since {jobs} jobs exceed "
+                f"the {len(cores)} available cores"
+            )
+            return [None] * jobs
+        logger.info(f"Pinning the cases to the cores {cores[:jobs]}")
+        return list(cores[:jobs])
+
+    def __run(
+        self,
+        project: Project,
+        runners: dict[int, ProgramRunner],
+        case_ids: list[int],
+        args: "Flags.Args",
+        memory_limit: int | None,
+    ) -> dict[int, list[CaseResult]]:
+        """Run every variant on every case, each pinned to a free core.
+
+        The runs of the variants on a case are next to each other, so that drifts in
+        the load of the machine affect all variants alike. Outputs are discarded.
+
+        Args:
+            project (Project): Project.
+            runners (dict[int, ProgramRunner]): Runner by index of the variant.
+            case_ids (list[int]): IDs of the cases.
+            args (Flags.Args): Arguments.
+            memory_limit (int | None): Memory limit [MB]. None means unlimited.
+
+        Returns:
+            dict[int, list[CaseResult]]: Results by index of the variant.
+        """
+        free_cores: queue.Queue[int | None] = queue.Queue()
+        for core in self.__cores(args.jobs):
+            free_cores.put(core)
+
+        def run_pinned(runner: ProgramRunner, case_id: int) -> CaseResult:
+            core = free_cores.get()
+            try:
+                if core is not None:
+                    runner = ProgramRunner(
+                        ["taskset", "-c", str(core), *runner.exec_cmd]
+                    )
+                return run_case(
+                    runner,
+                    Case(case_id, project.input_file(case_id), Path(os.devnull)),
+                    timelimit=args.timelimit,
+                    memory_limit=memory_limit,
+                )
+            finally:
+                free_cores.put(core)
+
+        results: dict[int, list[CaseResult]] = {index: [] for index in runners}
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            futures: dict[Future[CaseResult], int] = {
+                pool.submit(run_pinned, runner, case_id): index
+                for case_id in case_ids
+                for index, runner in runners.items()
+            }
+            for future in as_completed(futures):
+                results[futures[future]].append(future.result())
+        return results
+
+    def run(self, raw_args: argparse.Namespace) -> None:
+        """Run the subcommand.
+
+        Args:
+            raw_args (argparse.Namespace): Raw arguments.
+
+        Raises:
+            ValueError: If the source file is not C++.
+            RuntimeError: If no variant could be built.
+        """
+        args = self.parse_args(raw_args)
+        logger.debug(f"Running subcommand 'flags' with args: {args}")
+        project = Project(Project.search_project_root(args.source))
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        add_log_file(project.log_file(timestamp))
+
+        if detect_language(args.source) is not Cpp:
+            raise ValueError("Compilers and flags can be compared only for C++")
+        matrix = Matrix.load(
+            args.config if args.config is not None else project.flags_config_file
+        )
+        config_file = project.config_file(Cpp)
+        case_ids = select_cases(args.cases, project)
+        memory_limit = (
+            Cpp(build_mode=BuildMode.RELEASE, config_file=config_file).memory_limit
+            if args.memory_limit is None
+            else args.memory_limit
+        )
+
+        with TemporaryDirectory() as build_root:
+            logger.info(f"Building {len(matrix.variants)} variants")
+            runners = self.__build(
+                args.source, matrix.variants, config_file, Path(build_root), args.jobs
+            )
+            if not runners:
+                raise RuntimeError("No variant could be built")
+            logger.info(f"Running {len(runners)} variants on {len(case_ids)} cases")
+            results = self.__run(
+                project,
+                runners,
+                case_ids,
+                args,
+                memory_limit if memory_limit > 0 else None,
+            )
+
+        summaries = [
+            VariantSummary.of(
+                matrix.variants[index],
+                variant_results,
+                [
+                    args.score_type.transform(result.score)
+                    for result in variant_results
+                    if result.verdict == Verdict.AC and result.score is not None
+                ],
+                matrix.metric,
+            )
+            for index, variant_results in results.items()
+        ]
+        ranked = rank(summaries, args.rank_by, matrix.direction)
+        table = pretty(ranked, matrix.metric)
+        logger.info(f"Variants ranked by {args.rank_by}:\n{table}")
+        report_file = project.scores_dir / f"flags_{timestamp}.txt"
+        project.scores_dir.mkdir(exist_ok=True)
+        report_file.write_text(table + "\n")
+        logger.info(f"Ranking written to {report_file}")
+
+        best = ranked[0]
+        if not args.write_best:
+            return
+        if best.failed > 0 or (
+            args.rank_by == "throughput" and best.throughput is None
+        ):
+            logger.warning("No variant succeeded on all cases, so none is written")
+            return
+        write_release_config(config_file, best.variant)
+        logger.info(
+            f"Wrote {best.variant.name} to the release section of {config_file}"
+        )
@@ -0,0 +1,112 @@
+import argparse
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+from cp_heuristics_adapter.case_index import CaseIndex
+from cp_heuristics_adapter.project import Project
+from cp_heuristics_adapter.subcommands.subcommand import Subcommand
+from cp_heuristics_adapter.util import pathlib_util
+
+logger = logging.getLogger(__name__)
+
+
+class Index(Subcommand):
+    """Subcommand 'index'.
+
+    Write the manifest of the inputs, so that the cases may have any names and be
+    in subdirectories.
+    """
+
+    @dataclass(frozen=True)
+    class Args:
+        """Arguments for the 'index' subcommand.
+
+        Attributes:
+            path (Path): Path to the project directory.
+            shard_size (int | None): Number of inputs per subdirectory. None means the inputs are not moved.
+            renumber (bool): Whether to number all the cases anew instead of appending the new inputs.
+        """
+
+        path: Path
+        shard_size: int | None
+        renumber: bool
+
+    def add_arguments(self) -> None:
+        """Add arguments.
+
+        path: Path to the project directory.
+        shard-size: Number of inputs per subdirectory.
+        renumber: Number all the cases anew.
+        """
+        self.parser.add_argument(
+            "-p", "--path", type=str, default=".", help="Path to project directory"
+        )
+        self.parser.add_argument(
+            "--shard-size",
+            type=int,
+            default=None,
+            metavar="N",
+            help=(
+                "Move the inputs into subdirectories 000, 001, ... of N inputs each "
+                "before indexing them. Default is to keep them where they are."
+            ),
+        )
+        self.parser.add_argument(
+            "--renumber",
+            action="store_true",
+            help=(
+                "Number all the inputs anew by their names. By default, the cases of "
+                "the existing manifest keep their IDs and new inputs are appended."
+            ),
+        )
+
+    def parse_args(self, args: argparse.Namespace) -> "Index.Args":
+        """Parse the arguments.
+
+        Args:
+            args (argparse.Namespace): Arguments.
+
+        Raises:
+            ValueError: If the shard size is invalid.
+
+        Returns:
+            Index.Args: Parsed arguments.
+        """
+        if args.shard_size is not None and args.shard_size < 1:
+            raise ValueError(f"Invalid shard size: {args.shard_size}")
+        return Index.Args(
+            path=Path(args.path).expanduser(),
+            shard_size=args.shard_size,
+            renumber=args.renumber,
+        )
+
+    def run(self, raw_args: argparse.Namespace) -> None:
+        """Run the subcommand.
+
+        Args:
+            raw_args (argparse.Namespace): Raw arguments.
+
+        Raises:
+            FileNotFoundError: If the inputs directory does not exist.
+            FileExistsError: If an input would be moved onto another.
+        """
+        args = self.parse_args(raw_args)
+        logger.debug(f"Running subcommand 'index' with args: {args}")
+        project = Project(Project.search_project_root(args.path.resolve()))
+        pathlib_util.assert_dir_existence(project.inputs_dir)
+
+        previous = None if args.renumber else project.cases
+        cases = CaseIndex.build(project.inputs_dir, args.shard_size, previous)
+        cases.save(project.case_manifest_file)
+        added = len(cases) - (0 if previous is None else len(previous))
+        logger.info(
+            f"Indexed {len(cases)} cases in {project.case_manifest_file} "
+            f"({added} new). "
+            "Case IDs are their lines in it"
+        )
+        if args.renumber:
+            logger.warning(
+                "Case IDs may have changed, so the scores of past runs may refer to "
+                "other cases"
+            )
@@ -4,11 +4,9 @@ import logging
 from pathlib import Path
 import shutil
 from cp_heuristics_adapter.project import Project
-from cp_heuristics_adapter.setup_logger import setup_logging
 from cp_heuristics_adapter.subcommands.subcommand import Subcommand
 from cp_heuristics_adapter.util.file_deletion_interactor import delete_if_allowed
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
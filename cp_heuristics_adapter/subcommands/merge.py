@@ -0,0 +1,115 @@
+import argparse
+import datetime
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+from cp_heuristics_adapter.project import Project
+from cp_heuristics_adapter.selection import (
+    case_ids_file,
+    read_case_ids,
+    resolve_run,
+    write_ids,
+)
+from cp_heuristics_adapter.subcommands.subcommand import Subcommand
+
+logger = logging.getLogger(__name__)
+
+
+def merge_scores(scores_files: list[Path]) -> dict[int, str]:
+    """Merge the scores files of runs on disjoint cases, e.g. the shards of a run.
+
+    Args:
+        scores_files (list[Path]): Paths to the scores files.
+
+    Raises:
+        ValueError: If a case is in more than one run.
+
+    Returns:
+        dict[int, str]: Line of the scores file by case ID, sorted by case ID.
+    """
+    lines: dict[int, str] = {}
+    for scores_file in scores_files:
+        file_lines = [
+            line for line in scores_file.read_text().splitlines() if line.strip()
+        ]
+        for case_id, line in zip(
+            read_case_ids(scores_file, len(file_lines)), file_lines
+        ):
+            if case_id in lines:
+                raise ValueError(f"Case {case_id} is in more than one run")
+            lines[case_id] = line
+    return dict(sorted(lines.items()))
+
+
+class Merge(Subcommand):
+    """Subcommand 'merge'.
+
+    Merge the scores of runs on disjoint cases into a new run.
+    """
+
+    @dataclass(frozen=True)
+    class Args:
+        """Arguments for the 'merge' subcommand.
+
+        Attributes:
+            runs (list[str]): Runs to merge, as timestamps or paths to scores files.
+            path (Path): Path to the project directory.
+        """
+
+        runs: list[str]
+        path: Path
+
+    def add_arguments(self) -> None:
+        """Add arguments.
+
+        runs: Runs to merge.
+        path: Path to the project directory.
+        """
+        self.parser.add_argument(
+            "runs",
+            type=str,
+            nargs="+",
+            help=(
+                "Runs to merge: timestamps (YYYYmmdd-HHMMSS) or paths to scores files, "
+                "e.g. those of the shards of a run."
+            ),
+        )
+        self.parser.add_argument(
+            "-p", "--path", type=str, default=".", help="Path to project directory"
+        )
+
+    def parse_args(self, args: argparse.Namespace) -> "Merge.Args":
+        """Parse the arguments.
+
+        Args:
+            args (argparse.Namespace): Arguments.
+
+        Returns:
+            Merge.Args: Parsed arguments.
+        """
+        return Merge.Args(runs=args.runs, path=Path(args.path).expanduser())
+
+    def run(self, raw_args: argparse.Namespace) -> None:
+        """Run the subcommand.
+
+        Args:
+            raw_args (argparse.Namespace): Raw arguments.
+        """
+        args = self.parse_args(raw_args)
+        logger.debug(f"Running subcommand 'merge' with args: {args}")
+        project = Project(Project.search_project_root(args.path.resolve()))
+
+        scores_files = [resolve_run(project, run) for run in args.runs]
+        lines = merge_scores(scores_files)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        merged_file = project.scores_file(timestamp)
+        project.scores_dir.mkdir(exist_ok=True)
+        merged_file.write_text("".join(f"{line}\n" for line in lines.values()))
+        case_ids = list(lines)
+        if case_ids != list(range(len(case_ids))):
+            write_ids(case_ids_file(merged_file), case_ids)
+        logger.info(
+            f"Merged {len(scores_files)} runs into {merged_file.name} "
+            f"({len(case_ids)} cases)"
+        )
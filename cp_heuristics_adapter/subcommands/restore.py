@@ -0,0 +1,131 @@
+import argparse
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+from cp_heuristics_adapter.project import Project
+from cp_heuristics_adapter.store import OutputStore
+from cp_heuristics_adapter.subcommands.subcommand import Subcommand
+from cp_heuristics_adapter.tuning import Direction
+
+logger = logging.getLogger(__name__)
+
+
+class Restore(Subcommand):
+    """Subcommand 'restore'.
+
+    Write the stored outputs of a past run back to the outputs directory.
+    """
+
+    @dataclass(frozen=True)
+    class Args:
+        """Arguments for the 'restore' subcommand.
+
+        Attributes:
+            run (str | None): Timestamp of the run. None means the latest run.
+            best (bool): Whether to restore the run with the best mean score.
+            direction (Direction): Direction of the scores.
+            path (Path): Path to the project directory.
+            output_dir (Path | None): Directory to write the outputs to. None means the outputs directory.
+        """
+
+        run: str | None
+        best: bool
+        direction: Direction
+        path: Path
+        output_dir: Path | None
+
+    def add_arguments(self) -> None:
+        """Add arguments.
+
+        run: Timestamp of the run.
+        best: Restore the run with the best mean score.
+        direction: Direction of the scores.
+        path: Path to the project directory.
+        output-dir: Directory to write the outputs to.
+        """
+        self.parser.add_argument(
+            "run",
+            type=str,
+            nargs="?",
+            default=None,
+            help="Timestamp (YYYYmmdd-HHMMSS) of the run. Default is the latest run.",
+        )
+        self.parser.add_argument(
+            "--best",
+            action="store_true",
+            help="Restore the stored run with the best mean score.",
+        )
+        self.parser.add_argument(
+            "-d",
+            "--direction",
+            type=str,
+            choices=[direction.value for direction in Direction],
+            default=Direction.MAXIMIZE.value,
+            help="Direction of the scores for --best. Default is 'maximize'.",
+        )
+        self.parser.add_argument(
+            "-p", "--path", type=str, default=".", help="Path to project directory"
+        )
+        self.parser.add_argument(
+            "-o",
+            "--output-dir",
+            type=str,
+            default=None,
+            help="Directory to write the outputs to. Default is 'out' of the project.",
+        )
+
+    def parse_args(self, args: argparse.Namespace) -> "Restore.Args":
+        """Parse the arguments.
+
+        Args:
+            args (argparse.Namespace): Arguments.
+
+        Raises:
+            ValueError: If both a run and --best are given.
+
+        Returns:
+            Restore.Args: Parsed arguments.
+        """
+        if args.run is not None and args.best:
+            raise ValueError("Give either a run or --best")
+        return Restore.Args(
+            run=args.run,
+            best=args.best,
+            direction=Direction.from_str(args.direction),
+            path=Path(args.path).expanduser(),
+            output_dir=None
+            if args.output_dir is None
+            else Path(args.output_dir).expanduser(),
+        )
+
+    def run(self, raw_args: argparse.Namespace) -> None:
+        """Run the subcommand.
+
+        Args:
+            raw_args (argparse.Namespace): Raw arguments.
+
+        Raises:
+            FileNotFoundError: If the run is not stored.
+        """
+        args = self.parse_args(raw_args)
+        logger.debug(f"Running subcommand 'restore' with args: {args}")
+        project = Project(Project.search_project_root(args.path.resolve()))
+        store = OutputStore(project.store_dir)
+
+        if args.best:
+            run = store.best_run(args.direction)
+        elif args.run is not None:
+            run = store.run(args.run)
+        else:
+            runs = store.runs()
+            if not runs:
+                raise FileNotFoundError(f"No runs are stored in {store.root}")
+            run = runs[-1]
+        output_dir = project.outputs_dir if args.output_dir is None else args.output_dir
+        logger.info(
+            f"Restoring {len(run.outputs)} outputs of the run {run.timestamp} "
+            f"(mean score {run.mean_score:.2f}) to {output_dir}"
+        )
+        store.restore(run, output_dir)
+        logger.info("Restored successfully")
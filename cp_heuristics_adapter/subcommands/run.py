@@ -3,19 +3,49 @@ import datetime
 import logging
 import math
 import statistics
-import subprocess
+import threading
+from collections.abc import Callable
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from tempfile import NamedTemporaryFile
+from tempfile import TemporaryDirectory
 
-from cp_heuristics_adapter.languages import BuildMode, detect_language
+from cp_heuristics_adapter.batch import BatchSolver
+from cp_heuristics_adapter.capture import DEFAULT_STDERR_LIMIT_KB, last_lines
+from cp_heuristics_adapter.executor import Case, CaseResult, Verdict, run_cases
+from cp_heuristics_adapter.languages import (
+    BuildMode,
+    Cpp,
+    Language,
+    Python,
+    PythonBackend,
+    detect_language,
+)
+from cp_heuristics_adapter.pgo import PgoTraining
+from cp_heuristics_adapter.profiling import (
+    PROFILERS,
+    Profiler,
+    ProfilingRunner,
+    assert_supported,
+    default_profiler,
+)
 from cp_heuristics_adapter.project import Project
 from cp_heuristics_adapter.runner import ProgramRunner
-from cp_heuristics_adapter.setup_logger import setup_logging
+from cp_heuristics_adapter.selection import (
+    case_ids_file,
+    failed_file,
+    parse_shard,
+    select_cases,
+    shard_cases,
+    write_ids,
+)
+from cp_heuristics_adapter.setup_logger import add_log_file
+from cp_heuristics_adapter.staging import DEFAULT_STAGE_ROOT, Stage
+from cp_heuristics_adapter.store import OutputStore
 from cp_heuristics_adapter.subcommands.subcommand import Subcommand
+from cp_heuristics_adapter.warm import WarmState
+from cp_heuristics_adapter.watch import FileWatcher, local_dependencies
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -47,6 +77,38 @@ class ScoreType(Enum):
                 return score_type
         raise ValueError(f"Invalid score type: {value}")
 
+    def transform(self, score: float) -> float:
+        """Transform a score according to the type.
+
+        Args:
+            score (float): Score.
+
+        Returns:
+            float: Transformed score.
+        """
+        if self == ScoreType.LOG:
+            return math.log(score)
+        return score
+
+
+class CasesFailed(RuntimeError):
+    """Raised when some cases of a run do not finish successfully.
+
+    Attributes:
+        results (list[list[CaseResult]]): Results per seed of the cases that finished
+            successfully with every seed.
+    """
+
+    def __init__(self, message: str, results: list[list[CaseResult]]) -> None:
+        """Initialize the CasesFailed.
+
+        Args:
+            message (str): Message.
+            results (list[list[CaseResult]]): Results of the successful cases.
+        """
+        super().__init__(message)
+        self.results = results
+
 
 class ScoreSummary:
     """Summary of scores."""
@@ -63,7 +125,7 @@ class ScoreSummary:
         self.max = max(scores)
         self.mean = statistics.mean(scores)
         self.median = statistics.median(scores)
-        self.stdev = statistics.stdev(scores)
+        self.stdev = statistics.stdev(scores) if len(scores) > 1 else 0.0
 
     def pretty(self) -> str:
         """Return the summary in a pretty format.
@@ -82,6 +144,147 @@ class ScoreSummary:
         )
 
 
+class SeedSummary:
+    """Summary of scores of multiple seeds per case.
+
+    The variance of scores is split into the within-case part, the mean of the
+    variances over seeds, and the across-case part, the variance of the means.
+    """
+
+    def __init__(
+        self, scores: list[list[float]], case_ids: list[int] | None = None
+    ) -> None:
+        """Initialize the SeedSummary.
+
+        Args:
+            scores (list[list[float]]): Scores per case, each of which has scores per seed.
+            case_ids (list[int] | None, optional): ID of each case. Defaults to None (0, 1, ...).
+        """
+        self.case_ids = list(range(len(scores))) if case_ids is None else case_ids
+        self.means = [statistics.mean(case_scores) for case_scores in scores]
+        self.stdevs = [statistics.stdev(case_scores) for case_scores in scores]
+        self.mins = [min(case_scores) for case_scores in scores]
+        self.maxs = [max(case_scores) for case_scores in scores]
+        self.seeds = len(scores[0])
+        self.within_case_variance = statistics.mean([stdev**2 for stdev in self.stdevs])
+        self.across_case_variance = (
+            statistics.variance(self.means) if len(self.means) > 1 else 0.0
+        )
+        # Standard error of the overall mean caused by the randomness of the solver
+        self.seed_stderr = math.sqrt(
+            self.within_case_variance / (len(scores) * self.seeds)
+        )
+
+    def pretty(self) -> str:
+        """Return the summary in a pretty format.
+
+        Returns:
+            str: Summary in a pretty format.
+        """
+        lines = [
+            f"seeds per case       : {self.seeds}",
+            f"within-case variance : {self.within_case_variance:.2f}",
+            f"across-case variance : {self.across_case_variance:.2f}",
+            f"stderr of mean (seed): {self.seed_stderr:.2f}",
+            "",
+            "case       mean      stdev        min        max",
+        ]
+        for case_id, mean, stdev, min_, max_ in zip(
+            self.case_ids, self.means, self.stdevs, self.mins, self.maxs
+        ):
+            lines.append(
+                f"{case_id:04} {mean:10.2f} {stdev:10.2f} {min_:10.2f} {max_:10.2f}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+class MetricsSummary:
+    """Summary of the metrics reported by the solver, per metric over all runs.
+
+    Metrics are listed in the order the solver first reported them. A metric may be
+    missing in some runs, so each one has its own count.
+    """
+
+    def __init__(self, metrics: list[dict[str, float]]) -> None:
+        """Initialize the MetricsSummary.
+
+        Args:
+            metrics (list[dict[str, float]]): Metrics of each run.
+        """
+        names = dict.fromkeys(name for run_metrics in metrics for name in run_metrics)
+        self.values = {
+            name: [run_metrics[name] for run_metrics in metrics if name in run_metrics]
+            for name in names
+        }
+
+    def pretty(self) -> str:
+        """Return the summary in a pretty format.
+
+        Returns:
+            str: Summary in a pretty format.
+        """
+        width = max([len("metric"), *(len(name) for name in self.values)])
+        lines = [
+            f"{'metric':<{width}} count           mean            med"
+            "            min            max          stdev"
+        ]
+        for name, values in self.values.items():
+            stdev = statistics.stdev(values) if len(values) > 1 else 0.0
+            lines.append(
+                f"{name:<{width}} {len(values):5} {statistics.mean(values):14.2f} "
+                f"{statistics.median(values):14.2f} {min(values):14.2f} "
+                f"{max(values):14.2f} {stdev:14.2f}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+class BackendSummary:
+    """Summary of a backend in a benchmark of Python backends.
+
+    The minimum time roughly shows the fixed cost per case, such as the startup of
+    the interpreter and the warm-up of the JIT.
+    """
+
+    def __init__(self, backend: PythonBackend, results: list[CaseResult]) -> None:
+        """Initialize the BackendSummary.
+
+        Args:
+            backend (PythonBackend): Backend.
+            results (list[CaseResult]): Results of all runs with the backend.
+        """
+        times = [result.time_ms or 0.0 for result in results]
+        self.backend = backend
+        self.mean_time_ms = statistics.mean(times)
+        self.min_time_ms = min(times)
+        self.max_time_ms = max(times)
+
+    @staticmethod
+    def pretty(summaries: list["BackendSummary"], mean_scores: list[float]) -> str:
+        """Return the summaries of the backends as a table.
+
+        The speedup is relative to the first backend.
+
+        Args:
+            summaries (list[BackendSummary]): Summaries of the backends.
+            mean_scores (list[float]): Mean score of each backend.
+
+        Returns:
+            str: Table of the summaries.
+        """
+        lines = [
+            "backend        mean score   mean [ms]    min [ms]    max [ms]  speedup"
+        ]
+        base = summaries[0].mean_time_ms
+        for summary, mean_score in zip(summaries, mean_scores):
+            speedup = base / summary.mean_time_ms if summary.mean_time_ms > 0 else 0.0
+            lines.append(
+                f"{summary.backend.value:<10} {mean_score:14.2f} "
+                f"{summary.mean_time_ms:11.1f} {summary.min_time_ms:11.1f} "
+                f"{summary.max_time_ms:11.1f} {speedup:7.2f}x"
+            )
+        return "\n".join(lines) + "\n"
+
+
 class Run(Subcommand):
     """Subcommand 'run'.
 
@@ -91,11 +294,32 @@ class Run(Subcommand):
         DEFAULT_MODE (BuildMode): Default build mode.
         DEFAULT_TIME_LIMIT (float): Default time limit.
         DEFAULT_SCORE_TYPE (ScoreType): Default score type.
+        DEFAULT_JOBS (int): Default number of cases to run in parallel.
+        DEFAULT_SEEDS (int): Default number of runs per case.
+        DEFAULT_QUICK (int): Default number of cases run first in watch mode.
+        DEFAULT_CASES_PER_PROCESS (int): Default number of cases per solver process in batch mode.
+        DEFAULT_STDERR_LIMIT (int): Default size [KB] of the tail of stderr kept per case.
+        STDERR_TAIL_LINES (int): Number of lines of stderr shown for a failed case.
+        DEFAULT_PGO_CASES (str): Default cases to train the PGO build on.
+        warm (WarmState | None): Builds and stages kept across runs by a daemon. None
+            outside a daemon.
+        on_result (Callable[[CaseResult], None] | None): Called with the result of
+            each case as it finishes, e.g. by a daemon streaming the results.
     """
 
     DEFAULT_MODE = BuildMode.DEBUG
     DEFAULT_TIME_LIMIT = 2.0
     DEFAULT_SCORE_TYPE = ScoreType.PLAIN
+    DEFAULT_JOBS = 1
+    DEFAULT_SEEDS = 1
+    DEFAULT_QUICK = 10
+    DEFAULT_CASES_PER_PROCESS = 0
+    DEFAULT_STDERR_LIMIT = DEFAULT_STDERR_LIMIT_KB
+    STDERR_TAIL_LINES = 20
+    DEFAULT_PGO_CASES = "10"
+
+    warm: WarmState | None = None
+    on_result: Callable[[CaseResult], None] | None = None
 
     @dataclass(frozen=True)
     class Args:
@@ -103,26 +327,65 @@ class Run(Subcommand):
 
         Attributes:
             source (Path): Path to source file.
-            number (int): Number of cases to run.
+            cases (str): Cases to run, a number N for the cases 0 to N-1 or a selector (see select_cases).
+            shard (tuple[int, int] | None): 1-based index and number of shards to take. None means all cases.
             build_mode (BuildMode): Build mode.
             timelimit (float): Time limit for execution.
+            memory_limit (int | None): Memory limit [MB]. None means the language config.
             score_type (ScoreType): Type of score.
+            jobs (int): Number of cases to run in parallel.
+            seeds (int): Number of runs with distinct seeds per case.
+            backends (list[PythonBackend]): Python backends to benchmark. Empty means no benchmark.
+            profile (str | None): Profiler name, or "auto" for the default one. None means no profiling.
+            watch (bool): Whether to rebuild and rerun whenever the source file changes.
+            quick (int): Number of cases run first for an early summary in watch mode.
+            stage (Path | None): RAM-backed directory to stage the inputs and the executable in. None means no staging.
+            batch (bool): Whether to run many cases per solver process over the batch protocol.
+            cases_per_process (int): Number of cases after which a solver process is replaced in batch mode. 0 means never.
+            stderr_limit (int): Size [KB] of the tail of stderr kept per case. 0 means stderr is not captured.
+            pgo_cases (str): Cases to train the PGO build on, as a selector (see select_cases).
         """
 
         source: Path
-        number: int
+        cases: str
+        shard: tuple[int, int] | None
         build_mode: BuildMode
         timelimit: float
+        memory_limit: int | None
         score_type: ScoreType
+        jobs: int
+        seeds: int
+        backends: list[PythonBackend]
+        profile: str | None
+        watch: bool
+        quick: int
+        stage: Path | None
+        batch: bool
+        cases_per_process: int
+        stderr_limit: int
+        pgo_cases: str
 
     def add_arguments(self) -> None:
         """Add arguments.
 
         source: Path to source file.
-        number: Number of cases to run.
+        cases: Cases to run.
+        shard: Shard of the cases to run.
         build-mode: Build mode.
         time-limit: Time limit for execution.
+        memory-limit: Memory limit for execution.
         score-type: Type of score.
+        jobs: Number of cases to run in parallel.
+        seeds: Number of runs with distinct seeds per case.
+        backends: Python backends to benchmark.
+        profile: Profiler to run each case under.
+        watch: Rebuild and rerun whenever the source file changes.
+        quick: Number of cases run first in watch mode.
+        stage: Directory to stage the inputs and the executable in.
+        batch: Run many cases per solver process.
+        cases-per-process: Number of cases per solver process in batch mode.
+        stderr-limit: Size of the tail of stderr kept per case.
+        pgo-cases: Cases to train the PGO build on.
         """
         self.parser.add_argument(
             "source",
@@ -130,9 +393,15 @@ class Run(Subcommand):
             help="Path to source file.",
         )
         self.parser.add_argument(
-            "number",
-            type=int,
-            help="Number of cases to run.",
+            "cases",
+            type=str,
+            help=(
+                "Cases to run. A number N runs the cases 0 to N-1, and 'all' the cases "
+                "in the manifest 'in/manifest.txt'. Otherwise, "
+                "comma-separated IDs (e.g. '3,7'), ranges (e.g. '10-20'), '@FILE' for "
+                "the IDs in a file, 'glob:PATTERN' for the inputs matching the pattern "
+                "or 'failed[:YYYYmmdd-HHMMSS]' for the cases that failed in a run."
+            ),
         )
         self.parser.add_argument(
             "-b",
@@ -142,6 +411,16 @@ class Run(Subcommand):
             default=Run.DEFAULT_MODE.value,
             help=f"Build mode. Default is '{Run.DEFAULT_MODE.value}'.",
         )
+        self.parser.add_argument(
+            "--shard",
+            type=str,
+            default=None,
+            metavar="I/N",
+            help=(
+                "Run only the I-th (1-based) of N deterministic slices of the cases, "
+                "so that N processes or machines can split them."
+            ),
+        )
         self.parser.add_argument(
             "-t",
             "--time-limit",
@@ -149,6 +428,16 @@ class Run(Subcommand):
             default=Run.DEFAULT_TIME_LIMIT,
             help=f"Time limit for execution. Default is {Run.DEFAULT_TIME_LIMIT:.1f} seconds.",
         )
+        self.parser.add_argument(
+            "-m",
+            "--memory-limit",
+            type=int,
+            default=None,
+            help=(
+                "Memory limit [MB] for execution. 0 means unlimited. "
+                "Default is the 'memory_limit' in the language config."
+            ),
+        )
         self.parser.add_argument(
             "-s",
             "--score-type",
@@ -162,6 +451,119 @@ class Run(Subcommand):
                 f"Default is '{Run.DEFAULT_SCORE_TYPE.value}'."
             ),
         )
+        self.parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=Run.DEFAULT_JOBS,
+            help=(
+                "Number of cases to run in parallel. "
+                "Running many cases at once may affect the execution time of each case. "
+                f"Default is {Run.DEFAULT_JOBS}."
+            ),
+        )
+        self.parser.add_argument(
+            "--seeds",
+            type=int,
+            default=Run.DEFAULT_SEEDS,
+            help=(
+                "Number of runs per case. If more than 1, each run gets a distinct seed "
+                "0, 1, ... in the environment variable 'SEED'. "
+                f"Default is {Run.DEFAULT_SEEDS}."
+            ),
+        )
+        self.parser.add_argument(
+            "--backends",
+            type=str,
+            default=None,
+            help=(
+                "Comma-separated Python backends to benchmark on the same cases "
+                f"({', '.join(backend.value for backend in PythonBackend)}). "
+                "Only for Python. Default is the 'backend' in the language config."
+            ),
+        )
+        self.parser.add_argument(
+            "--profile",
+            type=str,
+            nargs="?",
+            const="auto",
+            default=None,
+            choices=["auto", *PROFILERS],
+            help=(
+                "Run each case under a profiler and merge the profiles into "
+                "'scores/profile_*'. Without a value, cprofile is used for Python, "
+                "and perf (or gprof for C++) for native programs."
+            ),
+        )
+        self.parser.add_argument(
+            "--watch",
+            action="store_true",
+            help=(
+                "Rebuild and rerun whenever the source file, its local headers or "
+                "modules, or the language config change, cancelling the cases of the "
+                "previous build."
+            ),
+        )
+        self.parser.add_argument(
+            "--quick",
+            type=int,
+            default=Run.DEFAULT_QUICK,
+            help=(
+                "Number of cases run first in watch mode to show an early summary "
+                f"before the rest. 0 disables it. Default is {Run.DEFAULT_QUICK}."
+            ),
+        )
+        self.parser.add_argument(
+            "--stage",
+            type=str,
+            nargs="?",
+            const=str(DEFAULT_STAGE_ROOT),
+            default=None,
+            metavar="DIR",
+            help=(
+                "Copy the inputs and the executable to a RAM-backed directory and run "
+                "the cases from there, writing the outputs back in the background. "
+                f"Without a value, '{DEFAULT_STAGE_ROOT}' is used."
+            ),
+        )
+        self.parser.add_argument(
+            "--batch",
+            action="store_true",
+            help=(
+                "Run many cases in each solver process over the batch protocol. "
+                "Python solvers are run as is, and other solvers must implement it."
+            ),
+        )
+        self.parser.add_argument(
+            "--cases-per-process",
+            type=int,
+            default=Run.DEFAULT_CASES_PER_PROCESS,
+            help=(
+                "Number of cases after which a solver process is replaced by a fresh "
+                f"one in batch mode. 0 means never. Default is {Run.DEFAULT_CASES_PER_PROCESS}."
+            ),
+        )
+        self.parser.add_argument(
+            "--stderr-limit",
+            type=int,
+            default=Run.DEFAULT_STDERR_LIMIT,
+            metavar="KB",
+            help=(
+                "Size [KB] of the tail of the solver's stderr kept per case in "
+                "scores/stderr_YYYYmmdd-HHMMSS/. 0 passes stderr through to the terminal "
+                f"instead. Default is {Run.DEFAULT_STDERR_LIMIT}."
+            ),
+        )
+        self.parser.add_argument(
+            "--pgo-cases",
+            type=str,
+            default=Run.DEFAULT_PGO_CASES,
+            metavar="CASES",
+            help=(
+                "Cases to train the build on in the 'pgo' build mode, in the same form "
+                f"as 'cases'. Default is '{Run.DEFAULT_PGO_CASES}'."
+            ),
+        )
 
     def parse_args(self, args: argparse.Namespace) -> "Run.Args":
         """Parse the arguments.
@@ -169,121 +571,734 @@ class Run(Subcommand):
         Args:
             args (argparse.Namespace): Arguments.
 
+        Raises:
+            ValueError: If the shard, the number of jobs, seeds, quick cases or cases per
+                process, the stderr limit, or a backend is invalid.
+
         Returns:
             Run.Args: Parsed arguments.
         """
         source = Path(args.source).expanduser()
-        number: int = args.number
+        shard = None if args.shard is None else parse_shard(args.shard)
         build_mode = BuildMode.from_str(args.build_mode)
         timelimit: float = args.time_limit
+        memory_limit: int | None = args.memory_limit
         score_type = ScoreType.from_str(args.score_type)
+        jobs: int = args.jobs
+        if jobs < 1:
+            raise ValueError(f"Invalid number of jobs: {jobs}")
+        seeds: int = args.seeds
+        if seeds < 1:
+            raise ValueError(f"Invalid number of seeds: {seeds}")
+        quick: int = args.quick
+        if quick < 0:
+            raise ValueError(f"Invalid number of quick cases: {quick}")
+        cases_per_process: int = args.cases_per_process
+        if cases_per_process < 0:
+            raise ValueError(
+                f"Invalid number of cases per process: {cases_per_process}"
+            )
+        stderr_limit: int = args.stderr_limit
+        if stderr_limit < 0:
+            raise ValueError(f"Invalid stderr limit: {stderr_limit}")
+        backends: list[PythonBackend] = []
+        if args.backends is not None:
+            backends = [
+                PythonBackend.from_str(backend.strip())
+                for backend in args.backends.split(",")
+            ]
         return Run.Args(
             source=source,
-            number=number,
+            cases=args.cases,
+            shard=shard,
             build_mode=build_mode,
             timelimit=timelimit,
+            memory_limit=memory_limit,
             score_type=score_type,
+            jobs=jobs,
+            seeds=seeds,
+            backends=backends,
+            profile=args.profile,
+            watch=args.watch,
+            quick=quick,
+            stage=None if args.stage is None else Path(args.stage).expanduser(),
+            batch=args.batch,
+            cases_per_process=cases_per_process,
+            stderr_limit=stderr_limit,
+            pgo_cases=args.pgo_cases,
         )
 
-    def __run_single_case(
-        self,
-        *,
-        input_file: Path,
-        output_file: Path,
-        timelimit: float,
-        runner: ProgramRunner,
-    ) -> int:
-        """Run a single case.
+    def __make_output_dirs(self, cases: list[Case]) -> None:
+        """Create the directories of the outputs of cases.
 
-        Args:
-            input_file (Path): Path to the input file.
-            output_file (Path): Path to the output file.
-            timelimit (float): Time limit.
-            runner (ProgramRunner): Program runner.
+        Outputs are in subdirectories of the outputs directory if the inputs are,
+        e.g. with sharded inputs.
 
-        Raises:
-            CalledProcessError: If a runtime error occurs.
-            TimeoutExpired: If the time limit is exceeded.
-
-        Returns:
-            int: Score.
+        Args:
+            cases (list[Case]): Cases.
         """
-        logger.info(f"Running {input_file.name}")
-        with (
-            NamedTemporaryFile(mode="w") as tmpf,
-            input_file.open("r") as inf,
-            output_file.open("w") as ouf,
-        ):
-            solver_args = [tmpf.name]
-            try:
-                runner.run(
-                    args=solver_args,
-                    timeout=timelimit,
-                    stdin=inf,
-                    stdout=ouf,
-                )
-            except subprocess.CalledProcessError as e:
-                logger.error("Runtime error occured")
-                raise e
-            except subprocess.TimeoutExpired as e:
-                logger.error("Time limit exceeded")
-                raise e
-            with open(tmpf.name, "r") as in_tmpf:
-                score = int(in_tmpf.read())
-        return score
+        for output_dir in {case.output_file.parent for case in cases}:
+            output_dir.mkdir(parents=True, exist_ok=True)
 
     def __run_all_cases(
         self,
         *,
         project: Project,
-        runner: ProgramRunner,
-        number: int,
+        runner: ProgramRunner | BatchSolver,
+        case_ids: list[int],
+        timestamp: str,
         timelimit: float,
-    ) -> list[int]:
+        memory_limit: int | None,
+        jobs: int,
+        seeds: int,
+        cancel: threading.Event | None = None,
+        stage: Stage | None = None,
+        stderr_limit: int | None = None,
+    ) -> list[list[CaseResult]]:
         """Run all cases.
 
+        With more than one seed, each case is run once per seed and its outputs are
+        written to separate files. With a stage, the cases are run from it, and their
+        outputs are all written back when this returns. If some cases fail, the rest
+        are still run, and the failed cases are written to the failed cases file of
+        the run so that they can be rerun with the selector 'failed' and merged with
+        the successful ones, which are carried by the raised CasesFailed. The captured
+        stderr of each case is written to the stderr directory of the run, and its
+        last lines are logged for the failed cases.
+
         Args:
             project (Project): Project.
-            runner (ProgramRunner): Program runner.
-            number (int): Number of cases.
+            runner (ProgramRunner | BatchSolver): Program runner, or batch solver in batch mode.
+            case_ids (list[int]): IDs of the cases.
+            timestamp (str): Timestamp of the run.
             timelimit (float): Time limit.
+            memory_limit (int | None): Memory limit [MB]. None means unlimited.
+            jobs (int): Number of cases to run in parallel.
+            seeds (int): Number of runs with distinct seeds per case.
+            cancel (threading.Event | None, optional): Event to cancel the remaining cases. Defaults to None.
+            stage (Stage | None, optional): Stage to run the cases from. Defaults to None.
+            stderr_limit (int | None, optional): Size [bytes] of the tail of stderr kept per case.
+                Defaults to None (stderr is not captured).
+
+        Raises:
+            CasesFailed: If some cases do not finish successfully.
+            CancelledError: If `cancel` is set.
 
         Returns:
-            list[int]: Scores.
+            list[list[CaseResult]]: Results per case, each of which has results per seed.
         """
-        scores = [
-            self.__run_single_case(
+        seed_list: list[int | None] = [None] if seeds == 1 else list(range(seeds))
+        cases = [
+            Case(
+                case_id=case_id,
                 input_file=project.input_file(case_id),
-                output_file=project.output_file(case_id),
+                output_file=project.output_file(case_id, seed),
+                seed=seed,
+            )
+            for case_id in case_ids
+            for seed in seed_list
+        ]
+        self.__make_output_dirs(cases)
+        if stage is not None:
+            cases = stage.cases(cases)
+        results: dict[tuple[int, int | None], CaseResult] = {}
+        failed: list[CaseResult] = []
+        if isinstance(runner, BatchSolver):
+            case_results = runner.run_cases(
+                cases,
+                jobs=jobs,
                 timelimit=timelimit,
-                runner=runner,
+                memory_limit=memory_limit,
+                cancel=cancel,
+                stderr_limit=stderr_limit,
+            )
+        else:
+            case_results = run_cases(
+                runner,
+                cases,
+                jobs=jobs,
+                timelimit=timelimit,
+                memory_limit=memory_limit,
+                cancel=cancel,
+                stderr_limit=stderr_limit,
+            )
+        for result in case_results:
+            if stage is not None:
+                result = stage.write_back(result)
+            if self.__check_result(project, timestamp, result):
+                results[(result.case.case_id, result.case.seed)] = result
+            else:
+                failed.append(result)
+        if stage is not None:
+            stage.flush()
+        if failed:
+            failed_set = {result.case.case_id for result in failed}
+            failed_ids = sorted(failed_set)
+            write_ids(failed_file(project.scores_file(timestamp)), failed_ids)
+            first = min(failed, key=lambda result: result.case.case_id)
+            raise CasesFailed(
+                f"{len(failed_ids)} cases failed, the first of which is "
+                f"{first.case.input_file.name} ({first.verdict.description()}). "
+                f"Rerun them with 'failed:{timestamp}'",
+                [
+                    [results[(case_id, seed)] for seed in seed_list]
+                    for case_id in case_ids
+                    if case_id not in failed_set
+                ],
             )
-            for case_id in range(number)
+        return [
+            [results[(case_id, seed)] for seed in seed_list] for case_id in case_ids
         ]
-        return scores
 
-    def __write_scores(self, scores: list[int], scores_file: Path) -> None:
-        """Write scores to a file.
+    def __check_result(
+        self, project: Project, timestamp: str, result: CaseResult
+    ) -> bool:
+        """Report the result of a case and keep its stderr.
+
+        Args:
+            project (Project): Project.
+            timestamp (str): Timestamp of the run.
+            result (CaseResult): Result of the case.
+
+        Returns:
+            bool: Whether the case finished successfully with a score.
+        """
+        if self.on_result is not None:
+            self.on_result(result)
+        if result.stderr:
+            self.__write_stderr(project, timestamp, result)
+        if result.verdict == Verdict.AC and result.score is not None:
+            return True
+        if result.stderr:
+            logger.error(
+                f"Last lines of stderr in {result.case.input_file.name}:\n"
+                + last_lines(result.stderr, Run.STDERR_TAIL_LINES)
+            )
+        return False
+
+    def __write_stderr(
+        self, project: Project, timestamp: str, result: CaseResult
+    ) -> None:
+        """Write the captured stderr of a case to the stderr directory of the run.
+
+        Args:
+            project (Project): Project.
+            timestamp (str): Timestamp of the run.
+            result (CaseResult): Result of the case, with the captured stderr.
+        """
+        assert result.stderr is not None
+        stderr_file = project.stderr_file(
+            timestamp, result.case.case_id, result.case.seed
+        )
+        stderr_file.parent.mkdir(parents=True, exist_ok=True)
+        stderr_file.write_text(result.stderr)
+
+    def __stderr_limit(self, args: "Run.Args") -> int | None:
+        """Get the size of the tail of stderr kept per case.
+
+        Args:
+            args (Run.Args): Arguments.
+
+        Returns:
+            int | None: Size [bytes]. None means stderr is not captured.
+        """
+        return None if args.stderr_limit == 0 else args.stderr_limit * 1024
+
+    def __write_scores(self, scores: list[list[int]], scores_file: Path) -> None:
+        """Write scores to a file, a line per case with scores per seed.
 
         Args:
-            scores (list[int]): Scores.
+            scores (list[list[int]]): Scores per case and seed.
             scores_file (Path): Path to the scores file.
         """
         with scores_file.open("w") as f:
-            for score in scores:
-                f.write(f"{score}\n")
+            for case_scores in scores:
+                f.write(" ".join(str(score) for score in case_scores) + "\n")
+
+    def __write_metrics(self, results: list[CaseResult], metrics_file: Path) -> None:
+        """Write the metrics to a file, a line per run with a column per metric.
+
+        Metrics missing in a run are written as '-'.
+
+        Args:
+            results (list[CaseResult]): Results of all runs.
+            metrics_file (Path): Path to the metrics file.
+        """
+        names = list(
+            dict.fromkeys(name for result in results for name in result.metrics)
+        )
+        with metrics_file.open("w") as f:
+            f.write("\t".join(["case", *names]) + "\n")
+            for result in results:
+                values = [
+                    f"{result.metrics[name]:g}" if name in result.metrics else "-"
+                    for name in names
+                ]
+                f.write("\t".join([result.case.output_file.stem, *values]) + "\n")
 
     def __write_scores_sum(
-        self, score_summary: ScoreSummary, scores_sum_file: Path
+        self,
+        score_summary: ScoreSummary,
+        seed_summary: SeedSummary | None,
+        metrics_summary: MetricsSummary | None,
+        scores_sum_file: Path,
     ) -> None:
         """Write scores summary to a file.
 
         Args:
             score_summary (ScoreSummary): Score summary.
+            seed_summary (SeedSummary | None): Summary of seeds. None if a case is run once.
+            metrics_summary (MetricsSummary | None): Summary of metrics. None if the solver reported none.
             scores_sum_file (Path): Path to the scores summary file.
         """
         with scores_sum_file.open("w") as f:
             f.write(f"{score_summary.pretty()}")
+            if seed_summary is not None:
+                f.write(f"\n{seed_summary.pretty()}")
+            if metrics_summary is not None:
+                f.write(f"\n{metrics_summary.pretty()}")
+
+    def __memory_limit(self, language: Language, args: "Run.Args") -> int | None:
+        """Resolve the memory limit from the arguments and the language config.
+
+        Args:
+            language (Language): Language of the source file.
+            args (Run.Args): Arguments.
+
+        Returns:
+            int | None: Memory limit [MB]. None means unlimited.
+        """
+        memory_limit = (
+            language.memory_limit if args.memory_limit is None else args.memory_limit
+        )
+        if memory_limit > 0:
+            logger.info(f"Memory limit: {memory_limit} MB")
+            return memory_limit
+        return None
+
+    def __benchmark_backends(
+        self,
+        project: Project,
+        args: "Run.Args",
+        case_ids: list[int],
+        timestamp: str,
+        stage: Stage | None,
+    ) -> None:
+        """Run all cases with each Python backend and write the comparison.
+
+        Args:
+            project (Project): Project.
+            args (Run.Args): Arguments.
+            case_ids (list[int]): IDs of the cases.
+            timestamp (str): Timestamp of the run.
+            stage (Stage | None): Stage to run the cases from. None means no staging.
+        """
+        summaries: list[BackendSummary] = []
+        mean_scores: list[float] = []
+        for backend in args.backends:
+            language = Python(
+                build_mode=args.build_mode,
+                config_file=project.config_file(Python),
+                backend=backend,
+            )
+            logger.info(f"Building the source file with {backend.value}")
+            runner = language.compile(args.source)
+            if stage is not None:
+                runner = stage.runner(runner)
+            logger.info(f"Running {len(case_ids)} cases with {backend.value}")
+            results = [
+                result
+                for case_results in self.__run_all_cases(
+                    project=project,
+                    runner=runner,
+                    case_ids=case_ids,
+                    timestamp=timestamp,
+                    timelimit=args.timelimit,
+                    memory_limit=self.__memory_limit(language, args),
+                    jobs=args.jobs,
+                    seeds=args.seeds,
+                    stage=stage,
+                    stderr_limit=self.__stderr_limit(args),
+                )
+                for result in case_results
+            ]
+            summaries.append(BackendSummary(backend, results))
+            mean_scores.append(
+                statistics.mean(
+                    args.score_type.transform(result.score or 0) for result in results
+                )
+            )
+
+        logger.info("Writing the benchmark of the backends")
+        backends_file = project.scores_dir / f"scores_{timestamp}.backends.txt"
+        backends_file.write_text(BackendSummary.pretty(summaries, mean_scores))
+
+    def __processed_scores(
+        self, args: "Run.Args", results: list[list[CaseResult]]
+    ) -> list[list[float]]:
+        """Transform the scores according to the score type.
+
+        Args:
+            args (Run.Args): Arguments.
+            results (list[list[CaseResult]]): Results per case and seed.
+
+        Returns:
+            list[list[float]]: Transformed scores per case and seed.
+        """
+        return [
+            [args.score_type.transform(result.score or 0) for result in case_results]
+            for case_results in results
+        ]
+
+    def __write_results(
+        self,
+        project: Project,
+        args: "Run.Args",
+        results: list[list[CaseResult]],
+        timestamp: str,
+    ) -> None:
+        """Write the scores, the metrics and their summary, and store the outputs.
+
+        Args:
+            project (Project): Project.
+            args (Run.Args): Arguments.
+            results (list[list[CaseResult]]): Results per case and seed.
+            timestamp (str): Timestamp of the run.
+        """
+        scores = [
+            [result.score or 0 for result in case_results] for case_results in results
+        ]
+
+        logger.info("Writing scores")
+        scores_file = project.scores_file(timestamp)
+        self.__write_scores(scores, scores_file)
+        case_ids = [case_results[0].case.case_id for case_results in results]
+        if case_ids != list(range(len(case_ids))):
+            write_ids(case_ids_file(scores_file), case_ids)
+
+        all_results = [result for case_results in results for result in case_results]
+        scores_processed = self.__processed_scores(args, results)
+        logger.info("Storing outputs")
+        OutputStore(project.store_dir).save_run(
+            timestamp,
+            [result.case.output_file for result in all_results],
+            project.outputs_dir,
+            statistics.mean(score for scores in scores_processed for score in scores),
+            case_ids,
+            args.score_type.value,
+        )
+
+        metrics_summary = None
+        if any(result.metrics for result in all_results):
+            logger.info("Writing metrics")
+            metrics_file = project.scores_dir / f"scores_{timestamp}.metrics.tsv"
+            self.__write_metrics(all_results, metrics_file)
+            metrics_summary = MetricsSummary([result.metrics for result in all_results])
+
+        logger.info("Writing scores summary")
+        score_summary = ScoreSummary(
+            [statistics.mean(case_scores) for case_scores in scores_processed]
+        )
+        seed_summary = (
+            SeedSummary(scores_processed, case_ids) if args.seeds > 1 else None
+        )
+        scores_sum_file = project.scores_dir / f"scores_{timestamp}.summary.txt"
+        self.__write_scores_sum(
+            score_summary, seed_summary, metrics_summary, scores_sum_file
+        )
+
+    def __run_and_write_scores(
+        self,
+        project: Project,
+        args: "Run.Args",
+        runner: ProgramRunner | BatchSolver,
+        case_ids: list[int],
+        memory_limit: int | None,
+        timestamp: str,
+        stage: Stage | None,
+    ) -> None:
+        """Run all cases and write the scores, the metrics and their summary.
+
+        Args:
+            project (Project): Project.
+            args (Run.Args): Arguments.
+            runner (ProgramRunner | BatchSolver): Program runner, or batch solver in batch mode.
+            case_ids (list[int]): IDs of the cases.
+            memory_limit (int | None): Memory limit [MB]. None means unlimited.
+            timestamp (str): Timestamp of the run.
+            stage (Stage | None): Stage to run the cases from. None means no staging.
+        """
+        if args.seeds > 1:
+            logger.info(f"Running {len(case_ids)} cases with {args.seeds} seeds each")
+        else:
+            logger.info(f"Running {len(case_ids)} cases")
+        try:
+            results = self.__run_all_cases(
+                project=project,
+                runner=runner,
+                case_ids=case_ids,
+                timestamp=timestamp,
+                timelimit=args.timelimit,
+                memory_limit=memory_limit,
+                jobs=args.jobs,
+                seeds=args.seeds,
+                stage=stage,
+                stderr_limit=self.__stderr_limit(args),
+            )
+        except CasesFailed as e:
+            # The successful cases are kept, so that the run is completed by merging
+            # it with the rerun of the failed cases
+            if e.results:
+                logger.info(f"Writing the scores of {len(e.results)} successful cases")
+                self.__write_results(project, args, e.results, timestamp)
+            raise
+        self.__write_results(project, args, results, timestamp)
+
+    def __watched_run(
+        self,
+        project: Project,
+        args: "Run.Args",
+        runner: ProgramRunner | BatchSolver,
+        case_ids: list[int],
+        memory_limit: int | None,
+        cancel: threading.Event,
+        stage: Stage | None,
+    ) -> None:
+        """Run the quick cases, log their summary, and then run the rest.
+
+        The scores are written with the timestamp of the start of the run, so that
+        the runs of successive builds can be compared. Errors are logged since the
+        run is in the background.
+
+        Args:
+            project (Project): Project.
+            args (Run.Args): Arguments.
+            runner (ProgramRunner | BatchSolver): Program runner, or batch solver in batch mode.
+            case_ids (list[int]): IDs of the cases.
+            memory_limit (int | None): Memory limit [MB]. None means unlimited.
+            cancel (threading.Event): Event to cancel the run.
+            stage (Stage | None): Stage to run the cases from. None means no staging.
+        """
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        batches = [case_ids[: args.quick], case_ids[args.quick :]]
+        results: list[list[CaseResult]] = []
+        try:
+            for batch in batches:
+                if not batch:
+                    continue
+                logger.info(f"Running {len(batch)} cases")
+                results += self.__run_all_cases(
+                    project=project,
+                    runner=runner,
+                    case_ids=batch,
+                    timestamp=timestamp,
+                    timelimit=args.timelimit,
+                    memory_limit=memory_limit,
+                    jobs=args.jobs,
+                    seeds=args.seeds,
+                    cancel=cancel,
+                    stage=stage,
+                    stderr_limit=self.__stderr_limit(args),
+                )
+                if len(results) < len(case_ids):
+                    summary = ScoreSummary(
+                        [
+                            statistics.mean(case_scores)
+                            for case_scores in self.__processed_scores(args, results)
+                        ]
+                    )
+                    logger.info(f"Summary of {len(results)} cases:\n{summary.pretty()}")
+            self.__write_results(project, args, results, timestamp)
+            logger.info(
+                f"All done successfully ({project.scores_file(timestamp).name})"
+            )
+        except Exception as e:
+            if cancel.is_set():
+                logger.info("Cancelled the run of the previous build")
+                return
+            logger.error(f"Run failed: {e}")
+            if isinstance(e, CasesFailed) and results + e.results:
+                self.__write_results(project, args, results + e.results, timestamp)
+
+    def __watch(
+        self,
+        Lang: type[Language],
+        project: Project,
+        args: "Run.Args",
+        case_ids: list[int],
+        stage: Stage | None,
+    ) -> None:
+        """Rebuild and rerun whenever the source file or its dependencies change.
+
+        The language config and the local files the source depends on (see
+        local_dependencies) are watched too. When they change, the cases of the
+        previous build are cancelled and the running ones are killed. It runs
+        until interrupted with Ctrl-C.
+
+        Args:
+            Lang (type[Language]): Language of the source file.
+            project (Project): Project.
+            args (Run.Args): Arguments.
+            case_ids (list[int]): IDs of the cases.
+            stage (Stage | None): Stage to run the cases from. None means no staging.
+        """
+        config_file = project.config_file(Lang)
+        try:
+            while True:
+                watcher = FileWatcher([*local_dependencies(args.source), config_file])
+                cancel = threading.Event()
+                runner: ProgramRunner | BatchSolver | None = None
+                thread: threading.Thread | None = None
+                try:
+                    language = self.__language(Lang, project, args, None)
+                    logger.info("Building the source file")
+                    program_runner = language.compile(args.source)
+                    if stage is not None:
+                        program_runner = stage.runner(program_runner)
+                    runner = program_runner
+                    if args.batch:
+                        runner = self.__batch_solver(Lang, program_runner, args)
+                    thread = threading.Thread(
+                        target=self.__watched_run,
+                        args=(
+                            project,
+                            args,
+                            runner,
+                            case_ids,
+                            self.__memory_limit(language, args),
+                            cancel,
+                            stage,
+                        ),
+                        daemon=True,
+                    )
+                    thread.start()
+                except Exception as e:
+                    logger.error(f"Build failed: {e}")
+                try:
+                    logger.info(f"Watching {len(watcher.files)} files for changes")
+                    changed = watcher.wait()
+                    logger.info(f"Changed: {', '.join(str(f) for f in changed)}")
+                finally:
+                    cancel.set()
+                    # Cases that started just before the cancellation are killed too
+                    while thread is not None and thread.is_alive():
+                        assert runner is not None
+                        runner.kill_running()
+                        thread.join(timeout=0.1)
+        except KeyboardInterrupt:
+            logger.info("Stopped watching")
+
+    def __batch_solver(
+        self, Lang: type[Language], runner: ProgramRunner, args: "Run.Args"
+    ) -> BatchSolver:
+        """Get the batch solver running the program.
+
+        Python solvers run on an interpreter are run by the batch harness, and
+        other programs are expected to implement the batch protocol.
+
+        Args:
+            Lang (type[Language]): Language of the source file.
+            runner (ProgramRunner): Program runner.
+            args (Run.Args): Arguments.
+
+        Raises:
+            ValueError: If a Python solver is compiled to a native executable.
+
+        Returns:
+            BatchSolver: Batch solver.
+        """
+        if Lang is Python:
+            if len(runner.exec_cmd) != 2:
+                raise ValueError(
+                    "Batch mode for Python needs an interpreter backend (cpython or pypy)"
+                )
+            logger.info("Running the cases in batch with the Python harness")
+            solver = BatchSolver.for_python(runner.exec_cmd)
+        else:
+            logger.info("Running the cases in batch over the batch protocol")
+            solver = BatchSolver(runner.exec_cmd)
+        solver.cases_per_process = args.cases_per_process
+        return solver
+
+    def __profiler(self, Lang: type[Language], args: "Run.Args") -> Profiler | None:
+        """Get the profiler requested by the arguments.
+
+        Args:
+            Lang (type[Language]): Language of the source file.
+            args (Run.Args): Arguments.
+
+        Raises:
+            ValueError: If the profiler is not available for the language.
+
+        Returns:
+            Profiler | None: Profiler. None if profiling is not requested.
+        """
+        if args.profile is None:
+            return None
+        if args.profile == "auto":
+            profiler = default_profiler(Lang)
+        else:
+            profiler = PROFILERS[args.profile]
+        assert_supported(profiler, Lang)
+        logger.info(f"Profiling with {profiler.NAME}")
+        return profiler()
+
+    def __language(
+        self,
+        Lang: type[Language],
+        project: Project,
+        args: "Run.Args",
+        profiler: Profiler | None,
+    ) -> Language:
+        """Set up the language of the source file.
+
+        Python solvers are profiled with CPython, and C++ solvers are compiled with
+        the flags needed by the profiler. In PGO mode, C++ solvers are trained on the
+        PGO cases.
+
+        Args:
+            Lang (type[Language]): Language of the source file.
+            project (Project): Project.
+            args (Run.Args): Arguments.
+            profiler (Profiler | None): Profiler. None if profiling is not requested.
+
+        Returns:
+            Language: Language.
+        """
+        config_file = project.config_file(Lang)
+        if profiler is not None and Lang is Python:
+            return Python(
+                build_mode=args.build_mode,
+                config_file=config_file,
+                backend=PythonBackend.CPYTHON,
+            )
+        if Lang is Cpp:
+            return Cpp(
+                build_mode=args.build_mode,
+                config_file=config_file,
+                extra_flags=None if profiler is None else profiler.COMPILE_FLAGS,
+                training=self.__pgo_training(project, args),
+            )
+        return Lang(build_mode=args.build_mode, config_file=config_file)
+
+    def __pgo_training(self, project: Project, args: "Run.Args") -> PgoTraining | None:
+        """Get the training runs of the PGO build.
+
+        Args:
+            project (Project): Project.
+            args (Run.Args): Arguments.
+
+        Returns:
+            PgoTraining | None: Training runs. None unless in PGO mode.
+        """
+        if args.build_mode != BuildMode.PGO:
+            return None
+        case_ids = select_cases(args.pgo_cases, project)
+        return PgoTraining(
+            [project.input_file(case_id) for case_id in case_ids],
+            args.jobs,
+            args.timelimit,
+        )
 
     def run(self, raw_args: argparse.Namespace) -> None:
         """Run the subcommand.
@@ -295,37 +1310,137 @@ class Run(Subcommand):
         logger.debug(f"Running subcommand 'run' with args: {args}")
         project_root = Project.search_project_root(args.source)
         project = Project(project_root)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        add_log_file(project.log_file(timestamp))
 
         logger.info("Detecting the language of the source file")
         Lang = detect_language(args.source)
         logger.info(f"Detected language: {Lang.__name__}")
-        source_language = Lang(
-            build_mode=args.build_mode, config_file=project.config_file(Lang)
-        )
+        if args.build_mode == BuildMode.PGO and Lang is not Cpp:
+            raise ValueError("PGO build mode is supported only for C++")
+        case_ids = self.__case_ids(project, args)
+        if args.stage is None:
+            self.__run_language(Lang, project, args, case_ids, timestamp, None)
+        elif self.warm is not None:
+            logger.info(f"Staging the files in {args.stage}, kept by the daemon")
+            stage = self.warm.stage(args.stage)
+            self.__run_language(Lang, project, args, case_ids, timestamp, stage)
+        else:
+            logger.info(f"Staging the files in {args.stage}")
+            with Stage(args.stage) as stage:
+                self.__run_language(Lang, project, args, case_ids, timestamp, stage)
+
+    def __case_ids(self, project: Project, args: "Run.Args") -> list[int]:
+        """Select the cases to run, taking the shard if requested.
+
+        Args:
+            project (Project): Project.
+            args (Run.Args): Arguments.
+
+        Raises:
+            ValueError: If no cases are selected.
+
+        Returns:
+            list[int]: IDs of the cases.
+        """
+        case_ids = select_cases(args.cases, project)
+        if args.shard is None:
+            return case_ids
+        index, count = args.shard
+        shard = shard_cases(case_ids, index, count)
+        logger.info(f"Shard {index}/{count}: {len(shard)} of {len(case_ids)} cases")
+        if not shard:
+            raise ValueError(f"Shard {index}/{count} has no cases")
+        return shard
+
+    def __run_language(
+        self,
+        Lang: type[Language],
+        project: Project,
+        args: "Run.Args",
+        case_ids: list[int],
+        timestamp: str,
+        stage: Stage | None,
+    ) -> None:
+        """Build and run the source file in the mode requested by the arguments.
+
+        Args:
+            Lang (type[Language]): Language of the source file.
+            project (Project): Project.
+            args (Run.Args): Arguments.
+            case_ids (list[int]): IDs of the cases.
+            timestamp (str): Timestamp of the run.
+            stage (Stage | None): Stage to run the cases from. None means no staging.
+
+        Raises:
+            ValueError: If backends are given for a source file other than Python, or
+                together with a profiler, or if watch mode or batch mode is combined
+                with either.
+        """
+        if args.batch and (args.backends or args.profile is not None):
+            raise ValueError(
+                "Batch mode cannot be combined with backends or a profiler"
+            )
+        if args.watch:
+            if args.backends or args.profile is not None:
+                raise ValueError(
+                    "Watch mode cannot be combined with backends or a profiler"
+                )
+            self.__watch(Lang, project, args, case_ids, stage)
+            return
+        if args.backends:
+            if Lang is not Python:
+                raise ValueError("Backends can be benchmarked only for Python")
+            if args.profile is not None:
+                raise ValueError("Backends cannot be benchmarked with a profiler")
+            self.__benchmark_backends(project, args, case_ids, timestamp, stage)
+            logger.info("All done successfully")
+            return
+        profiler = self.__profiler(Lang, args)
+        source_language = self.__language(Lang, project, args, profiler)
 
         logger.info("Building the source file")
-        runner = source_language.compile(args.source)
-
-        logger.info(f"Running {args.number} cases")
-        scores = self.__run_all_cases(
-            project=project,
-            runner=runner,
-            number=args.number,
-            timelimit=args.timelimit,
+        runner = (
+            source_language.compile(args.source)
+            if self.warm is None
+            else self.warm.compile(source_language, args.source)
         )
+        if stage is not None:
+            runner = stage.runner(runner)
+        memory_limit = self.__memory_limit(source_language, args)
 
-        logger.info("Writing scores")
-        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-        scores_file = project.scores_dir / f"scores_{timestamp}.txt"
-        self.__write_scores(scores, scores_file)
-
-        logger.info("Writing scores summary")
-        scores_processed: list[int] | list[float]
-        if args.score_type == ScoreType.LOG:
-            scores_processed = [math.log(score) for score in scores]
+        if args.batch:
+            self.__run_and_write_scores(
+                project,
+                args,
+                self.__batch_solver(Lang, runner, args),
+                case_ids,
+                memory_limit,
+                timestamp,
+                stage,
+            )
+        elif profiler is None:
+            self.__run_and_write_scores(
+                project, args, runner, case_ids, memory_limit, timestamp, stage
+            )
         else:
-            scores_processed = scores
-        scores_sum_file = project.scores_dir / f"scores_{timestamp}.summary.txt"
-        self.__write_scores_sum(ScoreSummary(scores_processed), scores_sum_file)
+            with TemporaryDirectory() as profile_dir:
+                profiling_runner = ProfilingRunner(runner, profiler, Path(profile_dir))
+                self.__run_and_write_scores(
+                    project,
+                    args,
+                    profiling_runner,
+                    case_ids,
+                    memory_limit,
+                    timestamp,
+                    stage,
+                )
+                logger.info("Merging the profiles")
+                report = profiling_runner.report()
+            report_file = (
+                project.scores_dir / f"profile_{timestamp}{profiler.REPORT_SUFFIX}"
+            )
+            report_file.write_text(report)
+            logger.info(f"Profile written to {report_file}")
 
         logger.info("All done successfully")
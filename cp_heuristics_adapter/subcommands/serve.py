@@ -0,0 +1,109 @@
+import argparse
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+from cp_heuristics_adapter.daemon import Daemon, request
+from cp_heuristics_adapter.project import Project
+from cp_heuristics_adapter.subcommands.subcommand import Subcommand
+
+logger = logging.getLogger(__name__)
+
+
+class Serve(Subcommand):
+    """Subcommand 'serve'.
+
+    Run a daemon for the project in the foreground. While it is running, 'run' and
+    'compare' in the project are sent to it and reuse the builds and stages it
+    keeps warm.
+    """
+
+    @dataclass(frozen=True)
+    class Args:
+        """Arguments for the 'serve' subcommand.
+
+        Attributes:
+            path (Path): Path to the project directory.
+            status (bool): Whether to show the status of the running daemon instead.
+            stop (bool): Whether to stop the running daemon instead.
+        """
+
+        path: Path
+        status: bool
+        stop: bool
+
+    def add_arguments(self) -> None:
+        """Add arguments.
+
+        path: Path to the project directory.
+        status: Show the status of the running daemon.
+        stop: Stop the running daemon.
+        """
+        self.parser.add_argument(
+            "-p", "--path", type=str, default=".", help="Path to project directory"
+        )
+        group = self.parser.add_mutually_exclusive_group()
+        group.add_argument(
+            "--status",
+            action="store_true",
+            help="Show the status of the running daemon instead of starting one.",
+        )
+        group.add_argument(
+            "--stop",
+            action="store_true",
+            help="Stop the running daemon after its running command.",
+        )
+
+    def parse_args(self, args: argparse.Namespace) -> "Serve.Args":
+        """Parse the arguments.
+
+        Args:
+            args (argparse.Namespace): Arguments.
+
+        Returns:
+            Serve.Args: Parsed arguments.
+        """
+        return Serve.Args(
+            path=Path(args.path).expanduser(), status=args.status, stop=args.stop
+        )
+
+    def run(self, raw_args: argparse.Namespace) -> None:
+        """Run the subcommand.
+
+        Args:
+            raw_args (argparse.Namespace): Raw arguments.
+
+        Raises:
+            RuntimeError: If a daemon is already running for the project, or the
+                platform has no Unix sockets.
+            ConnectionError: If --status or --stop is given and no daemon is running.
+        """
+        args = self.parse_args(raw_args)
+        logger.debug(f"Running subcommand 'serve' with args: {args}")
+        project_root = Project.search_project_root(args.path.resolve())
+
+        if args.status:
+            for reply in request(project_root, {"command": "status"}):
+                running = reply["running"]
+                print(f"pid: {reply['pid']}")
+                print(f"project: {reply['project']}")
+                print(f"uptime: {reply['uptime_s']} s")
+                print(f"running: {'-' if running is None else ' '.join(running)}")
+                for item in reply["queued"]:
+                    print(
+                        f"queued: {' '.join(item['argv'])} (priority {item['priority']})"
+                    )
+                print(f"builds: {reply['builds']}")
+                for stage in reply["stages"]:
+                    print(f"stage: {stage}")
+            return
+        if args.stop:
+            for _ in request(project_root, {"command": "stop"}):
+                logger.info(f"Stopped the daemon of {project_root}")
+            return
+
+        daemon = Daemon(project_root)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Interrupted")
@@ -0,0 +1,201 @@
+import argparse
+import logging
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from cp_heuristics_adapter.features import (
+    FeatureIndex,
+    FeatureSpec,
+    SliceSummary,
+    bucketize,
+)
+from cp_heuristics_adapter.project import Project
+from cp_heuristics_adapter.selection import resolve_run, scores_by_case
+from cp_heuristics_adapter.subcommands.run import ScoreType
+from cp_heuristics_adapter.subcommands.subcommand import Subcommand
+
+logger = logging.getLogger(__name__)
+
+
+class Slice(Subcommand):
+    """Subcommand 'slice'.
+
+    Slice the scores of runs by the features of the inputs.
+
+    Attributes:
+        DEFAULT_SCORE_TYPE (ScoreType): Default score type.
+        DEFAULT_JOBS (int): Default number of extractions to run in parallel.
+    """
+
+    DEFAULT_SCORE_TYPE = ScoreType.PLAIN
+    DEFAULT_JOBS = 1
+
+    @dataclass(frozen=True)
+    class Args:
+        """Arguments for the 'slice' subcommand.
+
+        Attributes:
+            runs (list[str]): Runs to slice. Empty means all runs.
+            path (Path): Path to the project directory.
+            config (Path | None): Path to the feature extractor. None means the project's features.toml.
+            features (list[str]): Features to slice by. Empty means all features.
+            buckets (int | None): Number of buckets per feature. None means the one in the config.
+            score_type (ScoreType): Type of score.
+            jobs (int): Number of extractions to run in parallel.
+        """
+
+        runs: list[str]
+        path: Path
+        config: Path | None
+        features: list[str]
+        buckets: int | None
+        score_type: ScoreType
+        jobs: int
+
+    def add_arguments(self) -> None:
+        """Add arguments.
+
+        runs: Runs to slice.
+        path: Path to the project directory.
+        config: Path to the feature extractor.
+        feature: Feature to slice by.
+        buckets: Number of buckets per feature.
+        score-type: Type of score.
+        jobs: Number of extractions to run in parallel.
+        """
+        self.parser.add_argument(
+            "runs",
+            type=str,
+            nargs="*",
+            help=(
+                "Runs to slice: timestamps (YYYYmmdd-HHMMSS), baseline names or paths "
+                "to scores files. Default is all runs."
+            ),
+        )
+        self.parser.add_argument(
+            "-p", "--path", type=str, default=".", help="Path to project directory"
+        )
+        self.parser.add_argument(
+            "-c",
+            "--config",
+            type=str,
+            default=None,
+            help="Path to the feature extractor. Default is '.cp-heuristics-adapter/features.toml'.",
+        )
+        self.parser.add_argument(
+            "-f",
+            "--feature",
+            type=str,
+            action="append",
+            default=[],
+            help="Feature to slice by. Can be given more than once. Default is all features.",
+        )
+        self.parser.add_argument(
+            "-b",
+            "--buckets",
+            type=int,
+            default=None,
+            help="Number of buckets per feature. Default is the 'buckets' in the config.",
+        )
+        self.parser.add_argument(
+            "-s",
+            "--score-type",
+            type=str,
+            choices=[score_type.value for score_type in ScoreType],
+            default=Slice.DEFAULT_SCORE_TYPE.value,
+            help=(
+                "Type of score to average over cases. "
+                f"Default is '{Slice.DEFAULT_SCORE_TYPE.value}'."
+            ),
+        )
+        self.parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=Slice.DEFAULT_JOBS,
+            help=(
+                "Number of inputs to extract the features of in parallel. "
+                f"Default is {Slice.DEFAULT_JOBS}."
+            ),
+        )
+
+    def parse_args(self, args: argparse.Namespace) -> "Slice.Args":
+        """Parse the arguments.
+
+        Args:
+            args (argparse.Namespace): Arguments.
+
+        Raises:
+            ValueError: If the number of buckets or jobs is invalid.
+
+        Returns:
+            Slice.Args: Parsed arguments.
+        """
+        if args.buckets is not None and args.buckets < 1:
+            raise ValueError(f"Invalid number of buckets: {args.buckets}")
+        if args.jobs < 1:
+            raise ValueError(f"Invalid number of jobs: {args.jobs}")
+        return Slice.Args(
+            runs=args.runs,
+            path=Path(args.path).expanduser(),
+            config=None if args.config is None else Path(args.config).expanduser(),
+            features=args.feature,
+            buckets=args.buckets,
+            score_type=ScoreType.from_str(args.score_type),
+            jobs=args.jobs,
+        )
+
+    def run(self, raw_args: argparse.Namespace) -> None:
+        """Run the subcommand.
+
+        Args:
+            raw_args (argparse.Namespace): Raw arguments.
+
+        Raises:
+            FileNotFoundError: If a run or an input is not found.
+            ValueError: If a feature is not extracted from any input.
+            RuntimeError: If the extractor fails.
+        """
+        args = self.parse_args(raw_args)
+        logger.debug(f"Running subcommand 'slice' with args: {args}")
+        project = Project(Project.search_project_root(args.path.resolve()))
+        spec = FeatureSpec.load(
+            args.config if args.config is not None else project.features_config_file
+        )
+
+        scores_files = (
+            [resolve_run(project, run) for run in args.runs]
+            if args.runs
+            else project.scores_files()
+        )
+        if not scores_files:
+            raise FileNotFoundError(f"No runs found in {project.scores_dir}")
+        runs = {
+            scores_file.stem.removeprefix("scores_"): {
+                case_id: args.score_type.transform(score)
+                for case_id, score in scores_by_case(scores_file).items()
+            }
+            for scores_file in scores_files
+        }
+
+        case_ids = sorted({case_id for scores in runs.values() for case_id in scores})
+        index = FeatureIndex(project.features_index_file, spec.command, project.root)
+        features = index.features(
+            [project.input_file(case_id) for case_id in case_ids], jobs=args.jobs
+        )
+        names = args.features or list(
+            dict.fromkeys(name for case_features in features for name in case_features)
+        )
+        for name in names:
+            values = {
+                case_id: case_features[name]
+                for case_id, case_features in zip(case_ids, features)
+                if name in case_features
+            }
+            if not values:
+                raise ValueError(f"No input has the feature '{name}'")
+            buckets = bucketize(
+                values, args.buckets if args.buckets is not None else spec.buckets
+            )
+            sys.stdout.write(SliceSummary(name, buckets, runs).pretty() + "\n")
@@ -0,0 +1,412 @@
+import argparse
+import datetime
+import logging
+import math
+import os
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from cp_heuristics_adapter.executor import Case, Verdict, run_cases
+from cp_heuristics_adapter.languages import BuildMode, Cpp, Language, detect_language
+from cp_heuristics_adapter.pgo import PgoTraining
+from cp_heuristics_adapter.project import Project
+from cp_heuristics_adapter.runner import ProgramRunner
+from cp_heuristics_adapter.setup_logger import add_log_file
+from cp_heuristics_adapter.subcommands.run import Run, ScoreType
+from cp_heuristics_adapter.subcommands.subcommand import Subcommand
+from cp_heuristics_adapter.tuning import (
+    Evaluator,
+    RandomSampler,
+    Sampler,
+    SearchSpace,
+    Study,
+    TPESampler,
+    Trial,
+    TrialState,
+    Tuner,
+    halving_budgets,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Tune(Subcommand):
+    """Subcommand 'tune'.
+
+    Search the parameters of the solver, compiling it once and running trials in parallel.
+
+    Attributes:
+        DEFAULT_MODE (BuildMode): Default build mode.
+        DEFAULT_TRIALS (int): Default number of trials.
+        DEFAULT_SAMPLER (str): Default sampler.
+        DEFAULT_ETA (int): Default reduction factor of successive halving.
+        DEFAULT_MIN_CASES (int): Default minimum number of cases in the first rung.
+        SAMPLERS (dict[str, type[Sampler]]): Available samplers.
+    """
+
+    DEFAULT_MODE = BuildMode.RELEASE
+    DEFAULT_TRIALS = 20
+    DEFAULT_SAMPLER = "tpe"
+    DEFAULT_ETA = 3
+    DEFAULT_MIN_CASES = 4
+    SAMPLERS: dict[str, type[Sampler]] = {
+        "random": RandomSampler,
+        "tpe": TPESampler,
+    }
+
+    @dataclass(frozen=True)
+    class Args:
+        """Arguments for the 'tune' subcommand.
+
+        Attributes:
+            source (Path): Path to source file.
+            number (int): Number of cases to evaluate trials on.
+            config (Path | None): Path to the parameter space. None means the project's tune.toml.
+            study (str): Name of the study.
+            trials (int): Total number of trials.
+            sampler (str): Sampler of parameter values.
+            halving (bool): Whether to prune trials by successive halving.
+            eta (int): Reduction factor of successive halving.
+            min_cases (int): Minimum number of cases in the first rung.
+            batch_size (int | None): Number of trials sampled at once. None means automatic.
+            seed (int | None): Seed of the sampler.
+            build_mode (BuildMode): Build mode.
+            timelimit (float): Time limit for execution.
+            memory_limit (int | None): Memory limit [MB]. None means the language config.
+            score_type (ScoreType): Type of score.
+            jobs (int): Number of cases to run in parallel.
+        """
+
+        source: Path
+        number: int
+        config: Path | None
+        study: str
+        trials: int
+        sampler: str
+        halving: bool
+        eta: int
+        min_cases: int
+        batch_size: int | None
+        seed: int | None
+        build_mode: BuildMode
+        timelimit: float
+        memory_limit: int | None
+        score_type: ScoreType
+        jobs: int
+
+    def add_arguments(self) -> None:
+        """Add arguments.
+
+        source: Path to source file.
+        number: Number of cases to evaluate trials on.
+        config: Path to the parameter space.
+        study: Name of the study.
+        trials: Total number of trials.
+        sampler: Sampler of parameter values.
+        halving: Whether to prune trials by successive halving.
+        eta: Reduction factor of successive halving.
+        min-cases: Minimum number of cases in the first rung.
+        batch-size: Number of trials sampled at once.
+        seed: Seed of the sampler.
+        build-mode: Build mode.
+        time-limit: Time limit for execution.
+        memory-limit: Memory limit for execution.
+        score-type: Type of score.
+        jobs: Number of cases to run in parallel.
+        """
+        self.parser.add_argument("source", type=str, help="Path to source file.")
+        self.parser.add_argument(
+            "number", type=int, help="Number of cases to evaluate trials on."
+        )
+        self.parser.add_argument(
+            "-c",
+            "--config",
+            type=str,
+            default=None,
+            help="Path to the parameter space. Default is '.cp-heuristics-adapter/tune.toml'.",
+        )
+        self.parser.add_argument(
+            "--study",
+            type=str,
+            default=None,
+            help=(
+                "Name of the study. Trials are recorded in 'scores/study_<name>.jsonl' "
+                "and an existing study is resumed. Default is the stem of the source file."
+            ),
+        )
+        self.parser.add_argument(
+            "-n",
+            "--trials",
+            type=int,
+            default=Tune.DEFAULT_TRIALS,
+            help=f"Total number of trials. Default is {Tune.DEFAULT_TRIALS}.",
+        )
+        self.parser.add_argument(
+            "--sampler",
+            type=str,
+            choices=list(Tune.SAMPLERS),
+            default=Tune.DEFAULT_SAMPLER,
+            help=f"Sampler of parameter values. Default is '{Tune.DEFAULT_SAMPLER}'.",
+        )
+        self.parser.add_argument(
+            "--halving",
+            action="store_true",
+            help="Prune bad trials early by successive halving.",
+        )
+        self.parser.add_argument(
+            "--eta",
+            type=int,
+            default=Tune.DEFAULT_ETA,
+            help=(
+                "Reduction factor of successive halving. "
+                f"Default is {Tune.DEFAULT_ETA}."
+            ),
+        )
+        self.parser.add_argument(
+            "--min-cases",
+            type=int,
+            default=Tune.DEFAULT_MIN_CASES,
+            help=(
+                "Minimum number of cases in the first rung of successive halving. "
+                f"Default is {Tune.DEFAULT_MIN_CASES}."
+            ),
+        )
+        self.parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of trials sampled at once. Default depends on the other options.",
+        )
+        self.parser.add_argument(
+            "--seed", type=int, default=None, help="Seed of the sampler."
+        )
+        self.parser.add_argument(
+            "-b",
+            "--build-mode",
+            type=str,
+            choices=[mode.value for mode in BuildMode],
+            default=Tune.DEFAULT_MODE.value,
+            help=f"Build mode. Default is '{Tune.DEFAULT_MODE.value}'.",
+        )
+        self.parser.add_argument(
+            "-t",
+            "--time-limit",
+            type=float,
+            default=Run.DEFAULT_TIME_LIMIT,
+            help=f"Time limit for execution. Default is {Run.DEFAULT_TIME_LIMIT:.1f} seconds.",
+        )
+        self.parser.add_argument(
+            "-m",
+            "--memory-limit",
+            type=int,
+            default=None,
+            help=(
+                "Memory limit [MB] for execution. 0 means unlimited. "
+                "Default is the 'memory_limit' in the language config."
+            ),
+        )
+        self.parser.add_argument(
+            "-s",
+            "--score-type",
+            type=str,
+            choices=[score_type.value for score_type in ScoreType],
+            default=Run.DEFAULT_SCORE_TYPE.value,
+            help=(
+                "Type of score to average over cases. "
+                f"Default is '{Run.DEFAULT_SCORE_TYPE.value}'."
+            ),
+        )
+        self.parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=Run.DEFAULT_JOBS,
+            help=f"Number of cases to run in parallel. Default is {Run.DEFAULT_JOBS}.",
+        )
+
+    def parse_args(self, args: argparse.Namespace) -> "Tune.Args":
+        """Parse the arguments.
+
+        Args:
+            args (argparse.Namespace): Arguments.
+
+        Raises:
+            ValueError: If a numerical option is out of range.
+
+        Returns:
+            Tune.Args: Parsed arguments.
+        """
+        source = Path(args.source).expanduser()
+        study: str = args.study if args.study is not None else source.stem
+        if args.number < 1:
+            raise ValueError(f"Invalid number of cases: {args.number}")
+        if args.jobs < 1:
+            raise ValueError(f"Invalid number of jobs: {args.jobs}")
+        if args.eta < 2:
+            raise ValueError(f"Invalid reduction factor: {args.eta}")
+        if args.batch_size is not None and args.batch_size < 1:
+            raise ValueError(f"Invalid batch size: {args.batch_size}")
+        return Tune.Args(
+            source=source,
+            number=args.number,
+            config=None if args.config is None else Path(args.config).expanduser(),
+            study=study,
+            trials=args.trials,
+            sampler=args.sampler,
+            halving=args.halving,
+            eta=args.eta,
+            min_cases=args.min_cases,
+            batch_size=args.batch_size,
+            seed=args.seed,
+            build_mode=BuildMode.from_str(args.build_mode),
+            timelimit=args.time_limit,
+            memory_limit=args.memory_limit,
+            score_type=ScoreType.from_str(args.score_type),
+            jobs=args.jobs,
+        )
+
+    def __evaluator(
+        self,
+        *,
+        project: Project,
+        runner: ProgramRunner,
+        space: SearchSpace,
+        timelimit: float,
+        memory_limit: int | None,
+        jobs: int,
+    ) -> Evaluator:
+        """Create an evaluator running (trial, case) pairs in parallel.
+
+        Outputs of the solver are discarded, since trials run the same cases concurrently.
+
+        Args:
+            project (Project): Project.
+            runner (ProgramRunner): Program runner of the compiled solver.
+            space (SearchSpace): Search space.
+            timelimit (float): Time limit.
+            memory_limit (int | None): Memory limit [MB]. None means unlimited.
+            jobs (int): Number of cases to run in parallel.
+
+        Returns:
+            Evaluator: Evaluator.
+        """
+
+        def evaluate(
+            tasks: list[tuple[Trial, int]],
+        ) -> Iterator[tuple[Trial, int, int | None]]:
+            cases = [
+                Case(
+                    case_id=case_id,
+                    input_file=project.input_file(case_id),
+                    output_file=Path(os.devnull),
+                    args=tuple(space.solver_args(trial.params)),
+                    env=space.solver_env(trial.params),
+                )
+                for trial, case_id in tasks
+            ]
+            # Cases of trials with the same parameters are equal, so they are told
+            # apart by identity
+            trials = {id(case): trial for case, (trial, _) in zip(cases, tasks)}
+            for result in run_cases(
+                runner,
+                cases,
+                jobs=jobs,
+                timelimit=timelimit,
+                memory_limit=memory_limit,
+            ):
+                score = result.score if result.verdict == Verdict.AC else None
+                yield trials[id(result.case)], result.case.case_id, score
+
+        return evaluate
+
+    def run(self, raw_args: argparse.Namespace) -> None:
+        """Run the subcommand.
+
+        Args:
+            raw_args (argparse.Namespace): Raw arguments.
+        """
+        args = self.parse_args(raw_args)
+        logger.debug(f"Running subcommand 'tune' with args: {args}")
+        project_root = Project.search_project_root(args.source)
+        project = Project(project_root)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        add_log_file(project.log_file(timestamp))
+
+        space = SearchSpace.load(
+            args.config if args.config is not None else project.tune_config_file
+        )
+        logger.info(f"Parameters: {[param.name for param in space.params]}")
+
+        Lang = detect_language(args.source)
+        logger.info(f"Detected language: {Lang.__name__}")
+        if args.build_mode == BuildMode.PGO:
+            if Lang is not Cpp:
+                raise ValueError("PGO build mode is supported only for C++")
+            # The build is trained on the cases of the study, with the default parameters
+            source_language: Language = Cpp(
+                build_mode=args.build_mode,
+                config_file=project.config_file(Cpp),
+                training=PgoTraining(
+                    [project.input_file(case_id) for case_id in range(args.number)],
+                    args.jobs,
+                    args.timelimit,
+                ),
+            )
+        else:
+            source_language = Lang(
+                build_mode=args.build_mode, config_file=project.config_file(Lang)
+            )
+        logger.info("Building the source file")
+        runner = source_language.compile(args.source)
+
+        memory_limit = (
+            source_language.memory_limit
+            if args.memory_limit is None
+            else args.memory_limit
+        )
+
+        case_ids = list(range(args.number))
+        if args.halving:
+            budgets = halving_budgets(args.number, args.min_cases, args.eta)
+            default_batch_size = args.eta ** (len(budgets) - 1)
+        else:
+            budgets = [args.number]
+            default_batch_size = max(1, math.ceil(args.jobs / args.number))
+        logger.info(f"Cases per rung: {budgets}")
+
+        study_file = project.study_file(args.study)
+        tuner = Tuner(
+            study=Study(study_file, space),
+            sampler=Tune.SAMPLERS[args.sampler](),
+            evaluator=self.__evaluator(
+                project=project,
+                runner=runner,
+                space=space,
+                timelimit=args.timelimit,
+                memory_limit=memory_limit if memory_limit > 0 else None,
+                jobs=args.jobs,
+            ),
+            case_ids=case_ids,
+            budgets=budgets,
+            eta=args.eta,
+            transform=args.score_type.transform,
+            seed=args.seed,
+        )
+        best = tuner.optimize(
+            n_trials=args.trials,
+            batch_size=args.batch_size or default_batch_size,
+        )
+
+        trials = tuner.study.trials
+        for state in TrialState:
+            count = sum(1 for trial in trials if trial.state == state)
+            logger.info(f"{state.value}: {count} trials")
+        if best is None:
+            logger.warning("No trial completed")
+            return
+        objective = best.objective(case_ids, args.score_type.transform)
+        logger.info(f"Best trial: {best.trial_id} (mean score: {objective:.2f})")
+        for name, value in best.params.items():
+            logger.info(f"  {name} = {value}")
+        logger.info(f"All trials are recorded in {study_file}")
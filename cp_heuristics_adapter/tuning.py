@@ -0,0 +1,870 @@
+import json
+import logging
+import math
+import random
+from abc import ABCMeta, abstractmethod
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+import toml
+
+from cp_heuristics_adapter.util import pathlib_util
+
+logger = logging.getLogger(__name__)
+
+ParamValue = int | float | str
+
+
+class ParamType(Enum):
+    """Type of a parameter.
+
+    INT: Integer in [low, high].
+    FLOAT: Real number in [low, high].
+    CATEGORICAL: One of the choices.
+    """
+
+    INT = "int"
+    FLOAT = "float"
+    CATEGORICAL = "categorical"
+
+    @staticmethod
+    def from_str(value: str) -> "ParamType":
+        """Get the ParamType from the value.
+
+        Args:
+            value (str): Value.
+
+        Raises:
+            ValueError: If the value is invalid.
+
+        Returns:
+            ParamType: ParamType.
+        """
+        for param_type in ParamType:
+            if param_type.value == value:
+                return param_type
+        raise ValueError(f"Invalid parameter type: {value}")
+
+
+class Direction(Enum):
+    """Direction of the optimization.
+
+    MAXIMIZE: Larger scores are better.
+    MINIMIZE: Smaller scores are better.
+    """
+
+    MAXIMIZE = "maximize"
+    MINIMIZE = "minimize"
+
+    @staticmethod
+    def from_str(value: str) -> "Direction":
+        """Get the Direction from the value.
+
+        Args:
+            value (str): Value.
+
+        Raises:
+            ValueError: If the value is invalid.
+
+        Returns:
+            Direction: Direction.
+        """
+        for direction in Direction:
+            if direction.value == value:
+                return direction
+        raise ValueError(f"Invalid direction: {value}")
+
+
+class PassBy(Enum):
+    """How parameters are passed to the solver.
+
+    ENV: As environment variables.
+    ARGS: As `--name=value` arguments following the score file path.
+    """
+
+    ENV = "env"
+    ARGS = "args"
+
+    @staticmethod
+    def from_str(value: str) -> "PassBy":
+        """Get the PassBy from the value.
+
+        Args:
+            value (str): Value.
+
+        Raises:
+            ValueError: If the value is invalid.
+
+        Returns:
+            PassBy: PassBy.
+        """
+        for pass_by in PassBy:
+            if pass_by.value == value:
+                return pass_by
+        raise ValueError(f"Invalid way to pass parameters: {value}")
+
+
+@dataclass(frozen=True)
+class Param:
+    """A parameter to tune.
+
+    Numerical parameters are mapped to the unit interval [0, 1] for sampling,
+    on a logarithmic scale if `log` is set.
+
+    Attributes:
+        name (str): Name of the parameter.
+        type (ParamType): Type of the parameter.
+        low (float): Lower bound of a numerical parameter.
+        high (float): Upper bound of a numerical parameter.
+        log (bool): Whether to sample a numerical parameter on a logarithmic scale.
+        choices (tuple[str, ...]): Choices of a categorical parameter.
+    """
+
+    name: str
+    type: ParamType
+    low: float = 0.0
+    high: float = 0.0
+    log: bool = False
+    choices: tuple[str, ...] = ()
+
+    def __post_init__(self) -> None:
+        if self.type == ParamType.CATEGORICAL:
+            if not self.choices:
+                raise ValueError(f"Parameter '{self.name}' has no choices")
+        else:
+            if self.low > self.high:
+                raise ValueError(f"Parameter '{self.name}' has low > high")
+            if self.log and self.low <= 0:
+                raise ValueError(
+                    f"Parameter '{self.name}' must be positive on log scale"
+                )
+
+    def to_unit(self, value: ParamValue) -> float:
+        """Map a numerical value to the unit interval.
+
+        Args:
+            value (ParamValue): Value of the parameter.
+
+        Returns:
+            float: Value in [0, 1].
+        """
+        assert self.type != ParamType.CATEGORICAL
+        if self.low == self.high:
+            return 0.5
+        x, low, high = float(value), self.low, self.high
+        if self.log:
+            x, low, high = math.log(x), math.log(low), math.log(high)
+        return min(1.0, max(0.0, (x - low) / (high - low)))
+
+    def from_unit(self, u: float) -> ParamValue:
+        """Map a value in the unit interval to a numerical value.
+
+        Args:
+            u (float): Value in [0, 1].
+
+        Returns:
+            ParamValue: Value of the parameter.
+        """
+        assert self.type != ParamType.CATEGORICAL
+        u = min(1.0, max(0.0, u))
+        if self.log:
+            x = math.exp(
+                math.log(self.low) + u * (math.log(self.high) - math.log(self.low))
+            )
+        else:
+            x = self.low + u * (self.high - self.low)
+        if self.type == ParamType.INT:
+            return min(int(self.high), max(int(self.low), round(x)))
+        return min(self.high, max(self.low, x))
+
+    def sample(self, rng: random.Random) -> ParamValue:
+        """Sample a value uniformly.
+
+        Args:
+            rng (random.Random): Random number generator.
+
+        Returns:
+            ParamValue: Value of the parameter.
+        """
+        if self.type == ParamType.CATEGORICAL:
+            return rng.choice(self.choices)
+        return self.from_unit(rng.random())
+
+    @staticmethod
+    def from_dict(name: str, spec: dict[str, Any]) -> "Param":
+        """Create a Param from its specification.
+
+        Args:
+            name (str): Name of the parameter.
+            spec (dict[str, Any]): Specification (type, low, high, log, choices).
+
+        Returns:
+            Param: Param.
+        """
+        param_type = ParamType.from_str(spec.get("type", ParamType.FLOAT.value))
+        if param_type == ParamType.CATEGORICAL:
+            return Param(
+                name=name,
+                type=param_type,
+                choices=tuple(str(choice) for choice in spec.get("choices", [])),
+            )
+        return Param(
+            name=name,
+            type=param_type,
+            low=float(spec["low"]),
+            high=float(spec["high"]),
+            log=bool(spec.get("log", False)),
+        )
+
+
+@dataclass(frozen=True)
+class SearchSpace:
+    """Parameters to tune and how to pass them to the solver.
+
+    Attributes:
+        params (tuple[Param, ...]): Parameters.
+        direction (Direction): Direction of the optimization.
+        pass_by (PassBy): How parameters are passed to the solver.
+    """
+
+    params: tuple[Param, ...]
+    direction: Direction = Direction.MAXIMIZE
+    pass_by: PassBy = PassBy.ENV
+
+    @staticmethod
+    def load(spec_file: Path) -> "SearchSpace":
+        """Load the search space from a TOML file.
+
+        Args:
+            spec_file (Path): Path to the specification file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the specification is invalid.
+
+        Returns:
+            SearchSpace: SearchSpace.
+        """
+        logger.info(f"loading search space from {spec_file}")
+        pathlib_util.assert_file_existence(spec_file)
+        spec = toml.load(spec_file)
+        params = tuple(
+            Param.from_dict(name, param_spec)
+            for name, param_spec in spec.get("params", {}).items()
+        )
+        if not params:
+            raise ValueError(f"No parameters are defined in {spec_file}")
+        return SearchSpace(
+            params=params,
+            direction=Direction.from_str(spec.get("direction", "maximize")),
+            pass_by=PassBy.from_str(spec.get("pass_by", "env")),
+        )
+
+    def solver_args(self, values: dict[str, ParamValue]) -> list[str]:
+        """Get the extra arguments for the solver.
+
+        Args:
+            values (dict[str, ParamValue]): Values of the parameters.
+
+        Returns:
+            list[str]: Arguments. Empty unless the parameters are passed by arguments.
+        """
+        if self.pass_by != PassBy.ARGS:
+            return []
+        return [f"--{param.name}={values[param.name]}" for param in self.params]
+
+    def solver_env(self, values: dict[str, ParamValue]) -> dict[str, str]:
+        """Get the extra environment variables for the solver.
+
+        Args:
+            values (dict[str, ParamValue]): Values of the parameters.
+
+        Returns:
+            dict[str, str]: Environment variables. Empty unless the parameters are passed by environment variables.
+        """
+        if self.pass_by != PassBy.ENV:
+            return {}
+        return {param.name: str(values[param.name]) for param in self.params}
+
+
+class TrialState(Enum):
+    """State of a trial.
+
+    RUNNING: Being evaluated.
+    COMPLETE: Evaluated on all cases.
+    PRUNED: Stopped early because of bad scores.
+    FAILED: Stopped because a case did not finish successfully.
+    """
+
+    RUNNING = "running"
+    COMPLETE = "complete"
+    PRUNED = "pruned"
+    FAILED = "failed"
+
+
+@dataclass
+class Trial:
+    """A set of parameter values and its evaluation.
+
+    Attributes:
+        trial_id (int): Trial ID.
+        bracket (int): ID of the group of trials compared with each other.
+        params (dict[str, ParamValue]): Values of the parameters.
+        state (TrialState): State of the trial.
+        rung (int): Index of the last rung the trial entered.
+        scores (dict[int, int | None]): Scores per case. None means a failure.
+    """
+
+    trial_id: int
+    bracket: int
+    params: dict[str, ParamValue]
+    state: TrialState = TrialState.RUNNING
+    rung: int = 0
+    scores: dict[int, int | None] = field(default_factory=dict)
+
+    def has_failed(self, case_ids: list[int]) -> bool:
+        """Check whether any of the cases failed.
+
+        Args:
+            case_ids (list[int]): Case IDs.
+
+        Returns:
+            bool: True if any of the cases failed.
+        """
+        return any(
+            case_id in self.scores and self.scores[case_id] is None
+            for case_id in case_ids
+        )
+
+    def objective(
+        self, case_ids: list[int], transform: Callable[[int], float]
+    ) -> float:
+        """Get the mean of the transformed scores.
+
+        Args:
+            case_ids (list[int]): Case IDs. All of them must have been evaluated successfully.
+            transform (Callable[[int], float]): Transformation of a score.
+
+        Returns:
+            float: Mean of the transformed scores.
+        """
+        values: list[float] = []
+        for case_id in case_ids:
+            score = self.scores[case_id]
+            assert score is not None
+            values.append(transform(score))
+        return sum(values) / len(values)
+
+
+class Study:
+    """Trials persisted to a JSON Lines file.
+
+    Every change is appended to the file as soon as it happens,
+    so an interrupted study can be resumed without losing finished evaluations.
+    """
+
+    def __init__(self, study_file: Path, space: SearchSpace) -> None:
+        """Initialize the Study, loading the trials if the file exists.
+
+        Args:
+            study_file (Path): Path to the study file.
+            space (SearchSpace): Search space.
+
+        Raises:
+            ValueError: If the file belongs to a study with different parameters.
+        """
+        self.study_file = study_file
+        self.space = space
+        self.trials: list[Trial] = []
+        if study_file.exists():
+            logger.info(f"resuming study from {study_file}")
+            self.__load()
+        else:
+            self.__append(
+                {
+                    "type": "study",
+                    "params": [param.name for param in space.params],
+                    "direction": space.direction.value,
+                }
+            )
+
+    def __load(self) -> None:
+        """Load the trials from the study file.
+
+        Raises:
+            ValueError: If the file belongs to a study with different parameters.
+        """
+        with self.study_file.open("r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                record_type = record["type"]
+                if record_type == "study":
+                    names = [param.name for param in self.space.params]
+                    if record["params"] != names:
+                        raise ValueError(
+                            f"{self.study_file} was created with parameters "
+                            f"{record['params']}, not {names}"
+                        )
+                elif record_type == "trial":
+                    self.trials.append(
+                        Trial(
+                            trial_id=record["trial"],
+                            bracket=record["bracket"],
+                            params=record["params"],
+                        )
+                    )
+                elif record_type == "score":
+                    trial = self.trials[record["trial"]]
+                    trial.scores[record["case"]] = record["score"]
+                elif record_type == "state":
+                    trial = self.trials[record["trial"]]
+                    trial.state = TrialState(record["state"])
+                    trial.rung = record["rung"]
+
+    def __append(self, record: dict[str, Any]) -> None:
+        """Append a record to the study file.
+
+        Args:
+            record (dict[str, Any]): Record.
+        """
+        with self.study_file.open("a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def add_trial(self, bracket: int, params: dict[str, ParamValue]) -> Trial:
+        """Add a new trial.
+
+        Args:
+            bracket (int): ID of the group of trials compared with each other.
+            params (dict[str, ParamValue]): Values of the parameters.
+
+        Returns:
+            Trial: Added trial.
+        """
+        trial = Trial(trial_id=len(self.trials), bracket=bracket, params=params)
+        self.trials.append(trial)
+        self.__append(
+            {
+                "type": "trial",
+                "trial": trial.trial_id,
+                "bracket": bracket,
+                "params": params,
+            }
+        )
+        return trial
+
+    def record_score(self, trial: Trial, case_id: int, score: int | None) -> None:
+        """Record the score of a case.
+
+        Args:
+            trial (Trial): Trial.
+            case_id (int): Case ID.
+            score (int | None): Score. None means a failure.
+        """
+        trial.scores[case_id] = score
+        self.__append(
+            {"type": "score", "trial": trial.trial_id, "case": case_id, "score": score}
+        )
+
+    def set_state(self, trial: Trial, state: TrialState, rung: int) -> None:
+        """Change the state of a trial.
+
+        Args:
+            trial (Trial): Trial.
+            state (TrialState): New state.
+            rung (int): Index of the rung the trial is in.
+        """
+        trial.state = state
+        trial.rung = rung
+        self.__append(
+            {
+                "type": "state",
+                "trial": trial.trial_id,
+                "state": state.value,
+                "rung": rung,
+            }
+        )
+
+
+class Sampler(metaclass=ABCMeta):
+    """Sampler of parameter values."""
+
+    @abstractmethod
+    def sample(
+        self,
+        space: SearchSpace,
+        ranked: list[Trial],
+        rng: random.Random,
+    ) -> dict[str, ParamValue]:
+        """Sample values of the parameters.
+
+        Args:
+            space (SearchSpace): Search space.
+            ranked (list[Trial]): Finished trials, from the best to the worst.
+            rng (random.Random): Random number generator.
+
+        Returns:
+            dict[str, ParamValue]: Values of the parameters.
+        """
+        pass
+
+
+class RandomSampler(Sampler):
+    """Sample parameter values uniformly at random."""
+
+    def sample(
+        self,
+        space: SearchSpace,
+        ranked: list[Trial],
+        rng: random.Random,
+    ) -> dict[str, ParamValue]:
+        return {param.name: param.sample(rng) for param in space.params}
+
+
+class TPESampler(Sampler):
+    """Tree-structured Parzen Estimator.
+
+    Finished trials are split into good and bad ones, and for each parameter
+    the value maximizing l(x) / g(x) among candidates drawn from l(x) is chosen,
+    where l and g are the densities estimated from the good and bad trials.
+
+    Attributes:
+        N_STARTUP_TRIALS (int): Number of finished trials sampled at random first.
+        GAMMA (float): Ratio of good trials.
+        N_CANDIDATES (int): Number of candidates drawn from l(x).
+    """
+
+    N_STARTUP_TRIALS = 10
+    GAMMA = 0.25
+    N_CANDIDATES = 24
+
+    def sample(
+        self,
+        space: SearchSpace,
+        ranked: list[Trial],
+        rng: random.Random,
+    ) -> dict[str, ParamValue]:
+        if len(ranked) < TPESampler.N_STARTUP_TRIALS:
+            return RandomSampler().sample(space, ranked, rng)
+        n_good = max(1, math.ceil(TPESampler.GAMMA * len(ranked)))
+        good, bad = ranked[:n_good], ranked[n_good:]
+        values: dict[str, ParamValue] = {}
+        for param in space.params:
+            if param.type == ParamType.CATEGORICAL:
+                values[param.name] = self.__sample_categorical(param, good, bad, rng)
+            else:
+                values[param.name] = self.__sample_numerical(param, good, bad, rng)
+        return values
+
+    def __sample_categorical(
+        self, param: Param, good: list[Trial], bad: list[Trial], rng: random.Random
+    ) -> ParamValue:
+        """Sample a categorical parameter.
+
+        Args:
+            param (Param): Parameter.
+            good (list[Trial]): Good trials.
+            bad (list[Trial]): Bad trials.
+            rng (random.Random): Random number generator.
+
+        Returns:
+            ParamValue: Value of the parameter.
+        """
+
+        def weights(trials: list[Trial]) -> list[float]:
+            counts = [1.0] * len(param.choices)
+            for trial in trials:
+                value = trial.params.get(param.name)
+                if value in param.choices:
+                    counts[param.choices.index(str(value))] += 1
+            return [count / sum(counts) for count in counts]
+
+        weights_good, weights_bad = weights(good), weights(bad)
+        candidates = rng.choices(
+            range(len(param.choices)), weights_good, k=TPESampler.N_CANDIDATES
+        )
+        best = max(candidates, key=lambda i: weights_good[i] / weights_bad[i])
+        return param.choices[best]
+
+    def __sample_numerical(
+        self, param: Param, good: list[Trial], bad: list[Trial], rng: random.Random
+    ) -> ParamValue:
+        """Sample a numerical parameter.
+
+        Args:
+            param (Param): Parameter.
+            good (list[Trial]): Good trials.
+            bad (list[Trial]): Bad trials.
+            rng (random.Random): Random number generator.
+
+        Returns:
+            ParamValue: Value of the parameter.
+        """
+        mus_good = TPESampler.__unit_values(param, good)
+        mus_bad = TPESampler.__unit_values(param, bad)
+        sigma_good = max(0.05, 1.0 / (len(mus_good) + 1))
+        candidates: list[float] = []
+        for _ in range(TPESampler.N_CANDIDATES):
+            # The uniform prior is one of the components of the mixture
+            component = rng.randrange(len(mus_good) + 1)
+            if component == len(mus_good):
+                candidates.append(rng.random())
+            else:
+                u = rng.gauss(mus_good[component], sigma_good)
+                candidates.append(min(1.0, max(0.0, u)))
+        best = max(
+            candidates,
+            key=lambda u: (
+                TPESampler.__density(u, mus_good) / TPESampler.__density(u, mus_bad)
+            ),
+        )
+        return param.from_unit(best)
+
+    @staticmethod
+    def __unit_values(param: Param, trials: list[Trial]) -> list[float]:
+        """Get the values of the parameter in the unit interval.
+
+        Args:
+            param (Param): Parameter.
+            trials (list[Trial]): Trials.
+
+        Returns:
+            list[float]: Values in [0, 1].
+        """
+        return [
+            param.to_unit(trial.params[param.name])
+            for trial in trials
+            if param.name in trial.params
+        ]
+
+    @staticmethod
+    def __density(u: float, mus: list[float]) -> float:
+        """Density of the mixture of the uniform prior and Gaussian kernels.
+
+        Args:
+            u (float): Point in [0, 1].
+            mus (list[float]): Centers of the kernels.
+
+        Returns:
+            float: Density at the point.
+        """
+        sigma = max(0.05, 1.0 / (len(mus) + 1))
+        total = 1.0
+        for mu in mus:
+            total += math.exp(-0.5 * ((u - mu) / sigma) ** 2) / (
+                sigma * math.sqrt(2 * math.pi)
+            )
+        return total / (len(mus) + 1)
+
+
+def halving_budgets(number: int, min_cases: int, eta: int) -> list[int]:
+    """Get the number of cases evaluated in each rung of successive halving.
+
+    Args:
+        number (int): Number of all cases.
+        min_cases (int): Minimum number of cases in the first rung.
+        eta (int): Reduction factor.
+
+    Returns:
+        list[int]: Number of cases per rung, ending with `number`.
+    """
+    assert number >= 1 and eta >= 2
+    budgets = [number]
+    while budgets[0] // eta >= max(1, min_cases):
+        budgets.insert(0, budgets[0] // eta)
+    return budgets
+
+
+# Evaluates (trial, case ID) pairs and yields (trial, case ID, score) as they finish.
+Evaluator = Callable[[list[tuple[Trial, int]]], Iterator[tuple[Trial, int, int | None]]]
+
+
+class Tuner:
+    """Search parameters with successive halving over brackets of trials.
+
+    A bracket is a group of trials sampled at once. Its trials are evaluated on
+    the first `budgets[0]` cases, then only the best 1/eta of them on the first
+    `budgets[1]` cases, and so on. With a single budget no trial is pruned
+    unless it fails.
+    """
+
+    def __init__(
+        self,
+        *,
+        study: Study,
+        sampler: Sampler,
+        evaluator: Evaluator,
+        case_ids: list[int],
+        budgets: list[int],
+        eta: int,
+        transform: Callable[[int], float],
+        seed: int | None = None,
+    ) -> None:
+        """Initialize the Tuner.
+
+        Args:
+            study (Study): Study to record the trials in.
+            sampler (Sampler): Sampler of parameter values.
+            evaluator (Evaluator): Evaluator of (trial, case ID) pairs.
+            case_ids (list[int]): Case IDs to evaluate the trials on.
+            budgets (list[int]): Number of cases per rung, ending with len(case_ids).
+            eta (int): Reduction factor.
+            transform (Callable[[int], float]): Transformation of a score before averaging.
+            seed (int | None, optional): Seed of the sampler. Defaults to None.
+        """
+        assert budgets and budgets[-1] == len(case_ids)
+        self.study = study
+        self.sampler = sampler
+        self.evaluator = evaluator
+        self.case_ids = case_ids
+        self.budgets = budgets
+        self.eta = eta
+        self.transform = transform
+        self.seed = seed
+
+    def optimize(self, n_trials: int, batch_size: int) -> Trial | None:
+        """Run trials until `n_trials` trials have been added to the study.
+
+        Unfinished brackets of a resumed study are finished first.
+
+        Args:
+            n_trials (int): Total number of trials.
+            batch_size (int): Number of trials in a bracket.
+
+        Returns:
+            Trial | None: Best complete trial. None if there is none.
+        """
+        running_brackets = sorted(
+            {t.bracket for t in self.study.trials if t.state == TrialState.RUNNING}
+        )
+        for bracket in running_brackets:
+            logger.info(f"Resuming bracket {bracket}")
+            self.__run_bracket(self.__bracket_trials(bracket))
+
+        while len(self.study.trials) < n_trials:
+            bracket = 1 + max((t.bracket for t in self.study.trials), default=-1)
+            rng = random.Random(None if self.seed is None else f"{self.seed}-{bracket}")
+            size = min(batch_size, n_trials - len(self.study.trials))
+            trials: list[Trial] = []
+            for _ in range(size):
+                params = self.sampler.sample(self.study.space, self.ranked(), rng)
+                trials.append(self.study.add_trial(bracket, params))
+            logger.info(f"Starting bracket {bracket} with {size} trials")
+            self.__run_bracket(trials)
+        return self.best()
+
+    def ranked(self) -> list[Trial]:
+        """Get the finished trials from the best to the worst.
+
+        Complete trials come first, ordered by their objective on all cases,
+        followed by pruned and failed trials.
+
+        Returns:
+            list[Trial]: Finished trials.
+        """
+        complete = self.__sort(
+            [t for t in self.study.trials if t.state == TrialState.COMPLETE],
+            self.case_ids,
+        )
+        pruned = [t for t in self.study.trials if t.state == TrialState.PRUNED]
+        pruned.sort(key=lambda t: -t.rung)
+        failed = [t for t in self.study.trials if t.state == TrialState.FAILED]
+        return complete + pruned + failed
+
+    def best(self) -> Trial | None:
+        """Get the best complete trial.
+
+        Returns:
+            Trial | None: Best complete trial. None if there is none.
+        """
+        ranked = self.ranked()
+        if not ranked or ranked[0].state != TrialState.COMPLETE:
+            return None
+        return ranked[0]
+
+    def __bracket_trials(self, bracket: int) -> list[Trial]:
+        return [t for t in self.study.trials if t.bracket == bracket]
+
+    def __sort(self, trials: list[Trial], case_ids: list[int]) -> list[Trial]:
+        """Sort trials from the best to the worst on the cases.
+
+        Args:
+            trials (list[Trial]): Trials evaluated successfully on the cases.
+            case_ids (list[int]): Case IDs.
+
+        Returns:
+            list[Trial]: Sorted trials.
+        """
+        reverse = self.study.space.direction == Direction.MAXIMIZE
+        return sorted(
+            trials,
+            key=lambda t: t.objective(case_ids, self.transform),
+            reverse=reverse,
+        )
+
+    def __run_bracket(self, trials: list[Trial]) -> None:
+        """Evaluate a bracket of trials rung by rung, pruning bad ones.
+
+        Args:
+            trials (list[Trial]): Trials in the bracket.
+        """
+        for rung, budget in enumerate(self.budgets):
+            case_ids = self.case_ids[:budget]
+            alive = [t for t in trials if t.state == TrialState.RUNNING]
+            if not alive:
+                return
+            self.__evaluate(alive, case_ids, rung)
+
+            if rung == len(self.budgets) - 1:
+                for trial in alive:
+                    if trial.state == TrialState.RUNNING:
+                        self.study.set_state(trial, TrialState.COMPLETE, rung)
+                return
+
+            # Trials pruned in this rung before an interruption compete again,
+            # so that a resumed bracket keeps the same survivors.
+            entrants = [
+                t
+                for t in trials
+                if t.state == TrialState.RUNNING
+                or (t.state == TrialState.PRUNED and t.rung == rung)
+            ]
+            n_failed = sum(
+                1 for t in trials if t.state == TrialState.FAILED and t.rung == rung
+            )
+            n_keep = max(1, (len(entrants) + n_failed) // self.eta)
+            survivors = self.__sort(entrants, case_ids)[:n_keep]
+            for trial in alive:
+                if trial.state == TrialState.RUNNING and trial not in survivors:
+                    self.study.set_state(trial, TrialState.PRUNED, rung)
+            logger.info(
+                f"Rung {rung}: {len(survivors)} of {len(entrants) + n_failed} "
+                f"trials go on to {self.budgets[rung + 1]} cases"
+            )
+
+    def __evaluate(self, trials: list[Trial], case_ids: list[int], rung: int) -> None:
+        """Evaluate trials on cases that have not been evaluated yet.
+
+        Args:
+            trials (list[Trial]): Running trials.
+            case_ids (list[int]): Case IDs.
+            rung (int): Index of the rung.
+        """
+        tasks = [
+            (trial, case_id)
+            for trial in trials
+            for case_id in case_ids
+            if case_id not in trial.scores
+        ]
+        for trial, case_id, score in self.evaluator(tasks):
+            self.study.record_score(trial, case_id, score)
+            if score is None and trial.state == TrialState.RUNNING:
+                logger.warning(f"Trial {trial.trial_id} failed on case {case_id}")
+                self.study.set_state(trial, TrialState.FAILED, rung)
+        for trial in trials:
+            if trial.state == TrialState.RUNNING and trial.has_failed(case_ids):
+                self.study.set_state(trial, TrialState.FAILED, rung)
@@ -1,3 +1,8 @@
+import getpass
+import os
+import stat
+import sys
+import tempfile
 from pathlib import Path
 
 
@@ -51,3 +56,62 @@ def assert_empty_dir(path: Path) -> None:
     """
     if not path.is_dir() or [*path.iterdir()]:
         raise FileExistsError(f"Directory '{path}' is not empty.")
+
+
+def write_atomically(path: Path, data: str | bytes) -> None:
+    """Write a file so that it is never seen partially written.
+
+    The data is written to a temporary file in the same directory, which then
+    replaces the file.
+
+    Args:
+        path (Path): Path to the file.
+        data (str | bytes): Content.
+    """
+    mode = "w" if isinstance(data, str) else "wb"
+    with tempfile.NamedTemporaryFile(mode=mode, dir=path.parent, delete=False) as tmpf:
+        try:
+            tmpf.write(data)
+        except BaseException:
+            tmpf.close()
+            os.unlink(tmpf.name)
+            raise
+    os.replace(tmpf.name, path)
+
+
+def runtime_dir() -> Path:
+    """Get the directory of the files shared by the invocations of the user, e.g. sockets.
+
+    It is `cp-heuristics-adapter` in $XDG_RUNTIME_DIR, or `cp-heuristics-adapter-{uid}`
+    in the temporary directory if it is not set (the user name instead of the uid on
+    Windows). It is created, accessible only by the user. As anyone may create the
+    directory in the temporary directory first, an existing one is used only if it is
+    a directory, not a symlink, owned by the user and accessible only by them.
+
+    Raises:
+        PermissionError: If the existing directory is not private to the user.
+
+    Returns:
+        Path: Path to the directory.
+    """
+    xdg_runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if xdg_runtime_dir:
+        path = Path(xdg_runtime_dir) / "cp-heuristics-adapter"
+    else:
+        if sys.platform == "win32":
+            user = getpass.getuser()
+        else:
+            user = str(os.getuid())
+        path = Path(tempfile.gettempdir()) / f"cp-heuristics-adapter-{user}"
+    path.mkdir(mode=0o700, exist_ok=True)
+    if sys.platform != "win32":
+        st = path.lstat()
+        if (
+            not stat.S_ISDIR(st.st_mode)
+            or st.st_uid != os.getuid()
+            or stat.S_IMODE(st.st_mode) != 0o700
+        ):
+            raise PermissionError(
+                f"Runtime directory '{path}' is not a directory private to the user."
+            )
+    return path
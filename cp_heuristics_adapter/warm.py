@@ -0,0 +1,139 @@
+import hashlib
+import json
+import logging
+import threading
+from enum import Enum
+from pathlib import Path
+
+from cp_heuristics_adapter.languages import Language
+from cp_heuristics_adapter.runner import ProgramRunner
+from cp_heuristics_adapter.staging import Stage
+from cp_heuristics_adapter.watch import local_dependencies
+
+logger = logging.getLogger(__name__)
+
+
+def _jsonable(value: object) -> object:
+    """Convert a setting of a language to a JSON value, e.g. its config.
+
+    Args:
+        value (object): Setting.
+
+    Returns:
+        object: Value of an enum, attributes of an object or the string of anything else.
+    """
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "__dict__"):
+        return vars(value)
+    return str(value)
+
+
+class WarmState:
+    """State kept across the runs served by a daemon (see Daemon).
+
+    A build is reused while the source file, its local dependencies, the settings of
+    the language and the executable are unchanged. Reusing the runner also keeps
+    the prefork server of a Python solver running. A stage is reused by every run
+    staging in the same root, so inputs staged before are not copied again.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the WarmState."""
+        self.__lock = threading.Lock()
+        # Runner and modification time of its executable by key of the build
+        self.__builds: dict[str, tuple[ProgramRunner, int | None]] = {}
+        self.__stages: dict[Path, Stage] = {}
+
+    @staticmethod
+    def __build_key(language: Language, source_file: Path) -> str:
+        """Get the key of a build.
+
+        Args:
+            language (Language): Language, with its settings.
+            source_file (Path): Path to the source file.
+
+        Returns:
+            str: SHA-256 digest of the source, its dependencies and the settings.
+        """
+        digest = hashlib.sha256(str(source_file.resolve()).encode())
+        for dependency in local_dependencies(source_file):
+            digest.update(dependency.read_bytes())
+        settings = {"language": type(language).__name__, **vars(language)}
+        digest.update(json.dumps(settings, sort_keys=True, default=_jsonable).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def __mtime(runner: ProgramRunner) -> int | None:
+        """Get the modification time of the executable of a runner.
+
+        Args:
+            runner (ProgramRunner): Runner.
+
+        Returns:
+            int | None: Modification time [ns]. None if the command is not a file, e.g. python3.
+        """
+        executable = Path(runner.exec_cmd[0])
+        return executable.stat().st_mtime_ns if executable.is_file() else None
+
+    def compile(self, language: Language, source_file: Path) -> ProgramRunner:
+        """Compile the source file unless the same build is kept.
+
+        The executable may be rebuilt by a run outside the daemon, e.g. in another
+        build mode, so a build is reused only if the executable was not modified.
+
+        Args:
+            language (Language): Language.
+            source_file (Path): Path to the source file.
+
+        Returns:
+            ProgramRunner: Runner.
+        """
+        key = WarmState.__build_key(language, source_file)
+        with self.__lock:
+            build = self.__builds.get(key)
+        if build is not None and WarmState.__mtime(build[0]) == build[1]:
+            logger.info(f"Reusing the build of {source_file} kept by the daemon")
+            return build[0]
+        runner = language.compile(source_file)
+        with self.__lock:
+            self.__builds[key] = (runner, WarmState.__mtime(runner))
+        return runner
+
+    def stage(self, root: Path) -> Stage:
+        """Get the stage in a root, creating it on the first call.
+
+        Args:
+            root (Path): RAM-backed directory to stage the files in.
+
+        Raises:
+            FileNotFoundError: If the root does not exist.
+
+        Returns:
+            Stage: Stage, closed by close.
+        """
+        with self.__lock:
+            key = root.resolve()
+            if key not in self.__stages:
+                self.__stages[key] = Stage(root)
+            return self.__stages[key]
+
+    def status(self) -> dict[str, object]:
+        """Get what is kept.
+
+        Returns:
+            dict[str, object]: Number of builds and directories of the stages.
+        """
+        with self.__lock:
+            return {
+                "builds": len(self.__builds),
+                "stages": [str(stage.dir) for stage in self.__stages.values()],
+            }
+
+    def close(self) -> None:
+        """Close the stages and drop the builds."""
+        with self.__lock:
+            for stage in self.__stages.values():
+                stage.close()
+            self.__stages.clear()
+            self.__builds.clear()
@@ -0,0 +1,195 @@
+import logging
+import re
+from pathlib import Path
+from time import monotonic, sleep
+
+logger = logging.getLogger(__name__)
+
+# #include "header.hpp"
+CPP_INCLUDE = re.compile(r'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+# import a.b, c / from a.b import c
+PYTHON_IMPORT = re.compile(
+    r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+(?:\s*,\s*[\w.]+)*))",
+    re.MULTILINE,
+)
+# mod name;
+RUST_MOD = re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?mod\s+(\w+)\s*;", re.MULTILINE)
+
+
+def _cpp_dependencies(file: Path, source: Path) -> list[Path]:
+    """Get the headers included by a C++ file with quotes.
+
+    Args:
+        file (Path): C++ file.
+        source (Path): Solver.
+
+    Returns:
+        list[Path]: Existing headers.
+    """
+    found = []
+    for name in CPP_INCLUDE.findall(file.read_text(errors="replace")):
+        for base in (file.parent, source.parent):
+            if (base / name).is_file():
+                found.append(base / name)
+                break
+    return found
+
+
+def _python_dependencies(file: Path, source: Path) -> list[Path]:
+    """Get the local modules imported by a Python file.
+
+    Args:
+        file (Path): Python file.
+        source (Path): Solver.
+
+    Returns:
+        list[Path]: Existing modules next to the solver.
+    """
+    found = []
+    for from_module, import_modules in PYTHON_IMPORT.findall(
+        file.read_text(errors="replace")
+    ):
+        modules = [from_module] if from_module else import_modules.split(",")
+        for module in modules:
+            base = source.parent.joinpath(*module.strip().split("."))
+            for candidate in (base.with_suffix(".py"), base / "__init__.py"):
+                if candidate.is_file():
+                    found.append(candidate)
+                    break
+    return found
+
+
+def _rust_dependencies(file: Path, source: Path) -> list[Path]:
+    """Get the module files declared by a Rust file with `mod name;`.
+
+    Args:
+        file (Path): Rust file.
+        source (Path): Solver.
+
+    Returns:
+        list[Path]: Existing module files.
+    """
+    # Modules of main.rs, lib.rs, mod.rs and the solver are next to them, and
+    # those of other files are in the directory named after the file
+    if file.name in ("main.rs", "lib.rs", "mod.rs") or file == source:
+        module_dir = file.parent
+    else:
+        module_dir = file.parent / file.stem
+    found = []
+    for name in RUST_MOD.findall(file.read_text(errors="replace")):
+        for candidate in (module_dir / f"{name}.rs", module_dir / name / "mod.rs"):
+            if candidate.is_file():
+                found.append(candidate)
+                break
+    return found
+
+
+def local_dependencies(source: Path) -> list[Path]:
+    """Get the source file and the local files it depends on, recursively.
+
+    They are the headers included with quotes in C++, the modules next to the
+    solver in Python and the files of the modules declared with `mod name;` in Rust.
+
+    Args:
+        source (Path): Source file.
+
+    Returns:
+        list[Path]: Source file followed by its dependencies.
+    """
+    finders = {
+        ".cpp": _cpp_dependencies,
+        ".py": _python_dependencies,
+        ".rs": _rust_dependencies,
+    }
+    files = [source]
+    # Dependencies are searched in the way of the solver's language, e.g. headers
+    # included by headers are searched like those included by the .cpp file
+    finder = finders.get(source.suffix)
+    if finder is None:
+        return files
+    seen = {source.resolve()}
+    index = 0
+    while index < len(files):
+        file = files[index]
+        index += 1
+        try:
+            dependencies = finder(file, source)
+        except OSError as e:
+            logger.warning(f"Failed to read {file}: {e}")
+            continue
+        for dependency in dependencies:
+            if dependency.resolve() not in seen:
+                seen.add(dependency.resolve())
+                files.append(dependency)
+    return files
+
+
+class FileWatcher:
+    """For waiting for changes of files by polling their modification times.
+
+    Editors often save a file in several steps, so a change is reported only once
+    the files have not changed for the debounce time.
+
+    Attributes:
+        POLL_INTERVAL (float): Interval [s] of polling.
+        DEBOUNCE (float): Time [s] the files must stay unchanged.
+    """
+
+    POLL_INTERVAL = 0.2
+    DEBOUNCE = 0.3
+
+    def __init__(self, files: list[Path]) -> None:
+        """Initialize the FileWatcher with the current state of the files.
+
+        Args:
+            files (list[Path]): Files to watch.
+        """
+        self.files = files
+        self.__snapshot = self.__take_snapshot()
+
+    def __take_snapshot(self) -> dict[Path, tuple[int, int] | None]:
+        """Get the modification time and the size of each file.
+
+        Returns:
+            dict[Path, tuple[int, int] | None]: State of each file. None if it does not exist.
+        """
+        snapshot: dict[Path, tuple[int, int] | None] = {}
+        for file in self.files:
+            try:
+                stat = file.stat()
+                snapshot[file] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                snapshot[file] = None
+        return snapshot
+
+    def changed(self) -> list[Path]:
+        """Get the files changed since the last call, without waiting.
+
+        Returns:
+            list[Path]: Changed files.
+        """
+        snapshot = self.__take_snapshot()
+        changed = [
+            file for file in self.files if snapshot[file] != self.__snapshot[file]
+        ]
+        self.__snapshot = snapshot
+        return changed
+
+    def wait(self) -> list[Path]:
+        """Wait until some files change and then stay unchanged for the debounce time.
+
+        Returns:
+            list[Path]: Changed files.
+        """
+        changed: list[Path] = []
+        while not changed:
+            sleep(FileWatcher.POLL_INTERVAL)
+            changed = self.changed()
+        last_change = monotonic()
+        while monotonic() - last_change < FileWatcher.DEBOUNCE:
+            sleep(FileWatcher.POLL_INTERVAL)
+            more = self.changed()
+            if more:
+                changed += [file for file in more if file not in changed]
+                last_change = monotonic()
+        return changed
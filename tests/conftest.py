@@ -66,3 +66,12 @@ def py_config_toml() -> Generator[Path, None, None]:
         dest = Path(temp_dir) / "py_config.toml"
         shutil.copy(source, dest)
         yield dest
+
+
+@pytest.fixture
+def rust_config_toml() -> Generator[Path, None, None]:
+    source = Path(__file__).parent / "data" / "rust_config.toml"
+    with TemporaryDirectory() as temp_dir:
+        dest = Path(temp_dir) / "rust_config.toml"
+        shutil.copy(source, dest)
+        yield dest
@@ -0,0 +1,67 @@
+import asyncio
+import sys
+
+import pytest
+
+from cp_heuristics_adapter.api import run_cases, run_cases_async
+from cp_heuristics_adapter.executor import CaseResult, Verdict
+from cp_heuristics_adapter.project import Project
+
+# Writes the number in the input as the score, failing on 0
+SOLVER = "import sys\nn = input()\nassert n != '0'\nopen(sys.argv[1], 'w').write(n)\n"
+
+
+@pytest.fixture
+def project(sample_project: Project) -> Project:
+    sample_project.python_config_file.write_text(
+        f'[debug]\npython = "{sys.executable}"\n'
+    )
+    (sample_project.root / "main.py").write_text(SOLVER)
+    for case_id in range(4):
+        (sample_project.inputs_dir / f"{case_id:04}.txt").write_text(f"{case_id}\n")
+    return sample_project
+
+
+def scores(results: list[CaseResult]) -> dict[int, int | None]:
+    return {result.case.case_id: result.score for result in results}
+
+
+def test_run_cases(project: Project) -> None:
+    results = list(run_cases(project.root / "main.py", 4, jobs=2))
+    assert scores(results) == {0: None, 1: 1, 2: 2, 3: 3}
+    assert {result.verdict for result in results} == {Verdict.AC, Verdict.RE}
+    assert project.output_file(1).is_file()
+
+    results = list(run_cases(str(project.root / "main.py"), "2-3", seeds=2))
+    assert sorted((r.case.case_id, r.case.seed) for r in results) == [
+        (2, 0),
+        (2, 1),
+        (3, 0),
+        (3, 1),
+    ]
+
+    project.output_file(1).unlink()
+    results = list(run_cases(project.root / "main.py", [1], write_outputs=False))
+    assert scores(results) == {1: 1}
+    assert not project.output_file(1).exists()
+
+
+def test_run_cases_invalid(project: Project) -> None:
+    with pytest.raises(ValueError):
+        next(run_cases(project.root / "main.py", 2, jobs=0))
+    with pytest.raises(ValueError):
+        next(run_cases(project.root / "main.py", []))
+
+
+def test_run_cases_async(project: Project) -> None:
+    async def collect(limit: int | None) -> list[CaseResult]:
+        results = []
+        async for result in run_cases_async(project.root / "main.py", 4):
+            results.append(result)
+            if len(results) == limit:
+                break
+        return results
+
+    assert scores(asyncio.run(collect(None))) == {0: None, 1: 1, 2: 2, 3: 3}
+    # The remaining cases are cancelled
+    assert len(asyncio.run(collect(1))) == 1
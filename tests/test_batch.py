@@ -0,0 +1,139 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from cp_heuristics_adapter.batch import BATCH_ENV_VAR, BatchSolver
+from cp_heuristics_adapter.executor import Case, Verdict
+
+SOLVER = """
+import os, sys, time
+x = int(input())
+if x < 0:
+    sys.exit(1)
+if x == 998:
+    raise ValueError(x)
+if x == 999:
+    time.sleep(10)
+print(x * 2)
+with open(sys.argv[1], "w") as f:
+    f.write(str(x + int(os.environ.get("SEED", "0"))))
+with open(os.environ["METRICS_FILE"], "w") as f:
+    f.write(f"pid {os.getpid()}\\n")
+"""
+
+# A solver implementing the batch protocol by itself
+PROTOCOL_SOLVER = f"""
+import os, sys
+assert os.environ["{BATCH_ENV_VAR}"] == "1"
+for line in sys.stdin:
+    input_file, output_file, score_file, metrics_file, seed = line.rstrip("\\n").split("\\t")
+    x = int(open(input_file).read())
+    open(output_file, "w").write(str(x * 3))
+    open(score_file, "w").write(str(x))
+    print("ok" if x >= 0 else "error negative", flush=True)
+"""
+
+
+def make_cases(directory: Path, values: list[int]) -> list[Case]:
+    cases = []
+    for case_id, value in enumerate(values):
+        input_file = directory / f"{case_id:04}.in"
+        input_file.write_text(f"{value}\n")
+        cases.append(Case(case_id, input_file, directory / f"{case_id:04}.out"))
+    return cases
+
+
+@pytest.fixture
+def solver(empty_dir: Path) -> BatchSolver:
+    source = empty_dir / "solver.py"
+    source.write_text(SOLVER)
+    return BatchSolver.for_python([sys.executable, str(source)])
+
+
+def test_harness(solver: BatchSolver, empty_dir: Path) -> None:
+    cases = make_cases(empty_dir, list(range(10)))
+    results = sorted(
+        solver.run_cases(cases, jobs=2, timelimit=10.0),
+        key=lambda result: result.case.case_id,
+    )
+    assert [result.verdict for result in results] == [Verdict.AC] * 10
+    assert [result.score for result in results] == list(range(10))
+    assert all(result.time_ms is not None for result in results)
+    assert cases[3].output_file.read_text() == "6\n"
+    # The cases are served by at most as many processes as jobs
+    assert len({result.metrics["pid"] for result in results}) <= 2
+    assert os.getpid() not in {result.metrics["pid"] for result in results}
+
+
+def test_failures(solver: BatchSolver, empty_dir: Path) -> None:
+    cases = make_cases(empty_dir, [1, -1, 998, 999, 5])
+    results = {
+        result.case.case_id: result
+        for result in solver.run_cases(cases, jobs=1, timelimit=1.0)
+    }
+    assert results[0].verdict == Verdict.AC
+    assert results[1].verdict == Verdict.RE
+    assert results[2].verdict == Verdict.RE
+    assert results[3].verdict == Verdict.TLE
+    # A fresh process serves the cases after a failure
+    assert results[4].verdict == Verdict.AC
+    assert results[4].score == 5
+
+
+def test_seed(solver: BatchSolver, empty_dir: Path) -> None:
+    input_file = empty_dir / "0000.in"
+    input_file.write_text("10\n")
+    cases = [
+        Case(0, input_file, empty_dir / f"0000_seed{seed}.out", seed)
+        for seed in range(3)
+    ]
+    results = solver.run_cases(cases, jobs=1, timelimit=10.0)
+    assert sorted(result.score or 0 for result in results) == [10, 11, 12]
+
+
+def test_cases_per_process(solver: BatchSolver, empty_dir: Path) -> None:
+    solver.cases_per_process = 2
+    cases = make_cases(empty_dir, list(range(6)))
+    results = list(solver.run_cases(cases, jobs=1, timelimit=10.0))
+    assert len({result.metrics["pid"] for result in results}) == 3
+
+
+def test_protocol(empty_dir: Path) -> None:
+    source = empty_dir / "protocol_solver.py"
+    source.write_text(PROTOCOL_SOLVER)
+    solver = BatchSolver([sys.executable, str(source)])
+    cases = make_cases(empty_dir, [2, -1, 4])
+    results = {
+        result.case.case_id: result
+        for result in solver.run_cases(cases, jobs=1, timelimit=10.0)
+    }
+    assert results[0].score == 2
+    assert results[1].verdict == Verdict.RE
+    assert results[2].score == 4
+    assert cases[2].output_file.read_text() == "12"
+
+
+def test_stderr(empty_dir: Path) -> None:
+    source = empty_dir / "stderr_solver.py"
+    source.write_text(
+        "import sys\n"
+        "x = int(input())\n"
+        "print(f'case {x}', file=sys.stderr)\n"
+        "assert x >= 0\n"
+        "open(sys.argv[1], 'w').write(str(x))\n"
+    )
+    solver = BatchSolver.for_python([sys.executable, str(source)])
+    cases = make_cases(empty_dir, [1, -1])
+    results = {
+        result.case.case_id: result
+        for result in solver.run_cases(cases, jobs=1, timelimit=10.0, stderr_limit=4096)
+    }
+    # The harness delimits the stderr of each case, so none of it goes to another
+    assert results[0].stderr == "case 1\n"
+    assert results[1].verdict == Verdict.RE
+    # The stderr of a failed case is complete, including the traceback
+    assert results[1].stderr is not None
+    assert results[1].stderr.startswith("case -1\n")
+    assert "AssertionError" in results[1].stderr
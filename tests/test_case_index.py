@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pytest
+
+from cp_heuristics_adapter.case_index import MANIFEST_NAME, CaseIndex
+
+
+def test_without_manifest(empty_dir: Path) -> None:
+    cases = CaseIndex.load(empty_dir / MANIFEST_NAME)
+    assert cases.names is None
+    assert cases.name(12) == "0012.txt"
+    assert cases.name(12345) == "12345.txt"
+    assert cases.output_name(12, seed=3) == "0012_seed3.txt"
+
+
+def test_manifest(empty_dir: Path) -> None:
+    manifest_file = empty_dir / MANIFEST_NAME
+    CaseIndex(["a/small.txt", "b/large.in"]).save(manifest_file)
+    cases = CaseIndex.load(manifest_file)
+    assert len(cases) == 2
+    assert cases.name(1) == "b/large.in"
+    assert cases.output_name(1) == "b/large.in"
+    assert cases.output_name(1, seed=0) == "b/large_seed0.in"
+    assert cases.match("a/*") == [0]
+    assert cases.match("*.in") == [1]
+    with pytest.raises(IndexError):
+        cases.name(2)
+
+
+def test_build(empty_dir: Path) -> None:
+    for name in ["10.txt", "9.txt", "sub/2.txt", ".hidden", MANIFEST_NAME]:
+        (empty_dir / name).parent.mkdir(exist_ok=True)
+        (empty_dir / name).write_text(name)
+    # Numbers in the names are compared by value
+    assert CaseIndex.build(empty_dir).names == ["9.txt", "10.txt", "sub/2.txt"]
+
+
+def test_build_sharded(empty_dir: Path) -> None:
+    for case_id in range(5):
+        (empty_dir / f"{case_id:04}.txt").write_text(str(case_id))
+    cases = CaseIndex.build(empty_dir, shard_size=2)
+    assert cases.names == [
+        "000/0000.txt",
+        "000/0001.txt",
+        "001/0002.txt",
+        "001/0003.txt",
+        "002/0004.txt",
+    ]
+    assert (empty_dir / "001" / "0003.txt").read_text() == "3"
+    assert not (empty_dir / "0003.txt").exists()
+    # Sharding again keeps the files where they are
+    assert CaseIndex.build(empty_dir, shard_size=2).names == cases.names
+
+
+def test_build_keeps_case_ids(empty_dir: Path) -> None:
+    for name in ["1.txt", "3.txt"]:
+        (empty_dir / name).write_text(name)
+    previous = CaseIndex.build(empty_dir)
+    (empty_dir / "2.txt").write_text("2.txt")
+    # The new input is appended instead of shifting the case of 3.txt
+    assert CaseIndex.build(empty_dir, previous=previous).names == [
+        "1.txt",
+        "3.txt",
+        "2.txt",
+    ]
+    assert CaseIndex.build(empty_dir).names == ["1.txt", "2.txt", "3.txt"]
+
+
+def test_build_sharded_collision(empty_dir: Path) -> None:
+    for name in ["a/0.txt", "b/0.txt"]:
+        (empty_dir / name).parent.mkdir()
+        (empty_dir / name).write_text(name)
+    # Both inputs would be moved to 000/0.txt, so none is moved
+    with pytest.raises(FileExistsError):
+        CaseIndex.build(empty_dir, shard_size=2)
+    assert (empty_dir / "a" / "0.txt").is_file()
+    assert (empty_dir / "b" / "0.txt").is_file()
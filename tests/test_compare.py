@@ -0,0 +1,172 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from cp_heuristics_adapter.main import build_parser
+from cp_heuristics_adapter.project import Project
+from cp_heuristics_adapter.selection import case_ids_file, failed_file, write_ids
+from cp_heuristics_adapter.subcommands.compare import (
+    Comparison,
+    bootstrap_mean_ci,
+)
+from cp_heuristics_adapter.tuning import Direction
+
+
+def write_scores(scores_file: Path, scores: list[list[int]]) -> None:
+    scores_file.write_text(
+        "".join(" ".join(str(score) for score in line) + "\n" for line in scores)
+    )
+
+
+def run(argv: list[str]) -> None:
+    # Unlike main, this leaves the logging of the process alone
+    parser, subcommand = build_parser(argv)
+    assert subcommand is not None
+    subcommand.run(parser.parse_args(argv))
+
+
+def test_bootstrap_mean_ci() -> None:
+    rng = random.Random(0)
+    values = [rng.gauss(1.0, 1.0) for _ in range(1000)]
+    lower, upper = bootstrap_mean_ci(values, 2000, 0.95, rng)
+    assert lower < sum(values) / len(values) < upper
+    assert 0.8 < lower < upper < 1.2
+
+
+class TestComparison:
+    def test_maximize(self) -> None:
+        comparison = Comparison(
+            baseline=[10, 10, 10, 10],
+            target=[11, 9, 10, 5],
+            direction=Direction.MAXIMIZE,
+            resamples=100,
+            confidence=0.95,
+            rng=random.Random(0),
+        )
+        assert (comparison.wins, comparison.losses, comparison.ties) == (1, 2, 1)
+        assert comparison.mean_delta == -1.25
+        assert comparison.regressed_cases(1) == [3]
+        assert comparison.regressed_cases(10) == [3, 1]
+
+    def test_case_ids(self) -> None:
+        comparison = Comparison(
+            baseline=[10, 10],
+            target=[9, 10],
+            direction=Direction.MAXIMIZE,
+            resamples=100,
+            confidence=0.95,
+            rng=random.Random(0),
+            case_ids=[4, 8],
+        )
+        assert comparison.regressed_cases(10) == [4]
+        assert "0004" in comparison.pretty(10)
+
+    def test_minimize(self) -> None:
+        comparison = Comparison(
+            baseline=[10] * 50,
+            target=[11] * 50,
+            direction=Direction.MINIMIZE,
+            resamples=100,
+            confidence=0.95,
+            rng=random.Random(0),
+        )
+        assert comparison.losses == 50
+        assert comparison.ci == (-1.0, -1.0)
+        assert comparison.significant_regression()
+
+    def test_failed(self) -> None:
+        comparison = Comparison(
+            baseline=[10, 10],
+            target=[11, 11],
+            direction=Direction.MAXIMIZE,
+            resamples=100,
+            confidence=0.95,
+            rng=random.Random(0),
+            case_ids=[0, 1],
+            failed=[2],
+        )
+        assert (comparison.wins, comparison.losses, comparison.ties) == (2, 1, 0)
+        assert comparison.ci == (1.0, 1.0)
+        assert comparison.significant_regression()
+        assert "failed      : 1 (0002)" in comparison.pretty(10)
+
+    def test_no_significant_regression(self) -> None:
+        rng = random.Random(0)
+        baseline = [100.0] * 100
+        target = [100.0 + rng.choice([-1, 1]) for _ in range(100)]
+        comparison = Comparison(
+            baseline, target, Direction.MAXIMIZE, 1000, 0.95, random.Random(0)
+        )
+        assert not comparison.significant_regression()
+
+
+class TestCompare:
+    def test_latest_runs(
+        self, sample_project: Project, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        write_scores(sample_project.scores_file("20240101-000000"), [[10]] * 20)
+        write_scores(sample_project.scores_file("20240102-000000"), [[12]] * 20)
+        run(["compare", "-p", str(sample_project.root)])
+        out = capsys.readouterr().out
+        assert "win/loss/tie: 20/0/0" in out
+        assert "regression  : no" in out
+
+    def test_case_ids(
+        self, sample_project: Project, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        write_scores(sample_project.scores_file("20240101-000000"), [[10]] * 5)
+        target_file = sample_project.scores_file("20240102-000000")
+        write_scores(target_file, [[10], [5]])
+        write_ids(case_ids_file(target_file), [2, 7])
+        run(["compare", "-p", str(sample_project.root)])
+        out = capsys.readouterr().out
+        # Only the case 2 is in both runs
+        assert "cases       : 1" in out
+
+    def test_fail_on_regression(self, sample_project: Project) -> None:
+        write_scores(sample_project.scores_file("20240101-000000"), [[10]] * 20)
+        write_scores(sample_project.scores_file("20240102-000000"), [[8]] * 20)
+        run(["compare", "-p", str(sample_project.root), "--save-baseline", "v1"])
+        assert sample_project.baseline_file("v1").is_file()
+        write_scores(sample_project.scores_file("20240103-000000"), [[6]] * 20)
+        with pytest.raises(SystemExit) as e:
+            run(
+                [
+                    "compare",
+                    "-p",
+                    str(sample_project.root),
+                    "v1",
+                    "--fail-on-regression",
+                ]
+            )
+        assert e.value.code == 1
+        # Lower scores are better
+        run(
+            [
+                "compare",
+                "-p",
+                str(sample_project.root),
+                "v1",
+                "-d",
+                "minimize",
+                "--fail-on-regression",
+            ]
+        )
+
+    def test_fail_on_failed_cases(
+        self, sample_project: Project, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        write_scores(sample_project.scores_file("20240101-000000"), [[10]] * 20)
+        # The target improves the cases it scored, but the case 5 crashed
+        target_file = sample_project.scores_file("20240102-000000")
+        write_scores(target_file, [[12]] * 19)
+        write_ids(case_ids_file(target_file), [i for i in range(20) if i != 5])
+        write_ids(failed_file(target_file), [5])
+        with pytest.raises(SystemExit) as e:
+            run(["compare", "-p", str(sample_project.root), "--fail-on-regression"])
+        assert e.value.code == 1
+        out = capsys.readouterr().out
+        assert "win/loss/tie: 19/1/0" in out
+        assert "failed      : 1 (0005)" in out
+        assert "regression  : yes" in out
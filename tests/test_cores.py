@@ -0,0 +1,85 @@
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from cp_heuristics_adapter.cores import CORES_ENV_VAR, CorePool, core_pool
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The core budget is Unix only"
+)
+
+# Leases the core 0 of the pool in the given directory until stdin is closed
+HOLDER = (
+    "import fcntl, os, sys; "
+    "fd = os.open(os.path.join(sys.argv[1], '0.lock'), os.O_RDWR | os.O_CREAT); "
+    "fcntl.flock(fd, fcntl.LOCK_EX); print('ok', flush=True); sys.stdin.read()"
+)
+
+
+def test_lease(empty_dir: Path) -> None:
+    pool = CorePool(2, empty_dir)
+    with pool.lease() as first, pool.lease() as second:
+        assert {first, second} == {0, 1}
+        assert pool.try_acquire() is None
+    with pool.lease() as core:
+        assert core == 0
+
+
+def test_lease_across_processes(empty_dir: Path) -> None:
+    pool = CorePool(1, empty_dir)
+    holder = subprocess.Popen(
+        [sys.executable, "-c", HOLDER, str(empty_dir)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert holder.stdout is not None and holder.stdout.readline() == "ok\n"
+    assert pool.try_acquire() is None
+    # The lease is released when the process exits
+    holder.kill()
+    holder.wait()
+    with pool.lease() as core:
+        assert core == 0
+
+
+def test_budget_bounds_threads(empty_dir: Path) -> None:
+    pool = CorePool(2, empty_dir)
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def work() -> None:
+        nonlocal running, peak
+        with pool.lease():
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == 2
+
+
+def test_core_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(CORES_ENV_VAR, raising=False)
+    core_pool.cache_clear()
+    assert core_pool() is None
+    monkeypatch.setenv(CORES_ENV_VAR, "0")
+    core_pool.cache_clear()
+    with pytest.raises(ValueError):
+        core_pool()
+    monkeypatch.setenv(CORES_ENV_VAR, "4")
+    core_pool.cache_clear()
+    pool = core_pool()
+    assert pool is not None and pool.budget == 4
+    core_pool.cache_clear()
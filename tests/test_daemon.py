@@ -0,0 +1,116 @@
+import os
+import sys
+import threading
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+
+from cp_heuristics_adapter import daemon as daemon_module
+from cp_heuristics_adapter.daemon import (
+    Daemon,
+    find_project_root,
+    forward,
+    request,
+    socket_path,
+)
+from cp_heuristics_adapter.project import Project
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The daemon is Unix only"
+)
+
+# Writes the number in the input as the score
+SOLVER = "import sys\nopen(sys.argv[1], 'w').write(input())\n"
+
+
+@pytest.fixture
+def daemon(sample_project: Project) -> Generator[Daemon, None, None]:
+    sample_project.python_config_file.write_text(
+        f'[debug]\npython = "{sys.executable}"\n'
+    )
+    (sample_project.root / "main.py").write_text(SOLVER)
+    for case_id in range(2):
+        (sample_project.inputs_dir / f"{case_id:04}.txt").write_text(f"{case_id + 1}\n")
+    daemon = Daemon(sample_project.root)
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+    assert daemon.ready.wait(10)
+    yield daemon
+    daemon.stop()
+    thread.join()
+
+
+def test_find_project_root(sample_project: Project) -> None:
+    assert find_project_root(sample_project.inputs_dir) == sample_project.root
+    assert find_project_root(Path("/")) is None
+
+
+def test_run(daemon: Daemon, sample_project: Project) -> None:
+    replies = list(
+        request(
+            sample_project.root,
+            {
+                "command": "run",
+                "argv": ["run", "main.py", "2"],
+                "cwd": str(sample_project.root),
+            },
+        )
+    )
+    assert replies[0] == {"type": "queued", "position": 0}
+    cases = sorted(
+        (reply["case"], reply["verdict"], reply["score"])
+        for reply in replies
+        if reply["type"] == "case"
+    )
+    assert cases == [(0, "AC", 1), (1, "AC", 2)]
+    assert replies[-1] == {"type": "exit", "code": 0}
+    assert list(sample_project.scores_dir.glob("scores_*.txt"))
+
+    # The second run reuses the build
+    assert forward(["run", "main.py", "2"], sample_project.root) == 0
+    (status,) = request(sample_project.root, {"command": "status"})
+    assert status["builds"] == 1
+    assert status["running"] is None
+
+    # A watch is run by the client
+    assert forward(["run", "main.py", "2", "--watch"], sample_project.root) is None
+
+
+def test_stop(daemon: Daemon, sample_project: Project) -> None:
+    # A single daemon runs per project
+    with pytest.raises(RuntimeError):
+        Daemon(sample_project.root).serve_forever()
+    assert list(request(sample_project.root, {"command": "stop"})) == [
+        {"type": "stopped"}
+    ]
+
+
+def test_no_daemon(sample_project: Project) -> None:
+    assert not socket_path(sample_project.root).exists()
+    assert forward(["run", "main.py", "2"], sample_project.root) is None
+    with pytest.raises(ConnectionError):
+        list(request(sample_project.root, {"command": "status"}))
+
+
+def test_other_user_client(
+    daemon: Daemon, sample_project: Project, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(daemon_module, "peer_uid", lambda conn: os.getuid() + 1)
+    # The connection is closed without running the command
+    assert forward(["run", "main.py", "2"], sample_project.root) is None
+    assert not list(sample_project.scores_dir.glob("scores_*.txt"))
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32" or os.getuid() != 0, reason="chown needs root"
+)
+def test_other_user_socket(daemon: Daemon, sample_project: Project) -> None:
+    path = socket_path(sample_project.root)
+    os.chown(path, 12345, -1)
+    try:
+        assert forward(["run", "main.py", "2"], sample_project.root) is None
+        with pytest.raises(ConnectionError):
+            list(request(sample_project.root, {"command": "status"}))
+    finally:
+        os.chown(path, 0, -1)
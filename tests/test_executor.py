@@ -0,0 +1,202 @@
+import statistics
+import subprocess
+import sys
+import threading
+from concurrent.futures import CancelledError
+from dataclasses import replace
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+
+from cp_heuristics_adapter.executor import (
+    METRICS_ENV_VAR,
+    SEED_ENV_VAR,
+    Case,
+    Verdict,
+    parse_metrics,
+    run_case,
+    run_cases,
+)
+from cp_heuristics_adapter.runner import ProgramRunner
+
+# Budget [ms] of run_case per case on top of a raw subprocess.run of the same solver.
+# It is far above the usual few ms so that loaded CI machines do not fail it, and
+# still catches a regression such as a poll loop or a sleep per case.
+OVERHEAD_BUDGET_MS = 250.0
+
+SOLVER = """
+import os, sys, time
+x = int(input())
+if x < 0:
+    sys.exit(1)
+if x == 999:
+    time.sleep(10)
+print(x * 2)
+with open(sys.argv[1], "w") as f:
+    f.write(str(x + int(os.environ.get("CP_OFFSET", "0")) + len(sys.argv) - 2))
+"""
+
+
+@pytest.fixture
+def runner(empty_dir: Path) -> ProgramRunner:
+    source = empty_dir / "solver.py"
+    source.write_text(SOLVER)
+    return ProgramRunner([sys.executable, str(source)])
+
+
+def make_case(directory: Path, case_id: int, value: int) -> Case:
+    input_file = directory / f"{case_id:04}.in"
+    input_file.write_text(f"{value}\n")
+    return Case(case_id, input_file, directory / f"{case_id:04}.out")
+
+
+class TestRunCase:
+    def test_accepted(self, runner: ProgramRunner, empty_dir: Path) -> None:
+        case = make_case(empty_dir, 0, 21)
+        result = run_case(runner, case, timelimit=10.0)
+        assert result.verdict == Verdict.AC
+        assert result.score == 21
+        assert result.time_ms is not None
+        assert case.output_file.read_text() == "42\n"
+
+    def test_args_and_env(self, runner: ProgramRunner, empty_dir: Path) -> None:
+        case = make_case(empty_dir, 0, 21)
+        result = run_case(
+            runner, case, timelimit=10.0, args=["a", "b"], env={"CP_OFFSET": "100"}
+        )
+        assert result.score == 123
+
+    def test_case_args_and_env(self, runner: ProgramRunner, empty_dir: Path) -> None:
+        case = replace(
+            make_case(empty_dir, 0, 21), args=("b",), env={"CP_OFFSET": "100"}
+        )
+        result = run_case(runner, case, timelimit=10.0, args=["a"])
+        assert result.score == 123
+
+    def test_seed(self, empty_dir: Path) -> None:
+        source = empty_dir / "seed.py"
+        source.write_text(
+            f"import os, sys\nopen(sys.argv[1], 'w').write(os.environ['{SEED_ENV_VAR}'])\n"
+        )
+        runner = ProgramRunner([sys.executable, str(source)])
+        case = make_case(empty_dir, 0, 0)
+        case = Case(case.case_id, case.input_file, case.output_file, seed=7)
+        assert run_case(runner, case, timelimit=10.0).score == 7
+
+    def test_metrics(self, empty_dir: Path) -> None:
+        source = empty_dir / "metrics.py"
+        source.write_text(
+            "import os, sys\n"
+            "open(sys.argv[1], 'w').write('1')\n"
+            f"with open(os.environ['{METRICS_ENV_VAR}'], 'w') as f:\n"
+            "    f.write('iterations 100\\ntemperature 0.5\\n')\n"
+        )
+        runner = ProgramRunner([sys.executable, str(source)])
+        result = run_case(runner, make_case(empty_dir, 0, 0), timelimit=10.0)
+        assert result.metrics == {"iterations": 100.0, "temperature": 0.5}
+
+    def test_no_metrics(self, runner: ProgramRunner, empty_dir: Path) -> None:
+        result = run_case(runner, make_case(empty_dir, 0, 21), timelimit=10.0)
+        assert result.metrics == {}
+
+    def test_runtime_error(self, runner: ProgramRunner, empty_dir: Path) -> None:
+        result = run_case(runner, make_case(empty_dir, 0, -1), timelimit=10.0)
+        assert result.verdict == Verdict.RE
+        assert result.score is None
+
+    def test_time_limit_exceeded(self, runner: ProgramRunner, empty_dir: Path) -> None:
+        result = run_case(runner, make_case(empty_dir, 0, 999), timelimit=0.5)
+        assert result.verdict == Verdict.TLE
+        assert result.score is None
+
+    def test_stderr(self, empty_dir: Path) -> None:
+        source = empty_dir / "stderr.py"
+        source.write_text(
+            "import sys\n"
+            "for i in range(10000):\n"
+            "    print(f'debug {i}', file=sys.stderr)\n"
+            "open(sys.argv[1], 'w').write('1')\n"
+            "sys.exit(int(input()))\n"
+        )
+        runner = ProgramRunner([sys.executable, str(source)])
+        result = run_case(
+            runner, make_case(empty_dir, 0, 0), timelimit=10.0, stderr_limit=1000
+        )
+        assert result.verdict == Verdict.AC
+        assert result.stderr is not None
+        # Only the tail is kept, after a note of what was dropped
+        first_line, *lines = result.stderr.splitlines()
+        assert first_line.startswith("[... ") and first_line.endswith("bytes dropped]")
+        assert lines[-1] == "debug 9999"
+        assert len("\n".join(lines)) <= 1000
+        result = run_case(
+            runner, make_case(empty_dir, 1, 1), timelimit=10.0, stderr_limit=1000
+        )
+        assert result.verdict == Verdict.RE
+        assert result.stderr is not None and result.stderr.endswith("debug 9999\n")
+        # Not captured by default
+        result = run_case(runner, make_case(empty_dir, 2, 0), timelimit=10.0)
+        assert result.stderr is None
+
+
+class TestRunCases:
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_run_cases(self, runner: ProgramRunner, empty_dir: Path, jobs: int) -> None:
+        cases = [make_case(empty_dir, case_id, case_id) for case_id in range(8)]
+        results = list(run_cases(runner, cases, jobs=jobs, timelimit=10.0))
+        assert sorted(result.case.case_id for result in results) == list(range(8))
+        for result in results:
+            assert result.verdict == Verdict.AC
+            assert result.score == result.case.case_id
+
+    def test_cancel(self, runner: ProgramRunner, empty_dir: Path) -> None:
+        cases = [make_case(empty_dir, case_id, 999) for case_id in range(4)]
+        cancel = threading.Event()
+        results = run_cases(runner, cases, jobs=1, timelimit=10.0, cancel=cancel)
+
+        def cancel_running() -> None:
+            cancel.set()
+            runner.kill_running()
+
+        timer = threading.Timer(0.5, cancel_running)
+        timer.start()
+        start = perf_counter()
+        with pytest.raises(CancelledError):
+            for result in results:
+                assert result.verdict == Verdict.RE
+        assert perf_counter() - start < 5.0
+        timer.cancel()
+
+
+def test_parse_metrics() -> None:
+    text = "iterations 10\n\naccepted 3\nbroken\niterations 20\ntemp 1e-3\nx y\n"
+    assert parse_metrics(text, "0000.txt") == {
+        "iterations": 20.0,
+        "accepted": 3.0,
+        "temp": 0.001,
+    }
+
+
+def test_verdict_description() -> None:
+    assert Verdict.MLE.description() == "Memory limit exceeded"
+
+
+def test_overhead_budget(empty_dir: Path) -> None:
+    source = empty_dir / "noop.py"
+    source.write_text("import sys\nopen(sys.argv[1], 'w').write('0')\n")
+    cmd = [sys.executable, str(source)]
+    runner = ProgramRunner(cmd)
+    raw_ms: list[float] = []
+    adapter_ms: list[float] = []
+    for case_id in range(10):
+        case = make_case(empty_dir, case_id, case_id)
+        with case.input_file.open() as inf, case.output_file.open("w") as ouf:
+            start = perf_counter()
+            subprocess.run(cmd + [str(empty_dir / "score")], stdin=inf, stdout=ouf)
+            raw_ms.append((perf_counter() - start) * 1000)
+        start = perf_counter()
+        assert run_case(runner, case, timelimit=10.0).verdict == Verdict.AC
+        adapter_ms.append((perf_counter() - start) * 1000)
+    overhead = statistics.median(adapter_ms) - statistics.median(raw_ms)
+    assert overhead < OVERHEAD_BUDGET_MS, f"run_case added {overhead:.1f} ms"
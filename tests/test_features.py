@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from cp_heuristics_adapter.features import (
+    Bucket,
+    FeatureIndex,
+    FeatureSpec,
+    SliceSummary,
+    bucketize,
+)
+
+# Prints the first number of the input as N, and counts its runs in a file
+EXTRACTOR = [
+    sys.executable,
+    "-c",
+    "import sys; print('N', sys.stdin.readline().split()[0]); "
+    "open('calls.txt', 'a').write('x')",
+]
+
+
+def test_load(empty_dir: Path) -> None:
+    spec_file = empty_dir / "features.toml"
+    spec_file.write_text('command = ["python3", "features.py"]\n')
+    assert FeatureSpec.load(spec_file) == FeatureSpec(["python3", "features.py"], 4)
+    spec_file.write_text("buckets = 3\n")
+    with pytest.raises(ValueError):
+        FeatureSpec.load(spec_file)
+
+
+def test_index(empty_dir: Path) -> None:
+    index_file = empty_dir / "features.json"
+    input_files = [empty_dir / f"{case_id:04}.txt" for case_id in range(3)]
+    for input_file, n in zip(input_files, [10, 20, 10]):
+        input_file.write_text(f"{n} 5\n")
+    features = FeatureIndex(index_file, EXTRACTOR, empty_dir).features(input_files)
+    assert features == [{"N": 10.0}, {"N": 20.0}, {"N": 10.0}]
+    # The inputs with the same content are extracted once
+    assert (empty_dir / "calls.txt").read_text() == "xx"
+
+    # A new index reuses the cached features
+    index = FeatureIndex(index_file, EXTRACTOR, empty_dir)
+    assert index.features(input_files) == features
+    assert (empty_dir / "calls.txt").read_text() == "xx"
+
+    # Only the changed input is extracted again
+    input_files[1].write_text("30 5\n")
+    assert index.features(input_files)[1] == {"N": 30.0}
+    assert (empty_dir / "calls.txt").read_text() == "xxx"
+
+    # Another extractor resets the features
+    index = FeatureIndex(index_file, [*EXTRACTOR, "other"], empty_dir)
+    assert index.features(input_files[:1]) == [{"N": 10.0}]
+    assert (empty_dir / "calls.txt").read_text() == "xxxx"
+
+
+def test_index_failure(empty_dir: Path) -> None:
+    input_file = empty_dir / "0000.txt"
+    input_file.write_text("1\n")
+    index = FeatureIndex(empty_dir / "features.json", [sys.executable, "-c", "1/0"])
+    with pytest.raises(RuntimeError):
+        index.features([input_file])
+
+
+def test_bucketize() -> None:
+    assert bucketize({0: 2.0, 1: 1.0, 2: 2.0}, 4) == [
+        Bucket("1", [1]),
+        Bucket("2", [0, 2]),
+    ]
+    values = {case_id: float(case_id) for case_id in range(8)}
+    assert bucketize(values, 2) == [
+        Bucket("0..3", [0, 1, 2, 3]),
+        Bucket("4..7", [4, 5, 6, 7]),
+    ]
+
+
+def test_slice_summary() -> None:
+    buckets = [Bucket("1", [0, 1]), Bucket("2", [2])]
+    summary = SliceSummary(
+        "N",
+        buckets,
+        {"a": {0: 1.0, 1: 3.0, 2: 10.0}, "b": {0: 4.0, 3: 100.0}},
+    )
+    assert summary.cases == [2, 1]
+    assert summary.means == {"a": [2.0, 10.0], "b": [4.0, None]}
+    lines = summary.pretty().splitlines()
+    assert lines[0] == "feature: N"
+    assert lines[-1].split() == ["b", "4.00", "-"]
@@ -0,0 +1,111 @@
+import shutil
+from pathlib import Path
+
+import pytest
+import toml
+
+from cp_heuristics_adapter.executor import Case, CaseResult, Verdict
+from cp_heuristics_adapter.flag_matrix import (
+    Matrix,
+    Variant,
+    VariantSummary,
+    rank,
+    write_release_config,
+)
+from cp_heuristics_adapter.languages import BuildMode, Cpp
+from cp_heuristics_adapter.tuning import Direction
+
+
+def test_load(empty_dir: Path) -> None:
+    spec_file = empty_dir / "flags.toml"
+    spec_file.write_text(
+        'direction = "minimize"\n'
+        'metric = "iterations"\n'
+        'compilers = ["g++", "clang++"]\n'
+        'flags = ["-Wall"]\n'
+        'axes = [["-O2", "-O3"], ["", "-march=native -flto"]]\n'
+    )
+    matrix = Matrix.load(spec_file)
+    assert matrix.direction == Direction.MINIMIZE
+    assert matrix.metric == "iterations"
+    assert len(matrix.variants) == 8
+    assert matrix.variants[0] == Variant("g++", ["-Wall", "-O2"])
+    assert matrix.variants[3] == Variant(
+        "g++", ["-Wall", "-O3", "-march=native", "-flto"]
+    )
+    assert matrix.variants[4].compiler == "clang++"
+    assert matrix.variants[3].name == "g++ -Wall -O3 -march=native -flto"
+
+
+def test_load_invalid(empty_dir: Path) -> None:
+    spec_file = empty_dir / "flags.toml"
+    spec_file.write_text('axes = [["-O2"]]\n')
+    with pytest.raises(ValueError):
+        Matrix.load(spec_file)
+    spec_file.write_text('compilers = ["g++"]\naxes = [[]]\n')
+    with pytest.raises(ValueError):
+        Matrix.load(spec_file)
+
+
+def summary(
+    name: str, score: float | None, throughput: float | None, failed: int = 0
+) -> VariantSummary:
+    return VariantSummary(Variant(name, []), score, throughput, failed)
+
+
+def test_rank() -> None:
+    summaries = [
+        summary("a", 10.0, 3.0),
+        summary("b", 30.0, 1.0),
+        summary("c", 50.0, 9.0, failed=1),
+        summary("d", 20.0, 2.0),
+    ]
+    names = [s.variant.name for s in rank(summaries, "score", Direction.MAXIMIZE)]
+    assert names == ["b", "d", "a", "c"]
+    names = [s.variant.name for s in rank(summaries, "score", Direction.MINIMIZE)]
+    assert names == ["a", "d", "b", "c"]
+    names = [s.variant.name for s in rank(summaries, "throughput", Direction.MAXIMIZE)]
+    assert names == ["a", "d", "b", "c"]
+
+
+def test_summary_throughput(empty_dir: Path) -> None:
+    case = Case(0, empty_dir / "0000.txt", empty_dir / "0000.out")
+    results = [
+        CaseResult(case, Verdict.AC, 1, 500.0, metrics={"iterations": 100.0}),
+        CaseResult(case, Verdict.AC, 3, 1500.0, metrics={"iterations": 300.0}),
+        CaseResult(case, Verdict.TLE, None),
+    ]
+    variant = Variant("g++", [])
+    by_metric = VariantSummary.of(variant, results, [1.0, 3.0], "iterations")
+    assert by_metric.score == 2.0
+    assert by_metric.throughput == pytest.approx(200.0)
+    assert by_metric.failed == 1
+    by_time = VariantSummary.of(variant, results, [1.0, 3.0], None)
+    assert by_time.throughput == pytest.approx(1.0)
+
+
+def test_write_release_config(cpp_config_toml: Path, empty_dir: Path) -> None:
+    config_file = empty_dir / "cpp_config.toml"
+    shutil.copy(cpp_config_toml, config_file)
+    write_release_config(config_file, Variant("g++", ["-O3", "-march=native"]))
+    text = config_file.read_text()
+    # The comments and the other sections are kept
+    assert "# Compiler to use in release mode" in text
+    config = Cpp.Config(build_mode=BuildMode.RELEASE, config_file=config_file)
+    assert config.compiler == "g++"
+    assert config.flags == ["-O3", "-march=native"]
+    assert config.memory_limit == 1024
+    assert toml.load(config_file)["debug"] == toml.load(cpp_config_toml)["debug"]
+
+
+def test_write_release_config_missing_keys(empty_dir: Path) -> None:
+    config_file = empty_dir / "cpp_config.toml"
+    config_file.write_text('[debug]\nflags = ["-g"]\n\n[release]\nmemory_limit = 512\n')
+    write_release_config(config_file, Variant("clang++", ["-O2"]))
+    config = toml.load(config_file)
+    assert config["release"] == {
+        "compiler": "clang++",
+        "flags": ["-O2"],
+        "memory_limit": 512,
+    }
+    assert config["debug"] == {"flags": ["-g"]}
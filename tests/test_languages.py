@@ -1,3 +1,8 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
 from pathlib import Path
 
 import pytest
@@ -8,8 +13,11 @@ from cp_heuristics_adapter.languages import (
     Cpp,
     Language,
     Python,
+    PythonBackend,
+    Rust,
     detect_language,
 )
+from cp_heuristics_adapter.pgo import PgoTraining
 
 
 class TestBuildMode:
@@ -19,6 +27,9 @@ class TestBuildMode:
     def test_build_mode_from_str_release(self) -> None:
         assert BuildMode.from_str("release") == BuildMode.RELEASE
 
+    def test_build_mode_from_str_pgo(self) -> None:
+        assert BuildMode.from_str("pgo") == BuildMode.PGO
+
     def test_build_mode_from_str_invalid(self) -> None:
         with pytest.raises(ValueError):
             BuildMode.from_str("hoge")
@@ -35,6 +46,7 @@ class TestCpp:
             "-Wall",
             "-Wextra",
         ]
+        assert config.memory_limit == 0
 
     def test_cpp_config_release(self, cpp_config_toml: Path) -> None:
         config = Cpp.Config(build_mode=BuildMode.RELEASE, config_file=cpp_config_toml)
@@ -45,6 +57,14 @@ class TestCpp:
             "-Wextra",
             "-Werror",
         ]
+        assert config.memory_limit == 1024
+
+    def test_cpp_config_pgo(self, cpp_config_toml: Path) -> None:
+        # Without a pgo section, the release config is used
+        config = Cpp.Config(build_mode=BuildMode.PGO, config_file=cpp_config_toml)
+        assert config.compiler == "clang++"
+        assert config.memory_limit == 1024
+        assert config.llvm_profdata == "llvm-profdata"
 
     @pytest.mark.parametrize(
         "build_mode",
@@ -58,6 +78,7 @@ class TestCpp:
         config = Cpp.Config(build_mode=build_mode, config_file=None)
         assert config.compiler == "g++"
         assert config.flags == ["-O2", "-Wall", "-Wextra"]
+        assert config.memory_limit == 0
 
     def test_cpp_config_not_found(self, empty_dir: Path) -> None:
         config_file = empty_dir / "hoge.toml"
@@ -96,15 +117,75 @@ class TestCpp:
         )
         mock_runner.assert_called_once_with([str(Path("a/b/c").resolve())])
 
+    def test_compile_pgo_without_training(self) -> None:
+        cpp = Cpp(build_mode=BuildMode.PGO)
+        with pytest.raises(ValueError):
+            cpp.compile(Path("a/b/c.cpp"))
+
+    @pytest.mark.skipif(shutil.which("g++") is None, reason="requires g++")
+    def test_compile_pgo(
+        self,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        empty_dir: Path,
+    ) -> None:
+        monkeypatch.setenv("XDG_CACHE_HOME", str(empty_dir / "cache"))
+        source_file = empty_dir / "solver.cpp"
+        source_file.write_text(
+            "#include <fstream>\n"
+            "#include <iostream>\n"
+            "int main(int argc, char** argv) {\n"
+            "    long long n, s = 0;\n"
+            "    std::cin >> n;\n"
+            "    for (long long i = 0; i < n; i++) s += i % 3 ? i : -i;\n"
+            "    std::cout << s << std::endl;\n"
+            "    std::ofstream(argv[1]) << n;\n"
+            "}\n"
+        )
+        inputs = []
+        for case_id in range(3):
+            input_file = empty_dir / f"{case_id:04}.txt"
+            input_file.write_text(f"{1000 * (case_id + 1)}\n")
+            inputs.append(input_file)
+        training = PgoTraining(inputs, jobs=2, timelimit=10.0)
+
+        runner = Cpp(build_mode=BuildMode.PGO, training=training).compile(source_file)
+        exec_file = Path(runner.exec_cmd[0])
+        assert exec_file.is_relative_to(empty_dir / "cache")
+        # The profiles are not kept with the build
+        assert [path.name for path in exec_file.parent.iterdir()] == ["solver"]
+        output = subprocess.run(
+            [str(exec_file), str(empty_dir / "score.txt")],
+            input="10\n",
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert output.stdout == "9\n"
+
+        # The same build is reused without compiling again
+        mocker.patch("subprocess.check_call", side_effect=AssertionError)
+        cached = Cpp(build_mode=BuildMode.PGO, training=training).compile(source_file)
+        assert cached.exec_cmd == runner.exec_cmd
+
 
 class TestPython:
     def test_py_config_debug(self, py_config_toml: Path) -> None:
         config = Python.Config(build_mode=BuildMode.DEBUG, config_file=py_config_toml)
         assert config.python == "~/.pyenv/shims/python"
+        assert config.memory_limit == 0
+        assert not config.prefork
+        assert config.preload == []
+        assert config.backend == PythonBackend.PYPY
+        assert config.pypy_jit == ["threshold=200"]
 
     def test_py_config_release(self, py_config_toml: Path) -> None:
         config = Python.Config(build_mode=BuildMode.RELEASE, config_file=py_config_toml)
         assert config.python == "python"
+        assert config.memory_limit == 512
+        assert config.prefork
+        assert config.preload == ["json", "heapq"]
+        assert config.backend == PythonBackend.CPYTHON
 
     @pytest.mark.parametrize(
         "build_mode",
@@ -117,6 +198,7 @@ class TestPython:
         mocker.patch("toml.load", side_effect=FileNotFoundError)
         config = Python.Config(build_mode=build_mode, config_file=None)
         assert config.python == "python"
+        assert config.memory_limit == 0
 
     def test_py_config_not_found(self, empty_dir: Path) -> None:
         config_file = empty_dir / "hoge.toml"
@@ -128,6 +210,9 @@ class TestPython:
             self, *, build_mode: BuildMode, config_file: Path | None = None
         ) -> None:
             self.python = "python3"
+            self.prefork = False
+            self.preload: list[str] = []
+            self.backend = PythonBackend.CPYTHON
 
     def test_compile(self, mocker: MockerFixture) -> None:
         mocker.patch(
@@ -143,6 +228,196 @@ class TestPython:
             ["python3", str(Path("a/b/c.py").resolve())]
         )
 
+    @pytest.mark.skipif(sys.platform == "win32", reason="prefork is Unix only")
+    def test_compile_prefork(self, py_config_toml: Path) -> None:
+        from cp_heuristics_adapter.prefork import PreforkRunner
+
+        python = Python(build_mode=BuildMode.RELEASE, config_file=py_config_toml)
+        runner = python.compile(Path("a/b/c.py"))
+        assert isinstance(runner, PreforkRunner)
+        assert runner.exec_cmd == ["python", str(Path("a/b/c.py").resolve())]
+        assert runner.preload == ["json", "heapq"]
+
+    def test_compile_pypy(self, mocker: MockerFixture, py_config_toml: Path) -> None:
+        mock_runner = mocker.patch("cp_heuristics_adapter.languages.ProgramRunner")
+        python = Python(build_mode=BuildMode.DEBUG, config_file=py_config_toml)
+        python.compile(Path("a/b/c.py"))
+        mock_runner.assert_called_once_with(
+            ["pypy3", "--jit", "threshold=200", str(Path("a/b/c.py").resolve())]
+        )
+
+    @pytest.mark.parametrize("backend", [PythonBackend.CYTHON, PythonBackend.NUITKA])
+    def test_compile_native_cached(
+        self,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        empty_dir: Path,
+        backend: PythonBackend,
+    ) -> None:
+        monkeypatch.setenv("XDG_CACHE_HOME", str(empty_dir / "cache"))
+        source_file = empty_dir / "solver.py"
+        source_file.write_text("print(1)\n")
+
+        def build(cmd: list[str]) -> None:
+            # Create the executable where the build command writes it
+            for arg in cmd:
+                if arg.startswith("--output-dir="):
+                    (Path(arg.split("=", 1)[1]) / "solver").touch()
+            if "-o" in cmd and not cmd[cmd.index("-o") + 1].endswith(".c"):
+                Path(cmd[cmd.index("-o") + 1]).touch()
+
+        mock_check_call = mocker.patch("subprocess.check_call", side_effect=build)
+        mocker.patch(
+            "subprocess.check_output",
+            return_value='{"include": "inc", "libdir": "lib", "ldversion": "3.12", "libs": "-lm"}',
+        )
+        mock_runner = mocker.patch("cp_heuristics_adapter.languages.ProgramRunner")
+
+        Python(build_mode=BuildMode.RELEASE, backend=backend).compile(source_file)
+        exec_file = Path(mock_runner.call_args.args[0][0])
+        assert exec_file.is_file()
+        assert exec_file.is_relative_to(empty_dir / "cache" / "cp-heuristics-adapter")
+        calls = mock_check_call.call_count
+
+        # The second build is served from the cache
+        Python(build_mode=BuildMode.RELEASE, backend=backend).compile(source_file)
+        assert mock_check_call.call_count == calls
+        assert Path(mock_runner.call_args.args[0][0]) == exec_file
+
+        # Changing the source invalidates the cache
+        source_file.write_text("print(2)\n")
+        Python(build_mode=BuildMode.RELEASE, backend=backend).compile(source_file)
+        assert mock_check_call.call_count == 2 * calls
+        assert Path(mock_runner.call_args.args[0][0]) != exec_file
+
+    def test_backend_from_str_invalid(self) -> None:
+        with pytest.raises(ValueError):
+            PythonBackend.from_str("jython")
+
+
+RUST_SOLVER = """
+fn main() {
+    let mut s = String::new();
+    std::io::stdin().read_line(&mut s).unwrap();
+    println!("{}", s.trim().parse::<i64>().unwrap() * 2);
+}
+"""
+
+
+class TestRust:
+    def test_rust_config_debug(
+        self, monkeypatch: pytest.MonkeyPatch, rust_config_toml: Path, empty_dir: Path
+    ) -> None:
+        monkeypatch.setenv("XDG_CACHE_HOME", str(empty_dir))
+        config = Rust.Config(build_mode=BuildMode.DEBUG, config_file=rust_config_toml)
+        assert config.cargo == str(Path.home() / ".cargo" / "bin" / "cargo")
+        assert config.profile == "dev"
+        assert config.edition == "2018"
+        assert config.dependencies == {}
+        assert (
+            config.target_dir == empty_dir / "cp-heuristics-adapter" / "rust" / "target"
+        )
+        assert config.memory_limit == 0
+
+    def test_rust_config_release(self, rust_config_toml: Path) -> None:
+        config = Rust.Config(build_mode=BuildMode.RELEASE, config_file=rust_config_toml)
+        assert config.cargo == "cargo"
+        assert config.profile == "bench"
+        assert config.rustflags == ["-C", "target-cpu=native"]
+        assert config.dependencies == {"rand": "0.8"}
+        assert config.target_dir == Path("/tmp/target")
+        assert config.memory_limit == 1024
+
+    @pytest.mark.parametrize(
+        "build_mode, profile",
+        [
+            (BuildMode.DEBUG, "dev"),
+            (BuildMode.RELEASE, "release"),
+        ],
+    )
+    def test_no_config(self, build_mode: BuildMode, profile: str) -> None:
+        config = Rust.Config(build_mode=build_mode, config_file=None)
+        assert config.cargo == "cargo"
+        assert config.profile == profile
+        assert config.edition == "2021"
+
+    @pytest.mark.parametrize(
+        "user_rustflags, rustflags, expected",
+        [
+            (None, [], None),
+            ("-C debuginfo=1", [], "-C debuginfo=1"),
+            (None, ["-C", "target-cpu=native"], "-C target-cpu=native"),
+            ("-C debuginfo=1", ["-C", "opt-level=3"], "-C debuginfo=1 -C opt-level=3"),
+        ],
+    )
+    def test_compile_rustflags(
+        self,
+        mocker: MockerFixture,
+        monkeypatch: pytest.MonkeyPatch,
+        user_rustflags: str | None,
+        rustflags: list[str],
+        expected: str | None,
+    ) -> None:
+        if user_rustflags is None:
+            monkeypatch.delenv("RUSTFLAGS", raising=False)
+        else:
+            monkeypatch.setenv("RUSTFLAGS", user_rustflags)
+        mocker.patch.object(
+            Rust, "_Rust__find_cargo_target", return_value=(Path("Cargo.toml"), "a")
+        )
+        artifact = {
+            "reason": "compiler-artifact",
+            "target": {"name": "a"},
+            "executable": "/target/a",
+        }
+        mock_build = mocker.patch(
+            "subprocess.check_output", return_value=json.dumps(artifact) + "\n"
+        )
+        rust = Rust(build_mode=BuildMode.RELEASE)
+        rust.config.rustflags = rustflags
+        rust.compile(Path("a.rs"))
+        env = mock_build.call_args.kwargs["env"]
+        assert env.get("RUSTFLAGS") == expected
+        if not rustflags:
+            # The environment of the user is left as is
+            assert env == dict(os.environ)
+
+    @pytest.mark.skipif(shutil.which("cargo") is None, reason="requires cargo")
+    def test_compile_single_file(
+        self, monkeypatch: pytest.MonkeyPatch, empty_dir: Path
+    ) -> None:
+        monkeypatch.setenv("XDG_CACHE_HOME", str(empty_dir / "cache"))
+        source_file = empty_dir / "main.rs"
+        source_file.write_text(RUST_SOLVER)
+        runner = Rust(build_mode=BuildMode.RELEASE).compile(source_file)
+        exec_file = Path(runner.exec_cmd[0])
+        assert exec_file.is_relative_to(empty_dir / "cache")
+        output = subprocess.check_output(exec_file, input="21\n", text=True)
+        assert output == "42\n"
+
+        # Nothing is rebuilt for an unchanged source
+        mtime = exec_file.stat().st_mtime_ns
+        runner = Rust(build_mode=BuildMode.RELEASE).compile(source_file)
+        assert Path(runner.exec_cmd[0]) == exec_file
+        assert exec_file.stat().st_mtime_ns == mtime
+
+    @pytest.mark.skipif(shutil.which("cargo") is None, reason="requires cargo")
+    def test_compile_cargo_project(
+        self, monkeypatch: pytest.MonkeyPatch, empty_dir: Path
+    ) -> None:
+        monkeypatch.setenv("XDG_CACHE_HOME", str(empty_dir / "cache"))
+        (empty_dir / "Cargo.toml").write_text(
+            '[package]\nname = "ahc"\nversion = "0.1.0"\nedition = "2021"\n'
+        )
+        source_file = empty_dir / "src" / "bin" / "a.rs"
+        source_file.parent.mkdir(parents=True)
+        source_file.write_text(RUST_SOLVER)
+        runner = Rust(build_mode=BuildMode.DEBUG).compile(source_file)
+        exec_file = Path(runner.exec_cmd[0])
+        assert exec_file.name == "a"
+        output = subprocess.check_output(exec_file, input="5\n", text=True)
+        assert output == "10\n"
+
 
 @pytest.mark.parametrize(
     "file, lang",
@@ -151,6 +426,7 @@ class TestPython:
         (Path("a/b/c.cc"), Cpp),
         (Path("a/b/c.cxx"), Cpp),
         (Path("a/b/c.py"), Python),
+        (Path("a/b/c.rs"), Rust),
     ],
 )
 def test_detect_language(file: Path, lang: type[Language]) -> None:
@@ -0,0 +1,86 @@
+import subprocess
+import sys
+from time import perf_counter
+
+import pytest
+
+from cp_heuristics_adapter.main import requested_subcommand
+
+# Budget [ms] of `cp-heuristics-adapter --help` on top of the interpreter startup.
+# It is far above the usual ~50 ms so that loaded CI machines do not fail it, and
+# still catches an eager import of the subcommands or their heavy dependencies.
+STARTUP_BUDGET_MS = 1000.0
+
+HELP = """
+from cp_heuristics_adapter.main import main
+try:
+    main(["--help"])
+except SystemExit:
+    pass
+"""
+
+CHECK_MODULES = """
+import sys
+from cp_heuristics_adapter.main import main
+try:
+    main({argv})
+except SystemExit:
+    pass
+heavy = ["toml", "yaml", "colorlog", "logging.config"]
+modules = [name for name in sys.modules if name in heavy or ".subcommands." in name]
+print(" ".join(modules), file=sys.stderr)
+"""
+
+
+def startup_ms(code: str) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+        best = min(best, perf_counter() - start)
+    return best * 1000
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        ([], None),
+        (["--help"], None),
+        (["run", "main.cpp", "10"], "run"),
+        (["-h", "tune"], "tune"),
+        (["--log-level", "info", "run", "main.cpp", "10"], "run"),
+        (["--log-level=info", "clean"], "clean"),
+        (["hoge"], None),
+    ],
+)
+def test_requested_subcommand(argv: list[str], expected: str | None) -> None:
+    assert requested_subcommand(argv) == expected
+
+
+def loaded_modules(argv: list[str]) -> set[str]:
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK_MODULES.format(argv=argv)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return set(result.stderr.split())
+
+
+def test_help_lazy_imports() -> None:
+    # Neither subcommands nor the logging configuration are loaded for --help
+    assert loaded_modules(["--help"]) == {
+        "cp_heuristics_adapter.subcommands.subcommand"
+    }
+
+
+def test_subcommand_lazy_imports() -> None:
+    modules = loaded_modules(["init", "--help"])
+    assert "cp_heuristics_adapter.subcommands.init" in modules
+    assert "cp_heuristics_adapter.subcommands.run" not in modules
+    assert "cp_heuristics_adapter.subcommands.tune" not in modules
+
+
+def test_startup_budget() -> None:
+    overhead = startup_ms(HELP) - startup_ms("pass")
+    assert overhead < STARTUP_BUDGET_MS, f"--help took {overhead:.0f} ms"
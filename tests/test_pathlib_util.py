@@ -1,3 +1,6 @@
+import os
+import sys
+import tempfile
 from pathlib import Path
 
 import pytest
@@ -7,6 +10,8 @@ from cp_heuristics_adapter.util.pathlib_util import (
     assert_empty_dir,
     assert_file_existence,
     assert_not_exists,
+    runtime_dir,
+    write_atomically,
 )
 
 
@@ -65,3 +70,47 @@ class TestPathlibUtil:
         child.mkdir()
         with pytest.raises(FileExistsError):
             assert_empty_dir(empty_dir)
+
+    def test_write_atomically(self, empty_dir: Path) -> None:
+        child = empty_dir / "child"
+        write_atomically(child, "text")
+        assert child.read_text() == "text"
+        write_atomically(child, b"bytes")
+        assert child.read_bytes() == b"bytes"
+        # No temporary file is left behind
+        assert [*empty_dir.iterdir()] == [child]
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="Unix permissions")
+    def test_runtime_dir(
+        self, empty_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(empty_dir))
+        path = runtime_dir()
+        assert path == empty_dir / "cp-heuristics-adapter"
+        assert path.stat().st_mode & 0o777 == 0o700
+        # An existing private directory is reused
+        assert runtime_dir() == path
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="Unix permissions")
+    def test_runtime_dir_not_private(
+        self, empty_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        # Created first by another user in the temporary directory
+        monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+        monkeypatch.setattr(tempfile, "tempdir", str(empty_dir))
+        path = empty_dir / f"cp-heuristics-adapter-{os.getuid()}"
+        path.mkdir(mode=0o777)
+        path.chmod(0o777)
+        with pytest.raises(PermissionError):
+            runtime_dir()
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="Unix permissions")
+    def test_runtime_dir_symlink(
+        self, empty_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(empty_dir))
+        target = empty_dir / "target"
+        target.mkdir(mode=0o700)
+        (empty_dir / "cp-heuristics-adapter").symlink_to(target)
+        with pytest.raises(PermissionError):
+            runtime_dir()
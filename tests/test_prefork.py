@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+if sys.platform == "win32":
+    pytest.skip("prefork is Unix only", allow_module_level=True)
+
+from cp_heuristics_adapter.prefork import PreforkRunner
+from cp_heuristics_adapter.runner import MemoryLimitExceeded
+
+SOLVER = """
+import json, os, sys, time
+x = int(input())
+if x < 0:
+    sys.exit(3)
+if x == 999:
+    time.sleep(10)
+if x == 1000:
+    a = bytearray(1 << 20)
+    while True:
+        a += bytearray(1 << 20)
+if x == 1001:
+    a = bytearray(2 << 30)
+if x == 1002:
+    os.kill(os.getppid(), 9)
+print(x * 2, "json" in sys.modules, __name__)
+with open(sys.argv[1], "w") as f:
+    f.write(os.environ.get("CP_OFFSET", "0"))
+"""
+
+
+@pytest.fixture
+def runner(empty_dir: Path) -> PreforkRunner:
+    source = empty_dir / "solver.py"
+    source.write_text(SOLVER)
+    return PreforkRunner(sys.executable, source, preload=["json"])
+
+
+def run(
+    runner: PreforkRunner, directory: Path, value: int, **kwargs: object
+) -> tuple[str, str]:
+    input_file = directory / "in.txt"
+    input_file.write_text(f"{value}\n")
+    output_file = directory / "out.txt"
+    score_file = directory / "score.txt"
+    with input_file.open("r") as inf, output_file.open("w") as ouf:
+        runner.run([str(score_file)], stdin=inf, stdout=ouf, **kwargs)  # type: ignore[arg-type]
+    return output_file.read_text(), score_file.read_text()
+
+
+def open_fds() -> int:
+    return len(os.listdir("/dev/fd"))
+
+
+def test_run(runner: PreforkRunner, empty_dir: Path) -> None:
+    assert run(runner, empty_dir, 21) == ("42 True __main__\n", "0")
+    # The server is reused and each run starts from a clean state
+    assert run(runner, empty_dir, 5) == ("10 True __main__\n", "0")
+
+
+def test_run_env(runner: PreforkRunner, empty_dir: Path) -> None:
+    assert run(runner, empty_dir, 1, env={"CP_OFFSET": "7"})[1] == "7"
+    assert run(runner, empty_dir, 1)[1] == "0"
+
+
+def test_run_runtime_error(runner: PreforkRunner, empty_dir: Path) -> None:
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        run(runner, empty_dir, -1)
+    assert e.value.returncode == 3
+
+
+def test_run_server_died(runner: PreforkRunner, empty_dir: Path) -> None:
+    # The solver kills the server, which therefore never reports its exit status
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        run(runner, empty_dir, 1002)
+    assert e.value.returncode == -1
+    # The server is gone, so the next run cannot connect, and leaks no descriptor
+    fds = open_fds()
+    with pytest.raises(OSError):
+        run(runner, empty_dir, 1, memory_limit_mb=256)
+    assert open_fds() == fds
+
+
+def test_run_timeout(runner: PreforkRunner, empty_dir: Path) -> None:
+    with pytest.raises(subprocess.TimeoutExpired):
+        run(runner, empty_dir, 999, timeout=0.5)
+    # The tail of stderr under a memory limit is closed too
+    fds = open_fds()
+    with pytest.raises(subprocess.TimeoutExpired):
+        run(runner, empty_dir, 999, timeout=0.5, memory_limit_mb=256)
+    assert open_fds() == fds
+    # The server keeps working after a child is killed
+    assert run(runner, empty_dir, 1)[0] == "2 True __main__\n"
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="RLIMIT_AS is enforced on Linux")
+def test_run_memory_limit_exceeded(runner: PreforkRunner, empty_dir: Path) -> None:
+    with pytest.raises(MemoryLimitExceeded):
+        run(runner, empty_dir, 1000, memory_limit_mb=256)
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="RLIMIT_AS is enforced on Linux")
+def test_run_single_allocation_exceeded(runner: PreforkRunner, empty_dir: Path) -> None:
+    with pytest.raises(MemoryLimitExceeded):
+        run(runner, empty_dir, 1001, memory_limit_mb=256)
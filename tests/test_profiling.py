@@ -0,0 +1,124 @@
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from cp_heuristics_adapter.languages import Cpp, Python, Rust
+from cp_heuristics_adapter.profiling import (
+    CProfileProfiler,
+    GprofProfiler,
+    ImportTimeProfiler,
+    PerfProfiler,
+    ProfilingRunner,
+    assert_supported,
+    collapse_perf_script,
+    default_profiler,
+)
+from cp_heuristics_adapter.runner import ProgramRunner
+
+PERF_SCRIPT = """\
+solver 1234 100.000001:     250000 cpu-clock:
+\t    55555555 hot_loop+0x1f (/tmp/solver)
+\t    55555556 main+0x10 (/tmp/solver)
+\t    7f000000 __libc_start_main+0xf3 (/usr/lib/libc.so.6)
+
+solver 1234 100.000002:     250000 cpu-clock:
+\t    55555555 hot_loop+0x2a (/tmp/solver)
+\t    55555556 main+0x10 (/tmp/solver)
+\t    7f000000 __libc_start_main+0xf3 (/usr/lib/libc.so.6)
+
+solver 1234 100.000003:     250000 cpu-clock:
+\t    55555557 std::vector<int, std::allocator<int> >::push_back+0x5 (/tmp/solver)
+\t    55555556 main+0x10 (/tmp/solver)
+"""
+
+SOLVER = """
+def hot_loop(n):
+    return sum(i * i for i in range(n))
+
+print(hot_loop(int(input())))
+"""
+
+
+def test_collapse_perf_script() -> None:
+    stacks = collapse_perf_script(PERF_SCRIPT)
+    assert stacks == {
+        "__libc_start_main;main;hot_loop": 2,
+        "main;std::vector<int, std::allocator<int> >::push_back": 1,
+    }
+
+
+def test_import_time_report(empty_dir: Path) -> None:
+    profile_files = [empty_dir / "0000.prof", empty_dir / "0001.prof"]
+    for self_us, profile_file in zip([1000, 3000], profile_files):
+        profile_file.write_text(
+            "import time: self [us] | cumulative | imported package\n"
+            f"import time: {self_us:>9} | {self_us + 500:>10} | numpy\n"
+            "Traceback of the solver is ignored\n"
+        )
+    report = ImportTimeProfiler().report([], profile_files, empty_dir)
+    assert "mean over 2 runs" in report
+    assert "2.50         2.00  numpy" in report
+
+
+def test_cprofile_runner(empty_dir: Path) -> None:
+    source = empty_dir / "solver.py"
+    source.write_text(SOLVER)
+    profile_dir = empty_dir / "profiles"
+    profile_dir.mkdir()
+    runner = ProfilingRunner(
+        ProgramRunner([sys.executable, str(source)]), CProfileProfiler(), profile_dir
+    )
+    for n in [10, 20]:
+        input_file = empty_dir / "in.txt"
+        input_file.write_text(f"{n}\n")
+        with input_file.open() as inf, (empty_dir / "out.txt").open("w") as ouf:
+            runner.run([], stdin=inf, stdout=ouf)
+    assert len(runner.profile_files) == 2
+    report = runner.report()
+    assert "hot_loop" in report
+
+
+@pytest.mark.skipif(
+    sys.platform != "linux" or shutil.which("gprof") is None,
+    reason="requires gprof with glibc",
+)
+def test_gprof_runner(empty_dir: Path) -> None:
+    source = empty_dir / "solver.cpp"
+    source.write_text(
+        "#include <cstdio>\n"
+        "int hot_loop(int n) { int s = 0; for (int i = 0; i < n; ++i) s += i; return s; }\n"
+        'int main() { printf("%d\\n", hot_loop(1000)); }\n'
+    )
+    exec_file = empty_dir / "solver"
+    subprocess.check_call(["g++", "-pg", str(source), "-o", str(exec_file)])
+    profile_dir = empty_dir / "profiles"
+    profile_dir.mkdir()
+    runner = ProfilingRunner(
+        ProgramRunner([str(exec_file)]), GprofProfiler(), profile_dir
+    )
+    for _ in range(2):
+        with (empty_dir / "out.txt").open("w") as ouf:
+            runner.run([], stdin=subprocess.DEVNULL, stdout=ouf)  # type: ignore[arg-type]
+    report = runner.report()
+    assert "hot_loop" in report
+
+
+def test_default_profiler() -> None:
+    assert default_profiler(Python) is CProfileProfiler
+
+
+@pytest.mark.parametrize(
+    "profiler, lang",
+    [
+        (CProfileProfiler, Cpp),
+        (ImportTimeProfiler, Rust),
+        (PerfProfiler, Python),
+        (GprofProfiler, Rust),
+    ],
+)
+def test_assert_supported(profiler: type, lang: type) -> None:
+    with pytest.raises(ValueError):
+        assert_supported(profiler, lang)
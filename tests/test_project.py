@@ -2,7 +2,8 @@ from pathlib import Path
 
 import pytest
 
-from cp_heuristics_adapter.languages import Cpp, Language, Python
+from cp_heuristics_adapter.case_index import CaseIndex
+from cp_heuristics_adapter.languages import Cpp, Language, Python, Rust
 from cp_heuristics_adapter.project import Project
 
 
@@ -29,7 +30,21 @@ class TestProject:
             == sample_project_root / ".cp-heuristics-adapter" / "py_config.toml"
         )
 
-    @pytest.mark.parametrize("lang", [Cpp, Python])
+    def test_rust_config_file(self, sample_project_root: Path) -> None:
+        project = Project(sample_project_root)
+        assert (
+            project.rust_config_file
+            == sample_project_root / ".cp-heuristics-adapter" / "rust_config.toml"
+        )
+
+    def test_tune_config_file(self, sample_project_root: Path) -> None:
+        project = Project(sample_project_root)
+        assert (
+            project.tune_config_file
+            == sample_project_root / ".cp-heuristics-adapter" / "tune.toml"
+        )
+
+    @pytest.mark.parametrize("lang", [Cpp, Python, Rust])
     def test_config_file(self, lang: type[Language], sample_project_root: Path) -> None:
         project = Project(sample_project_root)
         config_file: Path
@@ -41,6 +56,10 @@ class TestProject:
             config_file = (
                 sample_project_root / ".cp-heuristics-adapter" / "py_config.toml"
             )
+        elif lang == Rust:
+            config_file = (
+                sample_project_root / ".cp-heuristics-adapter" / "rust_config.toml"
+            )
         assert project.config_file(lang) == config_file
 
     def test_inputs_dir(self, sample_project_root: Path) -> None:
@@ -83,10 +102,55 @@ class TestProject:
             filename = "9999.txt"
         assert project.output_file(case_id) == sample_project_root / "out" / filename
 
+    def test_output_file_seed(self, sample_project_root: Path) -> None:
+        project = Project(sample_project_root)
+        assert (
+            project.output_file(12, seed=3)
+            == sample_project_root / "out" / "0012_seed3.txt"
+        )
+
+    def test_case_manifest(self, sample_project: Project) -> None:
+        CaseIndex(["017/017123.txt"]).save(sample_project.case_manifest_file)
+        project = Project(sample_project.root)
+        assert project.input_file(0) == project.inputs_dir / "017" / "017123.txt"
+        assert project.output_file(0, seed=1) == (
+            project.outputs_dir / "017" / "017123_seed1.txt"
+        )
+        assert project.stderr_file("20240101-000000", 0) == (
+            project.scores_dir / "stderr_20240101-000000" / "017" / "017123.txt"
+        )
+
     def test_scores_dir(self, sample_project_root: Path) -> None:
         project = Project(sample_project_root)
         assert project.scores_dir == sample_project_root / "scores"
 
+    def test_study_file(self, sample_project_root: Path) -> None:
+        project = Project(sample_project_root)
+        assert (
+            project.study_file("solver")
+            == sample_project_root / "scores" / "study_solver.jsonl"
+        )
+
+    def test_baseline_file(self, sample_project_root: Path) -> None:
+        project = Project(sample_project_root)
+        assert (
+            project.baseline_file("v1")
+            == sample_project_root / "scores" / "baseline_v1.txt"
+        )
+
+    def test_scores_files(self, sample_project: Project) -> None:
+        for name in [
+            "scores_20240102-000000.txt",
+            "scores_20240101-000000.txt",
+            "scores_20240101-000000.summary.txt",
+            "baseline_v1.txt",
+        ]:
+            (sample_project.scores_dir / name).touch()
+        assert sample_project.scores_files() == [
+            sample_project.scores_file("20240101-000000"),
+            sample_project.scores_file("20240102-000000"),
+        ]
+
     @pytest.mark.parametrize("relative_path", ["", "dir", "dir/subdir"])
     def test_search_project_root(
         self, sample_project: Project, relative_path: Path
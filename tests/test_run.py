@@ -0,0 +1,77 @@
+import math
+import sys
+
+import pytest
+
+from cp_heuristics_adapter.main import build_parser
+from cp_heuristics_adapter.project import Project
+from cp_heuristics_adapter.selection import failed_file, read_case_ids, read_ids
+from cp_heuristics_adapter.subcommands.run import CasesFailed, SeedSummary
+
+# Writes the number in the input as the score, failing on 0
+SOLVER = "import sys\nn = input()\nassert n != '0'\nopen(sys.argv[1], 'w').write(n)\n"
+
+
+@pytest.fixture
+def project(sample_project: Project) -> Project:
+    sample_project.python_config_file.write_text(
+        f'[debug]\npython = "{sys.executable}"\n'
+    )
+    (sample_project.root / "main.py").write_text(SOLVER)
+    for case_id in range(3):
+        (sample_project.inputs_dir / f"{case_id:04}.txt").write_text(f"{case_id}\n")
+    return sample_project
+
+
+def run(argv: list[str]) -> None:
+    parser, subcommand = build_parser(argv)
+    assert subcommand is not None
+    subcommand.run(parser.parse_args(argv))
+
+
+def test_failed_cases_keep_the_others(project: Project) -> None:
+    with pytest.raises(CasesFailed):
+        run(["run", str(project.root / "main.py"), "3"])
+    (scores_file,) = project.scores_dir.glob("scores_????????-??????.txt")
+    assert scores_file.read_text().split() == ["1", "2"]
+    assert read_case_ids(scores_file, 2) == [1, 2]
+    assert read_ids(failed_file(scores_file)) == [0]
+    assert any(project.store_dir.iterdir())
+
+
+def test_seed_summary() -> None:
+    summary = SeedSummary([[1, 3], [5, 7], [9, 9]])
+    assert summary.seeds == 2
+    assert summary.means == [2, 6, 9]
+    assert summary.mins == [1, 5, 9] and summary.maxs == [3, 7, 9]
+    # Variances over the seeds are 2, 2 and 0
+    assert summary.within_case_variance == pytest.approx(4 / 3)
+    # Variance of the means 2, 6 and 9
+    assert summary.across_case_variance == pytest.approx(37 / 3)
+    # The within-case variance over all the 3 * 2 runs
+    assert summary.seed_stderr == pytest.approx(math.sqrt(4 / 3 / 6))
+    assert "seeds per case       : 2" in summary.pretty()
+    assert "0002       9.00       0.00       9.00       9.00" in summary.pretty()
+
+
+def test_seed_summary_case_ids() -> None:
+    # Cases selected by e.g. '3,10-11', or left by failed cases
+    summary = SeedSummary([[1, 3], [5, 7], [9, 9]], [3, 10, 11])
+    rows = summary.pretty().splitlines()[-3:]
+    assert [row.split()[0] for row in rows] == ["0003", "0010", "0011"]
+    assert rows[1].split()[1:] == ["6.00", "1.41", "5.00", "7.00"]
+
+
+def test_seed_summary_single_case() -> None:
+    summary = SeedSummary([[4, 6, 8]])
+    assert summary.within_case_variance == pytest.approx(4)
+    assert summary.across_case_variance == 0.0
+
+
+def test_seed_summary_of_failed_run(project: Project) -> None:
+    with pytest.raises(CasesFailed):
+        run(["run", str(project.root / "main.py"), "3", "--seeds", "2"])
+    (summary_file,) = project.scores_dir.glob("scores_*.summary.txt")
+    rows = summary_file.read_text().split("case       mean")[1].splitlines()[1:3]
+    # The case 0 failed, so the rows are the cases 1 and 2
+    assert [row.split()[0] for row in rows] == ["0001", "0002"]
@@ -1,11 +1,14 @@
+import subprocess
 import sys
 from pathlib import Path
 from typing import Generator, TextIO
+from unittest.mock import MagicMock
 
 import pytest
 from pytest_mock import MockerFixture
 
 from cp_heuristics_adapter.runner import (
+    MemoryLimitExceeded,
     ProgramRunner,
     RunResult,
     Solver,
@@ -34,6 +37,16 @@ def text_io_err(empty_dir: Path) -> Generator[TextIO, None, None]:
         yield f
 
 
+@pytest.fixture
+def popen_mock(mocker: MockerFixture) -> MagicMock:
+    process = mocker.MagicMock()
+    process.__enter__.return_value = process
+    process.communicate.return_value = ("hello", None)
+    process.returncode = 0
+    mock: MagicMock = mocker.patch("subprocess.Popen", return_value=process)
+    return mock
+
+
 class TestRunResult:
     @pytest.mark.parametrize(
         "time_ms, expected",
@@ -74,7 +87,7 @@ class TestProgramRunner:
     )
     def test_run_std_inout(
         self,
-        mocker: MockerFixture,
+        popen_mock: MagicMock,
         stdin: TextIO | None,
         stdout: TextIO | None,
         stderr: TextIO | None,
@@ -84,26 +97,25 @@ class TestProgramRunner:
         args = ["arg1", "arg2"]
 
         runner = ProgramRunner(exec_cmd=exec_cmd)
-        check_output_mock = mocker.patch(
-            "subprocess.check_output", return_value="hello"
-        )
 
         result = runner.run(
             args=args, timeout=timeout, stdin=stdin, stdout=stdout, stderr=stderr
         )
         assert result.output == "hello"
         assert result.time_ms > 0
-        check_output_mock.assert_called_once_with(
+        popen_mock.assert_called_once_with(
             args=["python", "hoge.py", "arg1", "arg2"],
-            timeout=timeout,
             stdin=sys.stdin,
+            stdout=subprocess.PIPE,
             stderr=sys.stderr,
             text=True,
+            env=None,
         )
+        popen_mock.return_value.communicate.assert_called_once_with(timeout=timeout)
 
     def test_run_custom_inout(
         self,
-        mocker: MockerFixture,
+        popen_mock: MagicMock,
         text_io_in: TextIO,
         text_io_out: TextIO,
         text_io_err: TextIO,
@@ -112,9 +124,6 @@ class TestProgramRunner:
         args = ["arg1", "arg2"]
 
         runner = ProgramRunner(exec_cmd=exec_cmd)
-        check_output_mock = mocker.patch(
-            "subprocess.check_output", return_value="hello"
-        )
 
         result = runner.run(
             args=args,
@@ -125,13 +134,96 @@ class TestProgramRunner:
         )
         assert result.output == "hello"
         assert result.time_ms > 0
-        check_output_mock.assert_called_once_with(
+        popen_mock.assert_called_once_with(
             args=["python", "hoge.py", "arg1", "arg2"],
-            timeout=None,
             stdin=text_io_in,
+            stdout=subprocess.PIPE,
             stderr=text_io_err,
             text=True,
+            env=None,
         )
+        popen_mock.return_value.communicate.assert_called_once_with(timeout=None)
+
+    def test_run_env(self, text_io_in: TextIO, text_io_out: TextIO) -> None:
+        code = "import os; print(os.environ['CP_TEST'], 'PATH' in os.environ)"
+        runner = ProgramRunner([sys.executable, "-c", code])
+        result = runner.run(
+            args=[],
+            stdin=text_io_in,
+            stdout=text_io_out,
+            env={"CP_TEST": "value"},
+        )
+        assert result.output.split() == ["value", "True"]
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="requires RLIMIT_AS")
+    def test_run_memory_limit(
+        self, text_io_in: TextIO, text_io_out: TextIO, text_io_err: TextIO
+    ) -> None:
+        runner = ProgramRunner([sys.executable, "-c", "print('hello')"])
+        result = runner.run(
+            args=[],
+            timeout=None,
+            stdin=text_io_in,
+            stdout=text_io_out,
+            stderr=text_io_err,
+            memory_limit_mb=1024,
+        )
+        assert result.output == "hello\n"
+        assert result.max_rss_mb is not None
+        assert 0 < result.max_rss_mb < 1024
+
+    @pytest.mark.skipif(sys.platform != "linux", reason="requires enforced RLIMIT_AS")
+    def test_run_memory_limit_exceeded(
+        self, text_io_in: TextIO, text_io_out: TextIO, text_io_err: TextIO
+    ) -> None:
+        # Touch the memory page by page so that the resident set size grows
+        allocate = "a = bytearray(1 << 20)\nwhile True: a += bytearray(1 << 20)"
+        runner = ProgramRunner([sys.executable, "-c", allocate])
+        with pytest.raises(MemoryLimitExceeded) as e:
+            runner.run(
+                args=[],
+                timeout=10.0,
+                stdin=text_io_in,
+                stdout=text_io_out,
+                stderr=text_io_err,
+                memory_limit_mb=256,
+            )
+        assert e.value.memory_limit_mb == 256
+
+    @pytest.mark.skipif(sys.platform != "linux", reason="requires enforced RLIMIT_AS")
+    def test_run_single_allocation_exceeded(
+        self, text_io_in: TextIO, text_io_out: TextIO, empty_dir: Path
+    ) -> None:
+        # The allocation fails at once, so the resident set size stays small
+        runner = ProgramRunner([sys.executable, "-c", "a = bytearray(2 << 30)"])
+        with (empty_dir / "error.txt").open("w") as stderr:
+            with pytest.raises(MemoryLimitExceeded):
+                runner.run(
+                    args=[],
+                    timeout=10.0,
+                    stdin=text_io_in,
+                    stdout=text_io_out,
+                    stderr=stderr,
+                    memory_limit_mb=256,
+                )
+        # stderr still reaches the given file
+        assert "MemoryError" in (empty_dir / "error.txt").read_text()
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="requires RLIMIT_AS")
+    def test_run_memory_limit_runtime_error(
+        self, text_io_in: TextIO, text_io_out: TextIO, text_io_err: TextIO
+    ) -> None:
+        runner = ProgramRunner([sys.executable, "-c", "exit(1)"])
+        with pytest.raises(subprocess.CalledProcessError) as e:
+            runner.run(
+                args=[],
+                timeout=10.0,
+                stdin=text_io_in,
+                stdout=text_io_out,
+                stderr=text_io_err,
+                memory_limit_mb=1024,
+            )
+        assert not isinstance(e.value, MemoryLimitExceeded)
 
 
 class TestSolver:
@@ -0,0 +1,112 @@
+from pathlib import Path
+
+import pytest
+
+from cp_heuristics_adapter.case_index import CaseIndex
+from cp_heuristics_adapter.project import Project
+from cp_heuristics_adapter.selection import (
+    case_ids_file,
+    failed_file,
+    parse_shard,
+    read_case_ids,
+    read_scores,
+    resolve_run,
+    scores_by_case,
+    select_cases,
+    shard_cases,
+    write_ids,
+)
+from cp_heuristics_adapter.subcommands.merge import merge_scores
+
+
+class TestSelectCases:
+    def test_number(self, sample_project: Project) -> None:
+        assert select_cases("3", sample_project) == [0, 1, 2]
+
+    def test_ids_and_ranges(self, sample_project: Project) -> None:
+        assert select_cases("7,3,10-12,3", sample_project) == [3, 7, 10, 11, 12]
+        assert select_cases("5,", sample_project) == [5]
+
+    def test_file(self, sample_project: Project, empty_dir: Path) -> None:
+        ids_file = empty_dir / "ids.txt"
+        ids_file.write_text("4 2  # flaky\n9,1\n")
+        assert select_cases(f"@{ids_file}", sample_project) == [1, 2, 4, 9]
+
+    def test_glob(self, sample_project: Project) -> None:
+        for case_id in [1, 10, 11, 20]:
+            sample_project.input_file(case_id).touch()
+        assert select_cases("glob:001*.txt", sample_project) == [10, 11]
+
+    def test_manifest(self, sample_project: Project) -> None:
+        with pytest.raises(ValueError):
+            select_cases("all", sample_project)
+        CaseIndex(["a/1.txt", "a/2.txt", "b/1.txt"]).save(
+            sample_project.case_manifest_file
+        )
+        project = Project(sample_project.root)
+        assert select_cases("all", project) == [0, 1, 2]
+        assert select_cases("glob:*/1.txt", project) == [0, 2]
+
+    def test_failed(self, sample_project: Project) -> None:
+        write_ids(failed_file(sample_project.scores_file("20240101-000000")), [3, 5])
+        write_ids(failed_file(sample_project.scores_file("20240102-000000")), [8])
+        sample_project.scores_file("20240103-000000").write_text("1\n")
+        assert select_cases("failed:20240101-000000", sample_project) == [3, 5]
+        assert select_cases("failed", sample_project) == [8]
+        with pytest.raises(ValueError):
+            select_cases("failed:20240103-000000", sample_project)
+        with pytest.raises(FileNotFoundError):
+            select_cases("failed:20240104-000000", sample_project)
+
+    @pytest.mark.parametrize("selector", ["a", "1-", "glob:*.none"])
+    def test_invalid(self, sample_project: Project, selector: str) -> None:
+        with pytest.raises(ValueError):
+            select_cases(selector, sample_project)
+
+
+def test_shards() -> None:
+    case_ids = list(range(10))
+    shards = [shard_cases(case_ids, index, 3) for index in range(1, 4)]
+    assert shards == [[0, 3, 6, 9], [1, 4, 7], [2, 5, 8]]
+    assert parse_shard("2/3") == (2, 3)
+    for shard in ["0/3", "4/3", "1"]:
+        with pytest.raises(ValueError):
+            parse_shard(shard)
+
+
+def test_read_case_ids(empty_dir: Path) -> None:
+    scores_file = empty_dir / "scores.txt"
+    assert read_case_ids(scores_file, 3) == [0, 1, 2]
+    write_ids(case_ids_file(scores_file), [4, 2])
+    assert read_case_ids(scores_file, 2) == [4, 2]
+    with pytest.raises(ValueError):
+        read_case_ids(scores_file, 3)
+
+
+def test_read_scores(empty_dir: Path) -> None:
+    scores_file = empty_dir / "scores.txt"
+    scores_file.write_text("1 3\n5 5\n")
+    assert read_scores(scores_file) == [2.0, 5.0]
+    write_ids(case_ids_file(scores_file), [7, 4])
+    assert scores_by_case(scores_file) == {7: 2.0, 4: 5.0}
+
+
+def test_resolve_run(sample_project: Project) -> None:
+    scores_file = sample_project.scores_file("20240101-000000")
+    scores_file.write_text("1\n")
+    assert resolve_run(sample_project, "20240101-000000") == scores_file
+    assert resolve_run(sample_project, str(scores_file)) == scores_file
+    with pytest.raises(FileNotFoundError):
+        resolve_run(sample_project, "20240102-000000")
+
+
+def test_merge_scores(empty_dir: Path) -> None:
+    shard1 = empty_dir / "scores_1.txt"
+    shard1.write_text("10\n30\n")
+    write_ids(case_ids_file(shard1), [0, 2])
+    shard2 = empty_dir / "scores_2.txt"
+    shard2.write_text("20 21\n")
+    write_ids(case_ids_file(shard2), [1])
+    assert merge_scores([shard2, shard1]) == {0: "10", 1: "20 21", 2: "30"}
+    with pytest.raises(ValueError):
+        merge_scores([shard1, shard1])
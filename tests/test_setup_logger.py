@@ -0,0 +1,46 @@
+import json
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+from cp_heuristics_adapter.setup_logger import JsonLinesFormatter
+
+# setup_logging changes the global state, so it is tested in another process
+LOGGING = """
+import logging, sys
+from pathlib import Path
+from cp_heuristics_adapter.setup_logger import add_log_file, setup_logging
+setup_logging(console_level="WARNING", file_level="INFO")
+add_log_file(Path(sys.argv[1]))
+logger = logging.getLogger("test")
+logger.debug("debug")
+logger.info("info")
+logger.warning("warning")
+"""
+
+
+def test_json_lines_formatter() -> None:
+    record = logging.LogRecord(
+        "test", logging.INFO, __file__, 1, "score: %d", (42,), None
+    )
+    entry = json.loads(JsonLinesFormatter().format(record))
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "test"
+    assert entry["message"] == "score: 42"
+    assert "time" in entry and "thread" in entry
+
+
+def test_levels(empty_dir: Path) -> None:
+    log_file = empty_dir / "log.jsonl"
+    result = subprocess.run(
+        [sys.executable, "-c", LOGGING, str(log_file)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    # The console and the log file have independent levels
+    assert "warning" in result.stdout
+    assert "info" not in result.stdout
+    messages = [json.loads(line)["message"] for line in log_file.open()]
+    assert messages == ["info", "warning"]
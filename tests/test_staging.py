@@ -0,0 +1,84 @@
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+from cp_heuristics_adapter.executor import Case, Verdict, run_cases
+from cp_heuristics_adapter.runner import ProgramRunner
+from cp_heuristics_adapter.staging import Stage
+
+SOLVER = """
+import sys
+x = int(input())
+print(x * 2)
+with open(sys.argv[1], "w") as f:
+    f.write(str(x))
+"""
+
+
+@pytest.fixture
+def cases(empty_dir: Path) -> list[Case]:
+    (empty_dir / "in").mkdir()
+    (empty_dir / "out").mkdir()
+    cases = []
+    for case_id in range(5):
+        input_file = empty_dir / "in" / f"{case_id:04}.txt"
+        input_file.write_text(f"{case_id}\n")
+        cases.append(Case(case_id, input_file, empty_dir / "out" / f"{case_id:04}.txt"))
+    return cases
+
+
+def test_stage_cases(empty_dir: Path, cases: list[Case]) -> None:
+    source = empty_dir / "solver.py"
+    source.write_text(SOLVER)
+    runner = ProgramRunner([sys.executable, str(source)])
+    with Stage(empty_dir) as stage:
+        staged_cases = stage.cases(cases)
+        for case, staged_case in zip(cases, staged_cases):
+            assert staged_case.input_file.is_relative_to(stage.dir)
+            assert staged_case.input_file.name == case.input_file.name
+            assert staged_case.output_file.is_relative_to(stage.dir)
+        # Inputs are staged once
+        assert stage.cases(cases)[0].input_file == staged_cases[0].input_file
+        results = [
+            stage.write_back(result)
+            for result in run_cases(runner, staged_cases, jobs=2, timelimit=10.0)
+        ]
+        stage.flush()
+        assert {result.case for result in results} == set(cases)
+        assert all(result.verdict == Verdict.AC for result in results)
+        for case in cases:
+            assert case.output_file.read_text() == f"{case.case_id * 2}\n"
+        stage_dir = stage.dir
+    assert not stage_dir.exists()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Executables are not staged")
+def test_stage_runner(empty_dir: Path) -> None:
+    true = shutil.which("true")
+    assert true is not None
+    with Stage(empty_dir) as stage:
+        staged = stage.runner(ProgramRunner([true]))
+        assert Path(staged.exec_cmd[0]).is_relative_to(stage.dir)
+        assert os.access(staged.exec_cmd[0], os.X_OK)
+        # Interpreted solvers are run as is
+        interpreted = ProgramRunner([sys.executable, "solver.py"])
+        assert stage.runner(interpreted) is interpreted
+
+
+def test_restage_changed_input(empty_dir: Path, cases: list[Case]) -> None:
+    with Stage(empty_dir) as stage:
+        staged = stage.cases(cases[:1])[0].input_file
+        assert stage.cases(cases[:1])[0].input_file == staged
+        cases[0].input_file.write_text("100\n")
+        restaged = stage.cases(cases[:1])[0].input_file
+        assert restaged != staged
+        assert restaged.read_text() == "100\n"
+        assert not staged.exists()
+
+
+def test_missing_root(empty_dir: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        Stage(empty_dir / "missing")
@@ -0,0 +1,101 @@
+from pathlib import Path
+
+import pytest
+
+from cp_heuristics_adapter.store import OutputStore
+from cp_heuristics_adapter.tuning import Direction
+
+
+def save_run(
+    store: OutputStore,
+    outputs_dir: Path,
+    timestamp: str,
+    outputs: list[str],
+    case_ids: list[int] | None = None,
+) -> None:
+    if case_ids is None:
+        case_ids = list(range(len(outputs)))
+    output_files = []
+    for case_id, output in zip(case_ids, outputs):
+        output_file = outputs_dir / f"{case_id:04}.txt"
+        output_file.write_text(output)
+        output_files.append(output_file)
+    score = float(timestamp[-1])
+    store.save_run(timestamp, output_files, outputs_dir, score, case_ids, "plain")
+
+
+@pytest.fixture
+def store(empty_dir: Path) -> OutputStore:
+    return OutputStore(empty_dir / "store")
+
+
+@pytest.fixture
+def outputs_dir(empty_dir: Path) -> Path:
+    outputs_dir = empty_dir / "out"
+    outputs_dir.mkdir()
+    return outputs_dir
+
+
+def test_deduplication(store: OutputStore, outputs_dir: Path) -> None:
+    save_run(store, outputs_dir, "20240101-000001", ["a", "b", "a"])
+    save_run(store, outputs_dir, "20240101-000002", ["a", "c", "b"])
+    assert len(list(store.objects_dir.glob("*/*.gz"))) == 3
+    assert [run.timestamp for run in store.runs()] == [
+        "20240101-000001",
+        "20240101-000002",
+    ]
+
+
+def test_restore(store: OutputStore, outputs_dir: Path, empty_dir: Path) -> None:
+    save_run(store, outputs_dir, "20240101-000001", ["a", "b"])
+    save_run(store, outputs_dir, "20240101-000002", ["c", "d"])
+    restored_dir = empty_dir / "restored"
+    store.restore(store.run("20240101-000001"), restored_dir)
+    assert (restored_dir / "0000.txt").read_text() == "a"
+    assert (restored_dir / "0001.txt").read_text() == "b"
+    with pytest.raises(FileNotFoundError):
+        store.run("20240101-000003")
+
+
+def test_best_run(store: OutputStore, outputs_dir: Path) -> None:
+    save_run(store, outputs_dir, "20240101-000003", ["a"])
+    save_run(store, outputs_dir, "20240101-000001", ["b"])
+    save_run(store, outputs_dir, "20240101-000002", ["c"])
+    assert store.best_run(Direction.MAXIMIZE).timestamp == "20240101-000003"
+    assert store.best_run(Direction.MINIMIZE).timestamp == "20240101-000001"
+
+
+def test_best_run_over_the_same_cases(store: OutputStore, outputs_dir: Path) -> None:
+    save_run(store, outputs_dir, "20240101-000001", ["a", "b", "c"])
+    save_run(store, outputs_dir, "20240101-000002", ["d", "e", "f"])
+    # A rerun of a failed case is not ranked with the runs over all the cases
+    save_run(store, outputs_dir, "20240101-000009", ["g"], case_ids=[1])
+    assert store.best_run(Direction.MAXIMIZE).timestamp == "20240101-000002"
+
+
+def test_prune(store: OutputStore, outputs_dir: Path) -> None:
+    save_run(store, outputs_dir, "20240101-000009", ["best", "shared"])
+    for i in range(1, 5):
+        save_run(store, outputs_dir, f"20240101-00001{i}", [f"run{i}", "shared"])
+    removed = store.prune(keep_last=2, keep_best=1)
+    assert [run.timestamp for run in removed] == ["20240101-000011", "20240101-000012"]
+    assert [run.timestamp for run in store.runs()] == [
+        "20240101-000009",
+        "20240101-000013",
+        "20240101-000014",
+    ]
+    # The objects of the removed runs are collected unless kept runs use them
+    assert len(list(store.objects_dir.glob("*/*.gz"))) == 4
+    assert store.collect_garbage() == 0
+
+
+def test_prune_keeps_the_best_of_each_selection(
+    store: OutputStore, outputs_dir: Path
+) -> None:
+    save_run(store, outputs_dir, "20240101-000001", ["a", "b"])
+    save_run(store, outputs_dir, "20240101-000002", ["c", "d"])
+    save_run(store, outputs_dir, "20240101-000009", ["e"], case_ids=[1])
+    removed = store.prune(keep_last=None, keep_best=1)
+    assert [run.timestamp for run in removed] == ["20240101-000001"]
+    run = store.run("20240101-000009")
+    assert run.case_ids == (1,) and run.score_type == "plain"
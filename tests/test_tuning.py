@@ -0,0 +1,232 @@
+import random
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from cp_heuristics_adapter.tuning import (
+    Direction,
+    Param,
+    ParamType,
+    ParamValue,
+    PassBy,
+    RandomSampler,
+    SearchSpace,
+    Study,
+    TPESampler,
+    Trial,
+    TrialState,
+    Tuner,
+    halving_budgets,
+)
+
+SPEC = """
+direction = "minimize"
+pass_by = "args"
+
+[params.temp]
+type = "float"
+low = 1.0
+high = 100.0
+log = true
+
+[params.width]
+type = "int"
+low = 1
+high = 10
+
+[params.move]
+type = "categorical"
+choices = ["swap", "insert"]
+"""
+
+
+@pytest.fixture
+def space() -> SearchSpace:
+    return SearchSpace(
+        params=(
+            Param("x", ParamType.FLOAT, low=0.0, high=10.0),
+            Param("k", ParamType.INT, low=1, high=5),
+        ),
+    )
+
+
+def evaluator(
+    tasks: list[tuple[Trial, int]],
+) -> Iterator[tuple[Trial, int, int | None]]:
+    # The closer x is to 7 the better, and k = 5 always fails
+    for trial, case_id in tasks:
+        if trial.params["k"] == 5:
+            yield trial, case_id, None
+        else:
+            score = 1000 - int(100 * abs(float(trial.params["x"]) - 7)) + case_id
+            yield trial, case_id, score
+
+
+class TestParam:
+    @pytest.mark.parametrize("value", [1.0, 10.0, 100.0])
+    def test_unit_roundtrip_log(self, value: float) -> None:
+        param = Param("p", ParamType.FLOAT, low=1.0, high=100.0, log=True)
+        assert param.from_unit(param.to_unit(value)) == pytest.approx(value)
+
+    def test_to_unit_log(self) -> None:
+        param = Param("p", ParamType.FLOAT, low=1.0, high=100.0, log=True)
+        assert param.to_unit(10.0) == pytest.approx(0.5)
+
+    def test_from_unit_int(self) -> None:
+        param = Param("p", ParamType.INT, low=1, high=5)
+        assert param.from_unit(0.0) == 1
+        assert param.from_unit(0.5) == 3
+        assert param.from_unit(1.0) == 5
+
+    def test_sample_categorical(self) -> None:
+        param = Param("p", ParamType.CATEGORICAL, choices=("a", "b"))
+        rng = random.Random(0)
+        assert {param.sample(rng) for _ in range(100)} == {"a", "b"}
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"type": ParamType.FLOAT, "low": 2.0, "high": 1.0},
+            {"type": ParamType.FLOAT, "low": 0.0, "high": 1.0, "log": True},
+            {"type": ParamType.CATEGORICAL},
+        ],
+    )
+    def test_invalid(self, kwargs: dict[str, object]) -> None:
+        with pytest.raises(ValueError):
+            Param("p", **kwargs)  # type: ignore[arg-type]
+
+
+class TestSearchSpace:
+    def test_load(self, empty_dir: Path) -> None:
+        spec_file = empty_dir / "tune.toml"
+        spec_file.write_text(SPEC)
+        space = SearchSpace.load(spec_file)
+        assert space.direction == Direction.MINIMIZE
+        assert space.pass_by == PassBy.ARGS
+        assert [param.name for param in space.params] == ["temp", "width", "move"]
+        assert space.params[0].log
+        assert space.params[1].type == ParamType.INT
+        assert space.params[2].choices == ("swap", "insert")
+
+    def test_load_not_found(self, empty_dir: Path) -> None:
+        with pytest.raises(FileNotFoundError):
+            SearchSpace.load(empty_dir / "tune.toml")
+
+    def test_load_no_params(self, empty_dir: Path) -> None:
+        spec_file = empty_dir / "tune.toml"
+        spec_file.write_text('direction = "maximize"\n')
+        with pytest.raises(ValueError):
+            SearchSpace.load(spec_file)
+
+    def test_solver_env(self, space: SearchSpace) -> None:
+        values: dict[str, ParamValue] = {"x": 1.5, "k": 2}
+        assert space.solver_env(values) == {"x": "1.5", "k": "2"}
+        assert space.solver_args(values) == []
+
+    def test_solver_args(self, space: SearchSpace) -> None:
+        space = SearchSpace(params=space.params, pass_by=PassBy.ARGS)
+        values: dict[str, ParamValue] = {"x": 1.5, "k": 2}
+        assert space.solver_args(values) == ["--x=1.5", "--k=2"]
+        assert space.solver_env(values) == {}
+
+
+@pytest.mark.parametrize(
+    "number, min_cases, eta, expected",
+    [
+        (9, 1, 3, [1, 3, 9]),
+        (9, 4, 3, [9]),
+        (100, 4, 3, [11, 33, 100]),
+        (100, 3, 3, [3, 11, 33, 100]),
+        (1, 1, 2, [1]),
+    ],
+)
+def test_halving_budgets(
+    number: int, min_cases: int, eta: int, expected: list[int]
+) -> None:
+    assert halving_budgets(number, min_cases, eta) == expected
+
+
+class TestStudy:
+    def test_resume(self, empty_dir: Path, space: SearchSpace) -> None:
+        study_file = empty_dir / "study.jsonl"
+        study = Study(study_file, space)
+        trial = study.add_trial(0, {"x": 1.0, "k": 2})
+        study.record_score(trial, 0, 10)
+        study.record_score(trial, 1, None)
+        study.set_state(trial, TrialState.FAILED, 1)
+
+        resumed = Study(study_file, space)
+        assert len(resumed.trials) == 1
+        assert resumed.trials[0].params == {"x": 1.0, "k": 2}
+        assert resumed.trials[0].scores == {0: 10, 1: None}
+        assert resumed.trials[0].state == TrialState.FAILED
+        assert resumed.trials[0].rung == 1
+
+    def test_resume_other_params(self, empty_dir: Path, space: SearchSpace) -> None:
+        study_file = empty_dir / "study.jsonl"
+        Study(study_file, space)
+        other = SearchSpace(params=space.params[:1])
+        with pytest.raises(ValueError):
+            Study(study_file, other)
+
+
+class TestTuner:
+    def make_tuner(self, study: Study, budgets: list[int]) -> Tuner:
+        return Tuner(
+            study=study,
+            sampler=RandomSampler(),
+            evaluator=evaluator,
+            case_ids=list(range(budgets[-1])),
+            budgets=budgets,
+            eta=3,
+            transform=float,
+            seed=0,
+        )
+
+    def test_optimize(self, empty_dir: Path, space: SearchSpace) -> None:
+        study = Study(empty_dir / "study.jsonl", space)
+        best = self.make_tuner(study, [3]).optimize(n_trials=10, batch_size=4)
+        assert len(study.trials) == 10
+        assert all(t.state != TrialState.RUNNING for t in study.trials)
+        for trial in study.trials:
+            expected = (
+                TrialState.FAILED if trial.params["k"] == 5 else TrialState.COMPLETE
+            )
+            assert trial.state == expected
+        assert best is not None
+        complete = [t for t in study.trials if t.state == TrialState.COMPLETE]
+        assert min(abs(float(t.params["x"]) - 7) for t in complete) == abs(
+            float(best.params["x"]) - 7
+        )
+
+    def test_optimize_halving(self, empty_dir: Path, space: SearchSpace) -> None:
+        study = Study(empty_dir / "study.jsonl", space)
+        self.make_tuner(study, [1, 3, 9]).optimize(n_trials=9, batch_size=9)
+        states = [t.state for t in study.trials]
+        assert states.count(TrialState.COMPLETE) == 1
+        # Pruned trials are not evaluated on the remaining cases
+        for trial in study.trials:
+            if trial.state == TrialState.PRUNED and trial.rung == 0:
+                assert list(trial.scores) == [0]
+
+    def test_optimize_resume(self, empty_dir: Path, space: SearchSpace) -> None:
+        study_file = empty_dir / "study.jsonl"
+        self.make_tuner(Study(study_file, space), [3]).optimize(
+            n_trials=4, batch_size=4
+        )
+        study = Study(study_file, space)
+        self.make_tuner(study, [3]).optimize(n_trials=8, batch_size=4)
+        assert len(study.trials) == 8
+        assert study.trials[0].params != study.trials[4].params
+
+    def test_tpe_sampler(self, space: SearchSpace) -> None:
+        rng = random.Random(0)
+        ranked = [
+            Trial(trial_id=i, bracket=0, params={"x": 7.0 + i * 0.01, "k": 2})
+            for i in range(TPESampler.N_STARTUP_TRIALS)
+        ]
+        for _ in range(20):
+            values = TPESampler().sample(space, ranked, rng)
+            assert 0.0 <= float(values["x"]) <= 10.0
+            assert values["k"] in range(1, 6)
@@ -0,0 +1,66 @@
+import os
+import threading
+from pathlib import Path
+
+from cp_heuristics_adapter.watch import FileWatcher, local_dependencies
+
+
+def write(path: Path, text: str) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+class TestLocalDependencies:
+    def test_cpp(self, empty_dir: Path) -> None:
+        source = write(
+            empty_dir / "main.cpp",
+            '#include <vector>\n#include "lib/a.hpp"\n# include "missing.hpp"\n',
+        )
+        a = write(empty_dir / "lib" / "a.hpp", '#include "b.h"\n#include "c.hpp"\n')
+        b = write(empty_dir / "lib" / "b.h", '#include "a.hpp"\n')
+        c = write(empty_dir / "c.hpp", "")
+        assert local_dependencies(source) == [source, a, b, c]
+
+    def test_python(self, empty_dir: Path) -> None:
+        source = write(
+            empty_dir / "main.py",
+            "import sys, util\nfrom pkg.mod import f\nimport numpy as np\n",
+        )
+        util = write(empty_dir / "util.py", "from pkg import g\n")
+        mod = write(empty_dir / "pkg" / "mod.py", "")
+        init = write(empty_dir / "pkg" / "__init__.py", "")
+        assert local_dependencies(source) == [source, util, mod, init]
+
+    def test_rust(self, empty_dir: Path) -> None:
+        source = write(empty_dir / "src" / "main.rs", "mod a;\npub(crate) mod b;\n")
+        a = write(empty_dir / "src" / "a.rs", "pub mod c;\n")
+        b = write(empty_dir / "src" / "b" / "mod.rs", "")
+        c = write(empty_dir / "src" / "a" / "c.rs", "")
+        assert local_dependencies(source) == [source, a, b, c]
+
+    def test_unknown_suffix(self, empty_dir: Path) -> None:
+        source = write(empty_dir / "main.txt", '#include "a.hpp"\n')
+        assert local_dependencies(source) == [source]
+
+
+class TestFileWatcher:
+    def test_changed(self, empty_dir: Path) -> None:
+        a = write(empty_dir / "a.txt", "a")
+        b = empty_dir / "b.txt"
+        watcher = FileWatcher([a, b])
+        assert watcher.changed() == []
+        write(b, "b")
+        os.utime(a, ns=(0, 0))
+        assert watcher.changed() == [a, b]
+        assert watcher.changed() == []
+
+    def test_wait(self, empty_dir: Path) -> None:
+        a = write(empty_dir / "a.txt", "a")
+        watcher = FileWatcher([a])
+        timer = threading.Timer(0.3, lambda: write(a, "changed"))
+        timer.start()
+        try:
+            assert watcher.wait() == [a]
+        finally:
+            timer.cancel()